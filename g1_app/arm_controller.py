@@ -247,7 +247,9 @@ class ArmController:
         Play back a sequence of waypoints
         
         Args:
-            waypoints: List of waypoint dictionaries with 'arm' and 'joints'
+            waypoints: List of waypoint dictionaries with 'arm' and 'joints', and
+                optionally 'steps' - the number of transitions the waypoint stands
+                for (set by simplify_waypoints for the waypoints it dropped)
             speed: Playback speed multiplier (1.0 = normal)
             
         Returns:
@@ -258,18 +260,21 @@ class ArmController:
             
             # Default transition time between waypoints
             transition_time = 1.0 / speed
+            pause = 0.1
             
             for i, waypoint in enumerate(waypoints):
                 arm = waypoint['arm']
                 joints = waypoint['joints']
+                steps = max(1, int(waypoint.get('steps', 1)))
                 
                 logger.info(f"Waypoint {i+1}/{len(waypoints)}: {arm} arm")
                 
-                # Move to waypoint
+                # Move to waypoint, taking as long as the dropped waypoints
+                # (and their pauses) would have
                 success = await self.move_to_pose(
                     arm=arm,
                     joints=joints,
-                    duration=transition_time,
+                    duration=steps * transition_time + (steps - 1) * pause,
                     kp=50.0  # Slightly softer for smooth trajectories
                 )
                 
@@ -278,7 +283,7 @@ class ArmController:
                     return False
                 
                 # Small pause at waypoint
-                await asyncio.sleep(0.1)
+                await asyncio.sleep(pause)
             
             logger.info("Sequence playback completed successfully")
             return True
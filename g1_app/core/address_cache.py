@@ -0,0 +1,214 @@
+"""
+Address Cache - Persistent last-known robot addresses and racing connects
+
+Remembers every IP a robot MAC was seen or connected at, with timestamps and
+network mode, in ~/.unitree_robot_addresses.json. On connect the candidates
+(recently connected IPs first, then the AP address) are verified happy-eyeballs
+style: one attempt starts, the next joins after CONNECT_STAGGER or as soon as
+the previous one fails, and a fresh discovery runs alongside and adds its
+result to the race. The first candidate to verify wins; the rest are cancelled.
+
+Each connect attempt is recorded with its time-to-resolve and time-to-connect.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Awaitable, Deque, Dict, List, Optional, Sequence, Tuple
+import logging
+
+from ..utils.neighbor_table import find_ip, probe_host, read_arp_table
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_CACHE_FILE = Path.home() / ".unitree_robot_addresses.json"
+MAX_ADDRESSES_PER_ROBOT = 4
+SAVE_INTERVAL = 60.0  # Seconds between saves that only refresh last_seen
+CONNECT_STAGGER = 0.25  # Seconds before the next candidate joins the race
+MAX_ATTEMPTS = 50  # Connect attempts kept for stats
+
+Candidate = Tuple[str, str, bool]  # (ip, source, check_mac)
+
+
+@dataclass
+class ConnectAttempt:
+    """One /api/connect attempt"""
+    mac: str
+    started: float  # time.time()
+    ip: Optional[str] = None
+    source: Optional[str] = None  # Which candidate won: "cache", "ap", "discovery", ...
+    success: bool = False
+    resolve_ms: Optional[float] = None  # Until an address verified
+    connect_ms: Optional[float] = None  # Until the robot connection was up
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class AddressCache:
+    """MAC -> recent IPs, persisted across restarts"""
+
+    def __init__(self, path: Path = ADDRESS_CACHE_FILE):
+        self.path = path
+        self._robots: Dict[str, List[Dict]] = {}
+        self._last_save = 0.0
+        self.attempts: Deque[ConnectAttempt] = deque(maxlen=MAX_ATTEMPTS)
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self._robots = {mac.lower(): entries for mac, entries in json.load(f).items()}
+            logger.info(f"Loaded cached addresses for {len(self._robots)} robot(s)")
+        except Exception as e:
+            logger.error(f"Failed to load address cache: {e}")
+
+    def save(self) -> None:
+        """Write via a temp file so a crash mid-save never leaves a truncated cache"""
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self._robots, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._last_save = time.monotonic()
+        except Exception as e:
+            logger.warning(f"Failed to save address cache: {e}")
+            tmp_path.unlink(missing_ok=True)
+
+    def record(self, mac: str, ip: str, mode: Optional[str] = None,
+               connected: bool = False) -> None:
+        """Note that ``mac`` was seen (or connected) at ``ip``"""
+        mac = mac.lower()
+        now = time.time()
+        entries = self._robots.setdefault(mac, [])
+        entry = next((e for e in entries if e["ip"] == ip), None)
+        changed = entry is None or connected or (mode is not None and entry.get("mode") != mode)
+        if entry is None:
+            entry = {"ip": ip, "mode": mode, "first_seen": now, "last_seen": now, "last_connected": None}
+            entries.append(entry)
+        entry["last_seen"] = now
+        if mode is not None:
+            entry["mode"] = mode
+        if connected:
+            entry["last_connected"] = now
+
+        entries.sort(key=lambda e: (e.get("last_connected") or 0, e["last_seen"]), reverse=True)
+        del entries[MAX_ADDRESSES_PER_ROBOT:]
+        if changed or time.monotonic() - self._last_save > SAVE_INTERVAL:
+            self.save()
+
+    def addresses(self, mac: str) -> List[Dict]:
+        """Known addresses of ``mac``, most recently connected first"""
+        return list(self._robots.get(mac.lower(), []))
+
+    def record_attempt(self, attempt: ConnectAttempt) -> None:
+        self.attempts.append(attempt)
+        if attempt.success:
+            logger.info(f"⏱️ Connected to {attempt.mac} at {attempt.ip} via {attempt.source}: "
+                        f"resolve {attempt.resolve_ms:.0f} ms, connect {attempt.connect_ms:.0f} ms")
+
+    def get_stats(self) -> dict:
+        connected = [a.connect_ms for a in self.attempts if a.success and a.connect_ms is not None]
+        return {
+            "robots": {mac: entries for mac, entries in self._robots.items()},
+            "attempts": [attempt.to_dict() for attempt in self.attempts],
+            "avg_connect_ms": round(sum(connected) / len(connected), 1) if connected else None,
+        }
+
+
+async def _verify(ip: str, mac: str, check_mac: bool) -> bool:
+    """Host answers, and (if checked) the neighbor table does not contradict the MAC"""
+    if not await probe_host(ip):
+        return False
+    if check_mac:
+        entry = find_ip(ip, read_arp_table() or [])
+        if entry is not None and entry.mac != mac.lower():
+            logger.debug(f"{ip} answered but belongs to {entry.mac}, not {mac}")
+            return False
+    return True
+
+
+async def race_addresses(mac: str, candidates: Sequence[Candidate],
+                         discover: Optional[Awaitable[Optional[str]]] = None,
+                         stagger: float = CONNECT_STAGGER) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Happy-eyeballs race of candidate addresses
+
+    Args:
+        mac: Robot MAC (cached candidates are rejected if the neighbor table
+            maps them to another MAC)
+        candidates: (ip, source, check_mac) in preference order
+        discover: Optional awaitable resolving to a freshly discovered IP; it
+            joins the race ahead of any candidate not yet started
+        stagger: Delay before the next candidate starts while one is pending
+
+    Returns:
+        (ip, source) of the first candidate to verify, or (None, None)
+    """
+    queue: Deque[Candidate] = deque()
+    for candidate in candidates:
+        if all(candidate[0] != queued[0] for queued in queue):
+            queue.append(candidate)
+    started = set()
+    pending: Dict[asyncio.Future, Tuple[str, str]] = {}
+    discover_task = asyncio.ensure_future(discover) if discover is not None else None
+
+    def launch() -> None:
+        while queue:
+            ip, source, check_mac = queue.popleft()
+            if ip not in started:
+                started.add(ip)
+                pending[asyncio.ensure_future(_verify(ip, mac, check_mac))] = (ip, source)
+                return
+
+    launch()
+    try:
+        while pending or queue or discover_task is not None:
+            waiting = set(pending)
+            if discover_task is not None:
+                waiting.add(discover_task)
+            if not waiting:
+                launch()
+                continue
+            done, _ = await asyncio.wait(waiting, timeout=stagger if queue else None,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                launch()  # Stagger elapsed with the current attempts still pending
+                continue
+            for task in done:
+                if task is discover_task:
+                    discover_task = None
+                    ip = None if task.exception() else task.result()
+                    if ip:
+                        queue.appendleft((ip, "discovery", True))
+                        launch()
+                    continue
+                ip, source = pending.pop(task)
+                if not task.exception() and task.result():
+                    return ip, source
+                launch()  # Failed: don't wait out the stagger
+        return None, None
+    finally:
+        for task in pending:
+            task.cancel()
+        if discover_task is not None:
+            discover_task.cancel()
+
+
+_cache_instance = None
+
+def get_address_cache() -> AddressCache:
+    """Get singleton address cache"""
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = AddressCache()
+    return _cache_instance
@@ -0,0 +1,293 @@
+"""
+Broker Client - UnitreeWebRTCConnection look-alike backed by the robot broker
+
+BrokerConnection exposes the parts of UnitreeWebRTCConnection that the app
+and scripts use, so code written against the driver runs unchanged while the
+robot broker (robot_broker.py) owns the real connection:
+
+    conn = BrokerConnection()              # instead of UnitreeWebRTCConnection(...)
+    await conn.connect()
+    conn.datachannel.pub_sub.subscribe("rt/lf/sportmodestate", on_state)
+    response = await conn.datachannel.pub_sub.publish_request_new(topic, payload)
+    conn.datachannel.pub_sub.publish_without_callback("rt/wirelesscontroller", payload)
+    conn.video.add_track_callback(recv_frames)   # decoded frames via shared memory
+    await conn.disconnect()
+
+Subscription callbacks run on the event loop with the same message dicts the
+driver delivers. Messages the broker placed in shared memory are copied out
+before the callback runs; ones overwritten before we got to them are counted
+in ``shm_overruns`` and skipped.
+"""
+
+import asyncio
+import fractions
+import os
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+from .broker_protocol import (DEFAULT_BROKER_SOCKET, VIDEO_TOPIC, attach_shared_memory,
+                              pack_frame, read_frame, read_slot, unpack_frame)
+
+logger = logging.getLogger(__name__)
+
+try:
+    import av
+    from aiortc import MediaStreamTrack
+    from aiortc.mediastreams import MediaStreamError
+    AIORTC_AVAILABLE = True
+except ImportError:
+    AIORTC_AVAILABLE = False
+    MediaStreamTrack = object
+
+REQUEST_TIMEOUT = 10.0  # Seconds before a forwarded request is abandoned
+CONNECT_TIMEOUT = 5.0
+MAX_ATTACHED_SEGMENTS = 32  # Shared memory mappings kept open for reuse
+VIDEO_CLOCK_RATE = 90000
+
+
+class BrokerPubSub:
+    """Mirror of the driver's datachannel.pub_sub"""
+
+    def __init__(self, conn: "BrokerConnection"):
+        self._conn = conn
+        self._callbacks: Dict[str, List[Callable]] = {}
+
+    def subscribe(self, topic: str, callback: Optional[Callable] = None) -> None:
+        callbacks = self._callbacks.setdefault(topic, [])
+        if callback is not None and callback not in callbacks:
+            callbacks.append(callback)
+        if len(callbacks) <= 1:
+            self._conn._send({"op": "subscribe", "topic": topic})
+
+    def unsubscribe(self, topic: str) -> None:
+        if self._callbacks.pop(topic, None) is not None:
+            self._conn._send({"op": "unsubscribe", "topic": topic})
+
+    async def publish_request_new(self, topic: str, options: Any = None) -> Any:
+        return await self._conn._request("publish_request_new", topic, options)
+
+    async def publish_request(self, topic: str, options: Any = None) -> Any:
+        return await self._conn._request("publish_request", topic, options)
+
+    def publish_without_callback(self, topic: str, data: Any = None) -> None:
+        # Synchronous in the driver too
+        self._conn._send({"op": "publish", "topic": topic}, data)
+
+    def _dispatch_message(self, topic: str, message: Any) -> None:
+        for callback in list(self._callbacks.get(topic, ())):
+            try:
+                callback(message)
+            except Exception as e:
+                logger.error(f"Broker subscriber for {topic} failed: {e}")
+
+
+class BrokerDataChannel:
+    def __init__(self, conn: "BrokerConnection"):
+        self.pub_sub = BrokerPubSub(conn)
+
+
+class BrokerVideoTrack(MediaStreamTrack):
+    """Video track rebuilt from the broker's decoded frames (newest frame wins)"""
+
+    kind = "video"
+
+    def __init__(self):
+        super().__init__()
+        self._frame: Optional[dict] = None
+        self._ready = asyncio.Event()
+        self._start: Optional[float] = None
+
+    def push(self, message: dict) -> None:
+        self._frame = message
+        self._ready.set()
+
+    async def recv(self):
+        if self.readyState != "live":
+            raise MediaStreamError
+        await self._ready.wait()
+        self._ready.clear()
+        message, self._frame = self._frame, None
+        if message is None:
+            raise MediaStreamError  # stop() woke us
+        frame = av.VideoFrame.from_ndarray(message["data"], format=message.get("format", "bgr24"))
+        if self._start is None:
+            self._start = message["time"]
+        frame.pts = int((message["time"] - self._start) * VIDEO_CLOCK_RATE)
+        frame.time_base = fractions.Fraction(1, VIDEO_CLOCK_RATE)
+        return frame
+
+    def stop(self) -> None:
+        super().stop()
+        self._ready.set()
+
+
+class BrokerVideo:
+    """Mirror of the driver's conn.video (switchVideoChannel / add_track_callback)"""
+
+    def __init__(self, conn: "BrokerConnection"):
+        self._conn = conn
+        self._track_callbacks: List[Callable] = []
+        self._track: Optional[BrokerVideoTrack] = None
+
+    def switchVideoChannel(self, switch: bool) -> None:
+        pub_sub = self._conn.datachannel.pub_sub
+        if switch:
+            pub_sub.subscribe(VIDEO_TOPIC, self._on_frame)
+        else:
+            pub_sub.unsubscribe(VIDEO_TOPIC)
+            if self._track:
+                self._track.stop()
+                self._track = None
+
+    def add_track_callback(self, callback: Callable) -> None:
+        if not AIORTC_AVAILABLE:
+            raise RuntimeError("aiortc is not installed")
+        self._track_callbacks.append(callback)
+
+    def _on_frame(self, message: dict) -> None:
+        if self._track is None or self._track.readyState != "live":
+            self._track = BrokerVideoTrack()
+            for callback in self._track_callbacks:
+                asyncio.ensure_future(callback(self._track))
+        self._track.push(message)
+
+
+class BrokerConnection:
+    """Client side of the robot broker's Unix socket"""
+
+    def __init__(self, socket_path: Optional[str] = None, name: Optional[str] = None, **_driver_kwargs):
+        """
+        Args:
+            socket_path: Broker socket (default $G1_BROKER_SOCKET or DEFAULT_BROKER_SOCKET)
+            name: Shown in the broker's client list
+            _driver_kwargs: UnitreeWebRTCConnection arguments (ip, serialNumber, ...);
+                accepted so call sites can swap classes, and ignored
+        """
+        self.socket_path = socket_path or os.getenv('G1_BROKER_SOCKET') or DEFAULT_BROKER_SOCKET
+        self.name = name or f"pid {os.getpid()}"
+        self.datachannel = BrokerDataChannel(self)
+        self.video = BrokerVideo(self)
+        self.pc = None  # No peer connection of our own
+        self.isConnected = False
+        self.robot_connected = False
+        self.robot_ip: Optional[str] = None
+        self.robot_sn: Optional[str] = None
+        self.shm_overruns = 0
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._read_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._welcome: Optional[asyncio.Future] = None
+        self._segments: "OrderedDict[str, Any]" = OrderedDict()
+
+    async def connect(self) -> None:
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_unix_connection(self.socket_path), CONNECT_TIMEOUT)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise ConnectionError(f"Robot broker not reachable at {self.socket_path}: {e}")
+        self._welcome = asyncio.get_running_loop().create_future()
+        self._read_task = asyncio.create_task(self._read_loop())
+        self._send({"op": "hello", "name": self.name, "pid": os.getpid()})
+        welcome = await asyncio.wait_for(self._welcome, CONNECT_TIMEOUT)
+        robot = welcome.get("robot") or {}
+        self.robot_ip = robot.get("ip")
+        self.robot_sn = robot.get("serial_number")
+        self.robot_connected = bool(welcome.get("connected"))
+        self.isConnected = True
+        # Subscriptions made before connect() (or before a reconnect) go out now
+        for topic in self.datachannel.pub_sub._callbacks:
+            self._send({"op": "subscribe", "topic": topic})
+        logger.info(f"🔀 Connected to robot broker {self.socket_path} (robot {self.robot_ip}, "
+                    f"{'online' if self.robot_connected else 'offline'})")
+
+    async def disconnect(self) -> None:
+        self.isConnected = False
+        if self._read_task:
+            self._read_task.cancel()
+            self._read_task = None
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Disconnected from robot broker"))
+        self._pending.clear()
+        for segment in self._segments.values():
+            segment.close()
+        self._segments.clear()
+
+    def _send(self, header: dict, payload: Any = None) -> None:
+        if self._writer is None:
+            return  # Replayed on connect()
+        self._writer.write(pack_frame(header, payload))
+
+    async def _request(self, kind: str, topic: str, payload: Any) -> Any:
+        if self._writer is None:
+            raise ConnectionError("Not connected to robot broker")
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._send({"op": "request", "id": request_id, "kind": kind, "topic": topic}, payload)
+        try:
+            return await asyncio.wait_for(future, REQUEST_TIMEOUT)
+        finally:
+            self._pending.pop(request_id, None)
+
+    def _read_shared(self, header: dict) -> Optional[Any]:
+        name = header["shm"]
+        segment = self._segments.get(name)
+        if segment is None:
+            try:
+                segment = attach_shared_memory(name)
+            except FileNotFoundError:
+                self.shm_overruns += 1  # Slot was reallocated before we read it
+                return None
+            self._segments[name] = segment
+            if len(self._segments) > MAX_ATTACHED_SEGMENTS:
+                self._segments.popitem(last=False)[1].close()
+        else:
+            self._segments.move_to_end(name)
+        data = read_slot(segment, header["seq"])
+        if data is None:
+            self.shm_overruns += 1
+            return None
+        return unpack_frame(data)
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                header, payload = await read_frame(self._reader)
+                op = header.get("op")
+                if op == "message":
+                    if "shm" in header:
+                        unpacked = self._read_shared(header)
+                        if unpacked is None:
+                            continue
+                        header, payload = unpacked
+                    self.datachannel.pub_sub._dispatch_message(header["topic"], payload)
+                elif op == "result":
+                    future = self._pending.get(header.get("id"))
+                    if future and not future.done():
+                        if "error" in header:
+                            future.set_exception(RuntimeError(header["error"]))
+                        else:
+                            future.set_result(payload)
+                elif op == "welcome":
+                    if self._welcome and not self._welcome.done():
+                        self._welcome.set_result(header)
+                elif op == "connection":
+                    self.robot_connected = bool(header.get("connected"))
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            logger.warning("🔀 Robot broker closed the connection")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Robot broker read failed: {e}")
+        self.isConnected = False
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Robot broker connection lost"))
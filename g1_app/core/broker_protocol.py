@@ -0,0 +1,186 @@
+"""
+Broker Protocol - Wire format shared by the robot broker and its clients
+
+Frames on the Unix socket are a 4-byte big-endian length, a JSON header and
+then the header's binary blobs back to back:
+
+    [u32 json_len][json {..., "blobs": [n0, n1, ...]}][blob0][blob1]...
+
+bytes and numpy arrays anywhere in a message are lifted out of the JSON into
+blobs (``{"__blob__": i}`` / ``{"__ndarray__": i, "dtype", "shape"}``) so
+point clouds and frames are never base64- or list-encoded.
+
+Messages larger than SHM_THRESHOLD are not written to the socket at all. The
+broker packs the frame into a slot of a per-topic SharedMemory ring and sends
+only ``{"op": "message", "topic", "shm", "seq", "size"}``. Every subscribed
+client copies the frame out of the same segment. Each slot starts with a
+sequence number that the writer clears while rewriting, so a client that
+reads too late detects the overwrite and drops the message instead of
+decoding a torn one.
+"""
+
+import asyncio
+import json
+import struct
+import sys
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+DEFAULT_BROKER_SOCKET = "/tmp/g1_robot_broker.sock"
+SHM_THRESHOLD = 64 * 1024  # Frames above this go through shared memory
+SHM_SLOTS = 4  # Ring slots per topic: a client has SHM_SLOTS - 1 messages to read one
+MAX_HEADER = 16 * 1024 * 1024
+VIDEO_TOPIC = "broker/video"  # Decoded BGR frames re-published by the broker
+
+_LENGTH = struct.Struct(">I")
+_SLOT_HEADER = struct.Struct("<QQ")  # (seq, size); seq 0 = being written
+
+
+# ----------------------------------------------------------------------
+# Message encoding
+# ----------------------------------------------------------------------
+
+def _lift(value: Any, blobs: List[bytes]) -> Any:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        blobs.append(bytes(value))
+        return {"__blob__": len(blobs) - 1}
+    if NUMPY_AVAILABLE and isinstance(value, np.ndarray):
+        blobs.append(np.ascontiguousarray(value).tobytes())
+        return {"__ndarray__": len(blobs) - 1, "dtype": value.dtype.str, "shape": list(value.shape)}
+    if NUMPY_AVAILABLE and isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return {str(k): _lift(v, blobs) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_lift(v, blobs) for v in value]
+    return value
+
+
+def _restore(value: Any, blobs: List[bytes]) -> Any:
+    if isinstance(value, dict):
+        if "__blob__" in value:
+            return blobs[value["__blob__"]]
+        if "__ndarray__" in value:
+            if not NUMPY_AVAILABLE:
+                return blobs[value["__ndarray__"]]
+            return np.frombuffer(blobs[value["__ndarray__"]], dtype=value["dtype"]).reshape(value["shape"])
+        return {k: _restore(v, blobs) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_restore(v, blobs) for v in value]
+    return value
+
+
+def pack_frame(header: Dict[str, Any], payload: Any = None) -> bytes:
+    """Serialize a header dict (plus an optional payload with binary parts) to one frame"""
+    blobs: List[bytes] = []
+    header = dict(header)
+    if payload is not None:
+        header["payload"] = _lift(payload, blobs)
+    header["blobs"] = [len(blob) for blob in blobs]
+    data = json.dumps(header, default=str).encode()
+    return b"".join([_LENGTH.pack(len(data)), data, *blobs])
+
+
+def unpack_frame(buf: bytes) -> Tuple[Dict[str, Any], Any]:
+    """Inverse of pack_frame for a frame held in memory (e.g. copied out of shared memory)"""
+    (length,) = _LENGTH.unpack_from(buf, 0)
+    header = json.loads(bytes(buf[4:4 + length]))
+    blobs, offset = [], 4 + length
+    for size in header.get("blobs", ()):
+        blobs.append(bytes(buf[offset:offset + size]))
+        offset += size
+    return header, _restore(header.pop("payload", None), blobs)
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[Dict[str, Any], Any]:
+    """Read one frame from the socket (IncompleteReadError at EOF)"""
+    (length,) = _LENGTH.unpack(await reader.readexactly(4))
+    if length > MAX_HEADER:
+        raise ValueError(f"Broker frame header too large ({length} bytes)")
+    header = json.loads(await reader.readexactly(length))
+    blobs = [await reader.readexactly(size) for size in header.get("blobs", ())]
+    return header, _restore(header.pop("payload", None), blobs)
+
+
+# ----------------------------------------------------------------------
+# Shared memory
+# ----------------------------------------------------------------------
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Open a segment owned by another process without adopting it for cleanup"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Before 3.13 attaching registers the segment with the resource tracker,
+    # which would unlink it when this client exits; skip the registration
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def read_slot(segment: shared_memory.SharedMemory, seq: int) -> Optional[bytes]:
+    """Copy the frame out of a ring slot; None if it was overwritten"""
+    buf = segment.buf
+    current, size = _SLOT_HEADER.unpack_from(buf, 0)
+    if current != seq:
+        return None
+    data = bytes(buf[_SLOT_HEADER.size:_SLOT_HEADER.size + size])
+    if _SLOT_HEADER.unpack_from(buf, 0)[0] != seq:
+        return None
+    return data
+
+
+class ShmRing:
+    """Round-robin SharedMemory slots for one topic (broker side)"""
+
+    def __init__(self, slots: int = SHM_SLOTS):
+        self._slots: List[Optional[shared_memory.SharedMemory]] = [None] * slots
+        self._next = 0
+        self._seq = 0
+
+    def write(self, frame: bytes) -> Tuple[str, int]:
+        """
+        Store a packed frame in the next slot
+
+        Returns:
+            (segment name, sequence number) for the pointer message
+        """
+        index = self._next
+        self._next = (self._next + 1) % len(self._slots)
+        segment = self._slots[index]
+        needed = _SLOT_HEADER.size + len(frame)
+        if segment is None or segment.size < needed:
+            if segment is not None:
+                segment.close()
+                segment.unlink()
+            # Grow with headroom so a slowly growing map does not reallocate every message
+            segment = shared_memory.SharedMemory(create=True, size=max(needed * 5 // 4, SHM_THRESHOLD))
+            self._slots[index] = segment
+        self._seq += 1
+        buf = segment.buf
+        _SLOT_HEADER.pack_into(buf, 0, 0, 0)
+        buf[_SLOT_HEADER.size:needed] = frame
+        _SLOT_HEADER.pack_into(buf, 0, self._seq, len(frame))
+        return segment.name, self._seq
+
+    def close(self) -> None:
+        for segment in self._slots:
+            if segment is not None:
+                segment.close()
+                try:
+                    segment.unlink()
+                except FileNotFoundError:
+                    pass
+        self._slots = [None] * len(self._slots)
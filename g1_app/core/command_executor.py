@@ -421,14 +421,14 @@ class CommandExecutor:
         """
         # Check if another action is running
         if self.gesture_executing:
-            logger.warning(f\"Custom action {action_name} blocked - another action is running\")
-            return {\"success\": False, \"error\": \"Another action is already executing\"}
+            logger.warning(f"Custom action {action_name} blocked - another action is running")
+            return {"success": False, "error": "Another action is already executing"}
         
         payload = {
-            \"api_id\": ArmAPI.EXECUTE_CUSTOM_ACTION,
-            \"parameter\": json.dumps({\"action_name\": action_name})
+            "api_id": ArmAPI.EXECUTE_CUSTOM_ACTION,
+            "parameter": json.dumps({"action_name": action_name})
         }
-        logger.info(f\"Playing custom action: {action_name}\")
+        logger.info(f"Playing custom action: {action_name}")
         
         if not wait_for_completion:
             return await self._send_command(payload, service=Service.ARM)
@@ -441,20 +441,20 @@ class CommandExecutor:
         def _action_state_callback(message):
             try:
                 if isinstance(message, dict):
-                    data = message.get(\"data\", {})
+                    data = message.get("data", {})
                     if isinstance(data, str):
                         data = json.loads(data)
                     
                     # Check if action completed (status == 0 means idle/complete)
-                    status = data.get(\"status\", -1)
+                    status = data.get("status", -1)
                     if status == 0 and self.gesture_complete_event:
-                        logger.info(f\"\u2705 Custom action {action_name} completed\")
+                        logger.info(f"\u2705 Custom action {action_name} completed")
                         self.gesture_complete_event.set()
             except Exception as e:
-                logger.error(f\"Action state callback error: {e}\")
+                logger.error(f"Action state callback error: {e}")
         
         try:
-            self.datachannel.pub_sub.subscribe(\"rt/arm/action/state\", _action_state_callback)
+            self.datachannel.pub_sub.subscribe("rt/arm/action/state", _action_state_callback)
             
             # Send action command
             result = await self._send_command(payload, service=Service.ARM)
@@ -462,18 +462,18 @@ class CommandExecutor:
             # Wait for completion or timeout
             try:
                 await asyncio.wait_for(self.gesture_complete_event.wait(), timeout=timeout)
-                logger.info(f\"Custom action {action_name} finished successfully\")
+                logger.info(f"Custom action {action_name} finished successfully")
             except asyncio.TimeoutError:
-                logger.warning(f\"Custom action {action_name} timed out after {timeout}s\")
+                logger.warning(f"Custom action {action_name} timed out after {timeout}s")
         
         finally:
             # Clean up
             self.gesture_executing = False
             self.gesture_complete_event = None
             try:
-                self.datachannel.pub_sub.unsubscribe(\"rt/arm/action/state\")
+                self.datachannel.pub_sub.unsubscribe("rt/arm/action/state")
             except Exception as e:
-                logger.warning(f\"Failed to unsubscribe from action state: {e}\")
+                logger.warning(f"Failed to unsubscribe from action state: {e}")
         
         return result
     
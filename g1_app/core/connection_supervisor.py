@@ -0,0 +1,237 @@
+"""
+Connection Supervisor - Liveness watchdog and automatic reconnect
+
+Watches a connected RobotController and reconnects when the WebRTC session
+drops. The link counts as dead when the peer connection reports failed/closed,
+or when no subscribed message has arrived for SILENCE_TIMEOUT (armed only after
+the first message, so an idle connection with no subscriptions is left alone).
+
+Reconnects back off exponentially (BACKOFF_INITIAL doubling up to BACKOFF_MAX,
+with jitter). Each attempt optionally re-resolves the robot address first, then
+the controller reopens the connection and replays its topic subscriptions and
+enabled services.
+
+Every connect and reconnect gets a ConnectionTimeline with the milliseconds to
+each phase: discover, ice, datachannel (open) and first_state (first
+sportmodestate message). The driver has no phase callbacks, so ICE and
+datachannel are observed by polling the connection objects while connect runs.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, Optional
+import logging
+
+from .event_bus import EventBus, Events
+
+logger = logging.getLogger(__name__)
+
+SILENCE_TIMEOUT = 3.0  # Seconds without any subscribed message before the link is dead
+WATCHDOG_INTERVAL = 0.5
+BACKOFF_INITIAL = 0.5
+BACKOFF_MAX = 30.0
+PHASE_POLL_INTERVAL = 0.01
+MAX_TIMELINES = 10  # Connect/reconnect timelines kept for status
+
+PHASES = ("discover", "ice", "datachannel", "first_state")
+
+Resolver = Callable[[], Awaitable[Optional[str]]]
+
+
+@dataclass
+class ConnectionTimeline:
+    """Milliseconds from the start of one connect attempt to each phase"""
+    attempt: int
+    reason: str  # "connect" or "reconnect: <why the link was declared dead>"
+    started: float  # time.time()
+    phases: Dict[str, float] = field(default_factory=dict)
+    ip: Optional[str] = None
+    error: Optional[str] = None
+    _t0: float = field(default_factory=time.monotonic, repr=False)
+
+    def mark(self, phase: str) -> bool:
+        """Record a phase the first time it is reached"""
+        if phase in self.phases:
+            return False
+        self.phases[phase] = round((time.monotonic() - self._t0) * 1000, 1)
+        return True
+
+    @property
+    def complete(self) -> bool:
+        return "first_state" in self.phases
+
+    def to_dict(self) -> dict:
+        return {
+            "attempt": self.attempt,
+            "reason": self.reason,
+            "started": self.started,
+            "ip": self.ip,
+            "phases": {phase: self.phases.get(phase) for phase in PHASES},
+            "error": self.error,
+        }
+
+
+class ConnectionSupervisor:
+    """Watchdog plus backoff reconnect for one RobotController"""
+
+    def __init__(self, controller, resolver: Optional[Resolver] = None):
+        """
+        Args:
+            controller: RobotController to supervise
+            resolver: Optional coroutine returning the robot's current IP (discover phase)
+        """
+        self.controller = controller
+        self.resolver = resolver
+        self.state = "idle"  # idle, connected, reconnecting, stopped
+        self.timelines: Deque[ConnectionTimeline] = deque(maxlen=MAX_TIMELINES)
+        self.current: Optional[ConnectionTimeline] = None
+        self.last_message: Optional[float] = None  # time.monotonic(), reset per connection
+        self.drops = 0
+        self.reconnects = 0
+        self.last_drop_reason: Optional[str] = None
+        self._attempts = 0
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Timeline
+    # ------------------------------------------------------------------
+
+    def begin(self, reason: str, discover_ms: Optional[float] = None) -> ConnectionTimeline:
+        """
+        Start the timeline of a new connect attempt
+
+        Args:
+            reason: Why this attempt runs
+            discover_ms: Address resolution already done by the caller; the
+                timeline is back-dated so later phases include it
+        """
+        self._attempts += 1
+        timeline = ConnectionTimeline(attempt=self._attempts, reason=reason, started=time.time())
+        if discover_ms is not None:
+            timeline._t0 -= discover_ms / 1000
+            timeline.started -= discover_ms / 1000
+            timeline.phases["discover"] = round(discover_ms, 1)
+        self.current = timeline
+        self.last_message = None
+        self.timelines.append(timeline)
+        self._publish()
+        return timeline
+
+    def mark(self, phase: str) -> None:
+        if self.current and self.current.mark(phase):
+            logger.info(f"⏱️  {phase} after {self.current.phases[phase]:.0f} ms (attempt {self.current.attempt})")
+            self._publish()
+
+    def fail(self, error: str) -> None:
+        if self.current:
+            self.current.error = error
+            self._publish()
+
+    def note_message(self, first_state: bool = False) -> None:
+        """Called for every subscribed message; first_state for sportmodestate"""
+        self.last_message = time.monotonic()
+        if first_state and self.current and not self.current.complete:
+            self.mark("first_state")
+
+    async def watch_phases(self, conn) -> None:
+        """Poll ``conn`` until ICE is connected and the datachannel is open"""
+        while not ("ice" in self.current.phases and "datachannel" in self.current.phases):
+            pc = getattr(conn, "pc", None)
+            if pc is not None and getattr(pc, "iceConnectionState", None) in ("connected", "completed"):
+                self.mark("ice")
+            datachannel = getattr(conn, "datachannel", None)
+            channel = getattr(datachannel, "channel", None)
+            if getattr(channel, "readyState", None) == "open":
+                self.mark("datachannel")
+            await asyncio.sleep(PHASE_POLL_INTERVAL)
+
+    def _publish(self) -> None:
+        EventBus.emit(Events.CONNECTION_TIMELINE, self.get_stats())
+
+    # ------------------------------------------------------------------
+    # Watchdog
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start watching (after a successful connect)"""
+        self.state = "connected"
+        self.last_message = time.monotonic()  # Silence counts from the moment the link came up
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watchdog())
+
+    async def stop(self) -> None:
+        """Stop watching and abandon any reconnect in progress"""
+        self.state = "stopped"
+        task, self._task = self._task, None
+        if task and task is not asyncio.current_task():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def link_failure(self) -> Optional[str]:
+        """Reason the link is considered dead, or None while it is alive"""
+        conn = self.controller.conn
+        pc = getattr(conn, "pc", None)
+        state = getattr(pc, "connectionState", None)
+        if state in ("failed", "closed"):
+            return f"peer connection {state}"
+        if self.last_message is not None and self.controller._subscriptions:
+            silence = time.monotonic() - self.last_message
+            if silence > SILENCE_TIMEOUT:
+                return f"no messages for {silence:.1f} s"
+        return None
+
+    async def _watchdog(self) -> None:
+        while self.state == "connected":
+            await asyncio.sleep(WATCHDOG_INTERVAL)
+            reason = self.link_failure()
+            if reason:
+                await self._recover(reason)
+
+    async def _recover(self, reason: str) -> None:
+        """Reconnect with exponential backoff until it succeeds or stop() is called"""
+        self.drops += 1
+        self.last_drop_reason = reason
+        self.state = "reconnecting"
+        logger.warning(f"🔌 Robot link lost ({reason}); reconnecting")
+        self.controller._mark_link_lost(reason)
+
+        delay = BACKOFF_INITIAL
+        while self.state == "reconnecting":
+            timeline = self.begin(f"reconnect: {reason}")
+            try:
+                if self.resolver:
+                    ip = await self.resolver()
+                    self.mark("discover")
+                    if ip:
+                        self.controller.robot_ip = ip
+                timeline.ip = self.controller.robot_ip
+                await self.controller._reconnect()
+                self.reconnects += 1
+                self.state = "connected"
+                # A session that opens but never delivers must still time out
+                self.last_message = time.monotonic()
+                logger.info(f"✅ Reconnected to {self.controller.robot_ip} (attempt {timeline.attempt})")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.fail(str(e))
+                logger.warning(f"Reconnect failed: {e}; retrying in {delay:.1f} s")
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * 2, BACKOFF_MAX)
+
+    def get_stats(self) -> dict:
+        return {
+            "state": self.state,
+            "drops": self.drops,
+            "reconnects": self.reconnects,
+            "last_drop_reason": self.last_drop_reason,
+            "current": self.current.to_dict() if self.current else None,
+            "history": [timeline.to_dict() for timeline in self.timelines],
+        }
@@ -1,18 +1,24 @@
 #!/usr/bin/env python3
 """
-DDS-based robot discovery - listens to DDS topics to find robots
+DDS-based robot discovery - listens to DDS participant announcements to find robots
 This is how the Android app likely discovers robots (via DDS participant discovery)
+
+Announcements are decoded natively by core.rtps_spdp as they arrive; no
+ddsls process, no reverse DNS lookups.
 """
 import asyncio
-import subprocess
-import re
-import json
-import os
+import logging
 from typing import Dict, Optional, Set
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
+
+from .rtps_spdp import SpdpListener, SpdpParticipant
+from ..utils.subnet_sweep import target_networks
+
+logger = logging.getLogger(__name__)
+
+EXPIRE_INTERVAL = 5.0  # Seconds between participant lease checks
 
-from g1_app.utils.pathing import get_cyclonedds_uri
 
 @dataclass
 class DiscoveredRobot:
@@ -33,25 +39,35 @@ class DiscoveredRobot:
         }
 
 class DDSDiscovery:
-    """Discover robots via DDS participant discovery"""
+    """Discover robots via DDS participant discovery (SPDP)"""
     
-    def __init__(self):
+    def __init__(self, domain_id: int = 0):
+        # Keyed by host IP: announced names are not unique (every ROS 2
+        # participant announces "enclave=/;") and are only displayed
         self._robots: Dict[str, DiscoveredRobot] = {}
+        self._hosts: Dict[str, str] = {}  # Participant GUID -> robot IP
+        self._participants: Dict[str, Set[str]] = {}  # Robot IP -> live participant GUIDs
         self._running = False
         self._discovery_task = None
+        self._listener = SpdpListener(self._on_participant, domain_id=domain_id)
+        self._local_ips: Set[str] = set()
         
     async def start(self):
         """Start DDS discovery"""
         if self._running:
             return
             
+        self._local_ips = {local_ip for _, _, local_ip in target_networks() if local_ip}
+        if not await self._listener.start():
+            return
         self._running = True
-        self._discovery_task = asyncio.create_task(self._discovery_loop())
-        print("DDS Discovery: Started listening for robots...")
+        self._discovery_task = asyncio.create_task(self._expire_loop())
+        logger.info("DDS Discovery: Started listening for robots...")
     
     async def stop(self):
         """Stop DDS discovery"""
         self._running = False
+        self._listener.stop()
         if self._discovery_task:
             self._discovery_task.cancel()
             try:
@@ -59,112 +75,62 @@ class DDSDiscovery:
             except asyncio.CancelledError:
                 pass
     
-    async def _discovery_loop(self):
-        """Main discovery loop - uses ddsls to find DDS participants"""
+    async def _expire_loop(self):
+        """Forget participants whose SPDP lease ran out"""
         while self._running:
-            try:
-                # Use ddsls to discover DDS participants
-                # This shows all DDS participants on the network
-                cyclonedds_uri = get_cyclonedds_uri()
-                env = None
-                if cyclonedds_uri:
-                    env = os.environ.copy()
-                    env['CYCLONEDDS_URI'] = cyclonedds_uri
+            await asyncio.sleep(EXPIRE_INTERVAL)
+            self._listener.expire()
+    
+    def _robot_name(self, participant: SpdpParticipant) -> str:
+        """Display name from the announced user data / entity name, else the IP"""
+        name = participant.user_data_text or participant.entity_name
+        if name:
+            return name
+        return f"Robot_{(participant.ip or participant.guid_prefix).replace('.', '_')}"
 
-                proc = await asyncio.create_subprocess_exec(
-                    'timeout', '2', 'ddsls', '-a',
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                    env=env
-                )
-                
-                stdout, stderr = await proc.communicate()
-                
-                if stdout:
-                    await self._parse_ddsls_output(stdout.decode())
-                    
-            except FileNotFoundError:
-                # ddsls not found, try alternative method
-                await self._discover_via_topic_listening()
-                
-            except Exception as e:
-                print(f"DDS Discovery error: {e}")
-            
-            await asyncio.sleep(5)  # Check every 5 seconds
+    def _drop_participant(self, guid: str) -> None:
+        ip = self._hosts.pop(guid, None)
+        guids = self._participants.get(ip, set())
+        guids.discard(guid)
+        if ip and not guids:
+            # A robot runs several participants; it is gone with the last one
+            self._participants.pop(ip, None)
+            robot = self._robots.pop(ip, None)
+            if robot:
+                logger.info(f"DDS Discovery: Robot {robot.name} at {ip} left")
     
-    async def _parse_ddsls_output(self, output: str):
-        """Parse ddsls output to find robot participants"""
-        # Look for patterns like:
-        # Participant (1.f.1.2.3.4.5.6.7.8.9.a.b.c.d.e|0.0.0.0)
-        #   Topic: rt/lowstate
+    def _on_participant(self, participant: SpdpParticipant, removed: bool):
+        """SPDP update: add, refresh or drop the robot behind a participant"""
+        if removed:
+            self._drop_participant(participant.guid)
+            return
         
-        lines = output.split('\n')
-        current_participant = None
-        current_ip = None
-        has_robot_topics = False
+        ip = participant.ip
+        if ip is None or ip in self._local_ips or ip.startswith("127."):
+            return  # Our own participants
         
-        for line in lines:
-            # Extract participant GUID and IP
-            if 'Participant' in line:
-                match = re.search(r'Participant.*?\|([0-9.]+)', line)
-                if match:
-                    current_ip = match.group(1)
-                    current_participant = line
-                    has_robot_topics = False
-            
-            # Check for robot-specific topics
-            elif 'rt/lowstate' in line or 'rt/lowcmd' in line:
-                if current_ip and current_ip != '0.0.0.0':
-                    has_robot_topics = True
-                    # Extract robot name from participant info or hostname
-                    robot_name = await self._get_robot_name(current_ip)
-                    if robot_name:
-                        robot = DiscoveredRobot(
-                            name=robot_name,
-                            ip=current_ip,
-                            last_seen=datetime.now(),
-                            dds_participant_guid=current_participant
-                        )
-                        self._robots[robot_name] = robot
-                        print(f"DDS Discovery: Found robot {robot_name} at {current_ip}")
-    
-    async def _get_robot_name(self, ip: str) -> Optional[str]:
-        """Try to get robot name from hostname or reverse DNS"""
-        try:
-            # Try reverse DNS lookup
-            proc = await asyncio.create_subprocess_exec(
-                'nslookup', ip,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, _ = await proc.communicate()
-            
-            if stdout:
-                output = stdout.decode()
-                # Look for name like "name = G1_6937.local" or similar
-                match = re.search(r'name\s*=\s*([^.\s]+)', output)
-                if match:
-                    return match.group(1)
-                    
-        except:
-            pass
-        
-        # Fallback: create name from IP
-        return f"Robot_{ip.replace('.', '_')}"
-    
-    async def _discover_via_topic_listening(self):
-        """Alternative: Listen to rt/lowstate and extract sender info"""
-        # This would require C++ integration with test_robot_listener
-        # For now, fall back to periodic ping sweep
-        pass
+        if self._hosts.get(participant.guid) not in (None, ip):
+            self._drop_participant(participant.guid)  # Participant moved to another address
+        if participant.guid not in self._hosts:
+            self._hosts[participant.guid] = ip
+            self._participants.setdefault(ip, set()).add(participant.guid)
+        robot = self._robots.get(ip)
+        if robot is None:
+            robot = self._robots[ip] = DiscoveredRobot(name=self._robot_name(participant), ip=ip,
+                                                      dds_participant_guid=participant.guid)
+            logger.info(f"DDS Discovery: Found robot {robot.name} at {ip}")
+        robot.last_seen = datetime.now()
     
     def get_robots(self) -> Dict[str, DiscoveredRobot]:
-        """Get all discovered robots"""
+        """Get all discovered robots, keyed by IP"""
         return self._robots.copy()
     
-    def get_robot(self, name: str) -> Optional[DiscoveredRobot]:
-        """Get specific robot by name"""
-        return self._robots.get(name)
+    def get_robot(self, ip: str) -> Optional[DiscoveredRobot]:
+        """Get specific robot by IP"""
+        return self._robots.get(ip)
+
+    def get_stats(self) -> dict:
+        return self._listener.get_stats()
 
 
 # Global singleton
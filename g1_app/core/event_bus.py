@@ -76,6 +76,7 @@ class Events:
     STATE_CHANGED = "state_changed"
     LED_CHANGED = "led_changed"
     CONNECTION_CHANGED = "connection_changed"
+    CONNECTION_TIMELINE = "connection_timeline"
     BATTERY_UPDATED = "battery_updated"
     AUDIO_VOLUME_CHANGED = "audio_volume_changed"
     SPEECH_RECOGNIZED = "speech_recognized"
@@ -88,6 +89,7 @@ class Events:
     LIDAR_IMU = "lidar_imu"
     VIDEO_FRAME = "video_frame"
     SLAM_POSITION_UPDATED = "slam_position_updated"
+    SLAM_TRAJECTORY_UPDATED = "slam_trajectory_updated"
     
     # VUI
     ASR_TEXT = "asr_text"
@@ -97,6 +99,7 @@ class Events:
     # Commands
     COMMAND_SENT = "command_sent"
     COMMAND_RESULT = "command_result"
+    TRAJECTORY_PROGRESS = "trajectory_progress"
     
     # Errors
     ERROR = "error"
@@ -0,0 +1,314 @@
+"""
+Link Monitor - Datachannel health and adaptive subscription shedding
+
+Measures two things on the live connection:
+
+- Round-trip time of request/response pairs. Every publish_request_new() call
+  is timestamped per (response topic, api_id) and paired with the next 'res'
+  message carrying that api_id. When nothing else is being requested, a
+  GET_FSM_ID probe is sent every PROBE_INTERVAL; an unanswered request counts
+  as a loss at PROBE_TIMEOUT.
+- Inter-arrival gaps of rt/lf/sportmodestate (nominally ~50 ms at 20 Hz),
+  including the open gap since the last message, so a stall shows up before
+  the next message arrives.
+
+A SheddingPolicy lists stages from cheapest to most valuable (debug topics,
+LiDAR, video by default), each with an RTT and a gap threshold. When either
+metric stays above the next stage's threshold for shed_after evaluations,
+that stage is shed; when both stay below restore_ratio times the last shed
+stage's thresholds for restore_after seconds, it is restored. Stages move one
+at a time, so the link settles between changes instead of flapping.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from typing import Deque, Dict, List, Optional, Tuple
+import logging
+
+from ..api.constants import Topic, Service, LocoAPI
+
+logger = logging.getLogger(__name__)
+
+PROBE_INTERVAL = 2.0  # Seconds between RTT probes while no other request is in flight
+PROBE_TIMEOUT = 2.0  # Unanswered after this long: counted as lost
+EVALUATE_INTERVAL = 1.0
+METRIC_WINDOW = 10.0  # Seconds of samples behind each percentile
+RTT_PERCENTILE = 90
+GAP_PERCENTILE = 95
+PROBE_TOPIC = f"rt/api/{Service.SPORT}/request"
+PROBE_RESPONSE_TOPIC = f"rt/api/{Service.SPORT}/response"
+
+Sample = Tuple[float, float]  # (time.monotonic(), ms)
+
+
+@dataclass
+class ShedStage:
+    """One sheddable subscription group and the link quality that sheds it"""
+    group: str  # "debug", "lidar" or "video"
+    rtt_ms: float  # Shed when the RTT percentile exceeds this...
+    gap_ms: float  # ...or the sportmodestate gap percentile exceeds this
+
+
+def _default_stages() -> List[ShedStage]:
+    return [
+        ShedStage("debug", rtt_ms=150, gap_ms=150),
+        ShedStage("lidar", rtt_ms=300, gap_ms=250),
+        ShedStage("video", rtt_ms=600, gap_ms=400),
+    ]
+
+
+@dataclass
+class SheddingPolicy:
+    """When to shed and restore heavy streams"""
+    enabled: bool = True
+    stages: List[ShedStage] = field(default_factory=_default_stages)
+    shed_after: int = 2  # Consecutive evaluations over threshold
+    restore_ratio: float = 0.6  # Restore below this fraction of the thresholds...
+    restore_after: float = 10.0  # ...held for this many seconds
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'SheddingPolicy':
+        policy = cls()
+        for key in ("enabled", "shed_after", "restore_ratio", "restore_after"):
+            if key in data:
+                setattr(policy, key, type(getattr(policy, key))(data[key]))
+        if "stages" in data:
+            policy.stages = [ShedStage(str(s["group"]), float(s["rtt_ms"]), float(s["gap_ms"]))
+                             for s in data["stages"]]
+        return policy
+
+    @classmethod
+    def from_env(cls) -> 'SheddingPolicy':
+        """G1_LINK_POLICY: path to a JSON policy; G1_LINK_SHEDDING=false disables shedding"""
+        policy = cls()
+        path = os.getenv('G1_LINK_POLICY')
+        if path:
+            try:
+                with open(path, 'r') as f:
+                    policy = cls.from_dict(json.load(f))
+            except Exception as e:
+                logger.error(f"Failed to load link policy {path}: {e}")
+        if os.getenv('G1_LINK_SHEDDING', 'true').lower() != 'true':
+            policy.enabled = False
+        return policy
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class LinkMonitor:
+    """RTT and state-gap measurement plus policy-driven shedding for one RobotController"""
+
+    def __init__(self, controller, policy: Optional[SheddingPolicy] = None):
+        self.controller = controller
+        self.policy = policy or SheddingPolicy.from_env()
+        self.rtts: Deque[Sample] = deque(maxlen=500)
+        self.gaps: Deque[Sample] = deque(maxlen=1000)
+        self._pending: Dict[Tuple[str, int], Deque[float]] = {}
+        self._last_state: Optional[float] = None
+        self.requests = 0
+        self.responses = 0
+        self.lost = 0
+        self.shed: List[str] = []  # Groups shed, in stage order
+        self.events: Deque[dict] = deque(maxlen=20)
+        self._over = 0
+        self._under_since: Optional[float] = None
+        self.last_metrics: dict = {}
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Measurement
+    # ------------------------------------------------------------------
+
+    def attach(self, conn) -> None:
+        """Timestamp every request published on ``conn``"""
+        pub_sub = conn.datachannel.pub_sub
+        original = pub_sub.publish_request_new
+
+        async def timed_publish_request(topic, data, *args, **kwargs):
+            self.note_request(topic, data)
+            return await original(topic, data, *args, **kwargs)
+
+        pub_sub.publish_request_new = timed_publish_request
+
+    def note_request(self, topic: str, data, now: Optional[float] = None) -> None:
+        api_id = data.get("api_id") if isinstance(data, dict) else None
+        if api_id is None or not topic.endswith("/request"):
+            return
+        key = (topic[:-len("request")] + "response", int(api_id))
+        self._pending.setdefault(key, deque(maxlen=32)).append(time.monotonic() if now is None else now)
+        self.requests += 1
+
+    def note_message(self, topic: str, message, now: Optional[float] = None) -> None:
+        """Called for every subscribed message"""
+        now = time.monotonic() if now is None else now
+        if topic == Topic.SPORT_MODE_STATE_LF:
+            if self._last_state is not None:
+                self.gaps.append((now, (now - self._last_state) * 1000))
+            self._last_state = now
+            return
+        if not topic.endswith("/response") or not isinstance(message, dict) or message.get("type") != "res":
+            return
+        inner = message.get("data")
+        header = inner.get("header", {}) if isinstance(inner, dict) else {}
+        api_id = header.get("identity", {}).get("api_id")
+        pending = self._pending.get((topic, api_id))
+        if pending:
+            self.rtts.append((now, (now - pending.popleft()) * 1000))
+            self.responses += 1
+
+    def _expire_pending(self, now: float) -> None:
+        for pending in self._pending.values():
+            while pending and now - pending[0] > PROBE_TIMEOUT:
+                pending.popleft()
+                self.lost += 1
+                self.rtts.append((now, PROBE_TIMEOUT * 1000))  # A loss is at least this slow
+
+    def metrics(self, now: Optional[float] = None) -> dict:
+        now = time.monotonic() if now is None else now
+        rtts = [ms for t, ms in self.rtts if now - t <= METRIC_WINDOW]
+        gaps = [ms for t, ms in self.gaps if now - t <= METRIC_WINDOW]
+        if self._last_state is not None:
+            gaps.append((now - self._last_state) * 1000)  # Open gap
+        rtt = percentile(rtts, RTT_PERCENTILE)
+        gap = percentile(gaps, GAP_PERCENTILE)
+        return {
+            "rtt_ms": round(rtt, 1) if rtt is not None else None,
+            "gap_ms": round(gap, 1) if gap is not None else None,
+            "rtt_samples": len(rtts),
+            "gap_samples": len(gaps),
+        }
+
+    # ------------------------------------------------------------------
+    # Policy
+    # ------------------------------------------------------------------
+
+    def evaluate(self, now: Optional[float] = None) -> Optional[Tuple[str, str]]:
+        """
+        Apply the policy to the current metrics
+
+        Returns:
+            ("shed" | "restore", group) when a stage should change, else None
+        """
+        now = time.monotonic() if now is None else now
+        self._expire_pending(now)
+        if not self.policy.enabled:
+            return None
+        m = self.last_metrics = self.metrics(now)
+        rtt, gap = m["rtt_ms"] or 0.0, m["gap_ms"] or 0.0
+        stages = self.policy.stages
+
+        if len(self.shed) < len(stages):
+            stage = stages[len(self.shed)]
+            if rtt > stage.rtt_ms or gap > stage.gap_ms:
+                self._over += 1
+                self._under_since = None
+                if self._over >= self.policy.shed_after:
+                    self._over = 0
+                    return ("shed", stage.group)
+                return None
+        self._over = 0
+
+        if not self.shed:
+            return None
+        stage = next(s for s in stages if s.group == self.shed[-1])
+        ratio = self.policy.restore_ratio
+        if rtt < stage.rtt_ms * ratio and gap < stage.gap_ms * ratio:
+            if self._under_since is None:
+                self._under_since = now
+            elif now - self._under_since >= self.policy.restore_after:
+                self._under_since = None
+                return ("restore", stage.group)
+        else:
+            self._under_since = None
+        return None
+
+    async def _apply(self, action: str, group: str) -> None:
+        m = self.last_metrics  # What evaluate() decided on
+        if action == "shed":
+            self.shed.append(group)
+            logger.warning(f"📉 Link degraded (rtt {m['rtt_ms']} ms, gap {m['gap_ms']} ms): shedding {group}")
+        else:
+            self.shed.remove(group)
+            logger.info(f"📈 Link recovered (rtt {m['rtt_ms']} ms, gap {m['gap_ms']} ms): restoring {group}")
+        self.events.append({"time": time.time(), "action": action, "group": group, **m})
+        try:
+            await self.controller.set_group_shed(group, action == "shed")
+        except Exception as e:
+            logger.error(f"Failed to {action} {group}: {e}")
+
+    def set_policy(self, policy: SheddingPolicy) -> None:
+        """Replace the policy; stages no longer in it are restored on the next evaluation"""
+        self.policy = policy
+        groups = [s.group for s in policy.stages]
+        for group in [g for g in self.shed if g not in groups]:
+            self.shed.remove(group)
+            asyncio.ensure_future(self.controller.set_group_shed(group, False))
+
+    # ------------------------------------------------------------------
+    # Loop
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        # Probe responses only reach note_message on a subscribed topic
+        self.controller._subscribe_topic(PROBE_RESPONSE_TOPIC, lambda message: None)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _probe(self) -> None:
+        pub_sub = self.controller.conn.datachannel.pub_sub
+        payload = {"api_id": LocoAPI.GET_FSM_ID, "parameter": "{}"}
+        try:
+            await asyncio.wait_for(pub_sub.publish_request_new(PROBE_TOPIC, payload), timeout=PROBE_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass  # Counted as lost by _expire_pending
+        except Exception as e:
+            logger.debug(f"Link probe failed: {e}")
+
+    async def _run(self) -> None:
+        last_probe = 0.0
+        probe: Optional[asyncio.Task] = None
+        while True:
+            await asyncio.sleep(EVALUATE_INTERVAL)
+            if not self.controller.connected:
+                continue
+            now = time.monotonic()
+            idle = not any(self._pending.values())
+            if idle and now - last_probe >= PROBE_INTERVAL and (probe is None or probe.done()):
+                last_probe = now
+                probe = asyncio.create_task(self._probe())
+            action = self.evaluate(now)
+            if action:
+                await self._apply(*action)
+
+    def get_stats(self) -> dict:
+        return {
+            **self.metrics(),
+            "requests": self.requests,
+            "responses": self.responses,
+            "lost": self.lost,
+            "shed": list(self.shed),
+            "policy": self.policy.to_dict(),
+            "events": list(self.events),
+        }
@@ -0,0 +1,240 @@
+"""
+Recording Catalog - Single-file index of saved teach-mode recordings
+
+Keeps name, duration, sample count, created_at, size and checksum of every
+recording in one JSON manifest next to the data files, so listing and
+metadata queries cost one small file read regardless of how many recordings
+exist. Every update is written to a temp file and swapped in with an atomic
+rename; multi-step operations (rename, delete) roll back the data file if the
+manifest cannot be committed.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+from .teach_mode_format import RECORDING_SUFFIX, read_header
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILENAME = "catalog.json"
+CATALOG_VERSION = 1
+
+
+@dataclass
+class CatalogEntry:
+    """Catalog metadata for one recording"""
+    name: str
+    duration: float
+    sample_count: int
+    created_at: float
+    size: int  # File size in bytes
+    checksum: str  # "sha256:<hex>" of the data file
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'CatalogEntry':
+        return cls(**{k: data[k] for k in cls.__dataclass_fields__})
+
+
+def file_checksum(path: Path) -> str:
+    """SHA-256 of a file, prefixed with the algorithm name"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return f"sha256:{digest.hexdigest()}"
+
+
+def entry_for_file(name: str, path: Path) -> CatalogEntry:
+    """Build a catalog entry from a recording file (reads the header only)"""
+    header = read_header(path)
+    return CatalogEntry(
+        name=name,
+        duration=header.duration,
+        sample_count=header.sample_count,
+        created_at=header.created_at,
+        size=path.stat().st_size,
+        checksum=file_checksum(path),
+    )
+
+
+class RecordingCatalog:
+    """
+    JSON manifest of recordings in a storage directory
+
+    The manifest is cached in memory and re-read only when its mtime changes,
+    so another process updating the catalog is picked up on the next query.
+    """
+
+    def __init__(self, storage_dir: Path):
+        self.storage_dir = Path(storage_dir)
+        self.path = self.storage_dir / CATALOG_FILENAME
+        self._entries: Dict[str, CatalogEntry] = {}
+        self._mtime_ns: Optional[int] = None
+        self._lock = threading.RLock()
+
+        if self.path.exists():
+            self._reload()
+        else:
+            self.rebuild()
+
+    # ------------------------------------------------------------------
+    # Manifest I/O
+    # ------------------------------------------------------------------
+
+    def _reload(self) -> None:
+        try:
+            stat = self.path.stat()
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            self._entries = {
+                name: CatalogEntry.from_dict(entry)
+                for name, entry in data.get("recordings", {}).items()
+            }
+            self._mtime_ns = stat.st_mtime_ns
+        except Exception as e:
+            logger.error(f"Recording catalog unreadable ({e}); rebuilding from data files")
+            self.rebuild()
+
+    def _refresh(self) -> None:
+        """Re-read the manifest if another writer replaced it"""
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self.rebuild()
+            return
+        if mtime_ns != self._mtime_ns:
+            self._reload()
+
+    def _commit(self, entries: Dict[str, CatalogEntry]) -> None:
+        """Write the manifest atomically and adopt it as the cached state"""
+        data = {
+            "version": CATALOG_VERSION,
+            "recordings": {name: entry.to_dict() for name, entry in sorted(entries.items())},
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        self._entries = entries
+        self._mtime_ns = self.path.stat().st_mtime_ns
+
+    def rebuild(self) -> int:
+        """
+        Recreate the manifest by scanning recording headers
+
+        Returns:
+            Number of recordings indexed
+        """
+        with self._lock:
+            entries = {}
+            for path in self.storage_dir.glob(f"*{RECORDING_SUFFIX}"):
+                try:
+                    entries[path.stem] = entry_for_file(path.stem, path)
+                except Exception as e:
+                    logger.warning(f"Skipping unreadable recording '{path.name}': {e}")
+            self._commit(entries)
+            logger.info(f"Indexed {len(entries)} recording(s) in {self.path}")
+            return len(entries)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def names(self) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return list(self._entries.keys())
+
+    def entries(self) -> List[CatalogEntry]:
+        with self._lock:
+            self._refresh()
+            return list(self._entries.values())
+
+    def get(self, name: str) -> Optional[CatalogEntry]:
+        with self._lock:
+            self._refresh()
+            return self._entries.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def add(self, name: str, path: Path) -> CatalogEntry:
+        """Index a newly written recording file"""
+        with self._lock:
+            self._refresh()
+            entry = entry_for_file(name, path)
+            entries = dict(self._entries)
+            entries[name] = entry
+            self._commit(entries)
+            return entry
+
+    def remove(self, name: str) -> bool:
+        """Delete a recording file and its catalog entry"""
+        with self._lock:
+            self._refresh()
+            path = self.storage_dir / f"{name}{RECORDING_SUFFIX}"
+            if name not in self._entries and not path.exists():
+                return False
+
+            # Move the file aside first so a failed commit can restore it
+            trash_path = path.with_name(path.name + ".deleting")
+            if path.exists():
+                os.replace(path, trash_path)
+
+            entries = dict(self._entries)
+            entries.pop(name, None)
+            try:
+                self._commit(entries)
+            except Exception:
+                if trash_path.exists():
+                    os.replace(trash_path, path)
+                raise
+
+            if trash_path.exists():
+                trash_path.unlink()
+            return True
+
+    def rename(self, old_name: str, new_name: str) -> bool:
+        """Rename a recording file and its catalog entry as one operation"""
+        with self._lock:
+            self._refresh()
+            old_path = self.storage_dir / f"{old_name}{RECORDING_SUFFIX}"
+            new_path = self.storage_dir / f"{new_name}{RECORDING_SUFFIX}"
+
+            if not old_path.exists():
+                return False
+            if new_path.exists() or new_name in self._entries:
+                return False
+
+            os.rename(old_path, new_path)
+
+            entries = dict(self._entries)
+            entry = entries.pop(old_name, None)
+            if entry is None:
+                entry = entry_for_file(new_name, new_path)
+            else:
+                entry = CatalogEntry(**{**entry.to_dict(), "name": new_name})
+            entries[new_name] = entry
+
+            try:
+                self._commit(entries)
+            except Exception:
+                os.rename(new_path, old_path)
+                raise
+            return True
@@ -0,0 +1,356 @@
+"""
+Robot Broker - One robot connection shared by many local processes
+
+The robot accepts a single app connection. The broker owns it (a
+RobotController, so reconnects, subscription replay and link monitoring
+apply) and serves it on a Unix socket. Local clients (the web UI, mapping
+scripts, g1_tests) connect with BrokerConnection, which mirrors
+UnitreeWebRTCConnection's datachannel.pub_sub API.
+
+- subscribe/unsubscribe: the broker subscribes to a robot topic while at least
+  one client wants it and fans every message out to those clients.
+- publish_request_new/publish_request/publish_without_callback are forwarded
+  to the robot; request results go back to the calling client.
+- Large messages (point clouds, frames) travel through shared memory; see
+  broker_protocol. VIDEO_TOPIC carries decoded frames from the video relay.
+
+Each client has a bounded outgoing queue. A client that stops reading loses
+messages (counted as drops); it never stalls the robot connection.
+
+Run with:
+    python -m g1_app.core.robot_broker --ip 192.168.123.161 --sn E21D1000PAHBMB06
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import time
+from typing import Callable, Dict, Optional, Set
+import logging
+
+from .broker_protocol import (DEFAULT_BROKER_SOCKET, SHM_THRESHOLD, VIDEO_TOPIC, ShmRing,
+                              pack_frame, read_frame)
+from .event_bus import EventBus, Events
+
+logger = logging.getLogger(__name__)
+
+CLIENT_QUEUE_SIZE = 256  # Frames buffered per client before messages are dropped
+REQUEST_KINDS = ("publish_request_new", "publish_request")
+VIDEO_SOURCE_RETRY = 1.0  # Seconds between checks for a video track to relay
+
+
+class _BrokerClient:
+    """One connected local process"""
+
+    def __init__(self, broker: "RobotBroker", reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.broker = broker
+        self.reader = reader
+        self.writer = writer
+        self.name = "client"
+        self.pid: Optional[int] = None
+        self.topics: Set[str] = set()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.sent = 0
+        self.dropped = 0
+        self.requests = 0
+        self.connected_at = time.time()
+
+    def send(self, frame: bytes) -> None:
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def write_loop(self) -> None:
+        while True:
+            frame = await self.queue.get()
+            self.writer.write(frame)
+            await self.writer.drain()
+            self.sent += 1
+
+    def get_stats(self) -> dict:
+        return {
+            "name": self.name,
+            "pid": self.pid,
+            "topics": sorted(self.topics),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "queued": self.queue.qsize(),
+            "requests": self.requests,
+            "connected_at": self.connected_at,
+        }
+
+
+class RobotBroker:
+    """Unix-socket fan-out of a RobotController's datachannel"""
+
+    def __init__(self, controller, socket_path: str = DEFAULT_BROKER_SOCKET):
+        self.controller = controller
+        self.socket_path = socket_path
+        self.clients: Set[_BrokerClient] = set()
+        self._subscribers: Dict[str, Set[_BrokerClient]] = {}
+        self._owned_topics: Set[str] = set()  # Robot subscriptions made on behalf of clients
+        self._listeners: Dict[str, Callable] = {}
+        self._rings: Dict[str, ShmRing] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._video_task: Optional[asyncio.Task] = None
+        self._handlers: Set[asyncio.Task] = set()
+        self.messages = 0
+        self.shm_messages = 0
+
+    async def start(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # Stale socket from a previous run
+        self._server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        EventBus.subscribe(Events.CONNECTION_CHANGED, self._on_connection_change)
+        logger.info(f"🔀 Robot broker listening on {self.socket_path}")
+
+    async def stop(self) -> None:
+        EventBus.unsubscribe(Events.CONNECTION_CHANGED, self._on_connection_change)
+        if self._video_task:
+            self._video_task.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for task in list(self._handlers):
+            task.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        for ring in self._rings.values():
+            ring.close()
+        self._rings.clear()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    # ------------------------------------------------------------------
+    # Fan-out
+    # ------------------------------------------------------------------
+
+    def _on_connection_change(self, data) -> None:
+        frame = pack_frame({"op": "connection", "connected": bool(data.get("connected"))})
+        for client in list(self.clients):
+            client.send(frame)
+
+    def publish(self, topic: str, message) -> None:
+        """Send a robot message to every client subscribed to ``topic``"""
+        clients = self._subscribers.get(topic)
+        if not clients:
+            return
+        self.messages += 1
+        frame = pack_frame({"op": "message", "topic": topic}, message)
+        if len(frame) > SHM_THRESHOLD:
+            ring = self._rings.get(topic)
+            if ring is None:
+                ring = self._rings[topic] = ShmRing()
+            name, seq = ring.write(frame)
+            frame = pack_frame({"op": "message", "topic": topic, "shm": name, "seq": seq, "size": len(frame)})
+            self.shm_messages += 1
+        for client in list(clients):
+            client.send(frame)
+
+    def _subscribe(self, client: _BrokerClient, topic: str) -> None:
+        client.topics.add(topic)
+        subscribers = self._subscribers.setdefault(topic, set())
+        subscribers.add(client)
+        if len(subscribers) > 1:
+            return
+        if topic == VIDEO_TOPIC:
+            if self._video_task is None or self._video_task.done():
+                self._video_task = asyncio.create_task(self._relay_video())
+            return
+        self.controller.add_topic_listener(topic, self._listener(topic))
+        if self.controller.subscribe_raw(topic):
+            self._owned_topics.add(topic)
+
+    def _unsubscribe(self, client: _BrokerClient, topic: str) -> None:
+        client.topics.discard(topic)
+        subscribers = self._subscribers.get(topic)
+        if not subscribers or client not in subscribers:
+            return
+        subscribers.discard(client)
+        if subscribers:
+            return
+        del self._subscribers[topic]
+        if topic == VIDEO_TOPIC:
+            if self._video_task:
+                self._video_task.cancel()
+            return
+        self.controller.remove_topic_listener(topic, self._listener(topic))
+        if topic in self._owned_topics:
+            self._owned_topics.discard(topic)
+            self.controller.unsubscribe_raw(topic)
+
+    def _listener(self, topic: str) -> Callable:
+        # One callable per topic, so remove_topic_listener finds the one we added
+        if topic not in self._listeners:
+            self._listeners[topic] = lambda message, _topic=topic: self.publish(_topic, message)
+        return self._listeners[topic]
+
+    async def _relay_video(self) -> None:
+        """Publish decoded BGR frames from the video relay while VIDEO_TOPIC has subscribers"""
+        from .video_relay import get_video_relay
+        relay = get_video_relay()
+        while True:
+            if not relay.has_source:
+                await asyncio.sleep(VIDEO_SOURCE_RETRY)
+                continue
+            track = relay.subscribe()
+            try:
+                while True:
+                    frame = await track.recv()
+                    image = frame.to_ndarray(format="bgr24")
+                    self.publish(VIDEO_TOPIC, {
+                        "width": frame.width,
+                        "height": frame.height,
+                        "format": "bgr24",
+                        "time": time.time(),
+                        "data": image,
+                    })
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Broker video relay restarted: {e}")
+            finally:
+                track.stop()
+
+    # ------------------------------------------------------------------
+    # Clients
+    # ------------------------------------------------------------------
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        client = _BrokerClient(self, reader, writer)
+        self.clients.add(client)
+        self._handlers.add(asyncio.current_task())
+        write_task = asyncio.create_task(client.write_loop())
+        try:
+            while True:
+                header, payload = await read_frame(reader)
+                self._handle_frame(client, header, payload)
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        except asyncio.CancelledError:
+            pass  # Broker stopping; ending normally keeps asyncio's stream callback quiet
+        except Exception as e:
+            logger.error(f"Broker client {client.name} failed: {e}")
+        finally:
+            for topic in list(client.topics):
+                self._unsubscribe(client, topic)
+            self.clients.discard(client)
+            self._handlers.discard(asyncio.current_task())
+            write_task.cancel()
+            writer.close()
+            logger.info(f"🔀 Broker client {client.name} (pid {client.pid}) left")
+
+    def _handle_frame(self, client: _BrokerClient, header: dict, payload) -> None:
+        op = header.get("op")
+        if op == "hello":
+            client.name = str(header.get("name") or "client")
+            client.pid = header.get("pid")
+            logger.info(f"🔀 Broker client {client.name} (pid {client.pid}) joined")
+            client.send(pack_frame({
+                "op": "welcome",
+                "connected": self.controller.connected,
+                "robot": {"ip": self.controller.robot_ip, "serial_number": self.controller.serial_number},
+            }))
+        elif op == "subscribe":
+            self._subscribe(client, header["topic"])
+        elif op == "unsubscribe":
+            self._unsubscribe(client, header["topic"])
+        elif op == "publish":
+            self._publish_to_robot(header["topic"], payload)
+        elif op == "request":
+            client.requests += 1
+            asyncio.create_task(self._forward_request(client, header, payload))
+        else:
+            logger.warning(f"Unknown broker op from {client.name}: {op}")
+
+    def _publish_to_robot(self, topic: str, payload) -> None:
+        if not self.controller.connected:
+            logger.warning(f"Dropped publish to {topic}: robot not connected")
+            return
+        self.controller.conn.datachannel.pub_sub.publish_without_callback(topic, payload)
+
+    async def _forward_request(self, client: _BrokerClient, header: dict, payload) -> None:
+        reply = {"op": "result", "id": header.get("id")}
+        result = None
+        try:
+            kind = header.get("kind")
+            if kind not in REQUEST_KINDS:
+                raise ValueError(f"Unsupported request kind: {kind}")
+            if not self.controller.connected:
+                raise ConnectionError("Robot not connected")
+            method = getattr(self.controller.conn.datachannel.pub_sub, kind)
+            result = await method(header["topic"], payload)
+        except Exception as e:
+            reply["error"] = str(e)
+        client.send(pack_frame(reply, result))
+
+    def get_stats(self) -> dict:
+        return {
+            "socket": self.socket_path,
+            "messages": self.messages,
+            "shm_messages": self.shm_messages,
+            "topics": {topic: len(clients) for topic, clients in self._subscribers.items()},
+            "clients": [client.get_stats() for client in self.clients],
+        }
+
+
+async def run_broker(robot_ip: Optional[str], robot_sn: str, socket_path: str) -> None:
+    """Connect to the robot and serve it until SIGINT/SIGTERM"""
+    from .robot_controller import RobotController
+    from ..utils.robot_discovery import discover_robot_async
+
+    # The broker itself always talks WebRTC
+    os.environ.pop("G1_BROKER_SOCKET", None)
+
+    if not robot_ip:
+        discovered = await discover_robot_async(verify_with_ping=False)
+        if not discovered:
+            logger.error("Robot not found on network")
+            return
+        robot_ip = discovered["ip"]
+
+    controller = RobotController(robot_ip, robot_sn)
+    await controller.connect()
+    # State keeps the supervisor's silence watchdog armed; video feeds VIDEO_TOPIC
+    await controller.initialize_subscriptions(
+        include_state=True,
+        include_lowstate=False,
+        include_battery=False,
+        include_video=True,
+        include_slam=False,
+        include_lidar=False,
+    )
+
+    broker = RobotBroker(controller, socket_path)
+    await broker.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await broker.stop()
+        await controller.disconnect()
+
+
+def main() -> None:
+    from ..utils.config import RobotConfig
+
+    config = RobotConfig.from_env()
+    parser = argparse.ArgumentParser(description="Share one G1 robot connection with local processes")
+    parser.add_argument("--ip", default=config.ip, help="Robot IP (discovered when omitted)")
+    parser.add_argument("--sn", default=config.serial_number, help="Robot serial number")
+    parser.add_argument("--socket", default=DEFAULT_BROKER_SOCKET, help="Unix socket path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(run_broker(args.ip, args.sn, args.socket))
+
+
+if __name__ == "__main__":
+    main()
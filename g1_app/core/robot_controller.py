@@ -7,7 +7,8 @@ import sys
 import logging
 import struct
 import os
-from typing import Optional, List
+import time
+from typing import Callable, Dict, Optional, List
 
 from ..utils.pathing import get_webrtc_paths
 
@@ -25,6 +26,12 @@ from ..core.command_executor import CommandExecutor
 from ..core.event_bus import EventBus, Events
 from ..api.constants import Topic, SpeedMode, VelocityLimits
 from ..core.lidar_handler import LiDARPointCloudHandler
+from ..core.video_pipeline import get_video_renditions
+from ..core.video_relay import get_video_relay
+from ..core.trajectory_store import TrajectoryStore, yaw_from_quaternion
+from ..core.connection_supervisor import ConnectionSupervisor
+from ..core.link_monitor import LinkMonitor
+from ..core.broker_client import BrokerConnection
 
 logger = logging.getLogger(__name__)
 
@@ -34,15 +41,18 @@ class RobotController:
     Main robot controller - manages connection, state, and commands
     """
     
-    def __init__(self, robot_ip: str, robot_sn: str):
+    def __init__(self, robot_ip: str, robot_sn: str, broker_socket: Optional[str] = None):
         """
         Args:
             robot_ip: Robot IP address (discovered dynamically)
             robot_sn: Robot serial number (e.g., "E21D1000PAHBMB06")
+            broker_socket: Share a robot broker's connection instead of opening
+                WebRTC (defaults to $G1_BROKER_SOCKET)
         """
         self.robot_ip = robot_ip
         self.robot_sn = robot_sn
         self.serial_number = robot_sn  # Alias for compatibility
+        self.broker_socket = broker_socket or os.getenv('G1_BROKER_SOCKET')
         
         # Core components
         self.state_machine = StateMachine()
@@ -51,6 +61,8 @@ class RobotController:
         
         # Connection state
         self.connected = False
+        self.supervisor = ConnectionSupervisor(self)  # Watchdog, reconnect and phase timeline
+        self.link_monitor = LinkMonitor(self)  # RTT/gap measurement and stream shedding
         
         # Speed mode tracking (for RUN mode)
         self.current_speed_mode = SpeedMode.LOW
@@ -60,8 +72,8 @@ class RobotController:
         self._last_state_log_ts = 0.0
         self._last_bms_log_ts = 0.0
         
-        # Video frame storage
-        self.latest_frame = None
+        # Video frames are encoded on demand (see video_pipeline)
+        self.video_renditions = get_video_renditions()
         
         # LiDAR point cloud storage and handler
         self.latest_lidar_points = []
@@ -69,12 +81,21 @@ class RobotController:
 
         # Subscription tracking
         self._subscriptions = set()
+        self._topic_callbacks: Dict[str, Callable] = {}  # Replayed after a reconnect
+        self._video_enabled = False
+        self._video_track_conn = None  # Connection our track callback is registered on
+        self._lidar_service_enabled = False
+        self._shed_groups = set()  # Groups the link monitor turned off
+        self._topic_counts: Dict[str, int] = {}  # Messages received per subscribed topic
+        self._topic_last_seen: Dict[str, float] = {}  # time.monotonic() of the last message
+        self._lowstate_listeners: List[Callable[[dict], None]] = []
+        self._topic_listeners: Dict[str, List[Callable]] = {}  # Extra per-topic consumers (robot broker)
         self._debug_logging_enabled = False
         self._datachannel_dispatch_original = None
         
         # SLAM and Navigation state
         self.slam_active = False
-        self.slam_trajectory = []
+        self.trajectory_store = TrajectoryStore()  # Bounded, 5 cm-deduplicated pose history
         self.navigation_active = False
         self.loaded_map = None
         self.navigation_goal = None
@@ -101,30 +122,26 @@ class RobotController:
         
         logger.info(f"Initialized RobotController for {robot_sn} @ {robot_ip}")
     
-    async def connect(self) -> None:
-        """Establish WebRTC connection to robot (no auto-subscriptions)"""
+    async def connect(self, discover_ms: Optional[float] = None) -> None:
+        """
+        Establish WebRTC connection to robot (no auto-subscriptions)
+
+        Args:
+            discover_ms: Time the caller spent resolving robot_ip, for the timeline
+        """
         if self.connected:
             logger.warning("Already connected")
             return
         
-        logger.info(f"Connecting to G1 at {self.robot_ip}...")
+        if self.broker_socket:
+            logger.info(f"Connecting to G1 through robot broker {self.broker_socket}...")
+        else:
+            logger.info(f"Connecting to G1 at {self.robot_ip}...")
+        timeline = self.supervisor.begin("connect", discover_ms)
+        timeline.ip = self.robot_ip
         
         try:
-            # Create WebRTC connection
-            self.conn = UnitreeWebRTCConnection(
-                WebRTCConnectionMethod.LocalSTA,
-                ip=self.robot_ip,
-                serialNumber=self.robot_sn
-            )
-            
-            try:
-                await self.conn.connect()
-            except SystemExit:
-                # WebRTC driver calls sys.exit(1) on failure - catch it
-                raise ConnectionError(f"Failed to establish WebRTC connection to {self.robot_ip}. Check if robot is powered on and ports 8081/9991 are accessible.")
-            
-            # Create command executor
-            self.executor = CommandExecutor(self.conn.datachannel)
+            await self._open_connection()
             
             # NOTE: GET_FSM_ID and GET_FSM_MODE APIs don't return reliable state
             # API 7001 returns unknown values (e.g., 801)
@@ -134,14 +151,82 @@ class RobotController:
             
             self.connected = True
             EventBus.emit(Events.CONNECTION_CHANGED, {"connected": True})
+            self.supervisor.start()
+            self.link_monitor.start()
             
             logger.info("✅ Connected to robot")
             
         except Exception as e:
             logger.error(f"Connection failed: {e}")
+            self.supervisor.fail(str(e))
             EventBus.emit(Events.CONNECTION_CHANGED, {"connected": False, "error": str(e)})
             raise
 
+    async def _open_connection(self) -> None:
+        """Create the WebRTC connection and command executor, timing ICE and datachannel"""
+        if self.broker_socket:
+            self.conn = BrokerConnection(self.broker_socket, name=f"RobotController:{os.getpid()}")
+        else:
+            self.conn = UnitreeWebRTCConnection(
+                WebRTCConnectionMethod.LocalSTA,
+                ip=self.robot_ip,
+                serialNumber=self.robot_sn
+            )
+        
+        phases = asyncio.create_task(self.supervisor.watch_phases(self.conn))
+        try:
+            await self.conn.connect()
+        except SystemExit:
+            # WebRTC driver calls sys.exit(1) on failure - catch it
+            raise ConnectionError(f"Failed to establish WebRTC connection to {self.robot_ip}. Check if robot is powered on and ports 8081/9991 are accessible.")
+        finally:
+            phases.cancel()
+        if self.broker_socket and self.conn.robot_ip:
+            self.robot_ip = self.conn.robot_ip  # The broker's robot, whatever we were given
+        # connect() returns once the datachannel is validated
+        self.supervisor.mark("ice")
+        self.supervisor.mark("datachannel")
+        self.link_monitor.attach(self.conn)
+        
+        # Create command executor
+        self.executor = CommandExecutor(self.conn.datachannel)
+
+    def _mark_link_lost(self, reason: str) -> None:
+        """Called by the supervisor when the watchdog declares the link dead"""
+        self.connected = False
+        EventBus.emit(Events.CONNECTION_CHANGED, {"connected": False, "reconnecting": True, "reason": reason})
+
+    async def _reconnect(self) -> None:
+        """Reopen the connection and replay subscriptions and enabled services"""
+        old_conn, self.conn = self.conn, None
+        if old_conn:
+            try:
+                await asyncio.wait_for(old_conn.disconnect(), timeout=2.0)
+            except Exception as e:
+                logger.debug(f"Closing dead connection: {e}")
+        
+        self.executor = None
+        await self._open_connection()
+        await self._replay_subscriptions()
+        
+        self.connected = True
+        EventBus.emit(Events.CONNECTION_CHANGED, {"connected": True, "reconnected": True})
+
+    async def _replay_subscriptions(self) -> None:
+        """Re-register every tracked topic callback and service on the new connection"""
+        pub_sub = self.conn.datachannel.pub_sub
+        for topic, callback in self._topic_callbacks.items():
+            pub_sub.subscribe(topic, callback)
+        logger.info(f"🔁 Restored {len(self._topic_callbacks)} topic subscriptions")
+        
+        if self._video_enabled and "video" not in self._shed_groups:
+            self._subscribe_to_video()
+        if self._debug_logging_enabled:
+            self._debug_logging_enabled = False  # Patch the new datachannel
+            self._log_all_datachannel_messages()
+        if self._lidar_service_enabled:
+            await self._set_lidar_service(True)
+
     async def initialize_subscriptions(
         self,
         *,
@@ -233,29 +318,95 @@ class RobotController:
             ])
 
         if "lidar" in groups_set:
-            self._unsubscribe_topics([
-                "rt/unitree/slam_mapping/points",
-                Topic.LIDAR_CLOUD,
-                Topic.LIDAR_IMU,
-            ])
+            self._unsubscribe_topics(self._get_group_topics("lidar"))
 
         if "debug" in groups_set:
             self._unsubscribe_topics(self._get_debug_topics())
             self._disable_debug_logging()
 
+    def unsubscribe_topics(self, topics: List[str]) -> None:
+        """Drop individual topics (e.g. the ones a caller added through enable_subscriptions)"""
+        self._unsubscribe_topics(topics)
+
     def get_subscription_status(self) -> dict:
         """Return current subscription topics."""
         return {
             "topics": sorted(self._subscriptions),
         }
 
+    async def set_group_shed(self, group: str, shed: bool) -> None:
+        """
+        Turn a heavy subscription group off (shed) or back on for the link monitor
+
+        Only groups that were active when shed are restored.
+        """
+        if not self.conn:
+            return
+        if shed:
+            if group == "video":
+                active = self._video_enabled
+            else:
+                active = bool(self._subscriptions & set(self._get_group_topics(group)))
+                active = active or (group == "debug" and self._debug_logging_enabled)
+            if not active:
+                return
+            if group == "video":
+                self.conn.video.switchVideoChannel(False)
+            else:
+                self.disable_subscriptions([group])
+            self._shed_groups.add(group)
+        elif group in self._shed_groups:
+            self._shed_groups.discard(group)
+            if group == "video":
+                if self._video_track_conn is self.conn:
+                    self.conn.video.switchVideoChannel(True)
+                else:
+                    self._subscribe_to_video()  # Reconnected while shed: no track callback yet
+            else:
+                await self.enable_subscriptions([group])
+
+    def _get_group_topics(self, group: str) -> List[str]:
+        if group == "lidar":
+            return ["rt/unitree/slam_mapping/points", Topic.LIDAR_CLOUD, Topic.LIDAR_IMU]
+        if group == "debug":
+            return self._get_debug_topics()
+        return []
+
+    def get_topic_metrics(self) -> Dict[str, dict]:
+        """Message count and seconds since the last message, per subscribed topic"""
+        now = time.monotonic()
+        metrics = {}
+        for topic in sorted(self._subscriptions):
+            last_seen = self._topic_last_seen.get(topic)
+            metrics[topic] = {
+                "count": self._topic_counts.get(topic, 0),
+                "age": round(now - last_seen, 3) if last_seen is not None else None,
+            }
+        return metrics
+
     def _subscribe_topic(self, topic: str, callback) -> None:
         if not self.conn:
             return
         if topic in self._subscriptions:
             return
-        self.conn.datachannel.pub_sub.subscribe(topic, callback)
+
+        is_state = topic == Topic.SPORT_MODE_STATE_LF
+
+        def counted(message, _topic=topic, _callback=callback):
+            self._topic_counts[_topic] = self._topic_counts.get(_topic, 0) + 1
+            self._topic_last_seen[_topic] = time.monotonic()
+            self.supervisor.note_message(is_state)
+            self.link_monitor.note_message(_topic, message)
+            for listener in self._topic_listeners.get(_topic, ()):
+                try:
+                    listener(message)
+                except Exception as e:
+                    logger.error(f"Topic listener for {_topic} failed: {e}")
+            return _callback(message)
+
+        self.conn.datachannel.pub_sub.subscribe(topic, counted)
         self._subscriptions.add(topic)
+        self._topic_callbacks[topic] = counted
 
     def _unsubscribe_topics(self, topics: List[str]) -> None:
         if not self.conn:
@@ -264,6 +415,7 @@ class RobotController:
             if topic in self._subscriptions:
                 self.conn.datachannel.pub_sub.unsubscribe(topic)
                 self._subscriptions.discard(topic)
+                self._topic_callbacks.pop(topic, None)
 
     def _get_battery_topics(self) -> List[str]:
         return [
@@ -288,7 +440,10 @@ class RobotController:
     
     async def disconnect(self) -> None:
         """Close connection to robot"""
-        if not self.connected:
+        reconnecting = self.supervisor.state == "reconnecting"
+        await self.supervisor.stop()
+        await self.link_monitor.stop()
+        if not self.connected and not reconnecting:
             return
         
         logger.info("Disconnecting from robot...")
@@ -382,6 +537,12 @@ class RobotController:
                     if not hasattr(self.conn.datachannel.pub_sub, '_last_lowstate'):
                         logger.info(f"📖 Started caching rt/lowstate for arm reads ({motor_count} motors)")
                     self.conn.datachannel.pub_sub._last_lowstate = lowstate_data
+
+                    for listener in self._lowstate_listeners:
+                        try:
+                            listener(lowstate_data)
+                        except Exception as e:
+                            logger.error(f"Lowstate listener failed: {e}")
                 else:
                     logger.warning(f"📖 Lowstate data format unexpected: {list(data.keys()) if isinstance(data, dict) else type(data)}")
             except Exception as e:
@@ -398,6 +559,44 @@ class RobotController:
         except Exception as e:
             logger.warning(f"Could not subscribe to rt/lowstate: {e}")
     
+    def add_lowstate_listener(self, callback: Callable[[dict], None]) -> None:
+        """Call ``callback(lowstate_data)`` for every rt/lowstate message (requires the lowstate group)"""
+        if callback not in self._lowstate_listeners:
+            self._lowstate_listeners.append(callback)
+
+    def remove_lowstate_listener(self, callback: Callable[[dict], None]) -> None:
+        if callback in self._lowstate_listeners:
+            self._lowstate_listeners.remove(callback)
+
+    def add_topic_listener(self, topic: str, callback: Callable) -> None:
+        """Call ``callback(message)`` for every message on ``topic`` (while it is subscribed)"""
+        listeners = self._topic_listeners.setdefault(topic, [])
+        if callback not in listeners:
+            listeners.append(callback)
+
+    def remove_topic_listener(self, topic: str, callback: Callable) -> None:
+        listeners = self._topic_listeners.get(topic, [])
+        if callback in listeners:
+            listeners.remove(callback)
+
+    def subscribe_raw(self, topic: str) -> bool:
+        """
+        Subscribe ``topic`` with no handler of its own (consumers use add_topic_listener)
+
+        Returns:
+            True if this call created the subscription, so the caller owns it
+            and should drop it with unsubscribe_raw; False if it already existed
+            (or there is no connection)
+        """
+        if not self.conn or topic in self._subscriptions:
+            return False
+        self._subscribe_topic(topic, lambda message: None)
+        return topic in self._subscriptions
+
+    def unsubscribe_raw(self, topic: str) -> None:
+        """Drop a subscription made by subscribe_raw"""
+        self._unsubscribe_topics([topic])
+
     def _subscribe_to_battery(self) -> None:
         """Subscribe to battery state updates
         
@@ -457,7 +656,6 @@ class RobotController:
     def _subscribe_to_video(self) -> None:
         """Capture video frames from WebRTC video track"""
         try:
-            import cv2
             import asyncio
             from aiortc import MediaStreamTrack
             from aiortc.mediastreams import MediaStreamError
@@ -469,22 +667,25 @@ class RobotController:
             
             # Enable video channel
             self.conn.video.switchVideoChannel(True)
+            self._video_enabled = True
             logger.info("✅ Video channel enabled")
             
             async def recv_video_frames(track: MediaStreamTrack):
                 """Async callback to receive video frames"""
                 logger.info("📹 Starting video frame reception")
+                self.video_renditions.reset()
+                
+                # Relay the track so browser WebRTC peers share it with the JPEG path
+                relay = get_video_relay()
+                relay.set_source(track)
+                track = relay.subscribe()
                 while True:
                     try:
                         # Receive frame from WebRTC track
                         frame = await track.recv()
                         
-                        # Convert to numpy array
-                        img = frame.to_ndarray(format="bgr24")
-                        
-                        # Encode to JPEG for streaming
-                        _, buffer = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 80])
-                        self.latest_frame = buffer.tobytes()
+                        # Hand off to the encoder (JPEG only while viewers are attached)
+                        self.video_renditions.submit(frame)
                         
                     except MediaStreamError:
                         # Normal when track ends or restarts; avoid crashing app
@@ -496,6 +697,7 @@ class RobotController:
             
             # Register video track callback
             self.conn.video.add_track_callback(recv_video_frames)
+            self._video_track_conn = self.conn
             logger.info("✅ Subscribed to video stream")
             
         except Exception as e:
@@ -584,12 +786,10 @@ class RobotController:
                             self.current_position_updates += 1
                             
                             # Add to trajectory for visualization
-                            self.slam_trajectory.append({
-                                'x': x,
-                                'y': y,
-                                'z': z,
-                                'timestamp': self.current_position['timestamp']
-                            })
+                            self._append_trajectory_point(
+                                self.current_position['timestamp'], x, y, z,
+                                yaw_from_quaternion(pose.get('orientation'))
+                            )
                             
                             # Emit event for UI updates
                             EventBus.emit(Events.SLAM_POSITION_UPDATED, {
@@ -697,6 +897,51 @@ class RobotController:
             traceback.print_exc()
 
     
+    @property
+    def slam_trajectory(self) -> List[dict]:
+        """Retained SLAM trajectory as {x, y, z, heading, timestamp} dicts, oldest first"""
+        return TrajectoryStore.to_dicts(self.trajectory_store.history())
+
+    def _reset_trajectory(self) -> None:
+        """Start a new SLAM trajectory (invalidates cursors from the previous one)"""
+        self.trajectory_store.clear()
+
+    def _append_trajectory_point(self, t: float, x: float, y: float, z: float, heading: float = 0.0) -> None:
+        """Add a pose to the SLAM trajectory and notify cursor readers if it was kept"""
+        if not self.trajectory_store.append(t, x, y, z, heading):
+            return
+        EventBus.emit(Events.SLAM_TRAJECTORY_UPDATED, {
+            'epoch': self.trajectory_store.epoch,
+            'seq': self.trajectory_store.seq,
+            'point': {'x': x, 'y': y, 'z': z, 'heading': heading, 'timestamp': t}
+        })
+
+    def get_trajectory_since(self, since: Optional[int] = None, epoch: Optional[int] = None) -> dict:
+        """
+        SLAM trajectory points appended after cursor ``since``
+
+        Args:
+            since: ``seq`` returned by a previous call (None = everything retained)
+            epoch: ``epoch`` returned with that cursor
+
+        Returns:
+            {'points', 'seq', 'epoch', 'reset'} - pass ``seq``/``epoch`` back as the
+            next cursor. ``reset`` is True when the cursor could not be honoured
+            (new trajectory, or points already decimated) and ``points`` holds
+            everything retained, so the client must replace rather than append.
+        """
+        rows, reset = self.trajectory_store.since(since, epoch)
+        return {
+            'points': TrajectoryStore.to_dicts(rows),
+            'seq': self.trajectory_store.seq,
+            'epoch': self.trajectory_store.epoch,
+            'reset': reset,
+        }
+
+    def export_trajectory(self, path: Optional[str] = None) -> str:
+        """SLAM trajectory in slam_map_trajectory.txt format (written to ``path`` if given)"""
+        return self.trajectory_store.export(path)
+
     def _subscribe_to_slam_feedback(self) -> None:
         """Subscribe to SLAM feedback topics to monitor SLAM status"""
         try:
@@ -705,9 +950,8 @@ class RobotController:
             import time
             
             # Initialize trajectory storage
-            self.slam_trajectory = []  # List of {x, y, z, timestamp} pose points
+            self._reset_trajectory()
             self.slam_active = False
-            self.slam_last_pose = None  # Track last position for deduplication
             
             # rt/slam_info - Real-time broadcast info (robot data, pos info, ctrl info)
             def slam_info_callback(data: dict):
@@ -739,29 +983,12 @@ class RobotController:
                         if slam_data.get('type') in ['mapping_info', 'pos_info']:
                             pose = slam_data.get('data', {}).get('currentPose')
                             if pose and self.slam_active:
-                                # Only add point if robot moved > 5cm from last position
-                                should_add = True
-                                if self.slam_last_pose:
-                                    dx = pose['x'] - self.slam_last_pose['x']
-                                    dy = pose['y'] - self.slam_last_pose['y']
-                                    dz = pose['z'] - self.slam_last_pose['z']
-                                    distance = math.sqrt(dx*dx + dy*dy + dz*dz)
-                                    should_add = distance > 0.05  # 5cm threshold
-                                
-                                if should_add:
-                                    self.slam_trajectory.append({
-                                        'x': pose['x'],
-                                        'y': pose['y'],
-                                        'z': pose['z'],
-                                        'timestamp': slam_data.get('sec', 0)
-                                    })
-                                    self.slam_last_pose = pose
-                                    
-                                    # Limit to last 1000 points
-                                    if len(self.slam_trajectory) > 1000:
-                                        self.slam_trajectory = self.slam_trajectory[-1000:]
-                                    
-                                    logger.debug(f"📍 Trajectory point {len(self.slam_trajectory)}: ({pose['x']:.2f}, {pose['y']:.2f}, {pose['z']:.2f})")
+                                # The store skips points within 5cm of the last one
+                                self._append_trajectory_point(
+                                    slam_data.get('sec', 0), pose['x'], pose['y'], pose['z'],
+                                    yaw_from_quaternion(pose.get('orientation'))
+                                )
+                                logger.debug(f"📍 Trajectory point {self.trajectory_store.seq}: ({pose['x']:.2f}, {pose['y']:.2f}, {pose['z']:.2f})")
                         
                 except Exception as e:
                     logger.error(f"Error processing SLAM info: {e}")
@@ -792,7 +1019,16 @@ class RobotController:
                             # Navigation: 0°=+Y (North), 90°=+X (East)
                             self.current_position['heading'] = self.current_position['heading'] - 90
                             self.current_position_updates += 1
-                            
+
+                            # Emit event for UI updates (status snapshot and /ws pose channel)
+                            EventBus.emit(Events.SLAM_POSITION_UPDATED, {
+                                'x': self.current_position['x'],
+                                'y': self.current_position['y'],
+                                'z': self.current_position['z'],
+                                'heading': self.current_position['heading'],
+                                'source': 'relocation'
+                            })
+
                             logger.debug(f"📍 Position update #{self.current_position_updates}: ({self.current_position['x']:.3f}, {self.current_position['y']:.3f}, {self.current_position['heading']:.1f}°)")
                 except Exception as e:
                     logger.debug(f"Error processing relocation odometry: {e}")
@@ -811,11 +1047,11 @@ class RobotController:
                         # Track SLAM state
                         if api_id == 1801:  # START_MAPPING
                             self.slam_active = True
-                            self.slam_trajectory = []  # Reset trajectory
+                            self._reset_trajectory()
                             logger.info("🗺️  SLAM mapping STARTED - trajectory collection enabled")
                         elif api_id in [1802, 1901]:  # END_MAPPING or CLOSE_SLAM
                             self.slam_active = False
-                            logger.info(f"🗺️  SLAM mapping STOPPED - collected {len(self.slam_trajectory)} points")
+                            logger.info(f"🗺️  SLAM mapping STOPPED - collected {self.trajectory_store.seq} points")
                         
                         logger.info(f"🗺️  SLAM API RESPONSE: api_id={api_id}")
                 except Exception as e:
@@ -918,6 +1154,7 @@ class RobotController:
             await asyncio.sleep(0.5)
             
             logger.info(f"LiDAR service command sent: {response}")
+            self._lidar_service_enabled = enable
                 
         except Exception as e:
             logger.warning(f"Could not set LiDAR service: {e}")
@@ -1201,6 +1438,13 @@ class RobotController:
             return None
     
     # Properties
+    @property
+    def latest_frame(self) -> Optional[bytes]:
+        """Newest JPEG-encoded video frame (None until a viewer has been attached)"""
+        # Reading this must not create the default rendition (and its encoder)
+        encoder = self.video_renditions.peek()
+        return encoder.jpeg if encoder else None
+    
     @property
     def current_state(self):
         return self.state_machine.current_state
@@ -2,17 +2,15 @@
 Dynamically finds robot by MAC address on any network without fixed IPs
 
 Enhanced with Android app protocol insights:
-- Multicast discovery (231.1.1.2:7400)
+- Multicast announcements (231.1.1.2:7400), received by an always-on listener
 - Network mode detection (AP/STA-L/STA-T)
 - Multiple discovery methods (multicast, broadcast, ARP, nmap)
 - Fast initial discovery with fallback to thorough scans
 """
 import asyncio
 import logging
-import platform
-import subprocess
 import json
-import socket
+import time
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass, asdict
@@ -20,20 +18,25 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
-# Import enhanced discovery functions
-try:
-    import sys
-    sys.path.insert(0, str(Path(__file__).parent.parent))
-    from utils.arp_discovery import (
-        try_multicast_discovery,
-        get_network_interfaces as get_enhanced_interfaces,
-        detect_network_mode,
-        G1_AP_IP
-    )
-    ENHANCED_DISCOVERY = True
-except ImportError:
-    logger.warning("Enhanced discovery functions not available")
-    ENHANCED_DISCOVERY = False
+from ..utils.neighbor_table import (
+    find_ip,
+    find_mac,
+    get_discovery_metrics,
+    get_neighbors,
+    network_mode,
+    probe_host,
+    probe_hosts,
+    read_arp_table,
+    read_routes,
+)
+from ..utils.neighbor_watcher import NeighborEvent, NeighborWatcher
+from ..utils.multicast_listener import Announcement, MulticastListener
+from .address_cache import get_address_cache
+
+SCAN_INTERVAL = 2.0  # Seconds between discovery scans when polling
+CONFIRM_INTERVAL = 5.0  # Seconds between confirmation scans when netlink pushes changes
+OFFLINE_AFTER_MISSES = 3  # Consecutive failed checks before a robot is marked offline
+NOT_ROBOT_TTL = 300.0  # Seconds a multicast sender resolved to a non-robot is not re-probed
 
 # Path to robot bindings file
 BINDINGS_FILE = Path.home() / ".unitree_robot_bindings.json"
@@ -76,6 +79,14 @@ class RobotDiscovery:
         self._robots: Dict[str, RobotInfo] = {}
         self._running = False
         self._scan_task: Optional[asyncio.Task] = None
+        self.metrics = get_discovery_metrics()
+        self._watcher = NeighborWatcher(self._on_neighbor_event)
+        self._confirming: Dict[str, asyncio.Task] = {}
+        self.push_updates = 0  # Robots brought online straight from a netlink event
+        self._multicast = MulticastListener(self._on_announcement)
+        self.announcements: Dict[str, int] = {}  # Robot name -> multicast announcements
+        self._resolving: Dict[str, asyncio.Task] = {}  # Announcer IP -> MAC lookup in flight
+        self._not_robots: Dict[str, Tuple[Optional[str], float]] = {}  # Announcer IP -> (MAC, resolved at)
         self._load_bindings()
         
     def _load_bindings(self):
@@ -123,271 +134,154 @@ class RobotDiscovery:
         except Exception as e:
             logger.warning(f"Failed to update bindings file: {e}")
     
-    def _get_network_interfaces(self) -> List[Tuple[str, str]]:
-        """Get all network interfaces and their subnets"""
-        interfaces = []
-        try:
-            # Use timeout to avoid hanging
-            result = subprocess.run(['ip', 'route'], capture_output=True, text=True, timeout=1)
-            for line in result.stdout.split('\n'):
-                if 'dev' in line:
-                    parts = line.split()
-                    if len(parts) >= 1:
-                        network = parts[0]
-                        try:
-                            dev_idx = parts.index('dev')
-                            if dev_idx + 1 < len(parts):
-                                iface = parts[dev_idx + 1]
-                                if network and iface:
-                                    interfaces.append((network, iface))
-                                    logger.debug(f"Found network: {network} on {iface}")
-                        except (ValueError, IndexError):
-                            continue
-        except subprocess.TimeoutExpired:
-            logger.warning("ip route command timed out - skipping network interface detection")
-        except Exception as e:
-            logger.debug(f"Failed to get network interfaces: {e}")
-        
-        # Fallback: if no interfaces found, try eth0/eth1 with common subnets
-        if not interfaces:
-            logger.debug("No interfaces found via ip route, using fallback")
-            interfaces = [
-                ("192.168.0.0/16", "eth0"),
-                ("192.168.86.0/22", "eth1"),
-                ("10.0.0.0/8", "eth0"),
-            ]
-        
-        return interfaces
-    
-    def _get_arp_table(self) -> List[Tuple[str, str]]:
-        """Get ARP table - returns list of (IP, MAC) tuples"""
-        arp_entries = []
-        
-        try:
-            system = platform.system().lower()
-            
-            if system == "windows":
-                result = subprocess.run(['arp', '-a'], capture_output=True, text=True, timeout=2)
-                for line in result.stdout.split('\n'):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        ip = parts[0].strip()
-                        if '.' in ip and len(ip.split('.')) == 4:
-                            mac = parts[1].strip().replace('-', ':').lower()
-                            if ':' in mac or len(mac.replace(':', '')) == 12:
-                                arp_entries.append((ip, mac))
-                                logger.debug(f"ARP: {ip} -> {mac}")
-            else:
-                # Linux/Mac: parse arp -n output
-                result = subprocess.run(['arp', '-n'], capture_output=True, text=True, timeout=2)
-                for line in result.stdout.split('\n'):
-                    line = line.strip()
-                    if not line or line.startswith('Address'):
-                        continue
-                    
-                    parts = line.split()
-                    if len(parts) < 3:
-                        continue
-                    
-                    ip = parts[0]
-                    if not ('.' in ip and len(ip.split('.')) == 4):
-                        continue
-                    
-                    # Column 2 is either MAC or (incomplete) or interface name
-                    if len(parts) >= 3:
-                        candidate = parts[2].lower()
-                        if ':' in candidate or '-' in candidate:
-                            arp_entries.append((ip, candidate))
-                            logger.debug(f"ARP: {ip} -> {candidate}")
-                        elif candidate == "(incomplete)":
-                            logger.debug(f"Skip incomplete: {ip}")
-                            
-        except Exception as e:
-            logger.error(f"Failed to read ARP table: {e}")
-        
-        logger.info(f"ARP scan found {len(arp_entries)} entries total")
-        return arp_entries
-    
-    def _nmap_scan(self, subnet: str = "192.168.86.0/24") -> List[Tuple[str, str]]:
-        """Use nmap to find active hosts and try to get MACs via ARP"""
-        import time
-        results = []
-        try:
-            start = time.time()
-            logger.info(f"Running nmap scan on {subnet}...")
-            result = subprocess.run(
-                ['nmap', '-sn', subnet],
-                capture_output=True, text=True, timeout=20
-            )
-            
-            if result.returncode == 0:
-                import re
-                host_count = len(re.findall(r'Nmap scan report for', result.stdout))
-                logger.info(f"nmap found {host_count} hosts in {time.time() - start:.1f}s")
-                
-                for line in result.stdout.split('\n'):
-                    match = re.search(r'Nmap scan report for (\d+\.\d+\.\d+\.\d+)', line)
-                    if match:
-                        ip = match.group(1)
-                        # After nmap pings it, try to get MAC from ARP
-                        try:
-                            arp_result = subprocess.run(
-                                ['arp', '-n', ip], capture_output=True, text=True, timeout=1
-                            )
-                            mac = None
-                            for arp_line in arp_result.stdout.split('\n'):
-                                parts = arp_line.split()
-                                if len(parts) >= 3 and parts[0] == ip:
-                                    candidate = parts[2].lower()
-                                    if ':' in candidate or '-' in candidate:
-                                        mac = candidate
-                                        break
-                            
-                            if mac:
-                                results.append((ip, mac))
-                                logger.debug(f"nmap found: {ip} -> {mac}")
-                            else:
-                                # Just add the IP without MAC
-                                results.append((ip, "unknown"))
-                        except:
-                            results.append((ip, "unknown"))
-                
-                logger.info(f"nmap complete: {len(results)} hosts analyzed in {time.time() - start:.1f}s total")
-        except subprocess.TimeoutExpired:
-            logger.warning(f"nmap scan timeout on {subnet}")
-        except FileNotFoundError:
-            logger.debug("nmap not installed - skipping nmap scan")
-        except Exception as e:
-            logger.warning(f"nmap scan failed: {e}")
-        
-        return results
-    
-    async def _broadcast_arp_scan(self, network: str, interface: str):
-        """Send ARP broadcast to wake up devices on network"""
-        try:
-            import ipaddress
-            net = ipaddress.ip_network(network, strict=False)
-            broadcast_ip = str(net.broadcast_address)
-            logger.debug(f"Broadcast ping to {broadcast_ip} on {interface}")
-            
-            subprocess.run(['ping', '-c', '1', '-W', '1', broadcast_ip], 
-                         capture_output=True, timeout=2)
-        except Exception as e:
-            logger.debug(f"Broadcast scan skipped: {e}")
-    
+    def _mark_online(self, robot_name: str, robot: RobotInfo, ip: str, mode: Optional[str], via: str) -> None:
+        if not robot.is_online:
+            logger.info(f"✓ {robot_name} ONLINE via {via}: {ip} ({mode})")
+        robot.ip = ip
+        robot.network_mode = mode
+        robot.is_online = True
+        robot.last_seen = datetime.now()
+        robot.missed_scans = 0
+        if robot.mac_address:
+            get_address_cache().record(robot.mac_address, ip, mode)
+
+    def _record_miss(self, robot_name: str, robot: RobotInfo, reason: str) -> None:
+        """Count a failed check; go offline only after OFFLINE_AFTER_MISSES in a row"""
+        robot.missed_scans += 1
+        if robot.missed_scans >= OFFLINE_AFTER_MISSES and robot.is_online:
+            logger.warning(f"✗ {robot_name} OFFLINE ({reason}, {robot.missed_scans} checks)")
+            robot.is_online = False
+
+    def _on_neighbor_event(self, event: NeighborEvent) -> None:
+        """Kernel neighbor change: rebind IPs instantly, confirm anything uncertain"""
+        known = self._not_robots.get(event.ip)
+        if known and (event.deleted or event.mac != known[0]):
+            # The address moved to another host; let its next announcement be resolved
+            del self._not_robots[event.ip]
+        for robot_name, robot in self._robots.items():
+            if not robot.mac_address:
+                continue
+            if event.mac and event.mac == robot.mac_address.lower():
+                if event.failed:
+                    self._schedule_confirm(robot_name, event.ip)
+                elif event.reachable:
+                    self.push_updates += 1
+                    self._mark_online(robot_name, robot, event.ip, network_mode(event.ip), "netlink")
+                else:
+                    # Stale/delay/probe: the binding is known but liveness is not
+                    self._schedule_confirm(robot_name, event.ip)
+            elif event.failed and robot.ip == event.ip:
+                self._schedule_confirm(robot_name, event.ip)
+
+    def _robot_for_announcer(self, ip: str) -> Optional[str]:
+        entry = find_ip(ip, read_arp_table() or [])
+        for robot_name, robot in self._robots.items():
+            if entry and robot.mac_address and robot.mac_address.lower() == entry.mac:
+                return robot_name
+            if entry is None and robot.ip == ip:
+                return robot_name
+        return None
+
+    def _on_announcement(self, announcement: Announcement) -> None:
+        """Multicast announcement: credit the robot that sent it and mark it online"""
+        ip = announcement.ip
+        known = self._not_robots.get(ip)
+        if known:
+            if time.monotonic() - known[1] < NOT_ROBOT_TTL:
+                return
+            del self._not_robots[ip]
+        robot_name = self._robot_for_announcer(ip)
+        if robot_name is None:
+            # Receiving multicast does not teach the kernel the sender's MAC;
+            # a probe makes it resolve the address, then look again.
+            task = self._resolving.get(ip)
+            if task is None or task.done():
+                self._resolving[ip] = asyncio.ensure_future(self._resolve_announcer(announcement))
+            return
+        self.announcements[robot_name] = self.announcements.get(robot_name, 0) + 1
+        self._mark_online(robot_name, self._robots[robot_name], ip, network_mode(ip), "multicast")
+
+    async def _resolve_announcer(self, announcement: Announcement) -> None:
+        ip = announcement.ip
+        if await probe_host(ip) and self._robot_for_announcer(ip):
+            self._on_announcement(announcement)
+            return
+        # Some other DDS participant: skip it until its neighbor entry changes
+        entry = find_ip(ip, read_arp_table() or [])
+        self._not_robots[ip] = (entry.mac if entry else None, time.monotonic())
+
+    async def start_listener(self) -> bool:
+        """Join the robot multicast group (once, at server startup)"""
+        return await self._multicast.start()
+
+    def stop_listener(self) -> None:
+        self._multicast.stop()
+        for task in self._resolving.values():
+            task.cancel()
+        self._resolving.clear()
+        self._not_robots.clear()
+
+    def _schedule_confirm(self, robot_name: str, ip: str) -> None:
+        task = self._confirming.get(robot_name)
+        if task and not task.done():
+            return
+        self._confirming[robot_name] = asyncio.ensure_future(self._confirm(robot_name, ip))
+
+    async def _confirm(self, robot_name: str, ip: str) -> None:
+        """Probe one robot now rather than waiting for the next scan"""
+        robot = self._robots.get(robot_name)
+        if robot is None:
+            return
+        if await probe_host(ip):
+            self._mark_online(robot_name, robot, ip, network_mode(ip), "probe")
+        else:
+            self._record_miss(robot_name, robot, "not responding to probes")
+
+    async def _scan_once(self) -> None:
+        """One discovery pass: neighbor table lookup + concurrent liveness probes"""
+        scan_start = time.perf_counter()
+        routes = read_routes()
+
+        # Neighbor table lookup (multicast announcements arrive separately via
+        # the listener). ARP entries can be stale, so every hit is verified
+        # with a live probe.
+        robots_to_check = {name: robot for name, robot in self._robots.items()
+                           if robot.mac_address}
+        if robots_to_check:
+            neighbors = await get_neighbors()
+            candidates = {}
+            for robot_name, robot in robots_to_check.items():
+                entry = find_mac(robot.mac_address, neighbors)
+                if entry:
+                    candidates[robot_name] = entry.ip
+            alive = await probe_hosts(sorted(set(candidates.values())))
+
+            for robot_name, robot in robots_to_check.items():
+                ip = candidates.get(robot_name)
+                if ip and alive.get(ip):
+                    self._mark_online(robot_name, robot, ip, network_mode(ip, routes), "ARP")
+                    continue
+                if ip:
+                    logger.debug(f"⚠️  {robot_name} in ARP but not responding to probes")
+                self._record_miss(robot_name, robot, "not responding to probes" if ip else "not in ARP table")
+
+        duration_ms = (time.perf_counter() - scan_start) * 1000
+        self.metrics.record_scan(duration_ms)
+        logger.debug(f"DISCOVERY SCAN COMPLETE in {duration_ms:.1f} ms")
+
     async def _scan_loop(self):
-        """Scan networks for robots by MAC address"""
-        import time
+        """Scan for bound robots by MAC address without blocking the event loop
+
+        With the netlink watcher active, changes arrive as events and this loop
+        only confirms liveness every CONFIRM_INTERVAL; otherwise it polls.
+        """
         while self._running:
             try:
-                scan_start = time.time()
-                logger.debug("=" * 70)
-                logger.debug("DISCOVERY SCAN START")
-                logger.debug("=" * 70)
-                
-                # STEP 1: Try multicast discovery (fastest when robot broadcasts)
-                multicast_found = set()
-                if ENHANCED_DISCOVERY:
-                    logger.debug("Listening for robot multicast broadcasts...")
-                    multicast_ip = try_multicast_discovery(timeout=0.5)
-                    
-                    if multicast_ip:
-                        # Get MAC for the multicast responder
-                        try:
-                            result = subprocess.run(['arp', '-n', multicast_ip], 
-                                                   capture_output=True, text=True, timeout=1)
-                            for line in result.stdout.split('\n'):
-                                if multicast_ip in line:
-                                    parts = line.split()
-                                    if len(parts) >= 3 and parts[2] != '<incomplete>':
-                                        multicast_mac = parts[2].lower()
-                                        
-                                        # Find which robot this is
-                                        for robot_name, robot in list(self._robots.items()):
-                                            if robot.mac_address and robot.mac_address.lower() == multicast_mac:
-                                                mode = detect_network_mode(multicast_ip)
-                                                if not robot.is_online:
-                                                    logger.info(f"✓ {robot_name} ONLINE via multicast: {multicast_ip} ({mode})")
-                                                
-                                                robot.ip = multicast_ip
-                                                robot.network_mode = mode
-                                                robot.is_online = True
-                                                robot.last_seen = datetime.now()
-                                                robot.missed_scans = 0
-                                                multicast_found.add(robot_name)
-                                                break
-                                        break
-                        except Exception as e:
-                            logger.debug(f"Failed to get MAC for {multicast_ip}: {e}")
-                
-                # STEP 2: ARP fallback for robots not found via multicast
-                robots_to_check = [name for name in self._robots.keys() if name not in multicast_found]
-                
-                if robots_to_check:
-                    # Quick ARP scan for bound robots only
-                    try:
-                        result = subprocess.run(['arp', '-n'], capture_output=True, text=True, timeout=1)
-                        for robot_name in robots_to_check:
-                            robot = self._robots[robot_name]
-                            if not robot.mac_address:
-                                continue
-                            
-                            target_mac = robot.mac_address.lower()
-                            found = False
-                            
-                            # Search ARP table for this specific MAC
-                            for line in result.stdout.split('\n')[1:]:
-                                parts = line.split()
-                                if len(parts) >= 3 and parts[2].lower() == target_mac:
-                                    ip = parts[0]
-                                    
-                                    # ALWAYS verify with ping - ARP cache can be stale
-                                    try:
-                                        ping_result = subprocess.run(
-                                            ['ping', '-c', '1', '-W', '1', ip],
-                                            capture_output=True,
-                                            timeout=1.5  # Quick timeout
-                                        )
-                                        if ping_result.returncode != 0:
-                                            logger.debug(f"⚠️  {robot_name} in ARP but not responding to ping")
-                                            continue
-                                    except:
-                                        logger.debug(f"⚠️  {robot_name} ping failed")
-                                        continue
-                                    
-                                    mode = detect_network_mode(ip) if ENHANCED_DISCOVERY else None
-                                    
-                                    if not robot.is_online:
-                                        logger.info(f"✓ {robot_name} ONLINE via ARP: {ip} ({mode})")
-                                    
-                                    robot.ip = ip
-                                    robot.network_mode = mode
-                                    robot.is_online = True
-                                    robot.last_seen = datetime.now()
-                                    robot.missed_scans = 0
-                                    found = True
-                                    break
-                            
-                            if not found:
-                                robot.missed_scans += 1
-                                # Mark offline after 1 missed scan (2s with 2s intervals)
-                                if robot.missed_scans >= 1:
-                                    if robot.is_online:
-                                        logger.warning(f"✗ {robot_name} OFFLINE (not responding to ping)")
-                                    robot.is_online = False
-                    except Exception as e:
-                        logger.error(f"ARP scan failed: {e}")
-                
-                scan_duration = time.time() - scan_start
-                logger.info(f"DISCOVERY SCAN COMPLETE in {scan_duration:.2f}s total")
-                
+                await self._scan_once()
             except Exception as e:
                 logger.error(f"Error in discovery scan: {e}", exc_info=True)
             
-            await asyncio.sleep(2)  # Scan every 2 seconds (fast like Android app)
+            await asyncio.sleep(CONFIRM_INTERVAL if self._watcher.active else SCAN_INTERVAL)
     
     async def start(self):
         """Start robot discovery"""
@@ -395,6 +289,7 @@ class RobotDiscovery:
             return
         self._running = True
         logger.info("Starting active MAC-based robot discovery...")
+        self._watcher.start()
         self._scan_task = asyncio.create_task(self._scan_loop())
     
     async def stop(self, clear: bool = True):
@@ -403,6 +298,10 @@ class RobotDiscovery:
             return
         self._running = False
         logger.info("Stopping robot discovery...")
+        self._watcher.stop()
+        for task in self._confirming.values():
+            task.cancel()
+        self._confirming.clear()
         if self._scan_task:
             self._scan_task.cancel()
             try:
@@ -416,6 +315,20 @@ class RobotDiscovery:
         """Get list of discovered robots"""
         return list(self._robots.values())
 
+    def get_stats(self) -> dict:
+        """Scan timing, probe counters and subprocess spawns"""
+        return {
+            "running": self._running,
+            "robots": len(self._robots),
+            "online": sum(robot.is_online for robot in self._robots.values()),
+            "netlink": self._watcher.get_stats(),
+            "push_updates": self.push_updates,
+            "multicast": self._multicast.get_stats(),
+            "announcements": dict(self.announcements),
+            "ignored_announcers": len(self._not_robots),
+            **self.metrics.to_dict(),
+        }
+
 
 _discovery_instance = None
 
@@ -0,0 +1,388 @@
+"""
+RTPS SPDP - Pure-Python DDS participant discovery
+
+Listens on the DDS SPDP multicast group (239.255.0.1, port 7400 + 250 * domain)
+and decodes the participant announcements every DDS participant sends
+periodically (RTPS 2.x, DATA(p) from the builtin participant writer). Each
+announcement is parsed as it arrives into an SpdpParticipant: GUID, vendor,
+unicast/multicast locators, user data, entity name and lease duration.
+Announcements update the participant incrementally; repeats (same or older
+writer sequence number) only refresh ``last_seen``, and a disposed/unregistered
+status removes it.
+
+No ddsls, no CycloneDDS bindings: only the wire format is needed.
+"""
+
+import asyncio
+import socket
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+SPDP_MULTICAST_GROUP = "239.255.0.1"
+PORT_BASE = 7400  # PB
+DOMAIN_GAIN = 250  # DG
+
+RTPS_MAGIC = b"RTPS"
+RTPS_HEADER_SIZE = 20
+
+# Submessage ids
+SUBMSG_INFO_TS = 0x09
+SUBMSG_DATA = 0x15
+
+# Submessage flags
+FLAG_ENDIANNESS = 0x01
+FLAG_INLINE_QOS = 0x02
+FLAG_DATA = 0x04
+
+ENTITYID_SPDP_WRITER = 0x000100C2
+
+# Serialized payload encapsulations
+PL_CDR_BE = 0x0002
+PL_CDR_LE = 0x0003
+
+# Parameter ids
+PID_SENTINEL = 0x0001
+PID_PARTICIPANT_LEASE_DURATION = 0x0002
+PID_USER_DATA = 0x002C
+PID_DEFAULT_UNICAST_LOCATOR = 0x0031
+PID_METATRAFFIC_UNICAST_LOCATOR = 0x0032
+PID_METATRAFFIC_MULTICAST_LOCATOR = 0x0033
+PID_PROTOCOL_VERSION = 0x0015
+PID_VENDORID = 0x0016
+PID_DEFAULT_MULTICAST_LOCATOR = 0x0048
+PID_PARTICIPANT_GUID = 0x0050
+PID_ENTITY_NAME = 0x0062
+PID_KEY_HASH = 0x0070
+PID_STATUS_INFO = 0x0071
+
+LOCATOR_KIND_UDPv4 = 1
+STATUS_DISPOSED_OR_UNREGISTERED = 0x03
+
+DEFAULT_LEASE_DURATION = 100.0  # Seconds, RTPS default for participants
+
+LOCATOR_FIELDS = {
+    PID_DEFAULT_UNICAST_LOCATOR: "default_unicast",
+    PID_DEFAULT_MULTICAST_LOCATOR: "default_multicast",
+    PID_METATRAFFIC_UNICAST_LOCATOR: "metatraffic_unicast",
+    PID_METATRAFFIC_MULTICAST_LOCATOR: "metatraffic_multicast",
+}
+
+
+def spdp_port(domain_id: int = 0) -> int:
+    """SPDP multicast port of a DDS domain"""
+    return PORT_BASE + DOMAIN_GAIN * domain_id
+
+
+@dataclass
+class SpdpParticipant:
+    """What the SPDP announcements of one participant have told us"""
+    guid: str  # 32 hex digits (prefix + entity id)
+    vendor_id: str = ""
+    protocol_version: str = ""
+    source_ip: Optional[str] = None  # Sender of the last announcement
+    locators: Dict[str, List[Tuple[str, int]]] = field(default_factory=dict)
+    user_data: bytes = b""
+    entity_name: Optional[str] = None
+    lease_duration: float = DEFAULT_LEASE_DURATION
+    sequence: int = 0  # Highest writer sequence number applied
+    announcements: int = 0
+    last_seen: float = 0.0  # time.monotonic()
+
+    @property
+    def guid_prefix(self) -> str:
+        return self.guid[:24]
+
+    @property
+    def ip(self) -> Optional[str]:
+        """Best unicast address: default, then metatraffic, then the sender"""
+        for kind in ("default_unicast", "metatraffic_unicast"):
+            for address, _ in self.locators.get(kind, []):
+                if address != "0.0.0.0":
+                    return address
+        return self.source_ip
+
+    @property
+    def user_data_text(self) -> Optional[str]:
+        """User data as text, if it is printable UTF-8"""
+        try:
+            text = self.user_data.rstrip(b"\0").decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+        return text if text and text.isprintable() else None
+
+    def expired(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return now - self.last_seen > self.lease_duration
+
+
+@dataclass
+class SpdpData:
+    """One decoded DATA(p) submessage"""
+    guid_prefix: bytes
+    vendor_id: bytes
+    protocol_version: Tuple[int, int]
+    sequence: int
+    parameters: Dict[int, List[bytes]]  # Payload parameters (PID -> values)
+    little_endian: bool
+    status_info: int = 0
+
+
+def _iter_parameters(data: bytes, offset: int, end: int, little: bool) -> Iterator[Tuple[int, bytes]]:
+    fmt = "<HH" if little else ">HH"
+    while offset + 4 <= end:
+        pid, length = struct.unpack_from(fmt, data, offset)
+        offset += 4
+        if pid == PID_SENTINEL:
+            return
+        if offset + length > end:
+            return  # Truncated
+        yield pid & ~0x4000, data[offset:offset + length]  # Clear the must-understand bit
+        offset += length
+
+
+def parse_rtps_spdp(data: bytes) -> List[SpdpData]:
+    """
+    Decode the SPDP DATA submessages of an RTPS datagram
+
+    Returns:
+        One SpdpData per participant announcement (empty for non-SPDP traffic)
+    """
+    if len(data) < RTPS_HEADER_SIZE or data[:4] != RTPS_MAGIC:
+        return []
+    protocol_version = (data[4], data[5])
+    vendor_id = data[6:8]
+    guid_prefix = data[8:20]
+
+    results = []
+    offset = RTPS_HEADER_SIZE
+    while offset + 4 <= len(data):
+        submsg_id, flags = data[offset], data[offset + 1]
+        little = bool(flags & FLAG_ENDIANNESS)
+        length = struct.unpack_from("<H" if little else ">H", data, offset + 2)[0]
+        body = offset + 4
+        # A zero length on the last submessage means "to the end of the message"
+        end = len(data) if length == 0 else body + length
+        offset = end
+        if end > len(data):
+            break
+        if submsg_id != SUBMSG_DATA or body + 20 > end:
+            continue
+
+        octets_to_qos = struct.unpack_from("<H" if little else ">H", data, body + 2)[0]
+        writer_id = struct.unpack_from(">I", data, body + 8)[0]  # Entity ids are big-endian
+        if writer_id != ENTITYID_SPDP_WRITER:
+            continue
+        sn_high, sn_low = struct.unpack_from("<iI" if little else ">iI", data, body + 12)
+        position = body + 4 + octets_to_qos
+
+        status_info = 0
+        if flags & FLAG_INLINE_QOS:
+            qos_end = position
+            fmt = "<HH" if little else ">HH"
+            while qos_end + 4 <= end:
+                pid, plen = struct.unpack_from(fmt, data, qos_end)
+                if pid == PID_STATUS_INFO and plen >= 4:
+                    status_info = struct.unpack_from(">I", data, qos_end + 4)[0]
+                qos_end += 4 + plen
+                if pid == PID_SENTINEL:
+                    break
+            position = qos_end
+
+        parameters: Dict[int, List[bytes]] = {}
+        payload_little = little
+        if flags & FLAG_DATA and position + 4 <= end:
+            encapsulation = struct.unpack_from(">H", data, position)[0]
+            if encapsulation not in (PL_CDR_LE, PL_CDR_BE):
+                continue
+            payload_little = encapsulation == PL_CDR_LE
+            for pid, value in _iter_parameters(data, position + 4, end, payload_little):
+                parameters.setdefault(pid, []).append(value)
+
+        results.append(SpdpData(
+            guid_prefix=guid_prefix, vendor_id=vendor_id, protocol_version=protocol_version,
+            sequence=(sn_high << 32) | sn_low, parameters=parameters,
+            little_endian=payload_little, status_info=status_info,
+        ))
+    return results
+
+
+def _parse_locator(value: bytes, little: bool) -> Optional[Tuple[str, int]]:
+    if len(value) < 24:
+        return None
+    kind, port = struct.unpack_from("<iI" if little else ">iI", value, 0)
+    if kind != LOCATOR_KIND_UDPv4:
+        return None
+    return socket.inet_ntoa(value[20:24]), port
+
+
+def _parse_string(value: bytes, little: bool) -> Optional[str]:
+    if len(value) < 4:
+        return None
+    length = struct.unpack_from("<I" if little else ">I", value, 0)[0]
+    raw = value[4:4 + length].rstrip(b"\0")
+    return raw.decode("utf-8", errors="replace")
+
+
+class SpdpTable:
+    """Participants keyed by GUID, updated one announcement at a time"""
+
+    def __init__(self):
+        self.participants: Dict[str, SpdpParticipant] = {}
+        self.datagrams = 0
+        self.announcements = 0
+        self.malformed = 0
+
+    def feed(self, data: bytes, source_ip: Optional[str] = None,
+             now: Optional[float] = None) -> List[Tuple[SpdpParticipant, bool]]:
+        """
+        Apply one datagram
+
+        Returns:
+            [(participant, removed)] for every participant it touched
+        """
+        now = time.monotonic() if now is None else now
+        self.datagrams += 1
+        try:
+            decoded = parse_rtps_spdp(data)
+        except struct.error:
+            self.malformed += 1
+            return []
+
+        touched = []
+        for item in decoded:
+            self.announcements += 1
+            guid_values = item.parameters.get(PID_PARTICIPANT_GUID)
+            guid_bytes = guid_values[0] if guid_values and len(guid_values[0]) == 16 \
+                else item.guid_prefix + b"\x00\x00\x01\xc1"
+            guid = guid_bytes.hex()
+
+            if item.status_info & STATUS_DISPOSED_OR_UNREGISTERED:
+                participant = self.participants.pop(guid, None)
+                if participant:
+                    touched.append((participant, True))
+                continue
+
+            participant = self.participants.get(guid)
+            if participant is None:
+                participant = self.participants[guid] = SpdpParticipant(guid=guid)
+            participant.announcements += 1
+            participant.last_seen = now
+            participant.source_ip = source_ip or participant.source_ip
+            if item.sequence and item.sequence <= participant.sequence:
+                touched.append((participant, False))  # Periodic repeat: only liveness
+                continue
+            participant.sequence = item.sequence
+            self._apply(participant, item)
+            touched.append((participant, False))
+        return touched
+
+    @staticmethod
+    def _apply(participant: SpdpParticipant, item: SpdpData) -> None:
+        little = item.little_endian
+        participant.vendor_id = item.vendor_id.hex()
+        participant.protocol_version = f"{item.protocol_version[0]}.{item.protocol_version[1]}"
+        for pid, name in LOCATOR_FIELDS.items():
+            if pid in item.parameters:
+                locators = [_parse_locator(value, little) for value in item.parameters[pid]]
+                participant.locators[name] = [loc for loc in locators if loc]
+        if PID_USER_DATA in item.parameters:
+            value = item.parameters[PID_USER_DATA][0]
+            if len(value) >= 4:
+                length = struct.unpack_from("<I" if little else ">I", value, 0)[0]
+                participant.user_data = value[4:4 + length]
+        if PID_ENTITY_NAME in item.parameters:
+            participant.entity_name = _parse_string(item.parameters[PID_ENTITY_NAME][0], little)
+        if PID_PARTICIPANT_LEASE_DURATION in item.parameters:
+            value = item.parameters[PID_PARTICIPANT_LEASE_DURATION][0]
+            if len(value) >= 8:
+                seconds, fraction = struct.unpack_from("<iI" if little else ">iI", value, 0)
+                participant.lease_duration = seconds + fraction / 2 ** 32
+
+    def expire(self, now: Optional[float] = None) -> List[SpdpParticipant]:
+        """Drop participants whose lease ran out"""
+        now = time.monotonic() if now is None else now
+        expired = [p for p in self.participants.values() if p.expired(now)]
+        for participant in expired:
+            del self.participants[participant.guid]
+        return expired
+
+
+class _SpdpProtocol(asyncio.DatagramProtocol):
+    def __init__(self, listener: "SpdpListener"):
+        self.listener = listener
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self.listener._on_datagram(data, addr)
+
+
+class SpdpListener:
+    """Joins the SPDP group and reports participant changes to a callback"""
+
+    def __init__(self, callback: Callable[[SpdpParticipant, bool], None],
+                 domain_id: int = 0, group: str = SPDP_MULTICAST_GROUP,
+                 interface: str = "0.0.0.0"):
+        self.callback = callback
+        self.group = group
+        self.port = spdp_port(domain_id)
+        self.interface = interface
+        self.table = SpdpTable()
+        self._transport: Optional[asyncio.DatagramTransport] = None
+
+    @property
+    def active(self) -> bool:
+        return self._transport is not None
+
+    async def start(self) -> bool:
+        if self._transport is not None:
+            return True
+        sock = None
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if hasattr(socket, "SO_REUSEPORT"):
+                # CycloneDDS in this process (RobotController) binds the same port
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            sock.bind(("", self.port))
+            mreq = struct.pack("4s4s", socket.inet_aton(self.group), socket.inet_aton(self.interface))
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+            sock.setblocking(False)
+        except OSError as e:
+            if sock is not None:
+                sock.close()
+            logger.warning(f"SPDP listener unavailable on {self.group}:{self.port}: {e}")
+            return False
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(lambda: _SpdpProtocol(self), sock=sock)
+        logger.info(f"📡 Listening for DDS participants on {self.group}:{self.port}")
+        return True
+
+    def stop(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    def _on_datagram(self, data: bytes, addr) -> None:
+        for participant, removed in self.table.feed(data, addr[0]):
+            try:
+                self.callback(participant, removed)
+            except Exception as e:
+                logger.error(f"SPDP participant handler failed: {e}")
+
+    def expire(self) -> None:
+        for participant in self.table.expire():
+            self.callback(participant, True)
+
+    def get_stats(self) -> dict:
+        return {
+            "active": self.active,
+            "group": f"{self.group}:{self.port}",
+            "participants": len(self.table.participants),
+            "datagrams": self.table.datagrams,
+            "announcements": self.table.announcements,
+            "malformed": self.table.malformed,
+        }
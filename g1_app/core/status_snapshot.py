@@ -0,0 +1,104 @@
+"""
+Status Snapshot - Versioned robot status for cheap polling endpoints
+
+EventBus handlers write plain dict sections (connection, state, battery,
+speeds, position) as data arrives; each write that changes a section bumps
+its version. Status endpoints render a view over a few sections: the JSON body
+and its ETag are cached until one of those sections changes, so a poll costs a
+dict lookup and an unchanged poll with If-None-Match can be answered with 304.
+"""
+
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StatusSnapshot:
+    """Latest status sections with per-section versions and cached renderings"""
+
+    def __init__(self):
+        self.version = 0  # Bumped by every change to any section
+        self._sections: Dict[str, Tuple[int, Any]] = {}
+        self._rendered: Dict[str, Tuple[Tuple[int, ...], str, bytes]] = {}
+        # Distinguishes ETags of this process from those of a previous server run
+        self._epoch = f"{os.getpid():x}{int(time.time()):x}"
+        self.renders = 0
+        self.cache_hits = 0
+
+    def update(self, section: str, data: Any) -> bool:
+        """
+        Replace a section (data should not be mutated afterwards)
+
+        Returns:
+            True if the section changed
+        """
+        current = self._sections.get(section)
+        if current is not None and current[1] == data:
+            return False
+        self.version += 1
+        self._sections[section] = (self.version, data)
+        return True
+
+    def get(self, section: str, default: Any = None) -> Any:
+        entry = self._sections.get(section)
+        return entry[1] if entry is not None else default
+
+    def render(self, view: str, sections: Sequence[str],
+               build: Callable[..., dict]) -> Tuple[str, bytes]:
+        """
+        JSON body and ETag of a view, rebuilt only when its sections changed
+
+        Args:
+            view: Cache key (one per endpoint)
+            sections: Sections the view depends on
+            build: Called with each section's data (None if unset) in order
+
+        Returns:
+            (etag, body)
+        """
+        versions = tuple(self._sections.get(section, (0, None))[0] for section in sections)
+        cached = self._rendered.get(view)
+        if cached is not None and cached[0] == versions:
+            self.cache_hits += 1
+            return cached[1], cached[2]
+
+        body = json.dumps(build(*(self.get(section) for section in sections))).encode()
+        etag = f'"{self._epoch}-{view}-{"-".join(str(v) for v in versions)}"'
+        self._rendered[view] = (versions, etag, body)
+        self.renders += 1
+        return etag, body
+
+    @staticmethod
+    def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        """True if an If-None-Match header value covers ``etag``"""
+        if not if_none_match:
+            return False
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate.startswith("W/"):
+                candidate = candidate[2:]
+            if candidate == "*" or candidate == etag:
+                return True
+        return False
+
+    def get_stats(self) -> dict:
+        return {
+            "version": self.version,
+            "sections": {name: entry[0] for name, entry in self._sections.items()},
+            "renders": self.renders,
+            "cache_hits": self.cache_hits,
+        }
+
+
+_snapshot_instance = None
+
+def get_status_snapshot() -> StatusSnapshot:
+    """Get singleton status snapshot"""
+    global _snapshot_instance
+    if _snapshot_instance is None:
+        _snapshot_instance = StatusSnapshot()
+    return _snapshot_instance
@@ -2,17 +2,86 @@
 """
 STUN/WebRTC port discovery for Unitree teaching protocol
 Based on PCAP analysis showing STUN negotiation before teaching protocol
+
+All probes share one asyncio UDP endpoint and go out at once: a STUN Binding
+Request to the ICE port plus, for every known teaching port, a Binding
+Request and a teaching-protocol init packet. STUN responses are matched to
+their request by transaction id, teaching replies by source port, and the
+first verified port wins. Unanswered requests are retransmitted with a
+doubling RTO (RFC 5389) until the overall timeout, so a miss costs one
+timeout in total rather than one per port.
+
+Discovered ports are cached per robot serial number for PORT_CACHE_TTL.
+UDPProtocolClient(port=None, serial_number=...) discovers through this
+module and invalidates its cached port when the port stops answering.
 """
 
+import asyncio
 import socket
 import struct
 import secrets
 import time
 import logging
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from ..utils.arp_discovery import run_blocking
 
 logger = logging.getLogger(__name__)
 
+STUN_PORT = 51639  # Robot WebRTC/ICE port where its STUN server listens
+KNOWN_TEACHING_PORTS = [57006, 49504, 43893]  # 57006 from PCAP; others legacy/alternative
+PORT_CACHE_TTL = 600.0  # Seconds a discovered teaching port is trusted
+INITIAL_RTO = 0.5  # Seconds before the first retransmission
+
+# Teaching protocol init sequence start (command 0x09, see udp_protocol), padded to 57 bytes
+TEACHING_PROBE = b'\x17\xfe\xfd\x00\x01\x00\x00\x00\x00\x1d\x09\x00\x2c'.ljust(57, b'\x00')
+TEACHING_REPLY_PREFIX = b'\x17\xfe\xfd\x00'
+
+
+class TeachingPortCache:
+    """Robot serial -> discovered teaching port, expiring after a TTL"""
+
+    def __init__(self, ttl: float = PORT_CACHE_TTL):
+        self.ttl = ttl
+        self._ports: Dict[str, Tuple[int, float]] = {}  # serial -> (port, expires at)
+
+    def get(self, serial_number: str) -> Optional[int]:
+        entry = self._ports.get(serial_number)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry[1]:
+            del self._ports[serial_number]
+            return None
+        return entry[0]
+
+    def put(self, serial_number: str, port: int) -> None:
+        self._ports[serial_number] = (port, time.monotonic() + self.ttl)
+
+    def invalidate(self, serial_number: str) -> None:
+        """Forget a port that stopped working"""
+        self._ports.pop(serial_number, None)
+
+
+_port_cache_instance = None
+
+def get_teaching_port_cache() -> TeachingPortCache:
+    """Get singleton teaching port cache"""
+    global _port_cache_instance
+    if _port_cache_instance is None:
+        _port_cache_instance = TeachingPortCache()
+    return _port_cache_instance
+
+
+class _ProbeProtocol(asyncio.DatagramProtocol):
+    def __init__(self, client: "STUNClient"):
+        self.client = client
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self.client._on_datagram(data, addr)
+
+    def error_received(self, exc: Exception) -> None:
+        logger.debug(f"STUN probe socket error: {exc}")
+
 
 class STUNClient:
     """
@@ -44,11 +113,15 @@ class STUNClient:
     ATTR_FINGERPRINT = 0x8028
     ATTR_SOFTWARE = 0x8022
     
-    def __init__(self, robot_ip: str, timeout: float = 5.0):
+    def __init__(self, robot_ip: str, timeout: float = 5.0, serial_number: Optional[str] = None):
         self.robot_ip = robot_ip
         self.timeout = timeout
+        self.serial_number = serial_number
+        self._result: Optional[asyncio.Future] = None
+        self._transactions: Dict[bytes, int] = {}  # Transaction id -> port it was sent to
+        self._known_ports = set()
         
-    def create_binding_request(self, transaction_id: Optional[bytes] = None) -> bytes:
+    def create_binding_request(self, transaction_id: Optional[bytes] = None) -> Tuple[bytes, bytes]:
         """Create STUN Binding Request packet"""
         if transaction_id is None:
             transaction_id = secrets.token_bytes(12)
@@ -65,7 +138,7 @@ class STUNClient:
         
         return header, transaction_id
     
-    def create_binding_request_with_attrs(self, transaction_id: Optional[bytes] = None) -> bytes:
+    def create_binding_request_with_attrs(self, transaction_id: Optional[bytes] = None) -> Tuple[bytes, bytes]:
         """
         Create STUN Binding Request with attributes matching Android app
         From PCAP: includes USERNAME, FINGERPRINT, SOFTWARE attributes
@@ -174,158 +247,131 @@ class STUNClient:
         return None
     
     def discover_teaching_port(self, known_ports: list = None) -> Optional[int]:
+        """
+        Discover teaching protocol port (blocking wrapper around
+        discover_teaching_port_async for scripts without an event loop)
+        """
+        return run_blocking(self.discover_teaching_port_async(known_ports))
+
+    async def discover_teaching_port_async(self, known_ports: list = None) -> Optional[int]:
         """
         Discover teaching protocol port via STUN negotiation
         
-        Strategy:
-        1. Send STUN Binding Request to robot:51639 (WebRTC/ICE port)
-        2. Parse XOR-MAPPED-ADDRESS from response to get teaching service port
-        3. Fallback to hardcoded port 57006 if STUN fails (observed from PCAP)
+        Strategy (all probes concurrent, first verified answer wins):
+        1. STUN Binding Request to robot:51639 (WebRTC/ICE port); the
+           XOR-MAPPED-ADDRESS port of its response is the teaching port
+        2. Binding Request and teaching init packet to each known port
+           (hardcoded from PCAP analysis); any matching answer verifies it
         
         Args:
-            known_ports: List of ports to try if STUN fails (default: [57006, 49504, 43893])
+            known_ports: Ports to probe directly (default: KNOWN_TEACHING_PORTS)
         
         Returns:
             Teaching service port number if discovered, None otherwise
         """
-        if known_ports is None:
-            # Port 57006 is the teaching service port discovered via STUN in PCAP analysis
-            # Other ports are legacy/alternative ports from previous observations
-            known_ports = [57006, 49504, 43893]
-        
+        known_ports = list(KNOWN_TEACHING_PORTS if known_ports is None else known_ports)
+        cache = get_teaching_port_cache()
+        if self.serial_number:
+            cached = cache.get(self.serial_number)
+            if cached:
+                logger.info(f"✅ Teaching port for {self.serial_number} from cache: {cached}")
+                return cached
+
         logger.info(f"🔍 Discovering teaching protocol port for {self.robot_ip}")
-        
-        # Try STUN discovery first (proper method)
-        port = self._stun_discovery()
-        if port:
-            logger.info(f"✅ STUN discovery found teaching port: {port}")
-            return port
-        
-        # Fallback: try known ports (hardcoded from PCAP analysis)
-        logger.warning("⚠️ STUN discovery failed, trying known ports...")
-        port = self._scan_known_ports(known_ports)
-        if port:
-            logger.info(f"✅ Port scan found teaching port: {port}")
-            return port
-        
-        logger.error("❌ Failed to discover teaching protocol port")
-        return None
-    
-    def _stun_discovery(self) -> Optional[int]:
-        """
-        Attempt STUN discovery via WebRTC ICE port (51639)
-        
-        Discovery sequence (from PCAP analysis):
-        1. Send STUN Binding Request to robot:51639 (WebRTC/ICE port)
-        2. Robot responds with XOR-MAPPED-ADDRESS containing teaching service port
-        3. Extract port from response (e.g., 57006)
-        
-        Returns teaching service port number if successful
-        """
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.settimeout(self.timeout)
-        
-        try:
-            # CRITICAL: STUN request goes to WebRTC ICE port (51639)
-            # This is where the robot's STUN server listens
-            stun_port = 51639
-            
-            logger.info(f"🔍 Sending STUN request to {self.robot_ip}:{stun_port}")
-            
-            # Send binding request with attributes (like Android app)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self._result = loop.create_future()
+        self._transactions = {}
+        self._known_ports = set(known_ports)
+
+        probes: List[Tuple[bytes, int]] = []
+        for port in [STUN_PORT] + known_ports:
             packet, transaction_id = self.create_binding_request_with_attrs()
-            sock.sendto(packet, (self.robot_ip, stun_port))
-            
-            # Wait for response (may take a moment)
-            try:
-                data, addr = sock.recvfrom(2048)
-                logger.info(f"📥 Received STUN response from {addr} ({len(data)} bytes)")
-                
-                # Parse response to extract teaching service port
+            self._transactions[transaction_id] = port
+            probes.append((packet, port))
+        probes += [(TEACHING_PROBE, port) for port in known_ports]
+
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _ProbeProtocol(self), local_addr=('0.0.0.0', 0), family=socket.AF_INET)
+        try:
+            rto = INITIAL_RTO
+            deadline = started + self.timeout
+            while not self._result.done():
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                for packet, port in probes:
+                    transport.sendto(packet, (self.robot_ip, port))
+                try:
+                    await asyncio.wait_for(asyncio.shield(self._result), min(rto, remaining))
+                except asyncio.TimeoutError:
+                    rto *= 2
+        finally:
+            transport.close()
+
+        elapsed_ms = (loop.time() - started) * 1000
+        if not self._result.done():
+            logger.error(f"❌ Failed to discover teaching protocol port ({elapsed_ms:.0f} ms)")
+            return None
+        port, method = self._result.result()
+        logger.info(f"✅ Teaching port {port} via {method} in {elapsed_ms:.0f} ms")
+        if self.serial_number:
+            cache.put(self.serial_number, port)
+        return port
+
+    def _on_datagram(self, data: bytes, addr) -> None:
+        """Match a reply to the probe that caused it"""
+        if self._result is None or self._result.done() or addr[0] != self.robot_ip:
+            return
+        if len(data) >= 20 and struct.unpack('!I', data[4:8])[0] == self.MAGIC_COOKIE:
+            port = self._transactions.get(data[8:20])
+            if port is None:
+                logger.debug(f"Ignoring STUN message with unknown transaction id from {addr}")
+                return
+            if port == STUN_PORT:
                 result = self.parse_stun_response(data)
                 if result:
-                    ip, teaching_port = result
-                    logger.info(f"✅ STUN discovery: teaching service at {ip}:{teaching_port}")
-                    
-                    # The port from STUN response IS the teaching service port
-                    # No need to verify - STUN told us where it is
-                    return teaching_port
+                    self._result.set_result((result[1], "STUN"))
                 else:
                     logger.warning("⚠️ STUN response received but could not parse XOR-MAPPED-ADDRESS")
-            
-            except socket.timeout:
-                logger.warning(f"⏱️ STUN timeout waiting for response from {self.robot_ip}:{stun_port}")
-        
-        except Exception as e:
-            logger.error(f"❌ STUN discovery error: {e}")
-        
-        finally:
-            sock.close()
-        
-        return None
+            elif struct.unpack('!H', data[0:2])[0] == self.BINDING_RESPONSE:
+                self._result.set_result((port, "binding response"))
+        elif len(data) > 20 and data[:4] == TEACHING_REPLY_PREFIX and addr[1] in self._known_ports:
+            logger.info(f"Port {addr[1]} responds to teaching protocol!")
+            self._result.set_result((addr[1], "teaching reply"))
+
+
+async def discover_teaching_port_async(robot_ip: str, timeout: float = 5.0,
+                                       serial_number: Optional[str] = None) -> Optional[int]:
+    """
+    Discover teaching protocol port without blocking the event loop
     
-    def _scan_known_ports(self, ports: list) -> Optional[int]:
-        """
-        Scan known ports to find teaching protocol
-        Returns port number if found
-        """
-        for port in ports:
-            try:
-                logger.debug(f"Testing port {port}...")
-                if self._verify_teaching_port(port):
-                    return port
-            except Exception as e:
-                logger.debug(f"Port {port} failed: {e}")
-                continue
-        
-        return None
+    Args:
+        robot_ip: Robot IP address
+        timeout: Discovery timeout in seconds (for all probes together)
+        serial_number: Robot serial; enables the per-robot port cache
     
-    def _verify_teaching_port(self, port: int) -> bool:
-        """
-        Verify if a port responds to teaching protocol
-        Send init sequence and check for valid response
-        """
-        try:
-            # Quick connection test with short timeout
-            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            sock.settimeout(1.0)
-            
-            # Send a simple teaching protocol packet to test
-            # Use command 0x09 (init sequence start) from udp_protocol
-            test_packet = b'\x17\xfe\xfd\x00\x01\x00\x00\x00\x00\x1d\x09\x00\x2c'
-            test_packet += b'\x00' * (57 - len(test_packet))  # Pad to 57 bytes
-            
-            sock.sendto(test_packet, (self.robot_ip, port))
-            
-            # If we get ANY response, this port is likely correct
-            data, addr = sock.recvfrom(2048)
-            sock.close()
-            
-            if len(data) > 20 and data[0:4] == b'\x17\xfe\xfd\x00':
-                logger.info(f"Port {port} responds to teaching protocol!")
-                return True
-            
-        except socket.timeout:
-            pass
-        except Exception as e:
-            logger.debug(f"Port verification error: {e}")
-        
-        return False
+    Returns:
+        Port number if discovered, None otherwise
+    """
+    client = STUNClient(robot_ip, timeout, serial_number)
+    return await client.discover_teaching_port_async()
 
 
-def discover_teaching_port(robot_ip: str, timeout: float = 5.0) -> Optional[int]:
+def discover_teaching_port(robot_ip: str, timeout: float = 5.0,
+                           serial_number: Optional[str] = None) -> Optional[int]:
     """
     Convenience function to discover teaching protocol port
     
     Args:
         robot_ip: Robot IP address
         timeout: Discovery timeout in seconds
+        serial_number: Robot serial; enables the per-robot port cache
     
     Returns:
         Port number if discovered, None otherwise
     """
-    client = STUNClient(robot_ip, timeout)
-    return client.discover_teaching_port()
+    return run_blocking(discover_teaching_port_async(robot_ip, timeout, serial_number))
 
 
 if __name__ == '__main__':
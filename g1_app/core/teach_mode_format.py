@@ -0,0 +1,220 @@
+"""
+Teach Mode Binary Format - Columnar storage for arm joint recordings
+
+A recording is stored as one ``.g1rec`` file:
+
+    magic       8 bytes   b"G1REC" + format version (3 bytes)
+    header_len  uint32    little-endian length of the JSON header
+    header      JSON      duration, sample_count, sample_rate, joint_order, offsets
+    padding               zero bytes up to a 64-byte boundary
+    timestamps  float64   [sample_count]            seconds since recording start
+    positions   float32   [sample_count, n_joints]  radians, row-major
+
+The header can be read without touching sample data, and the sample block is
+memory-mapped on load so a 1000-sample recording costs one small read until
+the arrays are actually used.
+"""
+
+import json
+import os
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"G1REC\x00\x01\x00"
+FORMAT_VERSION = 1
+RECORDING_SUFFIX = ".g1rec"
+
+TIMESTAMP_DTYPE = np.dtype("<f8")
+POSITION_DTYPE = np.dtype("<f4")
+
+_ALIGNMENT = 64
+_PREAMBLE = struct.Struct("<8sI")
+
+
+@dataclass
+class RecordingHeader:
+    """Metadata block of a .g1rec file (readable without loading samples)"""
+    duration: float  # Seconds from first to last sample
+    sample_count: int
+    sample_rate: float  # Samples per second as captured (average unless given on write)
+    created_at: float  # Unix timestamp
+    joint_order: List[str]
+    timestamps_offset: int = 0
+    positions_offset: int = 0
+    format_version: int = FORMAT_VERSION
+    extra: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "format_version": self.format_version,
+            "duration": self.duration,
+            "sample_count": self.sample_count,
+            "sample_rate": self.sample_rate,
+            "created_at": self.created_at,
+            "joint_order": list(self.joint_order),
+            "timestamps_offset": self.timestamps_offset,
+            "positions_offset": self.positions_offset,
+            "timestamps_dtype": TIMESTAMP_DTYPE.str,
+            "positions_dtype": POSITION_DTYPE.str,
+            "extra": self.extra,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'RecordingHeader':
+        return cls(
+            duration=float(data["duration"]),
+            sample_count=int(data["sample_count"]),
+            sample_rate=float(data["sample_rate"]),
+            created_at=float(data["created_at"]),
+            joint_order=list(data["joint_order"]),
+            timestamps_offset=int(data["timestamps_offset"]),
+            positions_offset=int(data["positions_offset"]),
+            format_version=int(data.get("format_version", FORMAT_VERSION)),
+            extra=data.get("extra", {}),
+        )
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def write_recording(path: Path, timestamps: np.ndarray, positions: np.ndarray,
+                    joint_order: List[str], created_at: float,
+                    extra: Optional[dict] = None,
+                    sample_rate: Optional[float] = None) -> RecordingHeader:
+    """
+    Write a recording atomically (temp file + rename)
+
+    Args:
+        path: Destination .g1rec path
+        timestamps: Sample times in seconds, shape (N,)
+        positions: Joint positions in radians, shape (N, len(joint_order))
+        joint_order: Column names of ``positions``
+        created_at: Unix timestamp of recording start
+        extra: Optional JSON-serializable metadata stored in the header
+        sample_rate: Capture rate to record; defaults to the average rate of
+            the stored samples (too low for keyframe-simplified recordings)
+
+    Returns:
+        The header that was written
+    """
+    path = Path(path)
+    timestamps = np.ascontiguousarray(timestamps, dtype=TIMESTAMP_DTYPE)
+    positions = np.ascontiguousarray(positions, dtype=POSITION_DTYPE)
+
+    if positions.ndim != 2 or positions.shape[0] != timestamps.shape[0]:
+        raise ValueError(f"positions shape {positions.shape} does not match {timestamps.shape[0]} timestamps")
+    if positions.shape[1] != len(joint_order):
+        raise ValueError(f"positions has {positions.shape[1]} columns but joint_order has {len(joint_order)}")
+
+    sample_count = int(timestamps.shape[0])
+    duration = float(timestamps[-1] - timestamps[0]) if sample_count > 1 else 0.0
+
+    header = RecordingHeader(
+        duration=duration,
+        sample_count=sample_count,
+        sample_rate=(float(sample_rate) if sample_rate is not None
+                     else sample_count / duration if duration > 0 else 0.0),
+        created_at=float(created_at),
+        joint_order=list(joint_order),
+        extra=extra or {},
+    )
+
+    # Offsets depend on the header length, which depends on the offsets'
+    # digit count - iterate until the layout is stable (at most twice).
+    while True:
+        header_bytes = json.dumps(header.to_dict()).encode("utf-8")
+        timestamps_offset = _align(_PREAMBLE.size + len(header_bytes))
+        positions_offset = _align(timestamps_offset + timestamps.nbytes)
+        if (timestamps_offset, positions_offset) == (header.timestamps_offset, header.positions_offset):
+            break
+        header.timestamps_offset = timestamps_offset
+        header.positions_offset = positions_offset
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\x00" * (timestamps_offset - f.tell()))
+        f.write(timestamps.tobytes())
+        f.write(b"\x00" * (positions_offset - f.tell()))
+        f.write(positions.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    return header
+
+
+def read_header(path: Path) -> RecordingHeader:
+    """Read only the metadata header of a .g1rec file"""
+    with open(path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) != _PREAMBLE.size:
+            raise ValueError(f"{path}: truncated header")
+        magic, header_len = _PREAMBLE.unpack(preamble)
+        if magic[:5] != MAGIC[:5]:
+            raise ValueError(f"{path}: not a teach-mode recording")
+        header = RecordingHeader.from_dict(json.loads(f.read(header_len).decode("utf-8")))
+
+    if header.format_version > FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported format version {header.format_version}")
+    return header
+
+
+def load_samples(path: Path, header: Optional[RecordingHeader] = None,
+                 mmap: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load sample arrays of a .g1rec file
+
+    Args:
+        path: Recording file
+        header: Header if already read (avoids a second header parse)
+        mmap: Memory-map the sample block (read-only) instead of copying it
+
+    Returns:
+        (timestamps, positions) arrays
+    """
+    if header is None:
+        header = read_header(path)
+
+    n = header.sample_count
+    n_joints = len(header.joint_order)
+
+    if n == 0:
+        return np.zeros(0, dtype=TIMESTAMP_DTYPE), np.zeros((0, n_joints), dtype=POSITION_DTYPE)
+
+    if mmap:
+        timestamps = np.memmap(path, dtype=TIMESTAMP_DTYPE, mode="r",
+                               offset=header.timestamps_offset, shape=(n,))
+        positions = np.memmap(path, dtype=POSITION_DTYPE, mode="r",
+                              offset=header.positions_offset, shape=(n, n_joints))
+        return timestamps, positions
+
+    with open(path, "rb") as f:
+        f.seek(header.timestamps_offset)
+        timestamps = np.fromfile(f, dtype=TIMESTAMP_DTYPE, count=n)
+        f.seek(header.positions_offset)
+        positions = np.fromfile(f, dtype=POSITION_DTYPE, count=n * n_joints).reshape(n, n_joints)
+    return timestamps, positions
+
+
+def columns_from_json(data: dict, joint_order: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert a legacy JSON recording (list of snapshot dicts) to columns
+
+    Joints missing from a snapshot are stored as NaN.
+    """
+    snapshots = data.get("snapshots", [])
+    timestamps = np.fromiter((s["timestamp"] for s in snapshots), dtype=TIMESTAMP_DTYPE, count=len(snapshots))
+    positions = np.full((len(snapshots), len(joint_order)), np.nan, dtype=POSITION_DTYPE)
+    for row, snapshot in enumerate(snapshots):
+        joint_positions = snapshot["positions"]
+        for col, joint_name in enumerate(joint_order):
+            if joint_name in joint_positions:
+                positions[row, col] = joint_positions[joint_name]
+    return timestamps, positions
@@ -3,16 +3,38 @@ Teach Mode Recording System
 
 Records arm joint positions while in teach mode (FSM 501 + arms released),
 stores them as custom action trajectories, and enables playback.
+
+Recordings are stored in the columnar .g1rec format (see teach_mode_format);
+legacy JSON recordings are migrated automatically on startup. A catalog
+manifest (see recording_catalog) answers listing and metadata queries.
+
+Live capture attaches to the robot's rt/lowstate stream and writes every arm
+sample into preallocated buffers, with an optional pre-roll ring buffer and
+the same 20 s limit as robot-side recording.
 """
 
 import json
 import time
 import asyncio
+import threading
 from pathlib import Path
 from typing import Dict, List, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field
 import logging
 
+import numpy as np
+
+from .recording_catalog import CATALOG_FILENAME, CatalogEntry, RecordingCatalog
+from .trajectory_simplify import SimplificationReport, simplify_trajectory
+from .teach_mode_format import (
+    RECORDING_SUFFIX,
+    RecordingHeader,
+    columns_from_json,
+    load_samples,
+    read_header,
+    write_recording,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -44,17 +66,65 @@ class JointSnapshot:
     positions: Dict[str, float]  # Joint name → position (radians)
 
 
+ARM_JOINT_NAMES = list(ARM_JOINT_INDICES.keys())
+ARM_MOTOR_INDICES = list(ARM_JOINT_INDICES.values())
+
+NUM_MOTORS = 29
+LOWSTATE_MAX_RATE_HZ = 500.0  # Upper bound of the rt/lowstate publish rate (buffer sizing)
+MAX_RECORDING_SECONDS = 20.0  # Same limit as robot-side teach recording (API 7110)
+MAX_PRE_ROLL_SECONDS = 5.0
+
+
 @dataclass
 class CustomActionRecording:
-    """Complete custom action recording"""
+    """
+    Complete custom action recording in columnar form
+
+    ``positions`` is a float32 matrix (samples x joints) with columns ordered
+    by ``joint_order``; ``timestamps`` holds seconds since recording start.
+    Loaded recordings are memory-mapped, so arrays are read-only.
+    """
     name: str
     created_at: float  # Unix timestamp
     duration: float  # Total duration in seconds
-    sample_rate: float  # Samples per second
-    snapshots: List[JointSnapshot]
-    
+    sample_rate: float  # Samples per second as captured (keyframe-simplified recordings keep fewer)
+    timestamps: np.ndarray
+    positions: np.ndarray
+    joint_order: List[str] = field(default_factory=lambda: list(ARM_JOINT_NAMES))
+
+    @property
+    def sample_count(self) -> int:
+        return int(self.timestamps.shape[0])
+
+    @property
+    def snapshots(self) -> List[JointSnapshot]:
+        """Per-sample view (built on demand, for dict-based consumers)"""
+        return [
+            JointSnapshot(
+                timestamp=float(t),
+                positions={name: float(q) for name, q in zip(self.joint_order, row)}
+            )
+            for t, row in zip(self.timestamps, self.positions)
+        ]
+
+    @classmethod
+    def from_snapshots(cls, name: str, created_at: float,
+                       snapshots: List[JointSnapshot]) -> 'CustomActionRecording':
+        """Build a columnar recording from a list of snapshots"""
+        data = {"snapshots": [{"timestamp": s.timestamp, "positions": s.positions} for s in snapshots]}
+        timestamps, positions = columns_from_json(data, ARM_JOINT_NAMES)
+        duration = float(timestamps[-1]) if len(timestamps) else 0.0
+        return cls(
+            name=name,
+            created_at=created_at,
+            duration=duration,
+            sample_rate=len(timestamps) / duration if duration > 0 else 0,
+            timestamps=timestamps,
+            positions=positions,
+        )
+
     def to_dict(self) -> dict:
-        """Convert to JSON-serializable dict"""
+        """Convert to JSON-serializable dict (legacy snapshot layout)"""
         return {
             "name": self.name,
             "created_at": self.created_at,
@@ -68,22 +138,18 @@ class CustomActionRecording:
                 for s in self.snapshots
             ]
         }
-    
+
     @classmethod
     def from_dict(cls, data: dict) -> 'CustomActionRecording':
-        """Load from dict"""
+        """Load from a legacy JSON dict"""
+        timestamps, positions = columns_from_json(data, ARM_JOINT_NAMES)
         return cls(
             name=data["name"],
             created_at=data["created_at"],
             duration=data["duration"],
             sample_rate=data["sample_rate"],
-            snapshots=[
-                JointSnapshot(
-                    timestamp=s["timestamp"],
-                    positions=s["positions"]
-                )
-                for s in data["snapshots"]
-            ]
+            timestamps=timestamps,
+            positions=positions,
         )
 
 
@@ -91,10 +157,14 @@ class TeachModeRecorder:
     """
     Records and manages custom action recordings from teach mode.
     
-    Recordings are stored as JSON files in g1_app/data/custom_actions/
+    Recordings are stored as .g1rec files in g1_app/data/custom_actions/,
+    indexed by catalog.json in the same directory.
     """
     
-    def __init__(self, storage_dir: Optional[Path] = None):
+    def __init__(self, storage_dir: Optional[Path] = None,
+                 max_duration: float = MAX_RECORDING_SECONDS,
+                 max_pre_roll: float = MAX_PRE_ROLL_SECONDS,
+                 max_rate: float = LOWSTATE_MAX_RATE_HZ):
         if storage_dir is None:
             storage_dir = Path(__file__).parent.parent / "data" / "custom_actions"
         
@@ -103,17 +173,195 @@ class TeachModeRecorder:
         
         # Recording state
         self.is_recording = False
+        self.capture_complete = False  # max_duration reached, waiting for stop
         self.current_recording: Optional[CustomActionRecording] = None
-        self.record_start_time: float = 0
-        self.snapshots: List[JointSnapshot] = []
+        self.record_start_time: float = 0  # Unix time of the first sample
+        self.max_duration = max_duration
+        self.max_pre_roll = max_pre_roll
         self.sample_rate = 50.0  # Hz (matches sportmodestate frequency)
+        self.simplify_tolerance: Optional[float] = None  # Radians; None keeps every sample
+        self.last_simplification: Optional[SimplificationReport] = None
+        
+        # Preallocated capture buffers (sized for max_rate over the full
+        # window) so samples are written in place without allocating
+        n_joints = len(ARM_MOTOR_INDICES)
+        capacity = int((max_duration + max_pre_roll) * max_rate) + 1
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._positions = np.zeros((capacity, n_joints), dtype=np.float32)
+        self._count = 0
+        self._start_monotonic = 0.0
+        self._start_wall = 0.0
+        self._deadline = 0.0  # Pre-roll does not count towards max_duration
         
-    def start_recording(self, action_name: str) -> bool:
+        # Pre-roll ring buffer, filled while attached and not recording
+        pre_roll_capacity = int(max_pre_roll * max_rate) + 1
+        self._pre_timestamps = np.zeros(pre_roll_capacity, dtype=np.float64)
+        self._pre_positions = np.zeros((pre_roll_capacity, n_joints), dtype=np.float32)
+        self._pre_head = 0
+        self._pre_count = 0
+        
+        self._lock = threading.Lock()
+        self._robot = None
+        self._last_tick = None
+        
+        migrated = self._migrate_json_recordings()
+        self.catalog = RecordingCatalog(self.storage_dir)
+        if migrated:
+            self.catalog.rebuild()
+    
+    def _recording_path(self, action_name: str) -> Path:
+        return self.storage_dir / f"{action_name}{RECORDING_SUFFIX}"
+    
+    def _migrate_json_recordings(self) -> int:
+        """
+        Convert legacy JSON recordings to .g1rec
+        
+        The JSON file is kept as ``<name>.json.migrated`` after a successful
+        conversion so the migration runs once and can be undone by hand.
+        
+        Returns:
+            Number of recordings migrated
+        """
+        migrated = 0
+        for json_path in self.storage_dir.glob("*.json"):
+            if json_path.name == CATALOG_FILENAME:
+                continue
+            target = self._recording_path(json_path.stem)
+            if target.exists():
+                continue
+            try:
+                with open(json_path, 'r') as f:
+                    data = json.load(f)
+                timestamps, positions = columns_from_json(data, ARM_JOINT_NAMES)
+                write_recording(target, timestamps, positions, ARM_JOINT_NAMES,
+                                created_at=data.get("created_at", json_path.stat().st_mtime))
+                json_path.rename(json_path.with_name(json_path.name + ".migrated"))
+                migrated += 1
+            except Exception as e:
+                logger.error(f"Failed to migrate legacy recording '{json_path.name}': {e}")
+        
+        if migrated:
+            logger.info(f"Migrated {migrated} JSON recording(s) to {RECORDING_SUFFIX}")
+        return migrated
+        
+    # ------------------------------------------------------------------
+    # Live capture
+    # ------------------------------------------------------------------
+    
+    def attach(self, robot) -> None:
+        """
+        Feed the recorder from a RobotController's rt/lowstate stream
+        
+        While attached and idle, samples go to the pre-roll ring buffer.
+        The lowstate subscription group must be enabled on the robot.
+        """
+        if self._robot is robot:
+            return
+        self.detach()
+        self._robot = robot
+        self._last_tick = None
+        robot.add_lowstate_listener(self.record_lowstate)
+        logger.info("Teach recorder attached to rt/lowstate")
+    
+    def detach(self) -> None:
+        """Stop receiving lowstate samples and clear the pre-roll buffer"""
+        if self._robot is None:
+            return
+        self._robot.remove_lowstate_listener(self.record_lowstate)
+        self._robot = None
+        with self._lock:
+            self._pre_head = 0
+            self._pre_count = 0
+        logger.info("Teach recorder detached from rt/lowstate")
+    
+    @property
+    def attached(self) -> bool:
+        return self._robot is not None
+    
+    def record_lowstate(self, lowstate_data: dict) -> bool:
+        """
+        Record arm joint positions from one rt/lowstate message
+        
+        Args:
+            lowstate_data: LowState_ payload with ``motor_state[i]['q']``
+            
+        Returns:
+            True if the sample was stored (recording or pre-roll)
+        """
+        motor_state = lowstate_data.get('motor_state')
+        if not motor_state or len(motor_state) < NUM_MOTORS:
+            return False
+        
+        # rt/lowstate and rt/lf/lowstate may both deliver the same message
+        tick = lowstate_data.get('tick')
+        if tick is not None:
+            if tick == self._last_tick:
+                return False
+            self._last_tick = tick
+        
+        now = time.monotonic()
+        with self._lock:
+            row = self._next_row(now)
+            if row is None:
+                return False
+            for col, index in enumerate(ARM_MOTOR_INDICES):
+                row[col] = motor_state[index]['q']
+        return True
+    
+    def _next_row(self, now: float) -> Optional[np.ndarray]:
+        """Claim the buffer row for a sample taken at ``now`` (lock held)"""
+        if self.is_recording:
+            if self.capture_complete:
+                return None
+            if now > self._deadline or self._count >= len(self._timestamps):
+                self.capture_complete = True
+                logger.info(f"Recording reached {self.max_duration:.0f}s limit, capture stopped")
+                return None
+            self._timestamps[self._count] = now - self._start_monotonic
+            row = self._positions[self._count]
+            self._count += 1
+            return row
+        
+        if self._robot is None:
+            return None
+        
+        head = self._pre_head
+        self._pre_timestamps[head] = now
+        self._pre_head = (head + 1) % len(self._pre_timestamps)
+        self._pre_count = min(self._pre_count + 1, len(self._pre_timestamps))
+        return self._pre_positions[head]
+    
+    def _take_pre_roll(self, pre_roll: float, now: float) -> int:
+        """Copy the last ``pre_roll`` seconds of the ring into the capture buffer (lock held)"""
+        if pre_roll <= 0 or self._pre_count == 0:
+            return 0
+        
+        size = len(self._pre_timestamps)
+        order = (np.arange(self._pre_count) + self._pre_head - self._pre_count) % size
+        keep = order[self._pre_timestamps[order] >= now - pre_roll]
+        n = len(keep)
+        if n == 0:
+            return 0
+        
+        # Shift the recording start back to the first pre-roll sample
+        first = self._pre_timestamps[keep[0]]
+        self._start_monotonic = first
+        self._start_wall -= now - first
+        self._timestamps[:n] = self._pre_timestamps[keep] - first
+        self._positions[:n] = self._pre_positions[keep]
+        return n
+    
+    def start_recording(self, action_name: str, pre_roll: float = 0.0,
+                        simplify_tolerance: Optional[float] = None) -> bool:
         """
         Start recording a new custom action
         
         Args:
             action_name: Name for the custom action
+            pre_roll: Seconds of already-buffered motion to prepend
+                (needs the recorder to be attached beforehand)
+            simplify_tolerance: If set, keyframe-compress the recording on
+                save with this max joint deviation (radians)
             
         Returns:
             True if recording started successfully
@@ -127,14 +375,25 @@ class TeachModeRecorder:
             return False
         
         # Check if name already exists
-        if (self.storage_dir / f"{action_name}.json").exists():
+        if action_name in self.catalog or self._recording_path(action_name).exists():
             logger.warning(f"Action '{action_name}' already exists")
             return False
         
-        self.is_recording = True
-        self.record_start_time = time.time()
-        self.snapshots = []
-        logger.info(f"Started recording custom action: {action_name}")
+        with self._lock:
+            now = time.monotonic()
+            self._start_monotonic = now
+            self._start_wall = time.time()
+            self._deadline = now + self.max_duration
+            self._count = self._take_pre_roll(min(pre_roll, self.max_pre_roll), now)
+            self.record_start_time = self._start_wall
+            self.capture_complete = False
+            self.simplify_tolerance = simplify_tolerance
+            self.is_recording = True
+        
+        if self._count:
+            logger.info(f"Started recording custom action: {action_name} ({self._count} pre-roll samples)")
+        else:
+            logger.info(f"Started recording custom action: {action_name}")
         return True
     
     def record_snapshot(self, motor_positions: List[float]) -> bool:
@@ -150,23 +409,23 @@ class TeachModeRecorder:
         if not self.is_recording:
             return False
         
-        if len(motor_positions) < 29:
+        if len(motor_positions) < NUM_MOTORS:
             logger.error(f"Invalid motor positions array length: {len(motor_positions)}")
             return False
         
-        # Extract arm joint positions
-        positions = {}
-        for joint_name, index in ARM_JOINT_INDICES.items():
-            positions[joint_name] = motor_positions[index]
-        
-        # Calculate timestamp
-        timestamp = time.time() - self.record_start_time
-        
-        snapshot = JointSnapshot(timestamp=timestamp, positions=positions)
-        self.snapshots.append(snapshot)
-        
+        with self._lock:
+            row = self._next_row(time.monotonic())
+            if row is None:
+                return False
+            for col, index in enumerate(ARM_MOTOR_INDICES):
+                row[col] = motor_positions[index]
         return True
     
+    @property
+    def sample_count(self) -> int:
+        """Samples captured so far in the current recording"""
+        return self._count if self.is_recording else 0
+    
     def stop_recording(self, action_name: str) -> Optional[CustomActionRecording]:
         """
         Stop recording and save the custom action
@@ -181,74 +440,121 @@ class TeachModeRecorder:
             logger.warning("Not currently recording")
             return None
         
-        if len(self.snapshots) < 2:
-            logger.error("Recording too short (need at least 2 snapshots)")
+        with self._lock:
             self.is_recording = False
-            self.snapshots = []
+            count = self._count
+            self._count = 0
+            # Copy out so the buffers can be reused by the next recording
+            timestamps = self._timestamps[:count].copy()
+            positions = self._positions[:count].copy()
+        
+        if count < 2:
+            logger.error("Recording too short (need at least 2 snapshots)")
             return None
         
-        # Create recording object
-        duration = self.snapshots[-1].timestamp
+        extra = {}
+        duration = float(timestamps[-1])
+        # Capture rate; stays meaningful after simplification drops samples
+        sample_rate = count / duration if duration > 0 else 0
+        self.last_simplification = None
+        if self.simplify_tolerance is not None:
+            timestamps, positions, report = simplify_trajectory(
+                timestamps, positions, self.simplify_tolerance, ARM_JOINT_NAMES
+            )
+            self.last_simplification = report
+            extra["simplification"] = report.to_dict()
+            logger.info(f"Simplified '{action_name}': {report.original_count} -> {report.kept_count} samples "
+                        f"(max error {report.max_error:.4f} rad)")
+        
         recording = CustomActionRecording(
             name=action_name,
             created_at=self.record_start_time,
             duration=duration,
-            sample_rate=len(self.snapshots) / duration if duration > 0 else 0,
-            snapshots=self.snapshots
+            sample_rate=sample_rate,
+            timestamps=timestamps,
+            positions=positions,
         )
         
-        # Save to file
-        filepath = self.storage_dir / f"{action_name}.json"
+        # Save to file and index it
         try:
-            with open(filepath, 'w') as f:
-                json.dump(recording.to_dict(), f, indent=2)
-            logger.info(f"Saved recording '{action_name}': {len(self.snapshots)} snapshots, {duration:.2f}s")
+            filepath = self._recording_path(action_name)
+            write_recording(filepath, recording.timestamps, recording.positions,
+                            recording.joint_order, recording.created_at, extra=extra,
+                            sample_rate=sample_rate)
+            self.catalog.add(action_name, filepath)
+            logger.info(f"Saved recording '{action_name}': {recording.sample_count} snapshots, {recording.duration:.2f}s")
         except Exception as e:
             logger.error(f"Failed to save recording: {e}")
-            self.is_recording = False
-            self.snapshots = []
             return None
         
-        # Reset state
-        self.is_recording = False
-        self.snapshots = []
-        
         return recording
     
     def cancel_recording(self):
         """Cancel current recording without saving"""
         if self.is_recording:
             logger.info("Recording cancelled")
-            self.is_recording = False
-            self.snapshots = []
+            with self._lock:
+                self.is_recording = False
+                self._count = 0
     
     def list_recordings(self) -> List[str]:
         """List all saved custom action names"""
-        return [f.stem for f in self.storage_dir.glob("*.json")]
+        return self.catalog.names()
+    
+    def list_recording_info(self) -> List[CatalogEntry]:
+        """Catalog metadata (duration, samples, size, checksum) of all recordings"""
+        return self.catalog.entries()
+    
+    def get_recording_info(self, action_name: str) -> Optional[CatalogEntry]:
+        """Catalog metadata of one recording, or None if unknown"""
+        return self.catalog.get(action_name)
+    
+    def read_recording_header(self, action_name: str) -> Optional[RecordingHeader]:
+        """Read duration, sample count and joint order without loading samples"""
+        filepath = self._recording_path(action_name)
+        if not filepath.exists():
+            return None
+        
+        try:
+            return read_header(filepath)
+        except Exception as e:
+            logger.error(f"Failed to read header of '{action_name}': {e}")
+            return None
     
-    def load_recording(self, action_name: str) -> Optional[CustomActionRecording]:
-        """Load a saved custom action recording"""
-        filepath = self.storage_dir / f"{action_name}.json"
+    def load_recording(self, action_name: str, mmap: bool = True) -> Optional[CustomActionRecording]:
+        """
+        Load a saved custom action recording
+        
+        Args:
+            action_name: Recording name
+            mmap: Memory-map sample data (read-only arrays) instead of copying
+        """
+        filepath = self._recording_path(action_name)
         if not filepath.exists():
             logger.warning(f"Recording '{action_name}' not found")
             return None
         
         try:
-            with open(filepath, 'r') as f:
-                data = json.load(f)
-            return CustomActionRecording.from_dict(data)
+            header = read_header(filepath)
+            timestamps, positions = load_samples(filepath, header, mmap=mmap)
+            return CustomActionRecording(
+                name=action_name,
+                created_at=header.created_at,
+                duration=header.duration,
+                sample_rate=header.sample_rate,
+                timestamps=timestamps,
+                positions=positions,
+                joint_order=header.joint_order,
+            )
         except Exception as e:
             logger.error(f"Failed to load recording '{action_name}': {e}")
             return None
     
     def delete_recording(self, action_name: str) -> bool:
         """Delete a saved custom action"""
-        filepath = self.storage_dir / f"{action_name}.json"
-        if not filepath.exists():
-            return False
-        
         try:
-            filepath.unlink()
+            if not self.catalog.remove(action_name):
+                return False
             logger.info(f"Deleted recording '{action_name}'")
             return True
         except Exception as e:
@@ -256,9 +562,9 @@ class TeachModeRecorder:
             return False
     
     def rename_recording(self, old_name: str, new_name: str) -> bool:
-        """Rename a saved custom action"""
-        old_path = self.storage_dir / f"{old_name}.json"
-        new_path = self.storage_dir / f"{new_name}.json"
+        """Rename a saved custom action (the name lives in the filename only)"""
+        old_path = self._recording_path(old_name)
+        new_path = self._recording_path(new_name)
         
         if not old_path.exists():
             logger.warning(f"Recording '{old_name}' not found")
@@ -269,16 +575,10 @@ class TeachModeRecorder:
             return False
         
         try:
-            # Load, update name, and save to new file
-            recording = self.load_recording(old_name)
-            if recording:
-                recording.name = new_name
-                with open(new_path, 'w') as f:
-                    json.dump(recording.to_dict(), f, indent=2)
-                old_path.unlink()
-                logger.info(f"Renamed '{old_name}' to '{new_name}'")
-                return True
-            return False
+            if not self.catalog.rename(old_name, new_name):
+                return False
+            logger.info(f"Renamed '{old_name}' to '{new_name}'")
+            return True
         except Exception as e:
             logger.error(f"Failed to rename recording: {e}")
             return False
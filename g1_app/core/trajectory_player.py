@@ -0,0 +1,299 @@
+"""
+Trajectory Player - Host-side playback of recorded arm trajectories
+
+Resamples a CustomActionRecording to the arm_sdk command rate, optionally
+time-scaled and looped, blends in from the measured arm pose and streams the
+frames to rt/arm_sdk on an absolute-deadline clock (late frames are dropped
+rather than delaying the rest of the motion). Progress is published on the
+EventBus; stop() preempts playback immediately.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, asdict
+from typing import List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from .event_bus import EventBus, Events
+from .teach_mode_recorder import ARM_JOINT_INDICES, CustomActionRecording
+
+logger = logging.getLogger(__name__)
+
+PLAYBACK_RATE_HZ = 50.0  # arm_sdk command rate (matches ArmController)
+PROGRESS_INTERVAL = 0.1  # Seconds between progress events
+DEFAULT_BLEND_TIME = 1.0  # Seconds to move from the measured pose to the first frame
+MIN_SPEED = 0.1
+MAX_SPEED = 4.0
+
+
+def resample_trajectory(timestamps: np.ndarray, positions: np.ndarray,
+                        rate: float, speed: float = 1.0) -> np.ndarray:
+    """
+    Linearly resample a trajectory to a fixed rate
+
+    Args:
+        timestamps: Sample times in seconds, shape (N,), non-decreasing
+        positions: Joint positions, shape (N, J)
+        rate: Output frames per second
+        speed: Playback speed multiplier (2.0 = twice as fast)
+
+    Returns:
+        Frames of shape (M, J), the last frame being the final sample
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    positions = np.asarray(positions, dtype=np.float64)
+    if len(timestamps) < 2:
+        return positions.copy()
+
+    t0 = timestamps[0]
+    duration = (timestamps[-1] - t0) / speed
+    frame_count = int(np.floor(duration * rate)) + 1
+    source_t = t0 + np.arange(frame_count) * (speed / rate)
+    if source_t[-1] < timestamps[-1]:
+        source_t = np.append(source_t, timestamps[-1])
+
+    # Segment index and blend factor for every output frame at once
+    idx = np.clip(np.searchsorted(timestamps, source_t, side="right") - 1, 0, len(timestamps) - 2)
+    span = timestamps[idx + 1] - timestamps[idx]
+    frac = np.divide(source_t - timestamps[idx], span, out=np.zeros_like(span), where=span > 0)
+    frac = np.clip(frac, 0.0, 1.0)[:, None]
+    return positions[idx] + frac * (positions[idx + 1] - positions[idx])
+
+
+def blend_frames(start: np.ndarray, end: np.ndarray, duration: float, rate: float) -> np.ndarray:
+    """
+    Smooth (cosine-eased) transition between two poses, excluding ``end``
+
+    Returns:
+        Frames of shape (K, J); empty when duration is zero
+    """
+    count = int(round(duration * rate))
+    if count <= 0:
+        return np.zeros((0, len(end)))
+    alpha = 0.5 - 0.5 * np.cos(np.pi * np.arange(count) / count)
+    return start + alpha[:, None] * (end - start)
+
+
+@dataclass
+class PlaybackStatus:
+    """Snapshot of the player state (payload of TRAJECTORY_PROGRESS events)"""
+    name: Optional[str] = None
+    state: str = "idle"  # idle, blending, playing, finished, stopped, error
+    position: float = 0.0  # Seconds into the recording (recording time, not wall time)
+    duration: float = 0.0  # Recording duration in seconds
+    progress: float = 0.0  # 0.0 - 1.0 within the current pass
+    loop_count: int = 0
+    speed: float = 1.0
+    frames_sent: int = 0
+    frames_dropped: int = 0  # Frames skipped because their deadline had passed
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class TrajectoryPlayer:
+    """
+    Streams a recorded arm trajectory to the robot via rt/arm_sdk
+    """
+
+    def __init__(self, robot_controller, rate: float = PLAYBACK_RATE_HZ,
+                 kp: float = 50.0, kd: float = 1.5):
+        """
+        Args:
+            robot_controller: RobotController used for send_command/request_arm_state
+            rate: Command rate in Hz
+            kp: Position gain sent with every joint command
+            kd: Damping gain sent with every joint command
+        """
+        self.robot = robot_controller
+        self.rate = rate
+        self.kp = kp
+        self.kd = kd
+        self.status = PlaybackStatus()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_playing(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, recording: CustomActionRecording, speed: float = 1.0,
+              loop: bool = False, blend_time: float = DEFAULT_BLEND_TIME) -> bool:
+        """
+        Start playback in the background (must be called from the event loop)
+
+        Args:
+            recording: Recording to play
+            speed: Playback speed multiplier, clamped to [0.1, 4.0]
+            loop: Repeat until stopped (a blend segment joins end and start)
+            blend_time: Seconds to blend from the measured pose to the first frame
+
+        Returns:
+            True if playback started
+        """
+        if self.is_playing:
+            logger.warning("Trajectory playback already running, stop it first")
+            return False
+
+        if recording.sample_count < 2:
+            logger.error(f"Recording '{recording.name}' too short to play")
+            return False
+
+        speed = min(MAX_SPEED, max(MIN_SPEED, float(speed)))
+        self.status = PlaybackStatus(
+            name=recording.name,
+            state="blending",
+            duration=recording.duration,
+            speed=speed,
+        )
+        self._task = asyncio.create_task(self._run(recording, speed, loop, max(0.0, blend_time)))
+        return True
+
+    async def stop(self) -> None:
+        """Preempt playback immediately; the arm holds the last commanded pose"""
+        task = self._task
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def wait(self) -> PlaybackStatus:
+        """Wait for playback to finish and return the final status"""
+        if self._task is not None:
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        return self.status
+
+    # ------------------------------------------------------------------
+    # Playback loop
+    # ------------------------------------------------------------------
+
+    def _prepare(self, recording: CustomActionRecording, speed: float) -> Tuple[List[int], np.ndarray]:
+        """Select commandable joints and resample their columns"""
+        positions = np.asarray(recording.positions, dtype=np.float64)
+        # Legacy recordings may lack joints (all-NaN columns); never command those
+        valid = ~np.isnan(positions).any(axis=0)
+        columns = [i for i, name in enumerate(recording.joint_order)
+                   if valid[i] and name in ARM_JOINT_INDICES]
+        motor_indices = [ARM_JOINT_INDICES[recording.joint_order[i]] for i in columns]
+        frames = resample_trajectory(recording.timestamps, positions[:, columns], self.rate, speed)
+        return motor_indices, frames
+
+    async def _measured_pose(self, motor_indices: List[int]) -> Optional[np.ndarray]:
+        """Current positions of ``motor_indices`` from rt/lowstate, or None"""
+        joints = {}
+        for arm, first_motor in (("left", 15), ("right", 22)):
+            state = await self.robot.request_arm_state(arm)
+            if not state:
+                return None
+            for offset, q in enumerate(state["joints"]):
+                joints[first_motor + offset] = q
+        return np.array([joints[m] for m in motor_indices])
+
+    def _emit_progress(self) -> None:
+        EventBus.emit(Events.TRAJECTORY_PROGRESS, self.status.to_dict())
+
+    async def _run(self, recording: CustomActionRecording, speed: float,
+                   loop: bool, blend_time: float) -> None:
+        status = self.status
+        try:
+            motor_indices, frames = self._prepare(recording, speed)
+            if not motor_indices:
+                raise ValueError(f"Recording '{recording.name}' has no playable joints")
+
+            start_pose = await self._measured_pose(motor_indices) if blend_time > 0 else None
+            if start_pose is None and blend_time > 0:
+                logger.warning("Measured arm pose unavailable (is rt/lowstate enabled?), starting without blend")
+            lead_in = (blend_frames(start_pose, frames[0], blend_time, self.rate)
+                       if start_pose is not None else np.zeros((0, frames.shape[1])))
+            loop_seam = blend_frames(frames[-1], frames[0], blend_time, self.rate) if loop else None
+
+            # One command dict reused for every frame; only q values change
+            command = {
+                'type': 'arm_command',
+                'arm': 'both',
+                'enable_arm_sdk': True,
+                'joints': [
+                    {'motor_index': m, 'q': 0.0, 'dq': 0.0, 'tau': 0.0, 'kp': self.kp, 'kd': self.kd}
+                    for m in motor_indices
+                ],
+            }
+            joint_cmds = command['joints']
+
+            logger.info(f"▶️ Playing '{recording.name}' at {speed}x ({len(frames)} frames @ {self.rate:.0f} Hz"
+                        f"{', looping' if loop else ''})")
+
+            period = 1.0 / self.rate
+            segment = lead_in if len(lead_in) else frames
+            in_lead_in = len(lead_in) > 0
+            status.state = "blending" if in_lead_in else "playing"
+            self._emit_progress()
+
+            t0 = time.monotonic()
+            frame_clock = 0  # Frames scheduled since t0 (absolute deadlines: t0 + n * period)
+            segment_start = 0
+            last_progress = 0.0
+
+            while True:
+                now = time.monotonic()
+                due = int((now - t0) / period)
+                if due > frame_clock:
+                    # Behind schedule: skip to the frame that is due now
+                    status.frames_dropped += due - frame_clock
+                    frame_clock = due
+                index = frame_clock - segment_start
+
+                if index >= len(segment):
+                    # Advance to the next segment: lead-in -> frames -> (seam -> frames)*
+                    segment_start += len(segment)
+                    index -= len(segment)
+                    if in_lead_in or segment is loop_seam:
+                        in_lead_in = False
+                        segment = frames
+                        status.state = "playing"
+                    elif loop:
+                        status.loop_count += 1
+                        segment = loop_seam if len(loop_seam) else frames
+                    else:
+                        break
+                    continue
+
+                frame = segment[index]
+                for cmd, q in zip(joint_cmds, frame):
+                    cmd['q'] = float(q)
+                if not await self.robot.send_command(command):
+                    raise RuntimeError("send_command failed")
+                status.frames_sent += 1
+
+                if segment is frames:
+                    status.position = min(recording.duration, index * speed / self.rate)
+                    status.progress = index / max(1, len(frames) - 1)
+                if now - last_progress >= PROGRESS_INTERVAL:
+                    last_progress = now
+                    self._emit_progress()
+
+                frame_clock += 1
+                delay = t0 + frame_clock * period - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            status.state = "finished"
+            status.position = recording.duration
+            status.progress = 1.0
+            logger.info(f"✅ Finished playing '{recording.name}' ({status.frames_sent} frames, "
+                        f"{status.frames_dropped} dropped)")
+        except asyncio.CancelledError:
+            status.state = "stopped"
+            logger.info(f"⏹️ Playback of '{recording.name}' stopped")
+            raise
+        except Exception as e:
+            status.state = "error"
+            logger.error(f"Trajectory playback failed: {e}")
+        finally:
+            self._emit_progress()
@@ -0,0 +1,194 @@
+"""
+Trajectory Simplification - Keyframe compression for arm trajectories
+
+Ramer-Douglas-Peucker in joint space: a sample is dropped when linear
+interpolation (in time) between the kept neighbours reproduces every joint
+within ``tolerance`` radians. Deviation of a whole segment is computed in one
+vectorized step, so a 20 s recording at 500 Hz simplifies in milliseconds.
+
+Used at save time by TeachModeRecorder and on waypoint lists before they are
+streamed to the robot by /api/arm/play_sequence.
+"""
+
+from dataclasses import dataclass, asdict, field
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOLERANCE = 0.01  # Radians (~0.6°) of maximum reconstruction error
+
+# Joint order of a play_sequence waypoint (7 joints of one arm)
+WAYPOINT_JOINT_NAMES = [
+    "shoulder_pitch", "shoulder_roll", "shoulder_yaw", "elbow",
+    "wrist_roll", "wrist_pitch", "wrist_yaw",
+]
+
+
+@dataclass
+class SimplificationReport:
+    """Reconstruction error of a simplified trajectory against the original"""
+    original_count: int
+    kept_count: int
+    tolerance: float
+    max_error: float  # Radians, worst joint over all samples
+    rms_error: float  # Radians, over all samples and joints
+    joint_max_error: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def reduction(self) -> float:
+        """Fraction of samples removed (0.0 - 1.0)"""
+        if self.original_count == 0:
+            return 0.0
+        return 1.0 - self.kept_count / self.original_count
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["reduction"] = self.reduction
+        return data
+
+
+def _segment_deviation(t: np.ndarray, q: np.ndarray, a: int, b: int) -> np.ndarray:
+    """Max-abs joint deviation of samples a+1..b-1 from the a->b chord"""
+    span = t[b] - t[a]
+    if span > 0:
+        frac = (t[a + 1:b] - t[a]) / span
+    else:
+        frac = np.arange(1, b - a) / (b - a)
+    chord = q[a] + frac[:, None] * (q[b] - q[a])
+    return np.nan_to_num(np.abs(q[a + 1:b] - chord)).max(axis=1)
+
+
+def simplify_indices(timestamps: np.ndarray, positions: np.ndarray,
+                     tolerance: float = DEFAULT_TOLERANCE) -> np.ndarray:
+    """
+    Indices of the samples to keep
+
+    Args:
+        timestamps: Sample times, shape (N,), non-decreasing
+        positions: Joint positions, shape (N, J); NaN joints are ignored
+        tolerance: Maximum allowed deviation of any joint, in radians
+
+    Returns:
+        Sorted index array, always including the first and last sample
+    """
+    t = np.asarray(timestamps, dtype=np.float64)
+    q = np.asarray(positions, dtype=np.float64)
+    n = len(t)
+    if n <= 2:
+        return np.arange(n)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        deviation = _segment_deviation(t, q, a, b)
+        worst = int(np.argmax(deviation))
+        if deviation[worst] > tolerance:
+            split = a + 1 + worst
+            keep[split] = True
+            stack.append((a, split))
+            stack.append((split, b))
+    return np.flatnonzero(keep)
+
+
+def reconstruct(timestamps: np.ndarray, kept: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """Linearly interpolate the kept samples back onto all original timestamps"""
+    t = np.asarray(timestamps, dtype=np.float64)
+    q = np.asarray(positions, dtype=np.float64)
+    if len(kept) < 2:
+        return q.copy()
+    kt = t[kept]
+    seg = np.clip(np.searchsorted(kt, t, side="right") - 1, 0, len(kept) - 2)
+    span = kt[seg + 1] - kt[seg]
+    frac = np.divide(t - kt[seg], span, out=np.zeros_like(span), where=span > 0)
+    lo = q[kept[seg]]
+    hi = q[kept[seg + 1]]
+    return lo + frac[:, None] * (hi - lo)
+
+
+def _errors(timestamps: np.ndarray, positions: np.ndarray, kept: np.ndarray) -> np.ndarray:
+    q = np.asarray(positions, dtype=np.float64)
+    return np.nan_to_num(np.abs(q - reconstruct(timestamps, kept, q)))
+
+
+def _report(errors: np.ndarray, original_count: int, kept_count: int, tolerance: float,
+            joint_names: Optional[List[str]]) -> SimplificationReport:
+    if errors.size == 0:
+        joint_max = np.zeros(errors.shape[1] if errors.ndim == 2 else 0)
+        max_error = rms_error = 0.0
+    else:
+        joint_max = errors.max(axis=0)
+        max_error = float(errors.max())
+        rms_error = float(np.sqrt(np.mean(errors ** 2)))
+    names = joint_names or [str(i) for i in range(len(joint_max))]
+    return SimplificationReport(
+        original_count=original_count,
+        kept_count=kept_count,
+        tolerance=tolerance,
+        max_error=max_error,
+        rms_error=rms_error,
+        joint_max_error={name: float(e) for name, e in zip(names, joint_max)},
+    )
+
+
+def simplify_trajectory(timestamps: np.ndarray, positions: np.ndarray,
+                        tolerance: float = DEFAULT_TOLERANCE,
+                        joint_names: Optional[List[str]] = None
+                        ) -> Tuple[np.ndarray, np.ndarray, SimplificationReport]:
+    """
+    Simplify a timed trajectory
+
+    Returns:
+        (timestamps, positions, report) of the kept samples
+    """
+    kept = simplify_indices(timestamps, positions, tolerance)
+    errors = _errors(timestamps, positions, kept)
+    report = _report(errors, len(timestamps), len(kept), tolerance, joint_names)
+    return np.asarray(timestamps)[kept], np.asarray(positions)[kept], report
+
+
+def simplify_waypoints(waypoints: List[Dict], tolerance: float = DEFAULT_TOLERANCE
+                       ) -> Tuple[List[Dict], SimplificationReport]:
+    """
+    Simplify a play_sequence waypoint list ({'arm', 'joints'} dicts)
+
+    Waypoints carry no timing: play_sequence gives each one the same
+    transition time, so the waypoint index is the time parameter. Consecutive
+    waypoints of the same arm are simplified as one run; the first and last
+    waypoint of every run are always kept. Each kept waypoint is a copy with
+    ``steps`` set to the number of original transitions it replaces, which
+    play_sequence multiplies into its move duration so playback keeps the
+    recorded pacing.
+
+    Returns:
+        (kept waypoints, report over all runs)
+    """
+    kept_waypoints: List[Dict] = []
+    error_blocks = []
+    start = 0
+    while start < len(waypoints):
+        end = start
+        while end + 1 < len(waypoints) and waypoints[end + 1]['arm'] == waypoints[start]['arm']:
+            end += 1
+        run = waypoints[start:end + 1]
+
+        positions = np.array([w['joints'] for w in run], dtype=np.float64)
+        # Time in transitions; an already simplified input brings its own steps
+        index_time = np.cumsum([w.get('steps', 1) for w in run], dtype=np.float64)
+        kept = simplify_indices(index_time, positions, tolerance)
+        previous_time = index_time[0] - run[0].get('steps', 1)  # Arrival at the run's first waypoint
+        for i in kept:
+            kept_waypoints.append(dict(run[i], steps=int(index_time[i] - previous_time)))
+            previous_time = index_time[i]
+        error_blocks.append(_errors(index_time, positions, kept))
+        start = end + 1
+
+    errors = np.vstack(error_blocks) if error_blocks else np.zeros((0, 7))
+    report = _report(errors, len(waypoints), len(kept_waypoints), tolerance, WAYPOINT_JOINT_NAMES)
+    return kept_waypoints, report
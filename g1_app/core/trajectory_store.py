@@ -0,0 +1,274 @@
+"""
+Trajectory Store - Bounded columnar history of SLAM poses
+
+Poses are rows of (t, x, y, z, heading) in fixed-size NumPy ring buffers, so
+appending is O(1) and memory stays bounded however long mapping runs. The
+newest samples are kept at full resolution; rows that age out of a tier are
+decimated into the next, coarser tier instead of being dropped (defaults:
+1000 samples each at 1x, 10x and 100x spacing), and only the coarsest tier
+ever discards data.
+
+Samples closer than ``min_distance`` to the last kept pose are ignored; for
+batches the check is done vectorized along the cumulative path length.
+
+Export/import uses the slam_map_trajectory.txt layout
+(``# timestamp x y z qx qy qz qw``). Only heading is stored, so exported
+orientations are pure yaw rotations.
+"""
+
+import math
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("t", "x", "y", "z", "heading")  # Column order; heading in radians
+TRAJECTORY_FILE_HEADER = "# timestamp x y z qx qy qz qw"
+
+DEFAULT_TIERS = ((1000, 1), (1000, 10), (1000, 100))  # (capacity, decimation vs raw samples)
+DEFAULT_MIN_DISTANCE = 0.05  # Meters between kept poses
+
+
+def yaw_from_quaternion(q: Optional[Dict]) -> float:
+    """Heading (radians) from an {'x', 'y', 'z', 'w'} quaternion dict; 0.0 if missing"""
+    if not q:
+        return 0.0
+    x, y, z, w = q.get('x', 0.0), q.get('y', 0.0), q.get('z', 0.0), q.get('w', 1.0)
+    return math.atan2(2.0 * (w * z + x * y), 1.0 - 2.0 * (y * y + z * z))
+
+
+class _Tier:
+    """Ring buffer of pose rows; pushing past capacity returns the evicted rows"""
+
+    def __init__(self, capacity: int, factor: int):
+        self.capacity = capacity
+        self.factor = factor
+        self.rows = np.empty((capacity, len(FIELDS)), dtype=np.float64)
+        self.start = 0
+        self.size = 0
+        self.phase = 0  # Rows seen from the finer tier, for decimation
+
+    def push(self, rows: np.ndarray) -> np.ndarray:
+        """Append rows (oldest first); returns the rows evicted to make room"""
+        if len(rows) == 1:
+            # Per-sample fast path: no index arrays
+            end = (self.start + self.size) % self.capacity
+            if self.size < self.capacity:
+                self.rows[end] = rows[0]
+                self.size += 1
+                return rows[:0]
+            evicted = self.rows[self.start:self.start + 1].copy()
+            self.rows[self.start] = rows[0]
+            self.start = (self.start + 1) % self.capacity
+            return evicted
+
+        total = self.size + len(rows)
+        overflow = max(0, total - self.capacity)
+        evicted = self.take_oldest(min(overflow, self.size))
+        if len(rows) > self.capacity:
+            # More incoming than fits: the surplus goes straight through
+            evicted = np.vstack([evicted, rows[:len(rows) - self.capacity]])
+            rows = rows[len(rows) - self.capacity:]
+        idx = (self.start + self.size + np.arange(len(rows))) % self.capacity
+        self.rows[idx] = rows
+        self.size += len(rows)
+        return evicted
+
+    def take_oldest(self, count: int) -> np.ndarray:
+        idx = (self.start + np.arange(count)) % self.capacity
+        taken = self.rows[idx].copy()
+        self.start = (self.start + count) % self.capacity
+        self.size -= count
+        return taken
+
+    def view(self) -> np.ndarray:
+        """Rows oldest first (a copy)"""
+        idx = (self.start + np.arange(self.size)) % self.capacity
+        return self.rows[idx]
+
+    def last(self) -> Optional[np.ndarray]:
+        if self.size == 0:
+            return None
+        return self.rows[(self.start + self.size - 1) % self.capacity]
+
+    def clear(self) -> None:
+        self.start = self.size = self.phase = 0
+
+
+class TrajectoryStore:
+    """
+    Bounded, tiered pose history with a sequence cursor
+
+    ``seq`` counts kept samples since the last clear() and ``epoch`` changes on
+    every clear(), so readers can fetch only what is new (see since()).
+    """
+
+    def __init__(self, tiers: Sequence[Tuple[int, int]] = DEFAULT_TIERS,
+                 min_distance: float = DEFAULT_MIN_DISTANCE):
+        self.tiers = [_Tier(capacity, factor) for capacity, factor in tiers]
+        self.min_distance = min_distance
+        self.seq = 0
+        self.epoch = 0
+
+    def __len__(self) -> int:
+        return sum(tier.size for tier in self.tiers)
+
+    @property
+    def recent_count(self) -> int:
+        """Samples held at full resolution"""
+        return self.tiers[0].size
+
+    def clear(self) -> None:
+        """Start a new trajectory (invalidates cursors)"""
+        for tier in self.tiers:
+            tier.clear()
+        self.seq = 0
+        self.epoch += 1
+
+    def last(self) -> Optional[np.ndarray]:
+        """Newest kept row (t, x, y, z, heading) or None"""
+        return self.tiers[0].last()
+
+    def append(self, t: float, x: float, y: float, z: float, heading: float = 0.0) -> bool:
+        """
+        Add one pose
+
+        Returns:
+            True if kept, False if within min_distance of the last kept pose
+        """
+        last = self.last()
+        if last is not None and self.min_distance > 0:
+            dx, dy, dz = x - last[1], y - last[2], z - last[3]
+            if math.sqrt(dx * dx + dy * dy + dz * dz) <= self.min_distance:
+                return False
+        self._push(np.array([[t, x, y, z, heading]], dtype=np.float64))
+        return True
+
+    def extend(self, rows: np.ndarray) -> int:
+        """
+        Add a batch of poses, shape (N, 5) in FIELDS order, oldest first
+
+        A sample is kept each time the path length travelled since the last
+        kept pose crosses another multiple of min_distance.
+
+        Returns:
+            Number of samples kept
+        """
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(FIELDS))
+        if len(rows) == 0:
+            return 0
+        if self.min_distance > 0:
+            last = self.last()
+            anchor = rows[:1, 1:4] if last is None else last[None, 1:4]
+            steps = np.linalg.norm(np.diff(np.vstack([anchor, rows[:, 1:4]]), axis=0), axis=1)
+            bucket = np.floor(np.cumsum(steps) / self.min_distance)
+            keep = np.diff(bucket, prepend=0.0) > 0
+            if last is None:
+                keep[0] = True
+            rows = rows[keep]
+        if len(rows):
+            self._push(rows)
+        return len(rows)
+
+    def _push(self, rows: np.ndarray) -> None:
+        self.seq += len(rows)
+        for i, tier in enumerate(self.tiers):
+            rows = tier.push(rows)
+            if len(rows) == 0 or i + 1 == len(self.tiers):
+                return
+            # Decimate evicted rows down to the next tier's spacing
+            coarser = self.tiers[i + 1]
+            step = max(1, coarser.factor // tier.factor)
+            if len(rows) == 1:
+                if coarser.phase != 0:
+                    coarser.phase = (coarser.phase + 1) % step
+                    return
+                coarser.phase = 1 % step
+                continue
+            keep = (coarser.phase + np.arange(len(rows))) % step == 0
+            coarser.phase = (coarser.phase + len(rows)) % step
+            rows = rows[keep]
+
+    def history(self) -> np.ndarray:
+        """Every retained row, oldest (coarsest) first"""
+        parts = [tier.view() for tier in reversed(self.tiers) if tier.size]
+        if not parts:
+            return np.empty((0, len(FIELDS)))
+        return np.vstack(parts)
+
+    def since(self, since: Optional[int] = None, epoch: Optional[int] = None
+              ) -> Tuple[np.ndarray, bool]:
+        """
+        Rows kept after cursor ``since`` (a previous ``seq``)
+
+        Returns:
+            (rows, reset) - when the cursor is from another epoch or older than
+            the full-resolution tier, ``rows`` is the whole history and
+            ``reset`` is True. ``since=None`` returns the whole history with
+            ``reset`` False.
+        """
+        if since is None:
+            return self.history(), False
+        first_seq = self.seq - self.tiers[0].size
+        if (epoch is not None and epoch != self.epoch) or since < first_seq or since > self.seq:
+            return self.history(), True
+        recent = self.tiers[0].view()
+        return recent[since - first_seq:], False
+
+    @staticmethod
+    def to_dicts(rows: np.ndarray) -> List[Dict]:
+        """Rows -> [{'x', 'y', 'z', 'heading', 'timestamp'}] (heading in radians)"""
+        return [
+            {'x': x, 'y': y, 'z': z, 'heading': heading, 'timestamp': t}
+            for t, x, y, z, heading in rows.tolist()
+        ]
+
+    def export(self, path: Union[str, Path, None] = None) -> str:
+        """
+        Write the history in slam_map_trajectory.txt format
+
+        Args:
+            path: Output file (None = only return the text)
+
+        Returns:
+            File contents
+        """
+        rows = self.history()
+        half = rows[:, 4] / 2
+        table = np.column_stack([
+            rows[:, 0:4],
+            np.zeros(len(rows)), np.zeros(len(rows)), np.sin(half), np.cos(half),
+        ])
+        lines = [TRAJECTORY_FILE_HEADER]
+        lines.extend(
+            f"{row[0]:.6f} " + " ".join(f"{value:.6f}" for value in row[1:])
+            for row in table.tolist()
+        )
+        text = "\n".join(lines) + "\n"
+        if path is not None:
+            Path(path).write_text(text)
+            logger.info(f"Exported {len(rows)} trajectory poses to {path}")
+        return text
+
+    @classmethod
+    def load(cls, path: Union[str, Path], **kwargs) -> "TrajectoryStore":
+        """Read a slam_map_trajectory.txt file (yaw is taken from the quaternion)"""
+        table = np.loadtxt(path, comments="#", ndmin=2)
+        qx, qy, qz, qw = table[:, 4], table[:, 5], table[:, 6], table[:, 7]
+        heading = np.arctan2(2.0 * (qw * qz + qx * qy), 1.0 - 2.0 * (qy * qy + qz * qz))
+        store = cls(**kwargs)
+        store.extend(np.column_stack([table[:, 0:4], heading]))
+        return store
+
+    def get_stats(self) -> dict:
+        return {
+            "seq": self.seq,
+            "epoch": self.epoch,
+            "tiers": [
+                {"capacity": tier.capacity, "factor": tier.factor, "size": tier.size}
+                for tier in self.tiers
+            ],
+        }
@@ -22,6 +22,8 @@ import time
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 
+from .stun_discovery import discover_teaching_port_async, get_teaching_port_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -277,16 +279,20 @@ class UDPProtocolClient:
     Combines initialization, action querying, and playback
     """
     
-    def __init__(self, robot_ip: str, port: int = 49504):
+    def __init__(self, robot_ip: str, port: Optional[int] = 49504,
+                 serial_number: Optional[str] = None):
         """
         Initialize UDP client
         
         Args:
             robot_ip: Robot IP address
-            port: UDP port (default 49504)
+            port: UDP port (default 49504); None = discover via STUN on connect
+            serial_number: Robot serial; caches the discovered port per robot
         """
         self.robot_ip = robot_ip
         self.port = port
+        self.serial_number = serial_number
+        self.port_discovered = False  # Port came from STUN discovery (or its cache)
         self.socket: Optional[socket.socket] = None
         
         self.initializer = UDPInitializer()
@@ -295,7 +301,12 @@ class UDPProtocolClient:
         logger.info(f"🔌 UDP Protocol Client: {robot_ip}:{port}")
     
     async def connect(self):
-        """Create UDP socket"""
+        """Create UDP socket (discovering the teaching port first if unknown)"""
+        if self.port is None:
+            self.port = await discover_teaching_port_async(self.robot_ip, serial_number=self.serial_number)
+            if self.port is None:
+                raise ConnectionError(f"Teaching port discovery failed for {self.robot_ip}")
+            self.port_discovered = True
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             self.socket.settimeout(5.0)
@@ -354,11 +365,13 @@ class UDPProtocolClient:
             self.socket.sendto(cmd, (self.robot_ip, self.port))
             
             actions = []
+            replied = False
             self.socket.settimeout(3.0)
             
             try:
                 while True:
                     response, addr = self.socket.recvfrom(4096)
+                    replied = True
                     
                     # Parse response packet
                     pkt = UDPPacket.from_bytes(response)
@@ -382,6 +395,9 @@ class UDPProtocolClient:
             except socket.timeout:
                 pass
             
+            if not replied and self.port_discovered:
+                self._forget_port()
+            
             if actions:
                 logger.info(f"✅ Query complete: {len(actions)} actions found")
                 for action in actions:
@@ -395,6 +411,17 @@ class UDPProtocolClient:
             logger.error(f"Query failed: {e}")
             return []
     
+    def _forget_port(self):
+        """Drop a discovered port that stopped answering; the next connect rediscovers"""
+        logger.warning(f"⚠️  Teaching port {self.port} did not answer, forgetting it")
+        if self.serial_number:
+            get_teaching_port_cache().invalidate(self.serial_number)
+        self.port = None
+        self.port_discovered = False
+        if self.socket:
+            self.socket.close()
+            self.socket = None
+    
     async def play_action(self, action_name: str) -> bool:
         """
         Play an action by name
@@ -0,0 +1,412 @@
+"""
+Video Pipeline - Demand-driven JPEG encoding of the robot video track
+
+Decoded WebRTC frames are handed to the encoder by reference. Nothing is
+converted or encoded while no viewer is attached; with viewers, only the
+newest pending frame is encoded (older ones are dropped when the encoder
+falls behind) in a worker thread, so the asyncio loop never runs
+``to_ndarray``/``cv2.imencode``. Every viewer shares the one cached encode,
+identified by a sequence number.
+
+Encoded frames are published through a FrameBroadcaster: each MJPEG client
+waits on an asyncio condition for a sequence number newer than the last one
+it sent, so unchanged frames are never re-sent and a slow client always
+jumps straight to the newest frame.
+
+Clients may ask for a smaller width or lower quality. Requests are quantized
+to a few shared renditions (RenditionManager), each encoded once per source
+frame no matter how many clients use it, created on the first subscriber and
+torn down after sitting idle.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    logger.warning("OpenCV not available - video encoding disabled")
+    CV2_AVAILABLE = False
+
+DEFAULT_JPEG_QUALITY = 80
+PLACEHOLDER_SIZE = (640, 480)
+
+# Rendition grid: requested width/quality snap to these values
+RENDITION_WIDTHS = (160, 320, 640)  # Wider requests get the full-resolution source
+RENDITION_QUALITIES = (40, 60, 80)
+RENDITION_IDLE_SECONDS = 30.0  # Tear down a rendition this long after its last consumer left
+
+# Placeholder texts and their (x, y) origin on the 640x480 canvas
+PLACEHOLDER_TEXT = {
+    "disconnected": ("No video - Robot disconnected", (50, 240)),
+    "waiting": ("Waiting for video...", (150, 240)),
+}
+
+_placeholders: Dict[str, bytes] = {}
+
+
+def encode_placeholders() -> Dict[str, bytes]:
+    """Render and encode the placeholder frames (once; later calls are free)"""
+    if not _placeholders and CV2_AVAILABLE:
+        import numpy as np
+        width, height = PLACEHOLDER_SIZE
+        for kind, (text, origin) in PLACEHOLDER_TEXT.items():
+            canvas = np.zeros((height, width, 3), dtype=np.uint8)
+            cv2.putText(canvas, text, origin, cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+            _, buffer = cv2.imencode('.jpg', canvas)
+            _placeholders[kind] = buffer.tobytes()
+    return _placeholders
+
+
+def get_placeholder(kind: str) -> Optional[bytes]:
+    """Pre-encoded placeholder JPEG ('disconnected' or 'waiting')"""
+    return encode_placeholders().get(kind)
+
+
+class FrameBroadcaster:
+    """
+    Latest-frame broadcast with a sequence counter
+
+    Consumers remember the last sequence number they sent and wait for a
+    newer one; intermediate frames are skipped, never queued.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self.frame: Optional[bytes] = None
+        self.frame_time = 0.0  # time.time() when the source frame was received
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Created on first use so it binds to the running loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def publish(self, frame: bytes, frame_time: float) -> None:
+        condition = self._get_condition()
+        async with condition:
+            self.frame = frame
+            self.frame_time = frame_time
+            self.seq += 1
+            condition.notify_all()
+
+    def reset(self) -> None:
+        self.frame = None
+
+    async def wait_for_frame(self, last_seq: int, timeout: Optional[float] = None
+                             ) -> Optional[Tuple[int, bytes]]:
+        """
+        Wait for a frame newer than ``last_seq``
+
+        Returns:
+            (seq, frame), or None on timeout
+        """
+        condition = self._get_condition()
+        async with condition:
+            try:
+                await asyncio.wait_for(
+                    condition.wait_for(lambda: self.seq != last_seq and self.frame is not None),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                return None
+            return self.seq, self.frame
+
+
+class FrameEncoder:
+    """
+    Encodes the newest raw video frame to JPEG while consumers are attached
+
+    ``submit`` is called for every decoded frame and only stores a reference.
+    ``acquire``/``release`` bracket a consumer (e.g. one MJPEG client); the
+    worker task runs while at least one consumer is attached.
+    """
+
+    def __init__(self, quality: int = DEFAULT_JPEG_QUALITY, width: Optional[int] = None,
+                 converter=None):
+        """
+        Args:
+            quality: JPEG quality (1-100)
+            width: Output width in pixels (aspect kept); None = source resolution
+            converter: Callable frame -> BGR ndarray, shared between renditions
+        """
+        self.quality = quality
+        self.width = width
+        self._convert = converter or (lambda frame: frame.to_ndarray(format="bgr24"))
+        self.idle_since: Optional[float] = time.monotonic()
+
+        # Latest encoded frame, shared by all consumers
+        self.broadcaster = FrameBroadcaster()
+
+        self._pending = None  # Newest raw frame not yet encoded
+        self._pending_time = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._consumers = 0
+        self._task: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jpeg-encoder")
+
+        # Metrics
+        self.frames_received = 0
+        self.frames_encoded = 0
+        self.frames_dropped = 0  # Replaced before the encoder got to them
+        self.last_encode_ms = 0.0
+        self.avg_encode_ms = 0.0  # Exponential moving average
+
+    @property
+    def consumers(self) -> int:
+        return self._consumers
+
+    @property
+    def jpeg(self) -> Optional[bytes]:
+        return self.broadcaster.frame
+
+    @property
+    def seq(self) -> int:
+        return self.broadcaster.seq
+
+    def submit(self, frame) -> None:
+        """Offer a decoded av.VideoFrame (cheap; call from the event loop)"""
+        self.frames_received += 1
+        if self._consumers == 0:
+            return
+        if self._pending is not None:
+            self.frames_dropped += 1
+        self._pending = frame
+        self._pending_time = time.time()
+        self._wakeup.set()
+
+    def acquire(self) -> None:
+        """Attach a consumer; starts encoding on the first one"""
+        self._consumers += 1
+        self.idle_since = None
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            logger.info("📹 JPEG encoder started")
+
+    def release(self) -> None:
+        """Detach a consumer; encoding stops when the last one leaves"""
+        self._consumers = max(0, self._consumers - 1)
+        if self._consumers == 0:
+            self.idle_since = time.monotonic()
+        if self._consumers == 0 and self._wakeup is not None:
+            self._pending = None
+            self._wakeup.set()  # Let the worker notice and exit
+
+    def reset(self) -> None:
+        """Forget the cached frame (e.g. on a new video track)"""
+        self.broadcaster.reset()
+        self._pending = None
+
+    def close(self) -> None:
+        """Release the worker thread (rendition torn down)"""
+        self._executor.shutdown(wait=False)
+
+    def _encode(self, frame) -> bytes:
+        img = self._convert(frame)
+        if self.width is not None and img.shape[1] > self.width:
+            height = max(1, round(img.shape[0] * self.width / img.shape[1]))
+            img = cv2.resize(img, (self.width, height), interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise RuntimeError("cv2.imencode failed")
+        return buffer.tobytes()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while self._consumers > 0:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                frame, frame_time = self._pending, self._pending_time
+                self._pending = None
+                if frame is None or not CV2_AVAILABLE:
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    jpeg = await loop.run_in_executor(self._executor, self._encode, frame)
+                except Exception as e:
+                    logger.error(f"Error encoding video frame: {e}")
+                    continue
+                self.last_encode_ms = (time.perf_counter() - start) * 1000
+                if self.frames_encoded == 0:
+                    self.avg_encode_ms = self.last_encode_ms
+                else:
+                    self.avg_encode_ms += 0.1 * (self.last_encode_ms - self.avg_encode_ms)
+                self.frames_encoded += 1
+                await self.broadcaster.publish(jpeg, frame_time)
+        finally:
+            logger.info("📹 JPEG encoder idle (no consumers)")
+
+    def get_stats(self) -> dict:
+        return {
+            "consumers": self._consumers,
+            "seq": self.seq,
+            "quality": self.quality,
+            "width": self.width,
+            "frames_received": self.frames_received,
+            "frames_encoded": self.frames_encoded,
+            "frames_dropped": self.frames_dropped,
+            "last_encode_ms": round(self.last_encode_ms, 2),
+            "avg_encode_ms": round(self.avg_encode_ms, 2),
+            "last_frame_bytes": len(self.jpeg) if self.jpeg else 0,
+        }
+
+
+def quantize_rendition(width: Optional[int], quality: Optional[int]) -> Tuple[Optional[int], int]:
+    """Snap a requested (width, quality) to the shared rendition grid"""
+    if width is not None:
+        width = next((w for w in RENDITION_WIDTHS if w >= width), None)
+    if quality is None:
+        quality = DEFAULT_JPEG_QUALITY
+    quality = min(RENDITION_QUALITIES, key=lambda q: abs(q - quality))
+    return width, quality
+
+
+class RenditionManager:
+    """
+    Shared JPEG renditions of the robot video track
+
+    Every decoded frame is offered to all live renditions. The BGR conversion
+    of a frame is done once and shared by the renditions that encode it.
+    """
+
+    def __init__(self, idle_timeout: float = RENDITION_IDLE_SECONDS):
+        self.idle_timeout = idle_timeout
+        self._renditions: Dict[Tuple[Optional[int], int], FrameEncoder] = {}
+        self._convert_lock = threading.Lock()
+        self._converted: Tuple[object, object] = (None, None)  # (frame, ndarray)
+        self._reaper: Optional[asyncio.Task] = None
+
+    def _to_bgr(self, frame):
+        """Convert a frame once, whichever rendition's worker gets to it first"""
+        with self._convert_lock:
+            cached_frame, img = self._converted
+            if cached_frame is frame:
+                return img
+            img = frame.to_ndarray(format="bgr24")
+            self._converted = (frame, img)
+            return img
+
+    def get(self, width: Optional[int] = None, quality: Optional[int] = None) -> FrameEncoder:
+        """Rendition for a request (created on first use)"""
+        key = quantize_rendition(width, quality)
+        encoder = self._renditions.get(key)
+        if encoder is None:
+            encoder = FrameEncoder(quality=key[1], width=key[0], converter=self._to_bgr)
+            self._renditions[key] = encoder
+            logger.info(f"📹 Created video rendition width={key[0] or 'source'} quality={key[1]}")
+            self._start_reaper()
+        return encoder
+
+    def peek(self, width: Optional[int] = None, quality: Optional[int] = None) -> Optional[FrameEncoder]:
+        """Existing rendition for a request, or None (never creates one)"""
+        return self._renditions.get(quantize_rendition(width, quality))
+
+    def submit(self, frame) -> None:
+        """Offer a decoded frame to every rendition"""
+        for encoder in list(self._renditions.values()):
+            encoder.submit(frame)
+        self._reap()
+
+    def reset(self) -> None:
+        for encoder in self._renditions.values():
+            encoder.reset()
+        self._converted = (None, None)
+
+    def _reap(self) -> None:
+        """Tear down renditions idle for longer than idle_timeout"""
+        now = time.monotonic()
+        for key, encoder in list(self._renditions.items()):
+            if encoder.idle_since is not None and now - encoder.idle_since > self.idle_timeout:
+                del self._renditions[key]
+                encoder.close()
+                logger.info(f"📹 Removed idle video rendition width={key[0] or 'source'} quality={key[1]}")
+
+    def _start_reaper(self) -> None:
+        """Reap idle renditions even when no frames arrive (video stopped)"""
+        if self._reaper is not None and not self._reaper.done():
+            return
+        try:
+            self._reaper = asyncio.get_running_loop().create_task(self._reap_loop())
+        except RuntimeError:
+            pass  # No event loop: submit()/get_stats() still reap
+
+    async def _reap_loop(self) -> None:
+        while self._renditions:
+            await asyncio.sleep(self.idle_timeout / 2)
+            self._reap()
+
+    def get_stats(self) -> List[dict]:
+        self._reap()
+        return [encoder.get_stats() for encoder in self._renditions.values()]
+
+
+class LatencyStats:
+    """
+    Rolling latency samples per video path ("mjpeg", "webrtc")
+
+    ``first_frame`` is request/offer to first real frame sent; ``glass_to_glass``
+    is source-frame capture to display, reported by clients.
+    """
+
+    METRICS = ("first_frame", "glass_to_glass")
+
+    def __init__(self, window: int = 200):
+        self._samples: Dict[Tuple[str, str], deque] = {}
+        self._window = window
+
+    def record(self, path: str, metric: str, latency_ms: float) -> None:
+        if metric not in self.METRICS:
+            raise ValueError(f"Unknown latency metric: {metric}")
+        key = (path, metric)
+        if key not in self._samples:
+            self._samples[key] = deque(maxlen=self._window)
+        self._samples[key].append(float(latency_ms))
+
+    def summary(self) -> dict:
+        result: Dict[str, dict] = {}
+        for (path, metric), samples in self._samples.items():
+            ordered = sorted(samples)
+            result.setdefault(path, {})[metric] = {
+                "count": len(ordered),
+                "last_ms": round(samples[-1], 1),
+                "p50_ms": round(ordered[len(ordered) // 2], 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+            }
+        return result
+
+
+_latency_instance = None
+
+def get_video_latency() -> LatencyStats:
+    """Get singleton video latency statistics"""
+    global _latency_instance
+    if _latency_instance is None:
+        _latency_instance = LatencyStats()
+    return _latency_instance
+
+
+_renditions_instance = None
+
+def get_video_renditions() -> RenditionManager:
+    """Get singleton rendition manager instance"""
+    global _renditions_instance
+    if _renditions_instance is None:
+        _renditions_instance = RenditionManager()
+    return _renditions_instance
+
+
+def get_frame_encoder() -> FrameEncoder:
+    """Default (source resolution, quality 80) rendition"""
+    return get_video_renditions().get()
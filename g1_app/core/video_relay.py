@@ -0,0 +1,221 @@
+"""
+Video Relay - Forward the robot WebRTC video track to browser peers
+
+The robot's track is wrapped in aiortc's MediaRelay, so one decoded stream
+feeds any number of local consumers: the JPEG pipeline (MJPEG fallback) and
+every browser RTCPeerConnection negotiated through the FastAPI app. This
+skips the JPEG encode and HTTP push on the WebRTC path; note that aiortc
+still re-encodes the relayed frames once per peer for its RTP sender.
+
+SyntheticVideoTrack stamps its capture time into each frame so latency can
+be measured end to end without a robot (see test_video_relay.py).
+"""
+
+import asyncio
+import fractions
+import time
+from typing import Optional, Set
+import logging
+
+from .video_pipeline import get_video_latency
+
+logger = logging.getLogger(__name__)
+
+try:
+    import av
+    import numpy as np
+    from aiortc import MediaStreamTrack, RTCPeerConnection, RTCSessionDescription, VideoStreamTrack
+    from aiortc.contrib.media import MediaRelay
+    AIORTC_AVAILABLE = True
+except ImportError:
+    logger.warning("aiortc not available - WebRTC video relay disabled")
+    AIORTC_AVAILABLE = False
+    MediaStreamTrack = VideoStreamTrack = object
+
+# Capture-time stamp: 32 bits of the millisecond clock as black/white blocks
+# along the top edge (blocks are large enough to survive VP8/H.264 encoding)
+STAMP_BITS = 32
+STAMP_BLOCK = 16
+
+
+def stamp_frame_time(img, t: float) -> None:
+    """Write ``t`` (time.time()) into the top rows of a BGR/gray image in place"""
+    value = int(t * 1000) & 0xFFFFFFFF
+    for bit in range(STAMP_BITS):
+        x = bit * STAMP_BLOCK
+        img[:STAMP_BLOCK, x:x + STAMP_BLOCK] = 255 if (value >> bit) & 1 else 0
+
+
+def read_frame_time(img, now: Optional[float] = None) -> float:
+    """
+    Recover the capture time stamped by stamp_frame_time
+
+    Args:
+        img: Decoded frame as an ndarray (BGR or gray)
+        now: Reference time used to undo the 32-bit wrap (default: time.time())
+    """
+    now = time.time() if now is None else now
+    value = 0
+    inset = STAMP_BLOCK // 4
+    for bit in range(STAMP_BITS):
+        x = bit * STAMP_BLOCK
+        block = img[inset:STAMP_BLOCK - inset, x + inset:x + STAMP_BLOCK - inset]
+        if block.mean() > 127:
+            value |= 1 << bit
+    now_ms = int(now * 1000)
+    stamped_ms = (now_ms & ~0xFFFFFFFF) | value
+    if stamped_ms > now_ms:
+        stamped_ms -= 1 << 32
+    return stamped_ms / 1000
+
+
+class SyntheticVideoTrack(VideoStreamTrack):
+    """Local test pattern track (moving bar + capture-time stamp)"""
+
+    def __init__(self, width: int = 640, height: int = 480, fps: int = 30):
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self._frame_count = 0
+        self._start = None
+        self._time_base = fractions.Fraction(1, 90000)
+
+    async def recv(self):
+        # Pace at the requested fps (VideoStreamTrack.next_timestamp is fixed at 30)
+        if self._start is None:
+            self._start = time.monotonic()
+        target = self._start + self._frame_count / self.fps
+        delay = target - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        img = np.full((self.height, self.width, 3), 32, dtype=np.uint8)
+        bar_x = (self._frame_count * 8) % self.width
+        img[STAMP_BLOCK * 2:, bar_x:bar_x + 16] = (0, 200, 255)
+        stamp_frame_time(img, time.time())
+
+        frame = av.VideoFrame.from_ndarray(img, format="bgr24")
+        frame.pts = int(self._frame_count * 90000 / self.fps)
+        frame.time_base = self._time_base
+        self._frame_count += 1
+        return frame
+
+
+class _FirstFrameTimer(MediaStreamTrack):
+    """Pass-through track that records time from offer to first frame sent"""
+
+    kind = "video"
+
+    def __init__(self, track, started: float):
+        super().__init__()
+        self._track = track
+        self._started = started
+        self._timed = False
+
+    async def recv(self):
+        frame = await self._track.recv()
+        if not self._timed:
+            self._timed = True
+            get_video_latency().record("webrtc", "first_frame", (time.monotonic() - self._started) * 1000)
+        return frame
+
+    def stop(self):
+        super().stop()
+        self._track.stop()
+
+
+class VideoRelay:
+    """
+    Fan-out of one source video track to local consumers and browser peers
+
+    A new source (e.g. after reconnecting to the robot) replaces the relay;
+    peers negotiated against the old source must send a new offer.
+    """
+
+    def __init__(self, source=None):
+        self._source = None
+        self._relay = None
+        self._peers: Set["RTCPeerConnection"] = set()
+        self.offers_handled = 0
+        if source is not None:
+            self.set_source(source)
+
+    @property
+    def has_source(self) -> bool:
+        return self._source is not None and self._source.readyState == "live"
+
+    @property
+    def peer_count(self) -> int:
+        return len(self._peers)
+
+    def set_source(self, track) -> None:
+        """Use ``track`` (e.g. conn.video's remote track) as the relay source"""
+        if not AIORTC_AVAILABLE:
+            raise RuntimeError("aiortc is not installed")
+        if track is self._source:
+            return
+        self._source = track
+        self._relay = MediaRelay()
+        logger.info("📹 Video relay source set")
+
+    def subscribe(self):
+        """New consumer track fed from the source (unbuffered: always the newest frame)"""
+        if self._source is None:
+            raise RuntimeError("Video relay has no source track")
+        return self._relay.subscribe(self._source, buffered=False)
+
+    async def handle_offer(self, sdp: str, sdp_type: str = "offer") -> "RTCSessionDescription":
+        """
+        Answer a browser's SDP offer with a peer connection carrying the relayed track
+
+        Returns:
+            Local description (answer) to send back to the browser
+        """
+        if not self.has_source:
+            raise RuntimeError("No live video source to relay")
+
+        started = time.monotonic()
+        pc = RTCPeerConnection()
+        self._peers.add(pc)
+        self.offers_handled += 1
+
+        @pc.on("connectionstatechange")
+        async def on_connectionstatechange():
+            logger.info(f"📹 Video peer connection state: {pc.connectionState}")
+            if pc.connectionState in ("failed", "closed"):
+                await self._close_peer(pc)
+
+        pc.addTrack(_FirstFrameTimer(self.subscribe(), started))
+        await pc.setRemoteDescription(RTCSessionDescription(sdp=sdp, type=sdp_type))
+        await pc.setLocalDescription(await pc.createAnswer())
+        logger.info(f"📹 Video peer added ({len(self._peers)} active)")
+        return pc.localDescription
+
+    async def _close_peer(self, pc) -> None:
+        if pc in self._peers:
+            self._peers.discard(pc)
+            await pc.close()
+            logger.info(f"📹 Video peer removed ({len(self._peers)} active)")
+
+    async def close(self) -> None:
+        """Close every peer connection"""
+        await asyncio.gather(*(self._close_peer(pc) for pc in list(self._peers)))
+
+    def get_stats(self) -> dict:
+        return {
+            "available": AIORTC_AVAILABLE,
+            "source_live": self.has_source,
+            "peers": self.peer_count,
+            "offers_handled": self.offers_handled,
+        }
+
+
+_relay_instance = None
+
+def get_video_relay() -> VideoRelay:
+    """Get singleton relay for the robot video track"""
+    global _relay_instance
+    if _relay_instance is None:
+        _relay_instance = VideoRelay()
+    return _relay_instance
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test the address cache and the happy-eyeballs connect race (no robot needed)
+
+race_addresses runs against a fake _verify with scripted per-IP delays and
+outcomes, recording when each candidate was started.
+"""
+
+import sys
+import os
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import g1_app.core.address_cache as address_cache
+from g1_app.core.address_cache import AddressCache, race_addresses
+
+MAC = "fc:23:cd:92:60:02"
+
+
+class FakeVerify:
+    """Scripted _verify: ip -> (seconds until answer, verified)"""
+
+    def __init__(self, outcomes: dict):
+        self.outcomes = outcomes
+        self.started = {}  # ip -> seconds after the race began
+        self.calls = []
+        self.t0 = time.monotonic()
+
+    async def __call__(self, ip: str, mac: str, check_mac: bool) -> bool:
+        self.calls.append(ip)
+        self.started[ip] = time.monotonic() - self.t0
+        delay, ok = self.outcomes[ip]
+        await asyncio.sleep(delay)
+        return ok
+
+
+async def run_race(outcomes: dict, candidates, discover=None, stagger: float = 0.1):
+    fake = FakeVerify(outcomes)
+    address_cache._verify = fake
+    result = await race_addresses(MAC, candidates, discover, stagger=stagger)
+    return result, fake
+
+
+async def discovered(ip: str, delay: float) -> str:
+    await asyncio.sleep(delay)
+    return ip
+
+
+async def test_race_addresses():
+    print("=" * 80)
+    print("RACE TEST (stagger, fail-fast, discovery, de-duplication)")
+    print("=" * 80)
+
+    # Stagger: a slow first candidate does not hold up the second one
+    result, fake = await run_race({"10.0.0.1": (1.0, True), "10.0.0.2": (0.05, True)},
+                                  [("10.0.0.1", "cache", True), ("10.0.0.2", "ap", False)])
+    print(f"  stagger: {result}, started {fake.started}")
+    assert result == ("10.0.0.2", "ap")
+    assert 0.08 < fake.started["10.0.0.2"] < 0.3, "second candidate joins after the stagger"
+
+    # Fail-fast: a failed attempt launches the next one without waiting out the stagger
+    result, fake = await run_race({"10.0.0.1": (0.02, False), "10.0.0.2": (0.02, True)},
+                                  [("10.0.0.1", "cache", True), ("10.0.0.2", "ap", False)], stagger=1.0)
+    print(f"  fail-fast: {result}, started {fake.started}")
+    assert result == ("10.0.0.2", "ap")
+    assert fake.started["10.0.0.2"] < 0.5, "failure must launch the next candidate immediately"
+
+    # Discovery joins ahead of candidates not yet started
+    result, fake = await run_race({"10.0.0.1": (1.0, False), "10.0.0.2": (0.02, True),
+                                   "10.0.0.9": (0.02, True)},
+                                  [("10.0.0.1", "cache", True), ("10.0.0.2", "ap", False)],
+                                  discovered("10.0.0.9", 0.05), stagger=1.0)
+    print(f"  discovery: {result}, calls {fake.calls}")
+    assert result == ("10.0.0.9", "discovery")
+    assert fake.calls == ["10.0.0.1", "10.0.0.9"]
+
+    # De-duplication: each IP is verified once, also when discovery finds a known one
+    result, fake = await run_race({"10.0.0.1": (0.01, False), "10.0.0.2": (0.01, False)},
+                                  [("10.0.0.1", "cache", True), ("10.0.0.1", "ap", False),
+                                   ("10.0.0.2", "cache", True)],
+                                  discovered("10.0.0.1", 0.0))
+    print(f"  de-duplication: {result}, calls {fake.calls}")
+    assert result == (None, None)
+    assert sorted(fake.calls) == ["10.0.0.1", "10.0.0.2"]
+    print("\n✅ Race test passed")
+
+
+def test_atomic_save():
+    print("=" * 80)
+    print("SAVE TEST (temp file + replace)")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "addresses.json"
+        cache = AddressCache(path)
+        cache.record(MAC, "192.168.86.3", mode="STA-L", connected=True)
+        saved = json.loads(path.read_text())
+        assert saved[MAC][0]["ip"] == "192.168.86.3"
+
+        # A failed write leaves the previous file intact and no temp file behind
+        cache._robots["bad"] = [{"ip": object()}]
+        cache.save()
+        assert json.loads(path.read_text()) == saved, "failed save must not truncate the cache"
+        assert [p.name for p in Path(tmp).iterdir()] == ["addresses.json"]
+        assert AddressCache(path).addresses(MAC)[0]["ip"] == "192.168.86.3"
+    print("  failed save kept the previous cache readable")
+    print("\n✅ Save test passed")
+
+
+async def main():
+    await test_race_addresses()
+    test_atomic_save()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test the connection supervisor against a fake controller (no robot needed)
+
+The fake link delivers messages until it is "cut"; the watchdog must declare
+it dead after SILENCE_TIMEOUT, back off through failing reconnects, replay the
+subscriptions once a reconnect succeeds, and record a timeline per attempt.
+A reconnected link that never delivers a message must be declared dead too.
+"""
+
+import sys
+import os
+import asyncio
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import g1_app.core.connection_supervisor as supervision
+from g1_app.core.connection_supervisor import ConnectionSupervisor
+
+supervision.SILENCE_TIMEOUT = 0.3
+supervision.WATCHDOG_INTERVAL = 0.05
+supervision.BACKOFF_INITIAL = 0.05
+
+
+class FakeController:
+    def __init__(self):
+        self.conn = None
+        self.connected = True
+        self.robot_ip = "192.168.123.161"
+        self._subscriptions = {"rt/lf/sportmodestate"}
+        self.supervisor = ConnectionSupervisor(self)
+        self.failures_left = 2
+        self.replayed = 0
+        self.events = []
+
+    def _mark_link_lost(self, reason):
+        self.connected = False
+        self.events.append(("lost", reason))
+
+    async def _reconnect(self):
+        await asyncio.sleep(0.01)
+        if self.failures_left:
+            self.failures_left -= 1
+            raise ConnectionError("robot not answering")
+        self.supervisor.mark("ice")
+        self.supervisor.mark("datachannel")
+        self.replayed += len(self._subscriptions)
+        self.connected = True
+        self.events.append(("reconnected", self.robot_ip))
+
+
+async def test_reconnect():
+    print("=" * 80)
+    print("CONNECTION SUPERVISOR TEST (fake link, no robot)")
+    print("=" * 80)
+
+    controller = FakeController()
+    supervisor = controller.supervisor
+    resolved = []
+
+    async def resolver():
+        resolved.append(time.monotonic())
+        return "192.168.123.200"
+
+    supervisor.resolver = resolver
+    supervisor.begin("connect", discover_ms=12.0)
+    supervisor.start()
+
+    # Healthy link: messages keep the watchdog quiet
+    for _ in range(10):
+        supervisor.note_message(first_state=True)
+        await asyncio.sleep(0.05)
+    assert controller.events == [] and supervisor.state == "connected"
+    print(f"\nInitial connect phases: {supervisor.current.to_dict()['phases']}")
+    assert supervisor.current.phases["discover"] == 12.0
+
+    # Cut the link
+    cut = time.monotonic()
+    while not controller.events or supervisor.state != "connected":
+        await asyncio.sleep(0.01)
+    recovered = time.monotonic() - cut
+    supervisor.note_message(first_state=True)
+
+    stats = supervisor.get_stats()
+    print(f"  Events: {controller.events}")
+    print(f"  Recovered after {recovered * 1000:.0f} ms, drops {stats['drops']}, reconnects {stats['reconnects']}")
+    for timeline in stats["history"]:
+        print(f"  #{timeline['attempt']} {timeline['reason']}: {timeline['phases']} error={timeline['error']}")
+
+    assert controller.events[0][0] == "lost" and "no messages" in controller.events[0][1]
+    assert controller.events[-1] == ("reconnected", "192.168.123.200")
+    assert stats["drops"] == 1 and stats["reconnects"] == 1
+    assert len(stats["history"]) == 4  # connect + 2 failed + 1 successful reconnect
+    assert [t["error"] for t in stats["history"][1:3]] == ["robot not answering"] * 2
+    assert all(v is not None for v in stats["current"]["phases"].values())
+    assert controller.replayed == 1
+    # Backoff: gaps between attempts grow
+    gaps = [b - a for a, b in zip(resolved, resolved[1:])]
+    assert gaps[1] > gaps[0], gaps
+
+    print("\nReconnected link that stays silent:")
+    # Drop 2 ends in a reconnect that never delivers a message; that session must drop too
+    started = time.monotonic()
+    while supervisor.get_stats()["drops"] < 3:
+        assert time.monotonic() - started < 3.0, "silent session after reconnect was never detected"
+        await asyncio.sleep(0.01)
+    lost = [event for event in controller.events if event[0] == "lost"]
+    print(f"  Drops: {lost[1:]} within {(time.monotonic() - started) * 1000:.0f} ms")
+    assert all("no messages" in reason for _, reason in lost)
+
+    await supervisor.stop()
+    assert supervisor.state == "stopped"
+    print("\n✅ Connection supervisor test passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_reconnect())
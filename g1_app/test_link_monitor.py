@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test link-quality measurement and the shedding policy (no robot needed)
+
+Feeds synthetic sportmodestate arrivals and request/response pairs with
+explicit timestamps, then walks the policy through a congested period and a
+recovery: stages must shed one at a time (debug, lidar, video) and come back
+in reverse order only after the link has stayed good for restore_after.
+Video shed across a reconnect must come back on the new connection.
+"""
+
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from g1_app.core.link_monitor import LinkMonitor, SheddingPolicy, PROBE_TOPIC, PROBE_RESPONSE_TOPIC
+from g1_app.core.robot_controller import RobotController
+
+
+class FakeController:
+    connected = True
+
+    def __init__(self):
+        self.changes = []
+
+    async def set_group_shed(self, group, shed):
+        self.changes.append((group, shed))
+
+
+class FakeVideo:
+    def __init__(self):
+        self.switches = []
+        self.track_callbacks = []
+
+    def switchVideoChannel(self, switch):
+        self.switches.append(switch)
+
+    def add_track_callback(self, callback):
+        self.track_callbacks.append(callback)
+
+
+class FakePubSub:
+    def subscribe(self, topic, callback=None):
+        pass
+
+
+class FakeConn:
+    def __init__(self):
+        self.video = FakeVideo()
+        self.datachannel = type("DataChannel", (), {})()
+        self.datachannel.pub_sub = FakePubSub()
+
+
+def response(api_id: int) -> dict:
+    return {"type": "res", "data": {"header": {"identity": {"id": 1, "api_id": api_id}}, "data": "{}"}}
+
+
+def feed(monitor: LinkMonitor, start: float, seconds: float, gap_ms: float, rtt_ms: float) -> float:
+    """State messages every gap_ms and one request/response pair per second"""
+    t = start
+    next_request = start
+    while t < start + seconds:
+        monitor.note_message("rt/lf/sportmodestate", {}, now=t)
+        if t >= next_request:
+            monitor.note_request(PROBE_TOPIC, {"api_id": 7001, "parameter": "{}"}, now=t)
+            monitor.note_message(PROBE_RESPONSE_TOPIC, response(7001), now=t + rtt_ms / 1000)
+            next_request += 1.0
+        t += gap_ms / 1000
+    return t
+
+
+async def run(monitor: LinkMonitor, start: float, seconds: float, gap_ms: float, rtt_ms: float) -> float:
+    """Feed one second at a time and evaluate after each, like the monitor loop"""
+    t = start
+    for _ in range(int(seconds)):
+        t = feed(monitor, t, 1.0, gap_ms, rtt_ms)
+        action = monitor.evaluate(now=t)
+        if action:
+            await monitor._apply(*action)
+    return t
+
+
+async def test_link_monitor():
+    print("=" * 80)
+    print("LINK MONITOR TEST (synthetic link, no robot)")
+    print("=" * 80)
+
+    controller = FakeController()
+    monitor = LinkMonitor(controller, SheddingPolicy(restore_after=5.0))
+
+    print("\nHealthy link (50 ms state gaps, 20 ms RTT):")
+    t = await run(monitor, 1000.0, 5, gap_ms=50, rtt_ms=20)
+    metrics = monitor.metrics(now=t)
+    print(f"  {metrics}")
+    assert 45 <= metrics["gap_ms"] <= 55 and 19 <= metrics["rtt_ms"] <= 21
+    assert controller.changes == []
+
+    print("\nCongested link (500 ms gaps, 800 ms RTT):")
+    t = await run(monitor, t, 15, gap_ms=500, rtt_ms=800)
+    print(f"  Shed: {monitor.shed}, changes: {controller.changes}")
+    assert controller.changes == [("debug", True), ("lidar", True), ("video", True)]
+
+    print("\nRecovery:")
+    t = await run(monitor, t, 4, gap_ms=50, rtt_ms=20)
+    assert monitor.shed == ["debug", "lidar", "video"], "restored before restore_after"
+    t = await run(monitor, t, 30, gap_ms=50, rtt_ms=20)
+    print(f"  Shed: {monitor.shed}, changes: {controller.changes[3:]}")
+    assert controller.changes[3:] == [("video", False), ("lidar", False), ("debug", False)]
+
+    print("\nLost request:")
+    monitor.note_request(PROBE_TOPIC, {"api_id": 7001, "parameter": "{}"}, now=t)
+    monitor.evaluate(now=t + 3)
+    assert monitor.lost == 1
+    stats = monitor.get_stats()
+    print(f"  requests {stats['requests']}, responses {stats['responses']}, lost {stats['lost']}")
+    print(f"  Events: {[(e['action'], e['group']) for e in stats['events']]}")
+
+    print("\nPolicy from dict:")
+    policy = SheddingPolicy.from_dict({"shed_after": 3, "stages": [{"group": "video", "rtt_ms": 400, "gap_ms": 300}]})
+    print(f"  {policy.to_dict()}")
+    assert policy.shed_after == 3 and [s.group for s in policy.stages] == ["video"]
+
+    await test_video_shed_across_reconnect()
+
+    print("\n✅ Link monitor test passed")
+
+
+async def test_video_shed_across_reconnect():
+    print("\nVideo shed, reconnect, restore:")
+    robot = RobotController("192.168.123.161", "E21D1000PAHBMB06")
+    first = robot.conn = FakeConn()
+    robot._subscribe_to_video()
+    await robot.set_group_shed("video", True)
+    assert first.video.switches == [True, False]
+
+    # Reconnect while shed: video must not be replayed yet
+    second = robot.conn = FakeConn()
+    await robot._replay_subscriptions()
+    assert second.video.track_callbacks == [] and second.video.switches == []
+
+    await robot.set_group_shed("video", False)
+    print(f"  New connection: switches {second.video.switches}, "
+          f"{len(second.video.track_callbacks)} track callback(s)")
+    assert second.video.switches == [True] and len(second.video.track_callbacks) == 1, \
+        "restore must register the track callback on the new connection"
+
+    # Shedding and restoring again on the same connection only toggles the channel
+    await robot.set_group_shed("video", True)
+    await robot.set_group_shed("video", False)
+    assert second.video.switches == [True, False, True] and len(second.video.track_callbacks) == 1
+
+
+if __name__ == "__main__":
+    asyncio.run(test_link_monitor())
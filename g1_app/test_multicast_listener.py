@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test the always-on multicast listener against a local sender (no robot needed)
+
+A stand-in "robot" socket sends RTPS-style and raw announcements to a test
+group with multicast loopback enabled; the listener must count every one per
+source, record the RTPS GUID prefix, ignore discovery probes, and deliver each
+announcement to the callback without any polling window.
+"""
+
+import sys
+import os
+import asyncio
+import socket
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import g1_app.utils.multicast_listener as multicast
+from g1_app.utils.multicast_listener import DISCOVERY_PROBE, MulticastListener
+
+TEST_GROUP = "239.255.74.1"  # Administratively scoped; keeps the real 231.1.1.2 group untouched
+TEST_PORT = 17400
+ANNOUNCEMENTS = 20
+GUID_PREFIX = bytes(range(1, 13))
+
+
+def rtps_announcement() -> bytes:
+    """Minimal RTPS header: magic, version 2.3, vendor id, GUID prefix"""
+    return b"RTPS" + bytes([2, 3, 0x01, 0x0F]) + GUID_PREFIX + b"\0" * 16
+
+
+def make_sender() -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+    return sock
+
+
+async def test_multicast_listener():
+    print("=" * 80)
+    print("MULTICAST LISTENER TEST (local sender, no robot)")
+    print("=" * 80)
+
+    received = []
+    latencies = []
+    sent_at = {}
+
+    def on_announcement(announcement):
+        received.append(announcement)
+        if announcement.size in sent_at:
+            latencies.append((time.monotonic() - sent_at.pop(announcement.size)) * 1000)
+
+    listener = MulticastListener(on_announcement, group=TEST_GROUP, port=TEST_PORT)
+    assert await listener.start(), "Could not join the test multicast group"
+    sender = make_sender()
+
+    print(f"\nSending {ANNOUNCEMENTS} announcements (spaced, as a robot would)...")
+    for i in range(ANNOUNCEMENTS):
+        payload = rtps_announcement() if i % 2 == 0 else b"G1 hello" + bytes(i)
+        sent_at[len(payload)] = time.monotonic()
+        sender.sendto(payload, (TEST_GROUP, TEST_PORT))
+        await asyncio.sleep(0.02)
+    sender.sendto(DISCOVERY_PROBE, (TEST_GROUP, TEST_PORT))
+    await asyncio.sleep(0.2)
+
+    stats = listener.get_stats()
+    source = next(iter(stats["sources"].values()), None)
+    print(f"  Received: {stats['received']}, ignored: {stats['ignored']}, sources: {list(stats['sources'])}")
+    if latencies:
+        print(f"  Delivery latency: max {max(latencies):.2f} ms")
+
+    assert len(received) == ANNOUNCEMENTS, f"expected {ANNOUNCEMENTS} announcements, got {len(received)}"
+    assert stats["ignored"] == 1, "discovery probe should be ignored"
+    assert len(stats["sources"]) == 1 and source["count"] == ANNOUNCEMENTS
+    assert source["guid_prefix"] == GUID_PREFIX.hex()
+    assert sum(a.kind == "rtps" for a in received) == ANNOUNCEMENTS // 2
+
+    listener.stop()
+    sender.close()
+    assert not listener.active
+
+    print("\nMany senders on the group:")
+    for i in range(multicast.MAX_SOURCES * 2):
+        listener._on_datagram(rtps_announcement(), (f"10.0.{i // 250}.{i % 250 + 1}", 7400))
+    assert len(listener.sources) == multicast.MAX_SOURCES
+    oldest = next(iter(listener.sources))
+    listener._on_datagram(rtps_announcement(), (oldest, 7400))
+    assert list(listener.sources)[-1] == oldest, "a sender heard again becomes the most recent"
+    # Two senders silent for SOURCE_TTL both make way for one new sender
+    for ip in list(listener.sources)[:2]:
+        listener.sources[ip].last_seen -= multicast.SOURCE_TTL
+    listener._on_datagram(rtps_announcement(), ("10.9.9.9", 7400))
+    print(f"  Tracked {len(listener.sources)}, dropped {listener.sources_dropped}")
+    assert len(listener.sources) == multicast.MAX_SOURCES - 1
+    print("\n✅ Multicast listener test passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_multicast_listener())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test the non-blocking discovery helpers (no robot needed)
+
+Parses sample /proc/net/arp and /proc/net/route files and probes loopback
+TCP ports, so the discovery loop can be checked on any Linux host.
+"""
+
+import sys
+import os
+import asyncio
+import socket
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from g1_app.utils.neighbor_table import (find_ip, find_mac, icmp_probe, network_mode, probe_host,
+                                         read_arp_table, read_routes, tcp_probe)
+
+ARP_TABLE = """IP address       HW type     Flags       HW address            Mask     Device
+192.168.86.3     0x1         0x2         FC:23:CD:92:60:02     *        wlan0
+192.168.86.20    0x1         0x0         00:00:00:00:00:00     *        wlan0
+192.168.86.21    0x1         0x2         00:00:00:00:00:00     *        wlan0
+192.168.12.1     0x1         0x6         fc:23:cd:92:60:03     *        eth1
+"""
+
+# wlan0: default via 192.168.86.1, 192.168.86.0/24 connected; eth1: 192.168.12.0/24; docker0 down
+ROUTE_TABLE = """Iface\tDestination\tGateway \tFlags\tRefCnt\tUse\tMetric\tMask\t\tMTU\tWindow\tIRTT
+wlan0\t00000000\t0156A8C0\t0003\t0\t0\t600\t00000000\t0\t0\t0
+wlan0\t0056A8C0\t00000000\t0001\t0\t0\t600\t00FFFFFF\t0\t0\t0
+eth1\t000CA8C0\t00000000\t0001\t0\t0\t100\t00FFFFFF\t0\t0\t0
+docker0\t000011AC\t00000000\t0000\t0\t0\t0\t0000FFFF\t0\t0\t0
+"""
+
+
+def write_temp(text: str) -> str:
+    f = tempfile.NamedTemporaryFile("w", delete=False)
+    f.write(text)
+    f.close()
+    return f.name
+
+
+def test_proc_tables():
+    print("=" * 80)
+    print("PROC TABLE TEST (/proc/net/arp and /proc/net/route parsing)")
+    print("=" * 80)
+
+    arp_path, route_path = write_temp(ARP_TABLE), write_temp(ROUTE_TABLE)
+    try:
+        entries = read_arp_table(arp_path)
+        routes = read_routes(route_path)
+    finally:
+        os.unlink(arp_path)
+        os.unlink(route_path)
+
+    print(f"  ARP: {[(e.ip, e.mac, e.device) for e in entries]}")
+    assert [e.ip for e in entries] == ["192.168.86.3", "192.168.12.1"], "incomplete entries skipped"
+    assert find_mac("FC:23:CD:92:60:02", entries).ip == "192.168.86.3"
+    assert find_ip("192.168.12.1", entries).device == "eth1"
+    assert find_ip("192.168.86.20", entries) is None
+    assert read_arp_table("/nonexistent/arp") is None, "missing table means non-Linux"
+
+    print(f"  routes: {[(str(r.network), r.device, r.gateway) for r in routes]}")
+    assert [str(r.network) for r in routes] == ["0.0.0.0/0", "192.168.86.0/24", "192.168.12.0/24"]
+    assert routes[0].gateway == "192.168.86.1" and routes[1].gateway is None
+    assert network_mode("192.168.86.3", routes) == "STA-L"
+    assert network_mode("10.1.2.3", routes) == "STA-T", "reachable only via the default route"
+    assert network_mode("192.168.12.1", routes) == "AP"
+    print("\n✅ Proc table test passed")
+
+
+async def test_probes():
+    print("=" * 80)
+    print("PROBE TEST (TCP handshake/refusal, ICMP never raises)")
+    print("=" * 80)
+
+    server = await asyncio.start_server(lambda r, w: w.close(), "127.0.0.1", 0)
+    open_port = server.sockets[0].getsockname()[1]
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        closed_port = s.getsockname()[1]
+
+    assert await tcp_probe("127.0.0.1", open_port)
+    assert await tcp_probe("127.0.0.1", closed_port), "a refused connection still proves the host is up"
+    assert await probe_host("127.0.0.1", ports=(open_port,), timeout=0.5)
+    icmp = await icmp_probe("127.0.0.1", timeout=0.5)
+    print(f"  tcp open/closed alive, icmp -> {icmp} (None = no ICMP socket permission)")
+    assert icmp in (True, None)
+    server.close()
+    await server.wait_closed()
+    print("\n✅ Probe test passed")
+
+
+async def main():
+    test_proc_tables()
+    await test_probes()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test the recording catalog manifest (no robot needed)
+
+Recordings are written to a temp directory and indexed; manifest commits are
+then made to fail to check that delete and rename roll the files back.
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from g1_app.core.recording_catalog import RecordingCatalog
+from g1_app.core.teach_mode_format import write_recording
+
+
+def write(directory: Path, name: str, samples: int = 10) -> Path:
+    path = directory / f"{name}.g1rec"
+    write_recording(path, np.linspace(0.0, 1.0, samples), np.zeros((samples, 2)), ["a", "b"], created_at=1.0)
+    return path
+
+
+def failing_commit(entries):
+    raise OSError("disk full")
+
+
+def test_commit_and_rollback():
+    print("=" * 80)
+    print("CATALOG TEST (commit, external writer, rollback)")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        catalog = RecordingCatalog(tmp)
+        catalog.add("wave", write(tmp, "wave", samples=25))
+        catalog.add("bow", write(tmp, "bow"))
+        assert sorted(catalog.names()) == ["bow", "wave"]
+        assert catalog.get("wave").sample_count == 25
+        print(f"  indexed {catalog.names()}")
+
+        # Another process's commit is picked up through the manifest mtime
+        other = RecordingCatalog(tmp)
+        assert other.rename("bow", "curtsy")
+        assert sorted(catalog.names()) == ["curtsy", "wave"]
+        print("  rename by a second writer visible to the first")
+
+        # Failed commit during delete: file and entry stay
+        catalog._commit = failing_commit
+        try:
+            catalog.remove("wave")
+            raise AssertionError("remove must re-raise the commit failure")
+        except OSError:
+            pass
+        assert (tmp / "wave.g1rec").exists() and not (tmp / "wave.g1rec.deleting").exists()
+        assert "wave" in catalog
+
+        # Failed commit during rename: file moved back
+        try:
+            catalog.rename("wave", "hello")
+            raise AssertionError("rename must re-raise the commit failure")
+        except OSError:
+            pass
+        assert (tmp / "wave.g1rec").exists() and not (tmp / "hello.g1rec").exists()
+        assert "hello" not in catalog
+        print("  failed commits rolled delete and rename back")
+        del catalog._commit
+
+        assert catalog.remove("wave") and not (tmp / "wave.g1rec").exists()
+        assert catalog.names() == ["curtsy"]
+
+        # An unreadable manifest is rebuilt from the recording headers
+        (tmp / "catalog.json").write_text("{not json")
+        assert RecordingCatalog(tmp).names() == ["curtsy"]
+        print("  corrupt manifest rebuilt from data files")
+    print("\n✅ Catalog test passed")
+
+
+if __name__ == "__main__":
+    test_commit_and_rollback()
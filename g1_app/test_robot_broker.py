@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test the robot broker with two local clients (no robot needed)
+
+A fake controller stands in for RobotController: it records the topics the
+broker subscribes and answers forwarded requests. Two BrokerConnections share
+it; small messages must arrive inline, point-cloud sized ones through shared
+memory, requests must come back to the right client, and a client leaving
+must drop only its own subscriptions.
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from g1_app.core.broker_client import BrokerConnection
+from g1_app.core.broker_protocol import ShmRing, attach_shared_memory, pack_frame, read_slot, unpack_frame
+from g1_app.core.robot_broker import RobotBroker
+
+
+class FakePubSub:
+    def __init__(self):
+        self.published = []
+
+    async def publish_request_new(self, topic, data):
+        await asyncio.sleep(0.01)
+        return {"type": "res", "topic": topic.replace("request", "response"),
+                "data": {"header": {"identity": {"api_id": data["api_id"]}}, "data": "{\"data\": 801}"}}
+
+    async def publish_request(self, topic, data):
+        raise RuntimeError("audio service offline")
+
+    def publish_without_callback(self, topic, data):
+        self.published.append((topic, data))
+
+
+class FakeConn:
+    def __init__(self):
+        self.datachannel = type("DataChannel", (), {})()
+        self.datachannel.pub_sub = FakePubSub()
+
+
+class FakeController:
+    def __init__(self):
+        self.connected = True
+        self.robot_ip = "192.168.123.161"
+        self.serial_number = "E21D1000PAHBMB06"
+        self.conn = FakeConn()
+        self._subscriptions = {"rt/lf/sportmodestate"}  # Already subscribed by the app
+        self.listeners = {}
+
+    def add_topic_listener(self, topic, callback):
+        self.listeners.setdefault(topic, []).append(callback)
+
+    def remove_topic_listener(self, topic, callback):
+        self.listeners[topic].remove(callback)
+
+    def subscribe_raw(self, topic):
+        if topic in self._subscriptions:
+            return False
+        self._subscriptions.add(topic)
+        return True
+
+    def unsubscribe_raw(self, topic):
+        self._subscriptions.discard(topic)
+
+    def deliver(self, topic, message):
+        for callback in self.listeners.get(topic, []):
+            callback(message)
+
+
+async def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.005)
+
+
+def test_shm_ring():
+    print("\nShared memory ring:")
+    ring = ShmRing(slots=2)
+    frames = [pack_frame({"n": i}, {"data": bytes([i]) * 100_000}) for i in range(3)]
+    name0, seq0 = ring.write(frames[0])
+    segment = attach_shared_memory(name0)
+    header, payload = unpack_frame(read_slot(segment, seq0))
+    assert header["n"] == 0 and payload["data"] == bytes([0]) * 100_000
+    ring.write(frames[1])
+    ring.write(frames[2])  # Reuses slot 0
+    assert read_slot(segment, seq0) is None, "overwritten slot must be detected"
+    print("  Round trip and overwrite detection OK")
+    segment.close()
+    ring.close()
+
+
+async def test_broker():
+    print("=" * 80)
+    print("ROBOT BROKER TEST (fake robot, two local clients)")
+    print("=" * 80)
+    test_shm_ring()
+
+    controller = FakeController()
+    socket_path = os.path.join(tempfile.mkdtemp(), "broker.sock")
+    broker = RobotBroker(controller, socket_path)
+    await broker.start()
+
+    ui = BrokerConnection(socket_path, name="ui", ip="ignored", serialNumber="ignored")
+    mapper = BrokerConnection(socket_path, name="mapper")
+    await ui.connect()
+    await mapper.connect()
+    assert ui.robot_ip == controller.robot_ip and ui.robot_connected
+
+    states, ui_clouds, mapper_clouds = [], [], []
+    ui.datachannel.pub_sub.subscribe("rt/lf/sportmodestate", states.append)
+    ui.datachannel.pub_sub.subscribe("rt/unitree/slam_mapping/points", ui_clouds.append)
+    mapper.datachannel.pub_sub.subscribe("rt/unitree/slam_mapping/points", mapper_clouds.append)
+    await wait_for(lambda: len(controller.listeners.get("rt/unitree/slam_mapping/points", [])) == 1)
+    assert "rt/unitree/slam_mapping/points" in controller._subscriptions
+
+    print("\nFan-out:")
+    controller.deliver("rt/lf/sportmodestate", {"topic": "rt/lf/sportmodestate", "data": {"mode": 1}})
+    points = np.random.rand(200_000, 3).astype(np.float32)  # 2.4 MB
+    started = time.monotonic()
+    controller.deliver("rt/unitree/slam_mapping/points", {"data": {"points": points, "point_count": len(points)}})
+    await wait_for(lambda: states and ui_clouds and mapper_clouds)
+    print(f"  2.4 MB point cloud delivered to both clients in {(time.monotonic() - started) * 1000:.1f} ms")
+    assert states[0]["data"]["mode"] == 1
+    for clouds in (ui_clouds, mapper_clouds):
+        assert np.array_equal(clouds[0]["data"]["points"], points)
+    assert broker.shm_messages == 1, "large message should use shared memory"
+
+    print("\nForwarded commands:")
+    response = await mapper.datachannel.pub_sub.publish_request_new("rt/api/sport/request", {"api_id": 7001})
+    assert response["data"]["header"]["identity"]["api_id"] == 7001
+    try:
+        await ui.datachannel.pub_sub.publish_request("rt/api/audio/command", {"api_id": 1})
+        assert False, "error should propagate"
+    except RuntimeError as e:
+        print(f"  Error propagated: {e}")
+    ui.datachannel.pub_sub.publish_without_callback("rt/wirelesscontroller", {"lx": 0.0, "ly": 0.5})
+    await wait_for(lambda: controller.conn.datachannel.pub_sub.published)
+    assert controller.conn.datachannel.pub_sub.published == [("rt/wirelesscontroller", {"lx": 0.0, "ly": 0.5})]
+
+    print("\nClient leaving:")
+    await mapper.disconnect()
+    await wait_for(lambda: len(broker.clients) == 1)
+    assert "rt/unitree/slam_mapping/points" in controller._subscriptions  # ui still wants it
+    await ui.disconnect()
+    await wait_for(lambda: not broker.clients)
+    assert controller._subscriptions == {"rt/lf/sportmodestate"}, "only broker-owned topics are dropped"
+    print(f"  Stats: {broker.get_stats()}")
+
+    await broker.stop()
+    assert not os.path.exists(socket_path)
+    print("\n✅ Robot broker test passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_broker())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Test the native RTPS SPDP parser and listener (no robot, no ddsls needed)
+
+SPDP_FIXTURE is a participant announcement laid out byte-for-byte like a
+CycloneDDS DATA(p) (RTPS 2.1 header, INFO_TS, PL_CDR_LE parameter list with
+GUID, locators, user data, entity name and lease). It was synthesized from the
+RTPS specification, not captured from a robot; the variants below are built
+with the same helpers (big-endian, newer sequence number, dispose, SEDP
+traffic, truncation).
+"""
+
+import sys
+import os
+import asyncio
+import socket
+import struct
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from g1_app.core.dds_discovery import DDSDiscovery
+from g1_app.core.rtps_spdp import SpdpListener, SpdpParticipant, SpdpTable, parse_rtps_spdp, spdp_port
+
+GUID_PREFIX = bytes.fromhex("0110a3c5e2f1000000000001")
+GUID = GUID_PREFIX.hex() + "000001c1"
+
+SPDP_FIXTURE = bytes.fromhex(
+    "52545053020101100110a3c5e2f1000000000001090108000078e76800000000"
+    "1505c40000001000000100c7000100c200000000010000000003000015000400"
+    "020100001600040001100000500010000110a3c5e2f1000000000001000001c1"
+    "3100180001000000f21c0000000000000000000000000000c0a87ba132001800"
+    "01000000f31c0000000000000000000000000000c0a87ba13300180001000000"
+    "e81c0000000000000000000000000000efff00012c000c000700000047315f36"
+    "39333700620010000b000000756e69747265655f67310000020008000a000000"
+    "0000000001000000"
+)
+
+
+def locator(ip: str, port: int, e: str) -> bytes:
+    return struct.pack(e + "iI", 1, port) + b"\0" * 12 + socket.inet_aton(ip)
+
+
+def parameter(pid: int, value: bytes, e: str) -> bytes:
+    value += b"\0" * (-len(value) % 4)
+    return struct.pack(e + "HH", pid, len(value)) + value
+
+
+def spdp_packet(sn: int, ip: str = "192.168.123.161", little: bool = True,
+                dispose: bool = False, writer_id: str = "000100c2") -> bytes:
+    """DATA(p) like SPDP_FIXTURE, with the given variations"""
+    e = "<" if little else ">"
+    flags = 0x01 if little else 0x00
+    inline_qos = b""
+    if dispose:
+        flags |= 0x02
+        inline_qos = parameter(0x71, bytes([0, 0, 0, 3]), e) + struct.pack(e + "HH", 1, 0)
+    else:
+        flags |= 0x04
+    params = b"".join([
+        parameter(0x50, GUID_PREFIX + b"\0\0\1\xc1", e),
+        parameter(0x31, locator(ip, 7410, e), e),
+        parameter(0x2C, struct.pack(e + "I", 7) + b"G1_6937", e),
+        parameter(0x02, struct.pack(e + "iI", 10, 0), e),
+        struct.pack(e + "HH", 1, 0),
+    ])
+    payload = b"" if dispose else struct.pack(">HH", 3 if little else 2, 0) + params
+    body = (struct.pack(e + "HH", 0, 16) + bytes.fromhex("000100c7") + bytes.fromhex(writer_id)
+            + struct.pack(e + "iI", 0, sn) + inline_qos + payload)
+    return (b"RTPS" + bytes([2, 1, 1, 0x10]) + GUID_PREFIX
+            + bytes([0x15, flags]) + struct.pack(e + "H", len(body)) + body)
+
+
+def test_fixture():
+    print("\nRecorded-layout fixture:")
+    table = SpdpTable()
+    [(participant, removed)] = table.feed(SPDP_FIXTURE, "192.168.123.161")
+    print(f"  GUID {participant.guid}, vendor {participant.vendor_id}, locators {participant.locators}")
+    assert not removed
+    assert participant.guid == GUID
+    assert participant.vendor_id == "0110" and participant.protocol_version == "2.1"
+    assert participant.locators["default_unicast"] == [("192.168.123.161", 7410)]
+    assert participant.locators["metatraffic_unicast"] == [("192.168.123.161", 7411)]
+    assert participant.locators["metatraffic_multicast"] == [("239.255.0.1", 7400)]
+    assert participant.user_data_text == "G1_6937"
+    assert participant.entity_name == "unitree_g1"
+    assert participant.lease_duration == 10.0
+    assert participant.ip == "192.168.123.161"
+
+
+def test_incremental_updates():
+    print("\nIncremental updates:")
+    table = SpdpTable()
+    table.feed(SPDP_FIXTURE, "192.168.123.161", now=100.0)
+    participant = table.participants[GUID]
+
+    # Periodic repeat (same sequence number): liveness only
+    table.feed(SPDP_FIXTURE, "192.168.123.161", now=105.0)
+    assert participant.announcements == 2 and participant.last_seen == 105.0
+
+    # Newer announcement with a moved locator, big-endian this time
+    table.feed(spdp_packet(2, ip="192.168.123.200", little=False), "192.168.123.200", now=106.0)
+    assert participant.locators["default_unicast"] == [("192.168.123.200", 7410)]
+    assert participant.entity_name == "unitree_g1"  # Not in this announcement: kept
+    print(f"  After 3 announcements: {participant.ip}, seq {participant.sequence}")
+
+    # Stale (older) announcement does not roll the locator back
+    table.feed(spdp_packet(1, ip="10.0.0.1"), "10.0.0.1", now=107.0)
+    assert participant.ip == "192.168.123.200"
+
+    # Lease expiry (10 s)
+    assert table.expire(now=115.0) == []
+    assert [p.guid for p in table.expire(now=118.0)] == [GUID]
+    assert not table.participants
+
+
+def test_dispose_and_noise():
+    print("\nDispose and non-SPDP traffic:")
+    table = SpdpTable()
+    table.feed(SPDP_FIXTURE)
+    [(participant, removed)] = table.feed(spdp_packet(3, dispose=True))
+    assert removed and GUID not in table.participants
+
+    assert parse_rtps_spdp(spdp_packet(1, writer_id="000003c2")) == []  # SEDP publications writer
+    assert parse_rtps_spdp(b"G1_DISCOVERY") == []
+    for cut in (8, 24, 60, len(SPDP_FIXTURE) - 5):
+        table.feed(SPDP_FIXTURE[:cut])  # Must not raise
+    print(f"  {table.datagrams} datagrams, {table.malformed} malformed, {len(table.participants)} participants")
+
+
+def test_discovery_keys():
+    print("\nDDSDiscovery with identical user data on two hosts:")
+    discovery = DDSDiscovery()
+    hosts = {"192.168.123.161": ["01" * 12 + "000001c1", "02" * 12 + "000001c1"],
+             "192.168.123.162": ["03" * 12 + "000001c1"]}
+    participants = []
+    for ip, guids in hosts.items():
+        for guid in guids:
+            participant = SpdpParticipant(guid=guid, source_ip=ip, user_data=b"enclave=/;")
+            participants.append(participant)
+            discovery._on_participant(participant, False)
+    robots = discovery.get_robots()
+    print(f"  {[(ip, robot.name) for ip, robot in robots.items()]}")
+    assert sorted(robots) == sorted(hosts), "hosts with the same announced name must stay apart"
+    assert all(robot.ip == ip and robot.name == "enclave=/;" for ip, robot in robots.items())
+
+    # A host is gone only with its last participant
+    discovery._on_participant(participants[0], True)
+    assert "192.168.123.161" in discovery.get_robots()
+    discovery._on_participant(participants[1], True)
+    assert sorted(discovery.get_robots()) == ["192.168.123.162"]
+
+
+async def test_listener():
+    print("\nListener on a local multicast sender:")
+    seen = []
+    domain_id = 37  # Keeps the real domain 0 port untouched
+    listener = SpdpListener(lambda participant, removed: seen.append((participant.guid, removed)),
+                            domain_id=domain_id)
+    assert await listener.start(), "Could not join the SPDP group"
+
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sender.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+    sent = time.monotonic()
+    sender.sendto(SPDP_FIXTURE, ("239.255.0.1", spdp_port(domain_id)))
+    while not seen and time.monotonic() - sent < 2:
+        await asyncio.sleep(0.01)
+    print(f"  Participant reported after {(time.monotonic() - sent) * 1000:.1f} ms: {seen}")
+    assert seen == [(GUID, False)]
+    print(f"  Stats: {listener.get_stats()}")
+
+    sender.close()
+    listener.stop()
+
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("RTPS SPDP PARSER TEST (synthesized fixtures, no robot)")
+    print("=" * 80)
+    test_fixture()
+    test_incremental_updates()
+    test_dispose_and_noise()
+    test_discovery_keys()
+    asyncio.run(test_listener())
+    print("\n✅ RTPS SPDP test passed")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test that relocation odometry reaches /api/slam/current_position (no robot needed)
+
+Feeds two rt/unitree/slam_relocation/odom messages through the callback the
+controller subscribes, and checks that each one produces a new endpoint
+response (new pose, new ETag) and a pose message on the /ws pose channel.
+"""
+
+import sys
+import os
+import asyncio
+import json
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.requests import Request
+
+from g1_app.core.robot_controller import RobotController
+import g1_app.ui.web_server as web_server
+
+
+def make_request() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/api/slam/current_position",
+                    "headers": [], "query_string": b""})
+
+
+def odom(x: float, y: float) -> dict:
+    return {"topic": "rt/unitree/slam_relocation/odom",
+            "data": {"position": {"x": x, "y": y, "z": 0.0},
+                     "orientation": {"x": 0.0, "y": 0.0, "z": 0.0, "w": 1.0}}}
+
+
+async def test_slam_position():
+    print("=" * 80)
+    print("SLAM POSITION TEST (relocation odometry -> status endpoint)")
+    print("=" * 80)
+
+    robot = RobotController("192.168.123.161", "E21D1000PAHBMB06")
+    callbacks = {}
+    robot._subscribe_topic = lambda topic, callback: callbacks.__setitem__(topic, callback)
+    robot._subscribe_to_slam_feedback()
+    on_odom = callbacks["rt/unitree/slam_relocation/odom"]
+
+    web_server.robot = robot
+    web_server.status_snapshot.update("connection", {"connected": True, "robot": None})
+    poses = []
+    publish = web_server.manager.publish
+    web_server.manager.publish = lambda message, channel=None, key=None: (
+        poses.append(message) if channel == "pose" else publish(message, channel=channel, key=key))
+
+    responses = []
+    for x, y in ((1.0, 2.0), (1.5, 2.5)):
+        on_odom(odom(x, y))
+        response = await web_server.get_current_position(make_request())
+        body = json.loads(response.body)
+        print(f"  odom ({x}, {y}) -> {body['position']} ETag {response.headers['etag']}")
+        assert body["success"] and body["position"]["x"] == x and body["position"]["y"] == y
+        responses.append((response.headers["etag"], response.body))
+
+    assert responses[0] != responses[1], "second odom message must change the response"
+    assert responses[0][0] != responses[1][0], "ETag must change with the pose"
+    assert [p["data"]["x"] for p in poses] == [1.0, 1.5], "each odom message publishes a pose"
+    assert poses[-1]["data"]["source"] == "relocation"
+    print("\n✅ SLAM position test passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_slam_position())
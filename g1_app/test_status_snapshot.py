@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test the versioned status snapshot and its ETag/304 responses (no robot needed)
+
+Sections are written the way the EventBus handlers write them, then views are
+rendered directly and through /api/status with and without If-None-Match.
+"""
+
+import sys
+import os
+import asyncio
+import json
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.requests import Request
+
+from g1_app.core.status_snapshot import StatusSnapshot
+import g1_app.ui.web_server as web_server
+
+
+def make_request(path: str, etag: str = None) -> Request:
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": path, "headers": headers, "query_string": b""})
+
+
+def test_snapshot_versions():
+    print("=" * 80)
+    print("SNAPSHOT TEST (section versions, cached renders, ETag matching)")
+    print("=" * 80)
+
+    snapshot = StatusSnapshot()
+    builds = []
+
+    def build(battery, speeds):
+        builds.append(1)
+        return {"soc": (battery or {}).get("soc"), "speeds": speeds}
+
+    assert snapshot.update("battery", {"soc": 80})
+    assert not snapshot.update("battery", {"soc": 80}), "identical data is not a change"
+    assert snapshot.version == 1
+
+    etag, body = snapshot.render("view", ("battery", "speeds"), build)
+    assert json.loads(body) == {"soc": 80, "speeds": None}
+    assert snapshot.render("view", ("battery", "speeds"), build) == (etag, body)
+    assert len(builds) == 1 and snapshot.cache_hits == 1, "unchanged view is served from cache"
+
+    snapshot.update("position", {"x": 1.0})  # Not part of the view
+    assert snapshot.render("view", ("battery", "speeds"), build)[0] == etag
+    snapshot.update("battery", {"soc": 79})
+    new_etag, body = snapshot.render("view", ("battery", "speeds"), build)
+    assert new_etag != etag and json.loads(body)["soc"] == 79 and len(builds) == 2
+    print(f"  ETag {etag} -> {new_etag} after a battery change, {snapshot.cache_hits} cache hits")
+
+    assert StatusSnapshot.etag_matches(new_etag, new_etag)
+    assert StatusSnapshot.etag_matches(f'"other", W/{new_etag}', new_etag)
+    assert StatusSnapshot.etag_matches("*", new_etag)
+    assert not StatusSnapshot.etag_matches(etag, new_etag)
+    assert not StatusSnapshot.etag_matches(None, new_etag)
+    print("\n✅ Snapshot test passed")
+
+
+async def test_status_not_modified():
+    print("=" * 80)
+    print("304 TEST (/api/status with If-None-Match)")
+    print("=" * 80)
+
+    snapshot = web_server.status_snapshot
+    snapshot.update("connection", {"connected": True, "robot": {"serial_number": "E21D1000PAHBMB06"}})
+    snapshot.update("state", {"fsm_state_value": 500})
+    snapshot.update("battery", {"soc": 64})
+
+    response = await web_server.get_status(make_request("/api/status"))
+    etag = response.headers["etag"]
+    assert response.status_code == 200
+    assert json.loads(response.body) == {"connected": True, "robot_name": "E21D1000PAHBMB06",
+                                         "fsm_id": 500, "battery": 64}
+
+    cached = await web_server.get_status(make_request("/api/status", etag))
+    print(f"  first poll 200 with ETag {etag}, repeat poll {cached.status_code}")
+    assert cached.status_code == 304 and cached.body == b"" and cached.headers["etag"] == etag
+
+    snapshot.update("battery", {"soc": 63})
+    changed = await web_server.get_status(make_request("/api/status", etag))
+    assert changed.status_code == 200 and json.loads(changed.body)["battery"] == 63
+    assert changed.headers["etag"] != etag
+    print("\n✅ 304 test passed")
+
+
+async def main():
+    test_snapshot_versions()
+    await test_status_not_modified()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
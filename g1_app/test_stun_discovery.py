@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test STUN/teaching-port discovery against loopback responders (no robot needed)
+
+Fake robot services on 127.0.0.1 answer the client's probes: a STUN server
+returning XOR-MAPPED-ADDRESS, one that answers with a foreign transaction
+id, and a teaching service that only answers the protocol init packet.
+"""
+
+import sys
+import os
+import asyncio
+import socket
+import struct
+import secrets
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import g1_app.core.stun_discovery as stun_discovery
+from g1_app.core.stun_discovery import (STUNClient, TEACHING_REPLY_PREFIX, discover_teaching_port,
+                                        discover_teaching_port_async, get_teaching_port_cache)
+
+MAPPED_PORT = 57006
+
+
+def binding_response(transaction_id: bytes, port: int, ip: str = "127.0.0.1") -> bytes:
+    """Binding Response with one XOR-MAPPED-ADDRESS attribute"""
+    cookie = STUNClient.MAGIC_COOKIE
+    addr = struct.unpack('!I', socket.inet_aton(ip))[0]
+    attr = struct.pack('!HHBBHI', STUNClient.ATTR_XOR_MAPPED_ADDRESS, 8, 0, 1,
+                       port ^ (cookie >> 16), addr ^ cookie)
+    return struct.pack('!HHI', STUNClient.BINDING_RESPONSE, len(attr), cookie) + transaction_id + attr
+
+
+class Responder(asyncio.DatagramProtocol):
+    """Loopback UDP service; handler(data) returns the reply or None"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.transport = None
+        self.received = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.received += 1
+        reply = self.handler(data)
+        if reply is not None:
+            self.transport.sendto(reply, addr)
+
+
+async def start_responder(handler):
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(
+        lambda: Responder(handler), local_addr=('127.0.0.1', 0))
+    return transport, protocol, transport.get_extra_info('sockname')[1]
+
+
+def is_stun(data: bytes) -> bool:
+    return len(data) >= 20 and struct.unpack('!I', data[4:8])[0] == STUNClient.MAGIC_COOKIE
+
+
+async def test_stun_transaction_match():
+    print("=" * 80)
+    print("STUN TEST (XOR-MAPPED-ADDRESS matched by transaction id)")
+    print("=" * 80)
+
+    stun, _, stun_port = await start_responder(
+        lambda data: binding_response(data[8:20], MAPPED_PORT) if is_stun(data) else None)
+    stun_discovery.STUN_PORT = stun_port
+    try:
+        port = await STUNClient("127.0.0.1", timeout=2.0).discover_teaching_port_async(known_ports=[])
+    finally:
+        stun.close()
+    print(f"  STUN server on {stun_port} mapped teaching port {port}")
+    assert port == MAPPED_PORT
+    print("\n✅ STUN transaction test passed")
+
+
+async def test_unknown_transaction_ignored():
+    print("=" * 80)
+    print("UNKNOWN TRANSACTION TEST (foreign STUN reply ignored, teaching reply wins)")
+    print("=" * 80)
+
+    # A response to some other request: must not be taken as the mapped port
+    stun, stun_protocol, stun_port = await start_responder(
+        lambda data: binding_response(secrets.token_bytes(12), 11111) if is_stun(data) else None)
+    teaching_reply = TEACHING_REPLY_PREFIX + b'\x00' * 20
+    teaching, _, teaching_port = await start_responder(
+        lambda data: None if is_stun(data) else teaching_reply)
+    stun_discovery.STUN_PORT = stun_port
+    try:
+        port = await STUNClient("127.0.0.1", timeout=2.0).discover_teaching_port_async(
+            known_ports=[teaching_port])
+    finally:
+        stun.close()
+        teaching.close()
+    print(f"  foreign STUN replies: {stun_protocol.received}, result: port {port}")
+    assert stun_protocol.received > 0
+    assert port == teaching_port, "teaching reply must win over a foreign transaction id"
+    print("\n✅ Unknown transaction test passed")
+
+
+async def test_timeout_and_cache():
+    print("=" * 80)
+    print("TIMEOUT / CACHE TEST (silent robot, sync wrapper in a running loop)")
+    print("=" * 80)
+
+    silent, silent_protocol, silent_port = await start_responder(lambda data: None)
+    stun_discovery.STUN_PORT = silent_port
+    try:
+        started = time.monotonic()
+        port = await discover_teaching_port_async("127.0.0.1", timeout=0.6)
+        elapsed = time.monotonic() - started
+        print(f"  no answer: {port} after {elapsed:.2f}s ({silent_protocol.received} probes incl. retransmits)")
+        assert port is None
+        assert 0.5 < elapsed < 1.5, "all probes share one timeout"
+        assert silent_protocol.received >= 2, "unanswered request is retransmitted"
+
+        # The blocking wrapper must not call asyncio.run() inside this loop
+        assert discover_teaching_port("127.0.0.1", timeout=0.2) is None
+        print("  sync wrapper from a running loop returned None (no RuntimeError)")
+    finally:
+        silent.close()
+
+    stun, _, stun_port = await start_responder(
+        lambda data: binding_response(data[8:20], MAPPED_PORT) if is_stun(data) else None)
+    stun_discovery.STUN_PORT = stun_port
+    try:
+        assert await discover_teaching_port_async("127.0.0.1", timeout=2.0, serial_number="SN1") == MAPPED_PORT
+    finally:
+        stun.close()
+    assert get_teaching_port_cache().get("SN1") == MAPPED_PORT
+    assert await discover_teaching_port_async("127.0.0.1", timeout=0.2, serial_number="SN1") == MAPPED_PORT
+    get_teaching_port_cache().invalidate("SN1")
+    assert get_teaching_port_cache().get("SN1") is None
+    print("  discovered port cached per serial, served without probing, dropped on invalidate")
+    print("\n✅ Timeout / cache test passed")
+
+
+async def main():
+    await test_stun_transaction_match()
+    await test_unknown_transaction_ignored()
+    await test_timeout_and_cache()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
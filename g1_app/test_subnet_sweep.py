@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test the concurrent subnet sweep (no robot or raw sockets needed)
+
+Sweeps a loopback /29 with a scripted neighbor table standing in for the
+kernel's ARP cache, so the early exit, the probe window and the sync
+wrapper can be checked on any host.
+"""
+
+import sys
+import os
+import asyncio
+import ipaddress
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import g1_app.utils.subnet_sweep as subnet_sweep
+from g1_app.utils.arp_discovery import run_blocking
+from g1_app.utils.neighbor_table import NeighborEntry
+
+TARGET_MAC = "fc:23:cd:92:60:02"
+NETWORKS = [("test0", ipaddress.IPv4Network("127.0.0.0/29"), None)]  # No local IP: UDP probes only
+
+
+class FakeArpTable:
+    """read_arp_table() replacement that learns the target after ``after`` reads"""
+
+    def __init__(self, after: int, ip: str = "127.0.0.5"):
+        self.after = after
+        self.ip = ip
+        self.reads = 0
+
+    def __call__(self, path=None):
+        self.reads += 1
+        if self.reads > self.after:
+            return [NeighborEntry(self.ip, TARGET_MAC, "test0")]
+        return []
+
+
+async def sweep(table: FakeArpTable, **kwargs) -> subnet_sweep.SweepResult:
+    subnet_sweep.read_arp_table = table
+    return await subnet_sweep.sweep_for_mac(TARGET_MAC.upper(), networks=NETWORKS, **kwargs)
+
+
+async def test_sweep():
+    print("=" * 80)
+    print("SWEEP TEST (ARP cache hit, early exit, probe window, not found)")
+    print("=" * 80)
+
+    original = (subnet_sweep.read_arp_table, subnet_sweep.HOST_WAIT)
+    subnet_sweep.HOST_WAIT = 0.2
+    try:
+        cached = await sweep(FakeArpTable(after=0))
+        assert cached.ip == "127.0.0.5" and cached.method == "arp-cache" and cached.probes_sent == 0
+
+        found = await sweep(FakeArpTable(after=3), timeout=2.0)
+        print(f"  found: {found.to_dict()}")
+        assert found.ip == "127.0.0.5" and found.method == "udp" and found.mac == TARGET_MAC
+        assert found.hosts == 6 and found.elapsed_ms < 1000, "returns as soon as the MAC shows up"
+
+        started = time.perf_counter()
+        missing = await sweep(FakeArpTable(after=10 ** 6), window=2, timeout=2.0)
+        elapsed = time.perf_counter() - started
+        print(f"  not found: {missing.to_dict()}")
+        assert missing.ip is None and missing.method is None and missing.probes_sent == 6
+        assert 0.55 < elapsed < 1.5, "6 silent hosts, 2 at a time, each holding its slot for HOST_WAIT"
+    finally:
+        subnet_sweep.read_arp_table, subnet_sweep.HOST_WAIT = original
+    print("\n✅ Sweep test passed")
+
+
+async def test_run_blocking_in_loop():
+    print("=" * 80)
+    print("RUN_BLOCKING TEST (sync wrapper called from a running event loop)")
+    print("=" * 80)
+
+    async def answer():
+        await asyncio.sleep(0.01)
+        return 42
+
+    assert run_blocking(answer()) == 42, "runs on a worker thread instead of raising"
+    print("\n✅ run_blocking test passed")
+
+
+async def main():
+    await test_sweep()
+    await test_run_blocking_in_loop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    assert run_blocking(asyncio.sleep(0, result="sync")) == "sync", "no loop: plain asyncio.run"
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test the columnar .g1rec recording format (no robot needed)
+
+Writes recordings to a temp directory and reads them back through the
+header-only path, memory-mapped and copied sample loads, legacy JSON
+migration, and the recorder's keyframe-simplified save.
+"""
+
+import sys
+import os
+import json
+import tempfile
+import time
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from g1_app.core.teach_mode_format import load_samples, read_header, write_recording
+from g1_app.core.teach_mode_recorder import ARM_JOINT_NAMES, NUM_MOTORS, TeachModeRecorder
+
+
+def test_round_trip():
+    print("=" * 80)
+    print("ROUND TRIP TEST (write -> header -> mmap / copy load)")
+    print("=" * 80)
+
+    rng = np.random.default_rng(0)
+    timestamps = np.linspace(0.0, 2.0, 101)
+    positions = rng.uniform(-1.5, 1.5, (101, len(ARM_JOINT_NAMES))).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "wave.g1rec"
+        written = write_recording(path, timestamps, positions, ARM_JOINT_NAMES, created_at=1700000000.0,
+                                  extra={"note": "test"})
+        header = read_header(path)
+        print(f"  header: {header.sample_count} samples, {header.duration:.2f}s, "
+              f"{header.sample_rate:.1f} Hz, offsets {header.timestamps_offset}/{header.positions_offset}")
+        assert header == written
+        assert header.joint_order == ARM_JOINT_NAMES and header.extra == {"note": "test"}
+        assert header.timestamps_offset % 64 == 0 and header.positions_offset % 64 == 0
+
+        for mmap in (True, False):
+            loaded_t, loaded_q = load_samples(path, header, mmap=mmap)
+            assert np.array_equal(loaded_t, timestamps)
+            assert np.array_equal(loaded_q, positions)
+            assert isinstance(loaded_q, np.memmap) == mmap
+            del loaded_t, loaded_q  # Release the mapping before the directory goes away
+        print("  samples identical through mmap and copy loads")
+
+        # Legacy JSON recordings are migrated to .g1rec on startup
+        legacy = {"name": "legacy", "created_at": 1.0, "duration": 0.1, "sample_rate": 20.0,
+                  "snapshots": [{"timestamp": 0.0, "positions": {"left_elbow": 0.5}},
+                                {"timestamp": 0.1, "positions": {"left_elbow": 0.7}}]}
+        (Path(tmp) / "legacy.json").write_text(json.dumps(legacy))
+        recorder = TeachModeRecorder(storage_dir=Path(tmp))
+        recording = recorder.load_recording("legacy", mmap=False)
+        elbow = ARM_JOINT_NAMES.index("left_elbow")
+        assert recording.sample_count == 2
+        assert np.allclose(recording.positions[:, elbow], [0.5, 0.7])
+        assert np.isnan(recording.positions[0, 0]), "joints missing from a snapshot load as NaN"
+        assert (Path(tmp) / "legacy.json.migrated").exists()
+        print("  legacy JSON recording migrated and loaded")
+    print("\n✅ Round trip test passed")
+
+
+def test_simplified_sample_rate():
+    print("=" * 80)
+    print("SIMPLIFIED RECORDING TEST (sample_rate stays the capture rate)")
+    print("=" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = TeachModeRecorder(storage_dir=Path(tmp))
+        assert recorder.start_recording("still", simplify_tolerance=0.01)
+        for _ in range(20):
+            recorder.record_snapshot([0.25] * NUM_MOTORS)
+            time.sleep(0.005)
+        recording = recorder.stop_recording("still")
+        report = recorder.last_simplification
+        capture_rate = report.original_count / recording.duration
+        print(f"  {report.original_count} -> {report.kept_count} samples, "
+              f"sample_rate {recording.sample_rate:.1f} Hz (captured at {capture_rate:.1f} Hz)")
+        assert report.kept_count < report.original_count
+        assert abs(recording.sample_rate - capture_rate) < 1e-6
+        assert abs(recorder.read_recording_header("still").sample_rate - capture_rate) < 1e-6
+    print("\n✅ Simplified recording test passed")
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_simplified_sample_rate()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test incremental SLAM trajectory reads with since/epoch cursors (no robot needed)
+
+Poses are appended through the controller as odometry would append them and
+read back through /api/slam/trajectory the way a polling client does.
+"""
+
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from g1_app.core.robot_controller import RobotController
+from g1_app.core.trajectory_store import TrajectoryStore
+import g1_app.ui.web_server as web_server
+
+
+def walk(robot: RobotController, start: int, count: int) -> None:
+    """Append ``count`` poses 10 cm apart along x"""
+    for i in range(start, start + count):
+        robot._append_trajectory_point(float(i), i * 0.1, 0.0, 0.0)
+
+
+async def test_trajectory_cursor():
+    print("=" * 80)
+    print("TRAJECTORY CURSOR TEST (since/epoch, reset, packed format)")
+    print("=" * 80)
+
+    robot = RobotController("192.168.123.161", "E21D1000PAHBMB06")
+    robot.trajectory_store = TrajectoryStore(tiers=((20, 1), (20, 10)))
+    robot.connected = True
+    web_server.robot = robot
+
+    walk(robot, 0, 5)
+    full = await web_server.get_slam_trajectory()
+    assert full["count"] == 5 and full["seq"] == 5 and not full["reset"]
+
+    # Incremental: only points after the cursor
+    walk(robot, 5, 3)
+    delta = await web_server.get_slam_trajectory(since=full["seq"], epoch=full["epoch"])
+    print(f"  since={full['seq']}: {delta['count']} new points, seq {delta['seq']}")
+    assert [p["timestamp"] for p in delta["points"]] == [5.0, 6.0, 7.0] and not delta["reset"]
+    empty = await web_server.get_slam_trajectory(since=delta["seq"], epoch=delta["epoch"])
+    assert empty["count"] == 0 and not empty["reset"], "an up-to-date cursor gets nothing"
+
+    # Duplicate pose within min_distance: not kept, cursor unchanged
+    robot._append_trajectory_point(8.0, 0.7, 0.0, 0.0)
+    assert robot.trajectory_store.seq == 8
+
+    packed = await web_server.get_slam_trajectory(since=5, epoch=delta["epoch"], format="packed")
+    assert packed["fields"] == ["x", "y", "z", "timestamp"]
+    assert packed["values"] == [0.5, 0.0, 0.0, 5.0, 0.6, 0.0, 0.0, 6.0, 0.7, 0.0, 0.0, 7.0]
+
+    # Cursor older than the full-resolution tier: whole history with reset
+    walk(robot, 8, 30)
+    stale = await web_server.get_slam_trajectory(since=delta["seq"], epoch=delta["epoch"])
+    print(f"  stale cursor: reset={stale['reset']}, {stale['count']} points retained of {stale['seq']}")
+    assert stale["reset"] and stale["count"] == len(robot.trajectory_store)
+
+    # New mapping run: the old epoch forces a reset
+    robot._reset_trajectory()
+    walk(robot, 100, 2)
+    fresh = await web_server.get_slam_trajectory(since=stale["seq"], epoch=stale["epoch"])
+    assert fresh["reset"] and fresh["epoch"] == stale["epoch"] + 1 and fresh["count"] == 2
+    print(f"  new epoch {fresh['epoch']}: reset with {fresh['count']} points")
+    print("\n✅ Trajectory cursor test passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_trajectory_cursor())
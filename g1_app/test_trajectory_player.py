@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test host-side trajectory playback (no robot needed)
+
+Checks resampling and blending math, then plays a short recording through
+a fake controller that records every arm_sdk command it is sent.
+"""
+
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from g1_app.core.event_bus import EventBus, Events
+from g1_app.core.teach_mode_recorder import ARM_JOINT_INDICES, ARM_JOINT_NAMES, CustomActionRecording
+from g1_app.core.trajectory_player import TrajectoryPlayer, blend_frames, resample_trajectory
+
+RATE = 200.0
+
+
+class FakeRobot:
+    def __init__(self, pose: float = 0.0):
+        self.pose = pose
+        self.commands = []  # {motor_index: q} per command
+
+    async def request_arm_state(self, arm: str):
+        return {"joints": [self.pose] * 7}
+
+    async def send_command(self, command: dict) -> bool:
+        self.commands.append({j["motor_index"]: j["q"] for j in command["joints"]})
+        return True
+
+
+def make_recording(duration: float = 0.2, samples: int = 11) -> CustomActionRecording:
+    timestamps = np.linspace(0.0, duration, samples)
+    positions = np.tile(np.linspace(0.0, 1.0, samples)[:, None], (1, len(ARM_JOINT_NAMES))).astype(np.float32)
+    positions[:, ARM_JOINT_NAMES.index("right_wrist_yaw")] = np.nan  # Joint missing from a legacy recording
+    return CustomActionRecording(name="ramp", created_at=0.0, duration=duration, sample_rate=samples / duration,
+                                 timestamps=timestamps, positions=positions)
+
+
+def test_resample_and_blend():
+    print("=" * 80)
+    print("RESAMPLE TEST (fixed-rate frames, speed scaling, cosine blend)")
+    print("=" * 80)
+
+    t = np.array([0.0, 0.1, 0.25])
+    q = np.array([[0.0], [1.0], [4.0]])
+    frames = resample_trajectory(t, q, rate=20.0)
+    print(f"  20 Hz: {frames[:, 0].round(3).tolist()}")
+    assert np.allclose(frames[:, 0], [0.0, 0.5, 1.0, 2.0, 3.0, 4.0])
+
+    fast = resample_trajectory(t, q, rate=20.0, speed=2.0)
+    assert len(fast) == 4 and fast[-1, 0] == 4.0, "double speed halves the frames, keeps the end pose"
+
+    blend = blend_frames(np.zeros(2), np.ones(2), duration=0.5, rate=10.0)
+    assert blend.shape == (5, 2) and blend[0, 0] == 0.0 and np.all(np.diff(blend[:, 0]) > 0)
+    assert blend[-1, 0] < 1.0, "the end pose itself is not part of the blend"
+    assert len(blend_frames(np.zeros(2), np.ones(2), duration=0.0, rate=10.0)) == 0
+    print("\n✅ Resample test passed")
+
+
+async def test_playback():
+    print("=" * 80)
+    print("PLAYBACK TEST (blend-in, frame stream, stop)")
+    print("=" * 80)
+
+    events = []
+    EventBus.subscribe(Events.TRAJECTORY_PROGRESS, events.append)
+    robot = FakeRobot(pose=-1.0)
+    player = TrajectoryPlayer(robot, rate=RATE)
+    recording = make_recording()
+
+    assert player.start(recording, blend_time=0.05)
+    assert not player.start(recording), "second start while playing is refused"
+    status = await player.wait()
+
+    wrist = ARM_JOINT_INDICES["right_wrist_yaw"]
+    elbow = ARM_JOINT_INDICES["left_elbow"]
+    elbow_q = [command[elbow] for command in robot.commands]
+    print(f"  {status.state}: {status.frames_sent} frames sent, {status.frames_dropped} dropped")
+    assert status.state == "finished" and status.progress == 1.0
+    assert status.frames_sent + status.frames_dropped == 10 + 41, "10 blend frames + 0.2 s at 200 Hz"
+    assert all(wrist not in command for command in robot.commands), "NaN joint must never be commanded"
+    assert elbow_q[0] == -1.0, "playback starts from the measured pose"
+    assert np.isclose(elbow_q[-1], 1.0), "playback ends on the final sample"
+    assert events[0]["state"] == "blending" and events[-1]["state"] == "finished"
+
+    # A looping playback runs until stopped
+    robot.commands.clear()
+    assert player.start(recording, loop=True, blend_time=0.0)
+    await asyncio.sleep(0.5)
+    await player.stop()
+    print(f"  looped {player.status.loop_count} times before stop()")
+    assert player.status.state == "stopped" and player.status.loop_count >= 1
+    assert not player.is_playing
+    sent = len(robot.commands)
+    await asyncio.sleep(0.05)
+    assert len(robot.commands) == sent, "no commands after stop()"
+    EventBus.unsubscribe(Events.TRAJECTORY_PROGRESS, events.append)
+    print("\n✅ Playback test passed")
+
+
+async def main():
+    test_resample_and_blend()
+    await test_playback()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
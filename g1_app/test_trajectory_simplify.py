@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test keyframe compression of arm trajectories (no robot needed)
+
+Synthetic piecewise-linear and smooth trajectories are simplified and
+reconstructed to check the kept keyframes and the error bound.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from g1_app.core.trajectory_simplify import (reconstruct, simplify_indices, simplify_trajectory,
+                                             simplify_waypoints)
+
+
+def test_simplify_indices():
+    print("=" * 80)
+    print("SIMPLIFY TEST (keyframes, error bound, NaN joints)")
+    print("=" * 80)
+
+    # Two straight segments meeting at t=1.0: only the corner survives
+    t = np.linspace(0.0, 2.0, 201)
+    q = np.column_stack([np.where(t < 1.0, t, 2.0 - t), 0.5 * t])
+    kept = simplify_indices(t, q, tolerance=1e-6)
+    print(f"  piecewise linear: kept {kept.tolist()}")
+    assert kept.tolist() == [0, 100, 200]
+
+    # Smooth motion: every sample reconstructs within tolerance
+    q = np.column_stack([np.sin(2 * np.pi * t), np.cos(np.pi * t), np.full_like(t, np.nan)])
+    for tolerance in (0.05, 0.01, 0.001):
+        kept = simplify_indices(t, q, tolerance)
+        error = np.nanmax(np.abs(reconstruct(t, kept, q) - q))
+        print(f"  tolerance {tolerance}: {len(kept)}/{len(t)} samples, max error {error:.5f}")
+        assert kept[0] == 0 and kept[-1] == len(t) - 1
+        assert error <= tolerance
+    assert len(simplify_indices(t, q, 0.05)) < len(simplify_indices(t, q, 0.001))
+
+    assert simplify_indices(t[:2], q[:2]).tolist() == [0, 1]
+    new_t, new_q, report = simplify_trajectory(t, q, 0.01, ["a", "b", "c"])
+    assert report.original_count == 201 and report.kept_count == len(new_t) == len(new_q)
+    assert report.max_error <= 0.01 and report.joint_max_error["c"] == 0.0
+    print("\n✅ Simplify test passed")
+
+
+def test_simplify_waypoints():
+    print("=" * 80)
+    print("WAYPOINT TEST (per-arm runs, steps keep pacing)")
+    print("=" * 80)
+
+    straight = [{"arm": "left", "joints": [0.1 * i] * 7} for i in range(5)]
+    other = [{"arm": "right", "joints": [0.0] * 7}, {"arm": "right", "joints": [0.3] * 7}]
+    kept, report = simplify_waypoints(straight + other, tolerance=0.01)
+    print(f"  {report.original_count} -> {report.kept_count} waypoints, steps {[w['steps'] for w in kept]}")
+    assert [w["arm"] for w in kept] == ["left", "left", "right", "right"]
+    assert [w["steps"] for w in kept] == [1, 4, 1, 1], "a kept waypoint covers the transitions it replaces"
+    assert sum(w["steps"] for w in kept) == len(straight + other), "total pacing unchanged"
+
+    again, _ = simplify_waypoints(kept, tolerance=0.01)
+    assert [w["steps"] for w in again] == [1, 4, 1, 1], "re-simplifying keeps the steps"
+    print("\n✅ Waypoint test passed")
+
+
+if __name__ == "__main__":
+    test_simplify_indices()
+    test_simplify_waypoints()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test the tiered SLAM pose store (no robot needed)
+
+Small tiers make decimation visible: rows aging out of the full-resolution
+tier must land in the coarser tiers at their spacing, whether poses arrive
+one at a time or in batches, and only the coarsest tier may drop data.
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from g1_app.core.trajectory_store import TrajectoryStore
+
+TIERS = ((10, 1), (10, 5), (10, 25))
+
+
+def rows(start: int, count: int) -> np.ndarray:
+    """Poses 1 m apart along x, t = sample index"""
+    t = np.arange(start, start + count, dtype=np.float64)
+    return np.column_stack([t, t, np.zeros(count), np.zeros(count), np.zeros(count)])
+
+
+def test_tier_decimation():
+    print("=" * 80)
+    print("TIER TEST (decimation into coarser tiers, batch == per-sample)")
+    print("=" * 80)
+
+    single = TrajectoryStore(tiers=TIERS)
+    for row in rows(0, 200):
+        assert single.append(*row)
+    batch = TrajectoryStore(tiers=TIERS)
+    batch.extend(rows(0, 73))
+    batch.extend(rows(73, 127))
+
+    for store in (single, batch):
+        recent, mid, coarse = (tier.view()[:, 0].astype(int).tolist() for tier in store.tiers)
+        assert recent == list(range(190, 200)), "newest samples kept at full resolution"
+        assert mid == list(range(140, 190, 5)), "aged-out rows decimated 5x"
+        assert coarse == list(range(0, 140, 25))[-10:], "and 25x in the coarsest tier"
+        assert store.seq == 200 and len(store) == 10 + 10 + len(coarse)
+    assert np.array_equal(single.history(), batch.history()), "batch and per-sample pushes agree"
+    assert np.all(np.diff(single.history()[:, 0]) > 0), "history is oldest first"
+    print(f"  {single.seq} poses -> {len(single)} retained: {single.get_stats()['tiers']}")
+
+    # Coarsest tier drops its oldest rows once full
+    single.extend(rows(200, 2000))
+    assert all(tier.size == tier.capacity for tier in single.tiers)
+    assert len(single) == 30
+    print("\n✅ Tier test passed")
+
+
+def test_min_distance_and_export():
+    print("=" * 80)
+    print("DISTANCE / EXPORT TEST (path-length dedup, slam_map_trajectory.txt round trip)")
+    print("=" * 80)
+
+    store = TrajectoryStore(min_distance=0.05)
+    assert store.append(0.0, 0.0, 0.0, 0.0)
+    assert not store.append(0.1, 0.03, 0.0, 0.0), "within min_distance of the last kept pose"
+    x = np.arange(1, 101) * 0.01  # 1 cm steps: one kept pose per 5 cm of path
+    kept = store.extend(np.column_stack([x, x, np.zeros(100), np.zeros(100), np.full(100, 0.5)]))
+    print(f"  100 poses at 1 cm spacing -> {kept} kept")
+    assert kept == 20
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "slam_map_trajectory.txt"
+        store.export(path)
+        loaded = TrajectoryStore.load(path, min_distance=0.0)
+    assert np.allclose(loaded.history(), store.history(), atol=1e-6), "export/load keeps poses and yaw"
+    print("\n✅ Distance / export test passed")
+
+
+if __name__ == "__main__":
+    test_tier_decimation()
+    test_min_distance_and_export()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test the shared JPEG renditions of the video track (no robot needed)
+
+Synthetic frames are fed through a RenditionManager the way the controller's
+video callback does, to check that renditions are only created for viewers.
+"""
+
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import av
+import numpy as np
+
+from g1_app.core.robot_controller import RobotController
+from g1_app.core.video_pipeline import FrameBroadcaster, RenditionManager, get_video_renditions
+import g1_app.ui.web_server as web_server
+
+
+def make_frame(value: int) -> av.VideoFrame:
+    return av.VideoFrame.from_ndarray(np.full((48, 64, 3), value, dtype=np.uint8), format="bgr24")
+
+
+async def test_latest_frame_does_not_create():
+    print("=" * 80)
+    print("LATEST FRAME TEST (getter never creates a rendition)")
+    print("=" * 80)
+
+    robot = RobotController("192.168.123.161", "E21D1000PAHBMB06")
+    robot.video_renditions = RenditionManager()
+
+    assert robot.latest_frame is None
+    assert robot.video_renditions.get_stats() == [], "latest_frame must not create the default rendition"
+    print("  no viewer: latest_frame is None, no renditions")
+
+    encoder = robot.video_renditions.get()
+    encoder.acquire()
+    last_seq = encoder.seq
+    robot.video_renditions.submit(make_frame(128))
+    await encoder.broadcaster.wait_for_frame(last_seq, timeout=5.0)
+    encoder.release()
+    assert robot.latest_frame == encoder.jpeg and robot.latest_frame.startswith(b"\xff\xd8")
+    print(f"  viewer attached: latest_frame is the default rendition's JPEG ({len(robot.latest_frame)} bytes)")
+    print("\n✅ Latest frame test passed")
+
+
+async def test_idle_reaped_without_frames():
+    print("=" * 80)
+    print("IDLE RENDITION TEST (reaped after the last viewer leaves, no frames needed)")
+    print("=" * 80)
+
+    renditions = RenditionManager(idle_timeout=0.2)
+    encoder = renditions.get(width=320, quality=60)
+    encoder.acquire()
+    renditions.submit(make_frame(64))
+    encoder.release()
+    assert renditions.peek(width=320, quality=60) is encoder
+
+    # Video stopped: no submit()/get_stats() calls, only the periodic reaper runs
+    await asyncio.sleep(0.5)
+    assert renditions.peek(width=320, quality=60) is None, "idle rendition must be reaped"
+    print("  idle rendition removed without further frames or stats calls")
+    print("\n✅ Idle rendition test passed")
+
+
+async def test_new_frames_only():
+    print("=" * 80)
+    print("NEW FRAME TEST (consumers wake only for newer frames, MJPEG sends no repeats)")
+    print("=" * 80)
+
+    broadcaster = FrameBroadcaster()
+    assert await broadcaster.wait_for_frame(0, timeout=0.05) is None, "no frame yet"
+    await broadcaster.publish(b"a", 1.0)
+    await broadcaster.publish(b"b", 2.0)
+    assert await broadcaster.wait_for_frame(0, timeout=0.05) == (2, b"b"), "slow consumer skips to newest"
+    assert await broadcaster.wait_for_frame(2, timeout=0.05) is None, "same frame is not delivered twice"
+
+    class FakeRobot:
+        connected = True
+
+    web_server.robot = FakeRobot()
+    web_server.MJPEG_KEEPALIVE_SECONDS = 0.4
+    response = await web_server.video_stream()
+    encoder = get_video_renditions().get()
+    parts = []
+
+    async def consume():
+        async for part in response.body_iterator:
+            parts.append(part)
+
+    consumer = asyncio.create_task(consume())
+    await asyncio.sleep(0.05)
+    assert len(parts) == 1 and b"X-Frame-Timestamp" not in parts[0], "waiting placeholder first"
+    for frame in (b"\xff\xd8one", b"\xff\xd8two"):
+        await encoder.broadcaster.publish(frame, 1700000000.0)
+        await asyncio.sleep(0.1)
+    assert len(parts) == 3 and parts[1].endswith(b"one\r\n") and parts[2].endswith(b"two\r\n")
+    await asyncio.sleep(0.1)
+    assert len(parts) == 3, "no part is sent until a new frame (or the keepalive) arrives"
+    await asyncio.sleep(0.3)
+    assert len(parts) == 4 and parts[3].endswith(b"two\r\n"), "stalled stream repeats at the keepalive rate"
+    consumer.cancel()
+    print(f"  {len(parts)} parts: placeholder, two frames, one keepalive repeat")
+    print("\n✅ New frame test passed")
+
+
+async def main():
+    await test_latest_frame_does_not_create()
+    await test_idle_reaped_without_frames()
+    await test_new_frames_only()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
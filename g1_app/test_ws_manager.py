@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test the /ws connection manager against fake WebSockets (no robot needed)
+
+Fake clients record what the manager's writer tasks send them; a stuck
+client never completes a send, to check that it cannot delay the others.
+"""
+
+import sys
+import os
+import asyncio
+import json
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from g1_app.ui.ws_manager import MSGPACK_AVAILABLE, ConnectionManager
+
+if MSGPACK_AVAILABLE:
+    import msgpack
+
+TICK = 0.05  # Seconds per tick at the manager's default 20 Hz
+
+
+class FakeWebSocket:
+    def __init__(self, query: dict = None, stuck: bool = False):
+        self.query_params = query or {}
+        self.client = None
+        self.stuck = stuck
+        self.sent = []  # Decoded JSON text frames, raw binary frames
+        self.raw = []  # Frames as sent
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+
+    async def send_text(self, text: str):
+        if self.stuck:
+            await asyncio.Event().wait()
+        self.raw.append(text)
+        self.sent.append(json.loads(text))
+
+    async def send_bytes(self, data: bytes):
+        if self.stuck:
+            await asyncio.Event().wait()
+        self.raw.append(data)
+        self.sent.append(data)
+
+
+async def test_slow_client_isolated():
+    print("=" * 80)
+    print("QUEUE TEST (per-client writers, stuck client evicted)")
+    print("=" * 80)
+
+    manager = ConnectionManager(queue_size=4)
+    fast, stuck = FakeWebSocket(), FakeWebSocket(stuck=True)
+    await manager.connect(fast)
+    await manager.connect(stuck)
+
+    for i in range(6):
+        manager.publish({"type": "event", "n": i})
+        await asyncio.sleep(TICK * 1.5)
+    print(f"  fast client got {len(fast.sent)} messages, evictions {manager.evictions}")
+    assert [m["n"] for m in fast.sent] == list(range(6)), "stuck client must not delay the fast one"
+    assert manager.evictions == 1 and stuck not in manager.clients, "overflowing client is evicted"
+    await asyncio.sleep(0)
+    assert stuck.closed
+    assert manager.clients[fast].get_stats()["messages_sent"] == 6
+    manager.disconnect(fast)
+    print("\n✅ Queue test passed")
+
+
+async def test_batching():
+    print("=" * 80)
+    print("BATCH TEST (per-tick coalescing, one encode per format, msgpack)")
+    print("=" * 80)
+
+    manager = ConnectionManager()
+    legacy = FakeWebSocket()
+    batched = [FakeWebSocket({"batch": "1"}), FakeWebSocket({"batch": "1"})]
+    # Without msgpack installed this client negotiates down to JSON
+    packed = FakeWebSocket({"batch": "1", "encoding": "msgpack"})
+    for websocket in [legacy, *batched, packed]:
+        await manager.connect(websocket)
+    await asyncio.sleep(TICK / 2)
+    assert batched[0].sent[0]["type"] == "hello" and batched[0].sent[0]["batch"] is True
+    decode = msgpack.unpackb if MSGPACK_AVAILABLE else (lambda frame: frame)
+    assert decode(packed.sent[0])["encoding"] == ("msgpack" if MSGPACK_AVAILABLE else "json")
+    for websocket in [*batched, packed]:
+        websocket.sent.clear()
+        websocket.raw.clear()
+
+    # One tick's worth: state is coalesced to its latest value, events all kept
+    manager.publish({"type": "state", "v": 1}, channel="state", key="state")
+    manager.publish({"type": "event", "n": "a"})
+    manager.publish({"type": "state", "v": 2}, channel="state", key="state")
+    manager.publish({"type": "event", "n": "b"})
+    manager.publish({"type": "state", "v": 3}, channel="state", key="state")
+    await asyncio.sleep(TICK * 1.5)
+
+    expected = [{"type": "event", "n": "a"}, {"type": "event", "n": "b"}, {"type": "state", "v": 3}]
+    print(f"  legacy: {len(legacy.sent)} frames, batched: {len(batched[0].sent)} frame, "
+          f"coalesced {manager.messages_coalesced}")
+    assert legacy.sent == expected, "legacy clients get individual JSON messages"
+    assert len(batched[0].sent) == 1 and batched[0].sent[0]["messages"] == expected
+    assert batched[0].raw[0] is batched[1].raw[0], "identical batches are encoded once"
+    frame = decode(packed.sent[0])
+    assert frame["type"] == "batch" and frame["messages"] == expected
+    assert frame["seq"] == batched[0].sent[0]["seq"]
+    assert manager.messages_coalesced == 2
+    for websocket in [legacy, *batched, packed]:
+        manager.disconnect(websocket)
+    print("\n✅ Batch test passed")
+
+
+async def test_channels():
+    print("=" * 80)
+    print("CHANNEL TEST (subscriptions, per-channel rates, demand, broadcast)")
+    print("=" * 80)
+
+    manager = ConnectionManager()
+    demand = []
+    manager.on_demand_change = demand.append
+    viewer, legacy = FakeWebSocket({"batch": "1"}), FakeWebSocket()
+    await manager.connect(viewer)
+    await manager.connect(legacy)
+    assert demand[-1] == {"state", "battery", "events"}, "clients start on the legacy channels"
+
+    manager.handle_message(viewer, {"type": "subscribe", "channels": {"pose": 5, "imu": 0, "bogus": 1}})
+    manager.handle_message(viewer, {"type": "unsubscribe", "channels": ["events"]})
+    assert manager.has_subscribers("pose") and not manager.has_subscribers("lidar")
+    assert demand[-1] == {"state", "battery", "events", "pose", "imu"}
+    await asyncio.sleep(TICK / 2)
+    replies = [m for m in viewer.sent if m["type"] == "subscribed"]
+    assert replies[0]["unknown"] == ["bogus"] and "events" not in replies[-1]["channels"]
+
+    # One second of 20 Hz pose and imu updates; pose is limited to 5 Hz
+    viewer.sent.clear()
+    for i in range(20):
+        manager.publish({"type": "pose", "i": i}, channel="pose", key="pose")
+        manager.publish({"type": "imu", "i": i}, channel="imu", key="imu")
+        manager.publish({"type": "scan"}, channel="lidar")  # Nobody subscribed: discarded
+        await asyncio.sleep(TICK)
+    await manager.broadcast({"type": "notice"})
+    await asyncio.sleep(TICK * 2)
+
+    messages = [m for frame in viewer.sent if frame["type"] == "batch" for m in frame["messages"]]
+    poses = [m["i"] for m in messages if m["type"] == "pose"]
+    imus = [m["i"] for m in messages if m["type"] == "imu"]
+    print(f"  pose deliveries {poses}, imu deliveries {len(imus)}")
+    assert 4 <= len(poses) <= 7 and poses[-1] == 19, "rate-limited channel still ends on the latest value"
+    assert len(imus) >= 17
+    assert not any(m["type"] == "scan" for m in messages)
+    assert not any(m["type"] == "notice" for m in messages), "broadcast honours unsubscribed channels"
+    assert {"type": "notice"} in legacy.sent
+    assert not any(m["type"] in ("pose", "imu") for m in legacy.sent)
+
+    manager.disconnect(viewer)
+    assert demand[-1] == {"state", "battery", "events"}
+    manager.disconnect(legacy)
+    print("\n✅ Channel test passed")
+
+
+async def main():
+    await test_slow_client_isolated()
+    await test_batching()
+    await test_channels()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
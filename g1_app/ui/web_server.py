@@ -9,6 +9,7 @@ import logging
 import os
 import json
 import socket
+import time
 import subprocess
 import platform
 from typing import Optional, List, Dict
@@ -40,6 +41,18 @@ from g1_app import RobotController, EventBus, Events, FSMState, LEDColor
 from g1_app.utils import setup_app_logging
 from g1_app.core.robot_discovery import get_discovery
 from g1_app.arm_controller import ArmController
+from g1_app.ui.ws_manager import ConnectionManager
+from g1_app.core.teach_mode_recorder import TeachModeRecorder
+from g1_app.core.trajectory_player import TrajectoryPlayer
+from g1_app.core.trajectory_simplify import simplify_trajectory, simplify_waypoints
+from g1_app.core.video_pipeline import encode_placeholders, get_placeholder, get_video_latency, get_video_renditions
+from g1_app.core.video_relay import SyntheticVideoTrack, VideoRelay, get_video_relay
+from g1_app.core.status_snapshot import get_status_snapshot
+from g1_app.core.address_cache import ConnectAttempt, get_address_cache, race_addresses
+from g1_app.core.link_monitor import SheddingPolicy
+from g1_app.utils.arp_discovery import G1_AP_IP
+from g1_app.utils.neighbor_table import is_local_network, network_mode
+from g1_app.utils.robot_discovery import discover_robot_async
 
 # Setup logging
 setup_app_logging(verbose=False)
@@ -69,6 +82,13 @@ teach_recording_active = False
 teach_recording_name: Optional[str] = None
 TEACH_RECORDING_MAX_SECONDS = 20
 
+# Host-side copies of teach recordings (catalog-indexed .g1rec files)
+teach_recorder = TeachModeRecorder()
+trajectory_player: Optional[TrajectoryPlayer] = None
+
+# Synthetic test-pattern source for measuring the WebRTC video path without a robot
+synthetic_video_relay: Optional[VideoRelay] = None
+
 # Robot management
 ROBOTS_FILE = Path(__file__).parent / "robots.json"
 
@@ -97,29 +117,25 @@ def generate_robot_id(nickname):
     return nickname.lower().replace(' ', '_')
 
 # WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"WebSocket client connected. Total: {len(self.active_connections)}")
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-        logger.info(f"WebSocket client disconnected. Total: {len(self.active_connections)}")
-
-    async def broadcast(self, message: dict):
-        """Send message to all connected clients"""
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error sending to client: {e}")
+manager = ConnectionManager()
 
+# /ws channels that need a robot subscription group. state/battery are always
+# subscribed (the controller tracks them itself); the rest follow demand.
+WS_CHANNEL_GROUPS = {
+    "imu": "lowstate",
+    "pose": "slam",
+    "trajectory": "slam",
+    "lidar": "lidar",
+}
+TOPIC_METRICS_INTERVAL = 1.0  # Seconds between topics-metrics messages
+ws_enabled_topics: Dict[str, List[str]] = {}  # Group -> topics subscribed on behalf of /ws clients
+topic_metrics_task: Optional[asyncio.Task] = None
 
-manager = ConnectionManager()
+# Versioned status served by the polling endpoints (updated by the EventBus handlers below)
+status_snapshot = get_status_snapshot()
+
+# Last-known robot addresses and per-attempt connect timings
+address_cache = get_address_cache()
 
 
 # Event handlers to broadcast to web clients
@@ -166,10 +182,10 @@ def on_state_change(state):
                 "allowed_transitions": [s.name for s in allowed]
             }
         
-        asyncio.create_task(manager.broadcast({
+        manager.publish({
             "type": "state_changed",
             "data": data
-        }))
+        }, channel="state", key="state")
         logger.info(f"📤 Broadcasting state_changed: {data.get('fsm_state')}")
     except Exception as e:
         logger.error(f"Error in on_state_change: {e}")
@@ -178,24 +194,26 @@ def on_state_change(state):
 
 def on_connection_change(data):
     """Broadcast connection status to all web clients"""
-    asyncio.create_task(manager.broadcast({
+    manager.publish({
         "type": "connection_changed",
         "data": data
-    }))
+    }, channel="events")
 
 
 def on_battery_update(data):
     """Broadcast battery status to all web clients"""
     try:
-        asyncio.create_task(manager.broadcast({
+        battery = {
+            "soc": data.get("soc"),
+            "voltage": data.get("voltage"),
+            "current": data.get("current"),
+            "temperature": data.get("temperature")
+        }
+        status_snapshot.update("battery", battery)
+        manager.publish({
             "type": "battery_updated",
-            "data": {
-                "soc": data.get("soc"),
-                "voltage": data.get("voltage"),
-                "current": data.get("current"),
-                "temperature": data.get("temperature")
-            }
-        }))
+            "data": battery
+        }, channel="battery", key="battery")
     except Exception as e:
         logger.error(f"Error in on_battery_update: {e}")
 
@@ -203,7 +221,7 @@ def on_battery_update(data):
 def on_speech_recognized(data):
     """Broadcast speech recognition to all web clients"""
     try:
-        asyncio.create_task(manager.broadcast({
+        manager.publish({
             "type": "speech_recognized",
             "data": {
                 "text": data.get("text"),
@@ -211,7 +229,7 @@ def on_speech_recognized(data):
                 "angle": data.get("angle"),
                 "timestamp": data.get("timestamp")
             }
-        }))
+        }, channel="events")
     except Exception as e:
         logger.error(f"Error in on_speech_recognized: {e}")
 
@@ -245,12 +263,222 @@ def on_lidar_data_received(data):
         else:
             print("WARNING: robot is None!")
             logger.warning("⚠️  Robot object is None, cannot store points")
+
+        if manager.has_subscribers("lidar"):
+            manager.publish({
+                "type": "lidar",
+                "data": {
+                    "count": len(points),
+                    "points": points.tolist() if hasattr(points, 'tolist') else list(points)
+                }
+            }, channel="lidar", key="lidar")
             
     except Exception as e:
         print(f"ERROR in handler: {e}")
         logger.error(f"❌ Error in on_lidar_data_received: {e}", exc_info=True)
 
 
+def on_slam_position_updated(data):
+    """Publish SLAM pose (and the trajectory it extends) to subscribed web clients"""
+    try:
+        pose = {
+            "x": data.get("x"),
+            "y": data.get("y"),
+            "z": data.get("z"),
+            "heading": data.get("heading"),
+            "source": data.get("source")
+        }
+        if robot:
+            status_snapshot.update("position", {
+                "position": dict(robot.current_position),
+                "updates_received": robot.current_position_updates
+            })
+        manager.publish({"type": "pose", "data": pose}, channel="pose", key="pose")
+    except Exception as e:
+        logger.error(f"Error in on_slam_position_updated: {e}")
+
+
+def on_slam_trajectory_updated(data):
+    """Publish the newest trajectory point with its cursor
+
+    Rate-limited clients only get the latest point; a client that sees ``seq``
+    jump by more than one fetches the gap from /api/slam/trajectory?since=.
+    """
+    if not manager.has_subscribers("trajectory"):
+        return
+    try:
+        manager.publish({
+            "type": "trajectory",
+            "data": {
+                "epoch": data["epoch"],
+                "seq": data["seq"],
+                "point": data["point"]
+            }
+        }, channel="trajectory", key="trajectory")
+    except Exception as e:
+        logger.error(f"Error in on_slam_trajectory_updated: {e}")
+
+
+def on_lidar_imu(data):
+    """Publish LiDAR IMU samples to subscribed web clients"""
+    if not manager.has_subscribers("imu"):
+        return
+    try:
+        imu = data.get("data", data) if isinstance(data, dict) else data
+        manager.publish({"type": "imu", "data": {"source": "lidar", "imu": imu}},
+                        channel="imu", key="imu_lidar")
+    except Exception as e:
+        logger.error(f"Error in on_lidar_imu: {e}")
+
+
+def on_lowstate_imu(lowstate: dict):
+    """Publish the body IMU from rt/lowstate to subscribed web clients"""
+    if not manager.has_subscribers("imu"):
+        return
+    imu = lowstate.get("imu_state")
+    if imu:
+        manager.publish({"type": "imu", "data": {"source": "body", "imu": imu}},
+                        channel="imu", key="imu_body")
+
+
+async def _publish_topic_metrics() -> None:
+    """Publish per-topic message counts and rates while anyone subscribes"""
+    previous: Dict[str, int] = {}
+    loop = asyncio.get_running_loop()
+    last = loop.time()
+    while manager.has_subscribers("topics-metrics"):
+        await asyncio.sleep(TOPIC_METRICS_INTERVAL)
+        now = loop.time()
+        elapsed = max(now - last, 1e-6)
+        last = now
+        if not robot or not robot.connected:
+            continue
+        metrics = robot.get_topic_metrics()
+        for topic, entry in metrics.items():
+            entry["rate_hz"] = round((entry["count"] - previous.get(topic, 0)) / elapsed, 1)
+        previous = {topic: entry["count"] for topic, entry in metrics.items()}
+        manager.publish({"type": "topics_metrics", "data": metrics},
+                        channel="topics-metrics", key="topics_metrics")
+
+
+async def _sync_channel_groups() -> None:
+    """Subscribe/unsubscribe robot topic groups to match /ws channel demand"""
+    if not robot or not robot.connected:
+        return
+    wanted = {WS_CHANNEL_GROUPS[channel] for channel in WS_CHANNEL_GROUPS
+              if manager.has_subscribers(channel)}
+
+    for group in sorted(wanted - set(ws_enabled_topics)):
+        before = set(robot.get_subscription_status()["topics"])
+        await robot.enable_subscriptions([group])
+        # Only topics we added are ours to drop later; an already-active
+        # group (e.g. lidar enabled at connect) is left alone
+        ws_enabled_topics[group] = sorted(set(robot.get_subscription_status()["topics"]) - before)
+        logger.info(f"📡 /ws demand enabled '{group}': {ws_enabled_topics[group]}")
+    if manager.has_subscribers("imu"):
+        robot.add_lowstate_listener(on_lowstate_imu)
+    else:
+        robot.remove_lowstate_listener(on_lowstate_imu)
+
+    for group in sorted(set(ws_enabled_topics) - wanted):
+        topics = ws_enabled_topics.pop(group)
+        if group == "lowstate" and teach_recorder.attached:
+            continue  # Still feeding the teach recorder
+        robot.unsubscribe_topics(topics)
+        logger.info(f"📡 /ws demand dropped '{group}': {topics}")
+
+
+def on_ws_demand_change(channels):
+    """Follow /ws channel demand: robot subscriptions and the topics-metrics publisher"""
+    global topic_metrics_task
+    if "topics-metrics" in channels and (topic_metrics_task is None or topic_metrics_task.done()):
+        topic_metrics_task = asyncio.create_task(_publish_topic_metrics())
+    asyncio.create_task(_sync_channel_groups())
+
+
+manager.on_demand_change = on_ws_demand_change
+
+
+def _refresh_state_snapshot() -> None:
+    """Copy FSM state, allowed transitions and speed limits into the status snapshot"""
+    if not robot:
+        return
+    state = robot.current_state
+    allowed = sorted(robot.state_machine.get_allowed_transitions(), key=lambda s: s.value)
+    status_snapshot.update("state", {
+        "fsm_state": state.fsm_state.name,
+        "fsm_state_value": state.fsm_state.value,
+        "fsm_mode": state.fsm_mode,
+        "led_color": state.led_color.value,
+        "error": state.error,
+        "allowed_transitions": [s.name for s in allowed]
+    })
+    status_snapshot.update("speeds", robot.get_max_speeds())
+
+
+def on_status_state_event(_data):
+    """Refresh the state snapshot on FSM, LED and error events"""
+    try:
+        _refresh_state_snapshot()
+    except Exception as e:
+        logger.error(f"Error refreshing state snapshot: {e}")
+
+
+def on_status_connection_change(data):
+    """Record connection changes (and the connected robot) in the status snapshot"""
+    try:
+        connected = bool(data.get("connected")) and robot is not None
+        status_snapshot.update("connection", {
+            "connected": connected,
+            "reconnecting": bool(data.get("reconnecting")),
+            "robot": {
+                "ip": robot.robot_ip,
+                "serial_number": robot.serial_number,
+                "mac": getattr(robot, 'robot_mac', None)
+            } if connected else None
+        })
+        if connected:
+            _refresh_state_snapshot()
+            status_snapshot.update("position", {
+                "position": dict(robot.current_position),
+                "updates_received": robot.current_position_updates
+            })
+    except Exception as e:
+        logger.error(f"Error in on_status_connection_change: {e}")
+
+
+def on_connection_timeline(data):
+    """Record connect/reconnect phase timings in the status snapshot"""
+    try:
+        status_snapshot.update("timeline", data)
+    except Exception as e:
+        logger.error(f"Error in on_connection_timeline: {e}")
+
+
+def _snapshot_response(request: Request, view: str, sections, build) -> Response:
+    """Serve a cached status view; 304 when the client's ETag is current"""
+    etag, body = status_snapshot.render(view, sections, build)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if status_snapshot.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _is_connected(connection) -> bool:
+    return bool(connection and connection["connected"])
+
+
+def on_trajectory_progress(data):
+    """Broadcast local trajectory playback progress to all web clients"""
+    try:
+        manager.publish({
+            "type": "trajectory_progress",
+            "data": data
+        }, channel="events", key="trajectory_progress")
+    except Exception as e:
+        logger.error(f"Error in on_trajectory_progress: {e}")
+
+
 # Subscribe to events
 logger.info("🔧 Setting up EventBus subscriptions...")
 EventBus.subscribe(Events.STATE_CHANGED, on_state_change)
@@ -263,14 +491,29 @@ EventBus.subscribe(Events.SPEECH_RECOGNIZED, on_speech_recognized)
 logger.info(f"  ✅ Subscribed to SPEECH_RECOGNIZED")
 EventBus.subscribe(Events.LIDAR_CLOUD, on_lidar_data_received)
 logger.info(f"  ✅ Subscribed to LIDAR_CLOUD with handler: {on_lidar_data_received}")
+EventBus.subscribe(Events.TRAJECTORY_PROGRESS, on_trajectory_progress)
+logger.info(f"  ✅ Subscribed to TRAJECTORY_PROGRESS")
+EventBus.subscribe(Events.SLAM_POSITION_UPDATED, on_slam_position_updated)
+logger.info(f"  ✅ Subscribed to SLAM_POSITION_UPDATED")
+EventBus.subscribe(Events.LIDAR_IMU, on_lidar_imu)
+logger.info(f"  ✅ Subscribed to LIDAR_IMU")
+EventBus.subscribe(Events.SLAM_TRAJECTORY_UPDATED, on_slam_trajectory_updated)
+logger.info(f"  ✅ Subscribed to SLAM_TRAJECTORY_UPDATED")
+EventBus.subscribe(Events.CONNECTION_CHANGED, on_status_connection_change)
+EventBus.subscribe(Events.CONNECTION_TIMELINE, on_connection_timeline)
+for _status_event in (Events.STATE_CHANGED, Events.LED_CHANGED, Events.ERROR):
+    EventBus.subscribe(_status_event, on_status_state_event)
+logger.info(f"  ✅ Subscribed status snapshot to connection/state/LED/error events")
 logger.info("🔧 EventBus subscriptions complete")
 
 
 @app.on_event("startup")
 async def startup_event():
     """Start services on server startup"""
+    encode_placeholders()
     logger.info("Starting robot discovery service...")
     discovery = get_discovery()
+    await discovery.start_listener()
     await discovery.start()
 
 
@@ -280,6 +523,10 @@ async def shutdown_event():
     logger.info("Stopping robot discovery service...")
     discovery = get_discovery()
     await discovery.stop()
+    discovery.stop_listener()
+    await get_video_relay().close()
+    if synthetic_video_relay:
+        await synthetic_video_relay.close()
 
 
 @app.get("/api/discover")
@@ -299,8 +546,7 @@ async def discover_robots_endpoint(mac: str = None):
     if mac:
         try:
             logger.info(f"Discovering robot with MAC: {mac}")
-            from g1_app.utils.robot_discovery import discover_robot
-            robot = discover_robot(target_mac=mac, verify_with_ping=True)
+            robot = await discover_robot_async(target_mac=mac, verify_with_ping=True)
             
             if robot and robot.get('online'):
                 logger.info(f"✅ Robot found at {robot['ip']} (online)")
@@ -354,6 +600,12 @@ async def discover_robots_endpoint(mac: str = None):
         }
 
 
+@app.get("/api/discover/stats")
+async def discovery_stats_endpoint():
+    """Discovery scan timing, probe counters, subprocess spawns and connect attempts"""
+    return {"success": True, **get_discovery().get_stats(), "connect": address_cache.get_stats()}
+
+
 @app.post("/api/bind")
 async def bind_robot_endpoint(data: dict):
     """Bind to a robot for future auto-discovery"""
@@ -516,48 +768,65 @@ async def get_current_wifi():
 
 
 @app.get("/api/robot/status")
-async def get_robot_status():
+async def get_robot_status(request: Request):
     """Get current robot connection status"""
-    global robot
-    
-    if not robot or not robot.connected:
-        return {
-            "connected": False,
-            "robot": None,
-            "state": None
-        }
-    
-    try:
-        state = robot.current_state
-        allowed = robot.state_machine.get_allowed_transitions()
-        
+    def build(connection, state, timeline):
+        if not _is_connected(connection):
+            return {
+                "connected": False,
+                "reconnecting": bool(connection and connection.get("reconnecting")),
+                "robot": None,
+                "state": None,
+                "timeline": timeline
+            }
         return {
             "connected": True,
-            "robot": {
-                "ip": robot.robot_ip,
-                "serial_number": robot.serial_number,
-                "mac": getattr(robot, 'robot_mac', None)
-            },
+            "reconnecting": False,
+            "robot": connection["robot"],
             "state": {
-                "fsm_state": state.fsm_state.name,
-                "fsm_state_value": state.fsm_state.value,
-                "fsm_mode": state.fsm_mode,
-                "led_color": state.led_color.value,
-                "allowed_transitions": [s.name for s in allowed]
-            }
-        }
-    except Exception as e:
-        logger.error(f"Error getting robot status: {e}")
-        return {
-            "connected": robot.connected,
-            "robot": {
-                "ip": robot.robot_ip if robot else None,
-                "serial_number": robot.serial_number if robot else None
-            },
-            "state": None,
-            "error": str(e)
+                "fsm_state": state["fsm_state"],
+                "fsm_state_value": state["fsm_state_value"],
+                "fsm_mode": state["fsm_mode"],
+                "led_color": state["led_color"],
+                "allowed_transitions": state["allowed_transitions"]
+            } if state else None,
+            "timeline": timeline
         }
 
+    return _snapshot_response(request, "robot_status", ("connection", "state", "timeline"), build)
+
+
+async def _resolve_robot_address(mac: str, mode: str):
+    """
+    Race cached addresses, the AP address and a fresh discovery for ``mac``
+
+    The AP address only joins the race in auto/STA mode when this host has an
+    interface on its network (192.168.12.0/24); use mode "ap" to force it.
+
+    Returns:
+        (ip, source) of the first address that verifies, or (None, None)
+    """
+    if mode == "ap":
+        return await race_addresses(mac, [(G1_AP_IP, "ap", False)])
+
+    mac = mac.lower()
+    candidates = [
+        (known.ip, "discovery", True) for known in get_discovery().get_robots()
+        if known.is_online and known.ip and (known.mac_address or "").lower() == mac
+    ]
+    candidates += [(entry["ip"], "cache", True) for entry in address_cache.addresses(mac)]
+    # The AP interface has its own MAC, so it cannot be verified by MAC; only
+    # race it when we are on the robot's hotspot network, otherwise any LAN
+    # host at 192.168.12.1 (e.g. a home router) would win
+    if is_local_network(G1_AP_IP):
+        candidates.append((G1_AP_IP, "ap", False))
+
+    async def discover():
+        discovered = await discover_robot_async(target_mac=mac, verify_with_ping=False)
+        return discovered['ip'] if discovered else None
+
+    return await race_addresses(mac, candidates, discover())
+
 
 @app.post("/api/connect")
 async def connect_robot(mac: str, serial_number: str, mode: str = "auto"):
@@ -603,57 +872,42 @@ async def connect_robot(mac: str, serial_number: str, mode: str = "auto"):
         # Enforce single-app connection: if connected to another robot, refuse
         if robot and robot.connected:
             return {"success": False, "error": "Robot already connected. Disconnect first."}
+        if robot and robot.supervisor.state == "reconnecting":
+            return {"success": False, "error": "Reconnect in progress. Disconnect first to cancel it."}
         
         async with connect_lock:
-            # Determine IP based on mode
-            if mode == "ap":
-                # AP mode: use fixed IP
-                robot_ip = "192.168.12.1"
-                logger.info(f"AP mode connection to {robot_ip}")
-                
-            else:
-                # STA mode or auto: Discover IP from MAC address
-                logger.info(f"Discovering robot IP for MAC {mac}...")
-                from g1_app.utils.robot_discovery import discover_robot
-                discovered = discover_robot(target_mac=mac, verify_with_ping=False)
-                
-                if not discovered:
-                    logger.error(f"Robot with MAC {mac} not found on network")
-                    return {
-                        "success": False,
-                        "error": f"Robot not found on network",
-                        "suggestions": [
-                            "Check if robot is powered on",
-                            "Ensure robot is on same WiFi network",
-                            "Try AP mode: Connect to robot's WiFi 'G1_xxxx'"
-                        ]
-                    }
-                
-                robot_ip = discovered['ip']
-                logger.info(f"Discovered robot at {robot_ip} (SN: {serial_number}, online={discovered.get('online')})")
-            
-            # Check if robot is reachable
-            import subprocess
-            import platform
-            param = '-n' if platform.system().lower() == "windows" else '-c'
-            result = subprocess.run(['ping', param, '1', robot_ip], 
-                                  capture_output=True, text=True, timeout=3)
-            if result.returncode != 0:
-                logger.error(f"Robot at {robot_ip} is not reachable on network")
+            attempt = ConnectAttempt(mac=mac.lower(), started=time.time())
+            started = time.perf_counter()
+            robot_ip, source = await _resolve_robot_address(mac, mode)
+            attempt.ip, attempt.source = robot_ip, source
+            attempt.resolve_ms = round((time.perf_counter() - started) * 1000, 1)
+
+            if not robot_ip:
+                logger.error(f"Robot with MAC {mac} not found or not reachable")
+                attempt.error = "not found"
+                address_cache.record_attempt(attempt)
                 return {
                     "success": False,
-                    "error": f"Robot at {robot_ip} is not reachable",
+                    "error": f"Robot not found on network",
                     "suggestions": [
-                        "Check robot is powered on",
-                        "Verify network connection",
-                        "Try AP mode if on different network"
+                        "Check if robot is powered on",
+                        "Ensure robot is on same WiFi network",
+                        "Try AP mode: Connect to robot's WiFi 'G1_xxxx'"
                     ]
                 }
+            logger.info(f"Resolved robot at {robot_ip} via {source} in {attempt.resolve_ms:.0f} ms (SN: {serial_number})")
             
             try:
                 robot = RobotController(robot_ip, serial_number)
                 robot.robot_mac = mac  # Store MAC address for status API
-                await robot.connect()
+
+                async def resolve_again():
+                    # Discover phase of a supervised reconnect
+                    ip, _ = await _resolve_robot_address(mac, mode)
+                    return ip
+
+                robot.supervisor.resolver = resolve_again
+                await robot.connect(discover_ms=attempt.resolve_ms)
                 
                 # Initialize subscriptions for video, state updates, battery, etc.
                 await robot.initialize_subscriptions(
@@ -676,12 +930,23 @@ async def connect_robot(mac: str, serial_number: str, mode: str = "auto"):
                 on_state_change(initial_state)
                 print("DEBUG: Called on_state_change", flush=True)
                 logger.info("📤 Broadcasted initial state to WebSocket clients")
+
+                # Channels /ws clients subscribed to before the robot connected
+                ws_enabled_topics.clear()
+                await _sync_channel_groups()
+
+                attempt.success = True
+                attempt.connect_ms = round((time.perf_counter() - started) * 1000, 1)
+                address_cache.record(mac, robot_ip, network_mode(robot_ip), connected=True)
+                address_cache.record_attempt(attempt)
                 
             except Exception as e:
                 logger.error(f"Failed to connect to robot: {e}")
                 import traceback
                 traceback.print_exc()
                 robot = None
+                attempt.error = str(e)
+                address_cache.record_attempt(attempt)
                 return {
                     "success": False,
                     "error": f"Connection failed: {str(e)}",
@@ -734,6 +999,10 @@ async def disconnect_robot():
     
     try:
         if robot:
+            teach_recorder.detach()
+            ws_enabled_topics.clear()
+            if trajectory_player:
+                await trajectory_player.stop()
             await robot.disconnect()
             robot = None
         # Resume discovery after disconnect
@@ -793,6 +1062,34 @@ async def subscriptions_status():
     return {"success": True, **robot.get_subscription_status()}
 
 
+@app.get("/api/link/status")
+async def link_status():
+    """Datachannel RTT, sportmodestate gaps, shed groups and the shedding policy."""
+    global robot
+
+    if not robot or not robot.connected:
+        return {"success": False, "error": "Not connected"}
+
+    return {"success": True, **robot.link_monitor.get_stats()}
+
+
+@app.post("/api/link/policy")
+async def set_link_policy(request: Request):
+    """Replace the shedding policy of the active robot connection."""
+    global robot
+
+    if not robot:
+        return {"success": False, "error": "Not connected"}
+
+    try:
+        policy = SheddingPolicy.from_dict(await request.json())
+    except (KeyError, TypeError, ValueError) as e:
+        return {"success": False, "error": f"Invalid policy: {e}"}
+
+    robot.link_monitor.set_policy(policy)
+    return {"success": True, "policy": policy.to_dict()}
+
+
 @app.post("/api/set_state")
 async def set_fsm_state(state_name: str):
     """
@@ -914,10 +1211,12 @@ async def set_speed_mode_endpoint(mode: int):
         success = await robot.set_speed_mode(speed_mode)
         
         if success:
+            max_speeds = robot.get_max_speeds()
+            status_snapshot.update("speeds", max_speeds)
             return {
                 "success": True,
                 "speed_mode": mode,
-                "max_speeds": robot.get_max_speeds()
+                "max_speeds": max_speeds
             }
         else:
             return {"success": False, "error": "Failed to set speed mode"}
@@ -969,21 +1268,14 @@ async def set_balance_mode_endpoint(request: Request):
 
 
 @app.get("/api/max_speeds")
-async def get_max_speeds_endpoint():
+async def get_max_speeds_endpoint(request: Request):
     """Get current max speeds based on mode"""
-    global robot
-    
-    if not robot or not robot.connected:
-        return {"success": False, "error": "Not connected"}
-    
-    try:
-        return {
-            "success": True,
-            **robot.get_max_speeds()
-        }
-    except Exception as e:
-        logger.error(f"Move command failed: {e}")
-        return {"success": False, "error": str(e)}
+    def build(connection, speeds):
+        if not _is_connected(connection) or speeds is None:
+            return {"success": False, "error": "Not connected"}
+        return {"success": True, **speeds}
+
+    return _snapshot_response(request, "max_speeds", ("connection", "speeds"), build)
 
 @app.post("/api/gesture")
 async def execute_gesture_endpoint(request: Request):
@@ -1189,9 +1481,34 @@ async def _teach_recording_timeout():
     teach_recording_timeout_task = None
 
 
+async def _attach_teach_recorder() -> None:
+    """Enable rt/lowstate and feed it to the host-side recorder."""
+    await robot.enable_subscriptions(["lowstate"])
+    teach_recorder.attach(robot)
+
+
+@app.post("/api/teach/local/arm")
+async def arm_local_teach_capture():
+    """Start buffering arm motion so the next recording can include pre-roll."""
+    if not robot or not robot.connected:
+        return {"success": False, "error": "Robot not connected"}
+
+    try:
+        await _attach_teach_recorder()
+        return {"success": True, "max_pre_roll": teach_recorder.max_pre_roll}
+    except Exception as e:
+        logger.error(f"Arming local teach capture failed: {e}")
+        return {"success": False, "error": str(e)}
+
+
 @app.post("/api/teach/record/start")
 async def start_teach_recording(request: Request):
-    """Start teach-mode recording using API 7110 with keepalive."""
+    """Start teach-mode recording using API 7110 with keepalive.
+
+    A host-side copy is captured in parallel from rt/lowstate; pass
+    ``pre_roll`` (seconds) to include motion buffered since /api/teach/local/arm
+    and ``simplify_tolerance`` (radians) to keyframe-compress it on save.
+    """
     global robot, teach_recording_task, teach_recording_timeout_task, teach_recording_active, teach_recording_name
 
     if not robot or not robot.connected:
@@ -1215,7 +1532,19 @@ async def start_teach_recording(request: Request):
         teach_recording_task = asyncio.create_task(_teach_keepalive_loop())
         teach_recording_timeout_task = asyncio.create_task(_teach_recording_timeout())
 
-        return {"success": True, "action_name": action_name, "data": result}
+        local_recording = False
+        try:
+            await _attach_teach_recorder()
+            tolerance = data.get("simplify_tolerance")
+            local_recording = teach_recorder.start_recording(
+                action_name,
+                pre_roll=float(data.get("pre_roll", 0.0)),
+                simplify_tolerance=float(tolerance) if tolerance is not None else None,
+            )
+        except Exception as e:
+            logger.warning(f"Host-side teach capture unavailable: {e}")
+
+        return {"success": True, "action_name": action_name, "local_recording": local_recording, "data": result}
     except Exception as e:
         logger.error(f"Teach record start failed: {e}")
         return {"success": False, "error": str(e)}
@@ -1233,6 +1562,19 @@ async def stop_teach_recording():
         return {"success": False, "error": "Executor not initialized"}
 
     try:
+        local_recording = None
+        if teach_recorder.is_recording:
+            recording = teach_recorder.stop_recording(teach_recording_name)
+            if recording:
+                local_recording = {
+                    "name": recording.name,
+                    "duration": recording.duration,
+                    "sample_count": recording.sample_count,
+                    "sample_rate": recording.sample_rate,
+                    "simplification": (teach_recorder.last_simplification.to_dict()
+                                       if teach_recorder.last_simplification else None),
+                }
+
         result = await robot.executor.stop_teach_recording()
 
         teach_recording_active = False
@@ -1244,7 +1586,7 @@ async def stop_teach_recording():
             teach_recording_timeout_task.cancel()
             teach_recording_timeout_task = None
 
-        return {"success": True, "action_name": teach_recording_name, "data": result}
+        return {"success": True, "action_name": teach_recording_name, "local_recording": local_recording, "data": result}
     except Exception as e:
         logger.error(f"Teach record stop failed: {e}")
         return {"success": False, "error": str(e)}
@@ -1338,6 +1680,92 @@ async def stop_teach_action():
         return {"success": False, "error": str(e)}
 
 
+@app.get("/api/teach/local/recordings")
+async def list_local_recordings():
+    """List host-side teach recordings from the catalog (no data files are read)"""
+    try:
+        entries = teach_recorder.list_recording_info()
+        return {
+            "success": True,
+            "count": len(entries),
+            "recordings": [entry.to_dict() for entry in entries]
+        }
+    except Exception as e:
+        logger.error(f"List local recordings failed: {e}")
+        return {"success": False, "error": str(e)}
+
+
+@app.get("/api/teach/local/recordings/{action_name}")
+async def get_local_recording_info(action_name: str):
+    """Get catalog metadata of one host-side teach recording"""
+    entry = teach_recorder.get_recording_info(action_name)
+    if entry is None:
+        return {"success": False, "error": f"Recording '{action_name}' not found"}
+    return {"success": True, "recording": entry.to_dict()}
+
+
+@app.get("/api/teach/local/recordings/{action_name}/simplify")
+async def preview_recording_simplification(action_name: str, tolerance: float = 0.01):
+    """Report how far a recording would compress at a tolerance (nothing is saved)"""
+    recording = teach_recorder.load_recording(action_name)
+    if recording is None:
+        return {"success": False, "error": f"Recording '{action_name}' not found"}
+    _, _, report = simplify_trajectory(recording.timestamps, recording.positions,
+                                       tolerance, recording.joint_order)
+    return {"success": True, "report": report.to_dict()}
+
+
+@app.post("/api/teach/local/play")
+async def play_local_recording(request: Request):
+    """Play a host-side recording through rt/arm_sdk
+
+    Body: action_name, speed (default 1.0), loop (default false),
+    blend_time (seconds from the measured pose, default 1.0).
+    Progress is broadcast as ``trajectory_progress`` WebSocket messages.
+    """
+    global trajectory_player
+
+    if not robot or not robot.connected:
+        return {"success": False, "error": "Robot not connected"}
+
+    try:
+        data = await request.json()
+        action_name = data.get("action_name", "")
+        recording = teach_recorder.load_recording(action_name)
+        if recording is None:
+            return {"success": False, "error": f"Recording '{action_name}' not found"}
+
+        if trajectory_player is None or trajectory_player.robot is not robot:
+            trajectory_player = TrajectoryPlayer(robot)
+        if trajectory_player.is_playing:
+            return {"success": False, "error": "Playback already running"}
+
+        # Blending from the measured pose needs rt/lowstate
+        await robot.enable_subscriptions(["lowstate"])
+
+        started = trajectory_player.start(
+            recording,
+            speed=float(data.get("speed", 1.0)),
+            loop=bool(data.get("loop", False)),
+            blend_time=float(data.get("blend_time", 1.0)),
+        )
+        if not started:
+            return {"success": False, "error": "Failed to start playback"}
+        return {"success": True, "status": trajectory_player.status.to_dict()}
+    except Exception as e:
+        logger.error(f"Local playback failed: {e}")
+        return {"success": False, "error": str(e)}
+
+
+@app.post("/api/teach/local/stop")
+async def stop_local_playback():
+    """Stop host-side trajectory playback immediately"""
+    if trajectory_player is None:
+        return {"success": True, "status": None}
+    await trajectory_player.stop()
+    return {"success": True, "status": trajectory_player.status.to_dict()}
+
+
 # ========================================================================
 # ARM TEACHING ENDPOINTS (Coordinate-based motion control)
 # ========================================================================
@@ -1612,40 +2040,35 @@ async def debug_transitions():
 
 
 @app.get("/api/state")
-async def get_current_state():
+async def get_current_state(request: Request):
     """Get current robot state"""
-    global robot
-    
-    try:
-        if not robot or not robot.connected:
+    def build(connection, state):
+        if not _is_connected(connection) or state is None:
             return {"success": False, "error": "Not connected"}
-        
-        state = robot.current_state
-        allowed = robot.state_machine.get_allowed_transitions()
-        
-        # Debug logging
-        logger.info(f"Current state: {state.fsm_state.name} ({state.fsm_state.value})")
-        logger.info(f"Allowed transitions count: {len(allowed)}")
-        logger.info(f"Allowed transitions: {[s.name for s in sorted(allowed, key=lambda x: x.value)]}")
-        
         return {
             "success": True,
             "state": {
-                "fsm_state": state.fsm_state.name,
-                "fsm_state_value": state.fsm_state.value,
-                "led_color": state.led_color.value,
-                "error": state.error,
-                "allowed_transitions": [s.name for s in allowed]
+                "fsm_state": state["fsm_state"],
+                "fsm_state_value": state["fsm_state_value"],
+                "led_color": state["led_color"],
+                "error": state["error"],
+                "allowed_transitions": state["allowed_transitions"]
             }
         }
-    except Exception as e:
-        logger.error(f"Get state failed: {e}")
-        return {"success": False, "error": str(e)}
+
+    return _snapshot_response(request, "state", ("connection", "state"), build)
 
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time updates"""
+    """WebSocket endpoint for real-time updates
+
+    Query parameters: ``batch=1`` for one frame per 50 ms tick,
+    ``encoding=msgpack`` for binary MessagePack batch frames.
+
+    Client messages: ``ping``, and ``subscribe``/``unsubscribe`` with
+    ``channels`` as a list or a {channel: max_rate_hz} map (see ws_manager).
+    """
     await manager.connect(websocket)
     
     try:
@@ -1654,7 +2077,9 @@ async def websocket_endpoint(websocket: WebSocket):
             data = await websocket.receive_json()
             # Echo back for ping/pong
             if data.get("type") == "ping":
-                await websocket.send_json({"type": "pong"})
+                manager.send(websocket, {"type": "pong"})
+            else:
+                manager.handle_message(websocket, data)
     except WebSocketDisconnect:
         manager.disconnect(websocket)
     except Exception as e:
@@ -1662,6 +2087,12 @@ async def websocket_endpoint(websocket: WebSocket):
         manager.disconnect(websocket)
 
 
+@app.get("/api/ws/clients")
+async def get_websocket_clients():
+    """Per-client WebSocket queue depth, lag and throughput"""
+    return {"success": True, **manager.get_stats()}
+
+
 # ============================================================================
 # Audio Control Endpoints
 # ============================================================================
@@ -1754,87 +2185,152 @@ async def get_video_status():
             "message": "Video stream not yet initialized"
         }
 
+@app.get("/api/video/renditions")
+async def get_video_renditions_stats():
+    """Live JPEG renditions with per-rendition encode metrics"""
+    return {"success": True, "renditions": get_video_renditions().get_stats()}
+
+MJPEG_KEEPALIVE_SECONDS = 1.0  # Resend the current frame/placeholder this often when idle
+
+
+def _mjpeg_part(frame: bytes, frame_time: Optional[float] = None) -> bytes:
+    # X-Frame-Timestamp (source receive time, epoch seconds) lets clients measure latency
+    header = b'Content-Type: image/jpeg\r\n'
+    if frame_time:
+        header += f'X-Frame-Timestamp: {frame_time:.3f}\r\n'.encode()
+    return b'--frame\r\n' + header + b'\r\n' + frame + b'\r\n'
+
+
 @app.get("/api/video/stream")
-async def video_stream():
-    """MJPEG video stream from robot camera"""
+async def video_stream(w: Optional[int] = None, q: Optional[int] = None, fps: Optional[float] = None):
+    """MJPEG video stream from robot camera
+
+    Args:
+        w: Max frame width (snapped to 160/320/640; omit for source resolution)
+        q: JPEG quality (snapped to 40/60/80, default 80)
+        fps: Max frames per second sent to this client
+    
+    Each client is sent a frame only when a new one has been encoded; a
+    slow client skips to the newest frame. Clients asking for the same
+    rendition share one encode. Placeholders are pre-encoded and repeated
+    at a low keepalive rate.
+    """
     from fastapi.responses import StreamingResponse
-    import asyncio
-    import cv2
-    import numpy as np
     
+    encoder = get_video_renditions().get(w, q)
+    min_interval = 1.0 / fps if fps and fps > 0 else 0.0
+
     async def generate_frames():
         """Generate MJPEG frames from WebRTC video"""
         global robot
         
-        while True:
-            if not robot or not robot.connected:
-                # Send placeholder frame when disconnected
-                placeholder = np.zeros((480, 640, 3), dtype=np.uint8)
-                cv2.putText(placeholder, "No video - Robot disconnected", (50, 240),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                _, buffer = cv2.imencode('.jpg', placeholder)
-                frame = buffer.tobytes()
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-            elif hasattr(robot, 'latest_frame') and robot.latest_frame is not None:
-                # Send actual video frame
-                frame = robot.latest_frame
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-            else:
-                # Waiting for first frame
-                placeholder = np.zeros((480, 640, 3), dtype=np.uint8)
-                cv2.putText(placeholder, "Waiting for video...", (150, 240),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                _, buffer = cv2.imencode('.jpg', placeholder)
-                frame = buffer.tobytes()
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-            
-            await asyncio.sleep(0.033)  # ~30 FPS
+        # Frames are only encoded while at least one stream is open
+        encoder.acquire()
+        last_seq = -1
+        requested = time.monotonic()
+        first_frame_sent = False
+        try:
+            while True:
+                if not robot or not robot.connected:
+                    # Send placeholder frame when disconnected
+                    yield _mjpeg_part(get_placeholder("disconnected"))
+                    await asyncio.sleep(MJPEG_KEEPALIVE_SECONDS)
+                    continue
+                
+                if encoder.jpeg is None:
+                    # Waiting for first frame
+                    yield _mjpeg_part(get_placeholder("waiting"))
+                
+                result = await encoder.broadcaster.wait_for_frame(last_seq, timeout=MJPEG_KEEPALIVE_SECONDS)
+                if result is not None:
+                    # Send actual video frame
+                    last_seq, frame = result
+                    yield _mjpeg_part(frame, encoder.broadcaster.frame_time)
+                    if not first_frame_sent:
+                        first_frame_sent = True
+                        get_video_latency().record("mjpeg", "first_frame", (time.monotonic() - requested) * 1000)
+                    if min_interval:
+                        await asyncio.sleep(min_interval)
+                elif encoder.jpeg is not None:
+                    # Stream stalled - repeat the last frame so proxies keep the connection
+                    yield _mjpeg_part(encoder.jpeg)
+        finally:
+            encoder.release()
     
     return StreamingResponse(generate_frames(), media_type="multipart/x-mixed-replace; boundary=frame")
 
 
+@app.post("/api/video/webrtc/offer")
+async def video_webrtc_offer(request: Request):
+    """WebRTC signaling: relay the robot video track to a browser
+
+    Body: {"sdp": ..., "type": "offer", "source": "robot" | "synthetic"}
+    Returns the SDP answer. MJPEG (/api/video/stream) remains the fallback.
+    """
+    global synthetic_video_relay
+    
+    try:
+        data = await request.json()
+        if data.get("source") == "synthetic":
+            if synthetic_video_relay is None:
+                synthetic_video_relay = VideoRelay(SyntheticVideoTrack())
+            relay = synthetic_video_relay
+        else:
+            if not robot or not robot.connected:
+                return {"success": False, "error": "Robot not connected"}
+            relay = get_video_relay()
+        
+        answer = await relay.handle_offer(data["sdp"], data.get("type", "offer"))
+        return {"success": True, "sdp": answer.sdp, "type": answer.type}
+    except Exception as e:
+        logger.error(f"WebRTC video offer failed: {e}")
+        return {"success": False, "error": str(e)}
+
+
+@app.get("/api/video/webrtc/status")
+async def video_webrtc_status():
+    """WebRTC relay state (source, active peers)"""
+    return {"success": True, "relay": get_video_relay().get_stats()}
+
+
+@app.post("/api/video/latency")
+async def report_video_latency(request: Request):
+    """Record a client-measured latency sample
+
+    Body: {"path": "mjpeg" | "webrtc", "metric": "glass_to_glass" | "first_frame", "latency_ms": float}
+    """
+    try:
+        data = await request.json()
+        get_video_latency().record(data["path"], data["metric"], float(data["latency_ms"]))
+        return {"success": True}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.get("/api/video/latency")
+async def get_video_latency_stats():
+    """First-frame and glass-to-glass latency of the MJPEG and WebRTC paths"""
+    return {"success": True, "latency": get_video_latency().summary()}
+
+
 # ============================================================================
 # LiDAR Status Endpoint
 # ============================================================================
 
 @app.get("/api/status")
-async def get_status():
+async def get_status(request: Request):
     """Get overall robot status"""
-    global robot
-    
-    try:
-        print(f"DEBUG /api/status: robot={robot}, robot.connected={robot.connected if robot else 'N/A'}")
-        connected = robot.connected if robot else False
-        robot_name = "Unknown"
-        fsm_id = 0
-        battery = 0
-        
-        if robot:
-            if hasattr(robot, 'robot_name'):
-                robot_name = robot.robot_name
-            if connected and hasattr(robot, 'state_machine') and robot.state_machine:
-                if hasattr(robot.state_machine, 'current_state'):
-                    fsm_id = robot.state_machine.current_state.fsm_id
-                    battery = robot.state_machine.current_state.battery_percentage
-        
+    def build(connection, state, battery):
+        connected = _is_connected(connection)
         return {
             "connected": connected,
-            "robot_name": robot_name,
-            "fsm_id": fsm_id,
-            "battery": battery
-        }
-    except Exception as e:
-        logger.error(f"Error in /api/status: {e}", exc_info=True)
-        return {
-            "connected": False,
-            "robot_name": "Error",
-            "fsm_id": 0,
-            "battery": 0
+            "robot_name": connection["robot"]["serial_number"] if connected else "Unknown",
+            "fsm_id": state["fsm_state_value"] if connected and state else 0,
+            "battery": (battery or {}).get("soc") or 0 if connected else 0
         }
 
+    return _snapshot_response(request, "status", ("connection", "state", "battery"), build)
+
 @app.get("/api/lidar/status")
 async def get_lidar_status():
     """Get LiDAR status"""
@@ -1950,26 +2446,88 @@ async def slam_close():
         logger.error(f"Failed to close SLAM: {e}")
         return {"success": False, "error": str(e)}
 
+TRAJECTORY_PACKED_FIELDS = ["x", "y", "z", "timestamp"]
+
+
+def _pack_trajectory(points: List[Dict]) -> List[float]:
+    """Flatten trajectory points to [x0, y0, z0, t0, x1, ...] (positions rounded to mm)"""
+    values: List[float] = []
+    for point in points:
+        values.extend((
+            round(point['x'], 3),
+            round(point['y'], 3),
+            round(point['z'], 3),
+            point.get('timestamp', 0)
+        ))
+    return values
+
+
 @app.get("/api/slam/trajectory")
-async def get_slam_trajectory():
-    """Get current SLAM trajectory for live 3D visualization"""
+async def get_slam_trajectory(since: Optional[int] = None, epoch: Optional[int] = None,
+                              format: str = "json"):
+    """Get current SLAM trajectory for live 3D visualization
+
+    Args:
+        since: Cursor (``seq`` of a previous response) - only newer points are returned
+        epoch: ``epoch`` of that previous response; a new trajectory forces ``reset``
+        format: "json" for a list of point dicts, "packed" for a flat ``values``
+            array of TRAJECTORY_PACKED_FIELDS per point
+
+    When ``reset`` is true the response holds the whole retained trajectory and
+    replaces (rather than extends) what the client has.
+    """
     global robot
     
     if not robot or not robot.connected:
         return {"success": False, "error": "Not connected", "points": []}
     
     try:
-        trajectory = getattr(robot, 'slam_trajectory', [])
-        return {
+        result = robot.get_trajectory_since(since, epoch)
+        points = result['points']
+        response = {
             "success": True,
-            "points": trajectory,
-            "count": len(trajectory),
-            "active": getattr(robot, 'slam_active', False)
+            "count": len(points),
+            "active": getattr(robot, 'slam_active', False),
+            "seq": result['seq'],
+            "epoch": result['epoch'],
+            "reset": result['reset']
         }
+        if format == "packed":
+            response["fields"] = TRAJECTORY_PACKED_FIELDS
+            response["values"] = _pack_trajectory(points)
+        else:
+            response["points"] = points
+        return response
     except Exception as e:
         logger.error(f"Error getting trajectory: {e}")
         return {"success": False, "error": str(e), "points": []}
 
+@app.get("/api/slam/trajectory/export")
+async def export_slam_trajectory():
+    """Download the SLAM trajectory in slam_map_trajectory.txt format"""
+    global robot
+
+    if not robot or not robot.connected:
+        return {"success": False, "error": "Not connected"}
+
+    try:
+        return Response(
+            content=robot.export_trajectory(),
+            media_type="text/plain",
+            headers={"Content-Disposition": "attachment; filename=slam_map_trajectory.txt"}
+        )
+    except Exception as e:
+        logger.error(f"Error exporting trajectory: {e}")
+        return {"success": False, "error": str(e)}
+
+
+def _latest_trajectory_pose() -> Optional[Dict]:
+    last = robot.trajectory_store.last()
+    if last is None:
+        return None
+    return robot.trajectory_store.to_dicts(last[None, :])[0]
+
+
 @app.get("/api/slam/download_map")
 async def download_slam_map():
     """Download the PCD map file generated by SLAM
@@ -2250,14 +2808,14 @@ async def get_navigation_status():
         "current_goal": getattr(robot, 'navigation_goal', None),
         "slam_info": {
             "active": getattr(robot, 'slam_active', False),
-            "trajectory_points": len(getattr(robot, 'slam_trajectory', [])),
-            "latest_pose": robot.slam_trajectory[-1] if getattr(robot, 'slam_trajectory', []) else None
+            "trajectory_points": len(robot.trajectory_store),
+            "latest_pose": _latest_trajectory_pose()
         }
     }
 
 
 @app.get("/api/slam/current_position")
-async def get_current_position():
+async def get_current_position(request: Request):
     """Get current robot position from SLAM relocation odometry
     
     Returns:
@@ -2274,21 +2832,19 @@ async def get_current_position():
         "timestamp": 1707123456.789
     }
     """
-    global robot
-    
-    if not robot or not robot.connected:
-        return {"success": False, "error": "Not connected"}
-    
-    position = getattr(robot, 'current_position', {})
-    updates = getattr(robot, 'current_position_updates', 0)
-    
-    return {
-        "success": True,
-        "position": position,
-        "updates_received": updates,
-        "has_relocation": updates > 0,
-        "timestamp": position.get('timestamp', 0)
-    }
+    def build(connection, position):
+        if not _is_connected(connection) or position is None:
+            return {"success": False, "error": "Not connected"}
+        updates = position["updates_received"]
+        return {
+            "success": True,
+            "position": position["position"],
+            "updates_received": updates,
+            "has_relocation": updates > 0,
+            "timestamp": position["position"].get('timestamp', 0)
+        }
+
+    return _snapshot_response(request, "slam_position", ("connection", "position"), build)
 
 
 # ========================================================================
@@ -2424,7 +2980,10 @@ async def arm_play_sequence(request: Request):
                 {"arm": "right", "joints": [7 angles]},
                 ...
             ],
-            "speed": 1.0 (optional)
+            "speed": 1.0 (optional),
+            "tolerance": 0.01 (optional, radians - drop waypoints that linear
+                         interpolation reproduces within this bound; the kept
+                         waypoints take over the dropped ones' playback time)
         }
     """
     global robot, arm_controller
@@ -2449,6 +3008,12 @@ async def arm_play_sequence(request: Request):
             logger.warning("No waypoints provided")
             return {"success": False, "error": "No waypoints provided"}
         
+        simplification = None
+        if data.get("tolerance") is not None:
+            waypoints, report = simplify_waypoints(waypoints, float(data["tolerance"]))
+            simplification = report.to_dict()
+            logger.info(f"Simplified sequence: {report.original_count} -> {report.kept_count} waypoints")
+        
         # Initialize arm controller if needed
         if arm_controller is None:
             logger.debug("Initializing arm controller...")
@@ -2464,7 +3029,8 @@ async def arm_play_sequence(request: Request):
             return {
                 "success": True,
                 "message": f"Played sequence with {len(waypoints)} waypoints",
-                "waypoint_count": len(waypoints)
+                "waypoint_count": len(waypoints),
+                "simplification": simplification
             }
         else:
             logger.error("❌ Sequence playback failed")
@@ -0,0 +1,424 @@
+"""
+WebSocket Connection Manager - Concurrent fan-out to /ws clients
+
+Each client gets a bounded outbound queue drained by its own writer task, so
+a broadcast serializes the message once and only enqueues it: a slow or
+half-dead browser delays nobody else. Clients whose queue overflows or whose
+send lag exceeds a threshold are evicted.
+
+Event handlers ``publish`` into the current tick instead of sending directly.
+A ticker flushes every WS_TICK_HZ: state-like messages (published with a key)
+keep only their latest value per tick, and clients that negotiated batching
+(``/ws?batch=1&encoding=json|msgpack``) get one frame per tick, encoded once
+per format. Legacy clients keep receiving individual JSON messages.
+
+Every message belongs to a channel. Clients pick channels and a maximum rate
+per channel with ``{"type": "subscribe", "channels": {"pose": 5, "imu": 0}}``
+(0 = every tick) and drop them with ``{"type": "unsubscribe", ...}``; clients
+that never subscribe get LEGACY_CHANNELS. ``publish`` discards messages for
+channels nobody is subscribed to, and ``on_demand_change`` reports the set of
+channels in demand so the server can drive the robot-side subscriptions.
+"""
+
+import asyncio
+import itertools
+import json
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple, Union
+import logging
+
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+WS_QUEUE_SIZE = 256  # Messages buffered per client before it is evicted
+WS_MAX_LAG_SECONDS = 5.0  # Max time between broadcast and actual send
+WS_SEND_TIMEOUT = 5.0  # A single send blocking longer than this evicts the client
+WS_TICK_HZ = 20.0  # Published messages are flushed at this rate
+
+CHANNELS = ("state", "battery", "pose", "trajectory", "lidar", "imu", "topics-metrics", "events")
+LEGACY_CHANNELS = ("state", "battery", "events")  # What a client gets before it subscribes
+
+Payload = Union[str, bytes]  # str is sent as a text frame, bytes as binary
+
+
+class ClientConnection:
+    """One /ws client: outbound queue, writer task and lag metrics"""
+
+    def __init__(self, websocket: WebSocket, queue_size: int = WS_QUEUE_SIZE,
+                 batch: bool = False, encoding: str = "json"):
+        self.websocket = websocket
+        self.batch = batch  # One frame per tick instead of one per message
+        self.encoding = encoding  # "json" or "msgpack" (batched clients only)
+        self.queue: "asyncio.Queue[Tuple[Payload, float]]" = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+        self.connected_at = time.time()
+        self.client = f"{websocket.client.host}:{websocket.client.port}" if websocket.client else "unknown"
+
+        # Channel -> max rate in Hz (0 = every tick)
+        self.subscriptions: Dict[str, float] = {channel: 0.0 for channel in LEGACY_CHANNELS}
+        self.last_sent: Dict[str, float] = {}  # Channel -> time.monotonic() of last delivery
+        # Latest keyed message per key held back by a channel rate limit
+        self.held: Dict[Hashable, Tuple[str, dict]] = {}
+        self.messages_dropped = 0  # Unkeyed messages skipped by a rate limit
+
+        # Metrics
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.last_lag_ms = 0.0  # Enqueue -> sent, last message
+        self.max_lag_ms = 0.0
+
+    def enqueue(self, payload: Payload, enqueued_at: float) -> bool:
+        """Queue a serialized message; False if the queue is full"""
+        try:
+            self.queue.put_nowait((payload, enqueued_at))
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def due_channels(self, now: float, tick_interval: float) -> Set[str]:
+        """Subscribed channels whose rate limit allows a delivery this tick"""
+        due = set()
+        for channel, rate in self.subscriptions.items():
+            if rate <= 0:
+                due.add(channel)
+                continue
+            # Half a tick of slack so e.g. 5 Hz lands exactly on every 4th 20 Hz tick
+            last = self.last_sent.get(channel)
+            if last is None or now - last >= 1.0 / rate - tick_interval / 2:
+                due.add(channel)
+        return due
+
+    def get_stats(self) -> dict:
+        return {
+            "client": self.client,
+            "batch": self.batch,
+            "encoding": self.encoding,
+            "subscriptions": dict(self.subscriptions),
+            "messages_dropped": self.messages_dropped,
+            "connected_for": round(time.time() - self.connected_at, 1),
+            "queued": self.queue.qsize(),
+            "messages_sent": self.messages_sent,
+            "bytes_sent": self.bytes_sent,
+            "last_lag_ms": round(self.last_lag_ms, 1),
+            "max_lag_ms": round(self.max_lag_ms, 1),
+        }
+
+
+class ConnectionManager:
+    """Tracks /ws clients and fans broadcasts out to their queues"""
+
+    def __init__(self, queue_size: int = WS_QUEUE_SIZE, max_lag: float = WS_MAX_LAG_SECONDS,
+                 send_timeout: float = WS_SEND_TIMEOUT, tick_hz: float = WS_TICK_HZ):
+        self.queue_size = queue_size
+        self.max_lag = max_lag
+        self.send_timeout = send_timeout
+        self.tick_interval = 1.0 / tick_hz
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self.evictions = 0
+
+        # Called with the set of channels that have subscribers whenever it changes
+        self.on_demand_change: Optional[Callable[[Set[str]], None]] = None
+        self._demand: Set[str] = set()
+
+        # (channel, message) published since the last tick, in publish order. Keyed
+        # messages replace (and move behind) the previous value of their key.
+        self._pending: Dict[Hashable, Tuple[str, dict]] = {}
+        self._event_ids = itertools.count()
+        self._ticker: Optional[asyncio.Task] = None
+        self.tick_seq = 0
+        self.messages_coalesced = 0
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.clients.keys())
+
+    async def connect(self, websocket: WebSocket) -> ClientConnection:
+        """
+        Accept a client, negotiating batching/encoding from the query string
+
+        ``?batch=1`` enables per-tick batches, ``&encoding=msgpack`` binary
+        frames (falls back to JSON if msgpack is not installed). Negotiating
+        clients get a ``hello`` message with the settings in effect.
+        """
+        await websocket.accept()
+        params = websocket.query_params
+        batch = params.get("batch", "0").lower() in ("1", "true", "yes")
+        encoding = params.get("encoding", "json").lower()
+        if encoding != "msgpack" or not MSGPACK_AVAILABLE or not batch:
+            encoding = "json"
+
+        client = ClientConnection(websocket, self.queue_size, batch=batch, encoding=encoding)
+        client.writer = asyncio.create_task(self._writer(client))
+        self.clients[websocket] = client
+        if "batch" in params or "encoding" in params:
+            self.send(websocket, {
+                "type": "hello",
+                "batch": batch,
+                "encoding": encoding,
+                "tick_hz": round(1.0 / self.tick_interval, 1),
+                "channels": list(CHANNELS),
+            })
+        self._update_demand()
+        if self._ticker is None or self._ticker.done():
+            self._ticker = asyncio.create_task(self._tick_loop())
+        logger.info(f"WebSocket client connected (batch={batch}, encoding={encoding}). Total: {len(self.clients)}")
+        return client
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.clients.pop(websocket, None)
+        if client is None:
+            return
+        if client.writer and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+        self._update_demand()
+        logger.info(f"WebSocket client disconnected. Total: {len(self.clients)}")
+
+    def has_subscribers(self, channel: str) -> bool:
+        """True if any client would receive messages published on ``channel``"""
+        return channel in self._demand
+
+    def _update_demand(self) -> None:
+        demand = set()
+        for client in self.clients.values():
+            demand.update(client.subscriptions)
+        if demand == self._demand:
+            return
+        self._demand = demand
+        if self.on_demand_change:
+            try:
+                self.on_demand_change(set(demand))
+            except Exception as e:
+                logger.error(f"Channel demand callback failed: {e}")
+
+    @staticmethod
+    def _parse_channels(spec, default_rate: float) -> Dict[str, float]:
+        """``{"pose": 5}`` or ``["pose", "imu"]`` -> {channel: rate}"""
+        if isinstance(spec, str):
+            spec = [spec]
+        if isinstance(spec, dict):
+            return {str(name): float(rate or 0.0) for name, rate in spec.items()}
+        return {str(name): default_rate for name in (spec or [])}
+
+    def handle_message(self, websocket: WebSocket, data: dict) -> bool:
+        """
+        Handle a subscribe/unsubscribe request from a client
+
+        Replies with a ``subscribed`` message listing the channels (and
+        rates) now in effect, plus any names that are not channels.
+
+        Returns:
+            True if the message was a subscription request
+        """
+        kind = data.get("type")
+        if kind not in ("subscribe", "unsubscribe"):
+            return False
+        client = self.clients.get(websocket)
+        if client is None:
+            return True
+
+        try:
+            requested = self._parse_channels(data.get("channels"), float(data.get("max_rate") or 0.0))
+        except (TypeError, ValueError):
+            self.send(websocket, {"type": "error", "error": "Invalid channel rates"})
+            return True
+        unknown = sorted(name for name in requested if name not in CHANNELS)
+        tick_hz = 1.0 / self.tick_interval
+        for channel, rate in requested.items():
+            if channel not in CHANNELS:
+                continue
+            if kind == "subscribe":
+                # Rates at or above the tick rate are the same as "every tick"
+                client.subscriptions[channel] = 0.0 if rate >= tick_hz else max(rate, 0.0)
+            else:
+                client.subscriptions.pop(channel, None)
+                client.last_sent.pop(channel, None)
+                client.held = {key: held for key, held in client.held.items() if held[0] != channel}
+
+        self._update_demand()
+        reply = {"type": "subscribed", "channels": dict(client.subscriptions)}
+        if unknown:
+            reply["unknown"] = unknown
+        self.send(websocket, reply)
+        return True
+
+    def _evict(self, client: ClientConnection, reason: str) -> None:
+        if client.websocket not in self.clients:
+            return
+        self.evictions += 1
+        logger.warning(f"Evicting WebSocket client {client.client}: {reason}")
+        self.disconnect(client.websocket)
+        # Close in the background; a stuck socket must not block the caller
+        asyncio.create_task(self._close(client.websocket))
+
+    @staticmethod
+    async def _close(websocket: WebSocket) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), timeout=1.0)  # 1013 = try again later
+        except Exception:
+            pass
+
+    async def _writer(self, client: ClientConnection) -> None:
+        """Drain one client's queue"""
+        try:
+            while True:
+                payload, enqueued_at = await client.queue.get()
+                if isinstance(payload, bytes):
+                    send = client.websocket.send_bytes(payload)
+                else:
+                    send = client.websocket.send_text(payload)
+                await asyncio.wait_for(send, timeout=self.send_timeout)
+
+                lag = time.monotonic() - enqueued_at
+                client.messages_sent += 1
+                client.bytes_sent += len(payload)
+                client.last_lag_ms = lag * 1000
+                client.max_lag_ms = max(client.max_lag_ms, client.last_lag_ms)
+                if lag > self.max_lag:
+                    self._evict(client, f"lagging {lag:.1f}s behind")
+                    return
+        except asyncio.CancelledError:
+            pass
+        except asyncio.TimeoutError:
+            self._evict(client, f"send blocked for more than {self.send_timeout:.0f}s")
+        except Exception as e:
+            logger.error(f"Error sending to client {client.client}: {e}")
+            self._evict(client, "send failed")
+
+    def send(self, websocket: WebSocket, message: dict) -> None:
+        """Queue a message for one client (bypasses tick batching)"""
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        if client.encoding == "msgpack":
+            payload: Payload = msgpack.packb(message, default=str)
+        else:
+            payload = json.dumps(message)
+        if not client.enqueue(payload, time.monotonic()):
+            self._evict(client, "outbound queue full")
+
+    def publish(self, message: dict, channel: str = "events", key: Optional[Hashable] = None) -> None:
+        """
+        Queue a message for the next tick (cheap; call from event handlers)
+
+        Args:
+            message: JSON-serializable message
+            channel: Channel the message belongs to (see CHANNELS)
+            key: Coalescing key for state-like messages - only the latest
+                message per key is delivered each tick, and a rate-limited
+                client gets the latest one when its channel is next due.
+                None = deliver every message (dropped when rate-limited).
+        """
+        if channel not in self._demand:
+            return
+        if key is None:
+            key = ("event", next(self._event_ids))
+        elif key in self._pending:
+            del self._pending[key]  # Re-insert behind newer events
+            self.messages_coalesced += 1
+        self._pending[key] = (channel, message)
+
+    async def _tick_loop(self) -> None:
+        """Flush published messages every tick while clients are connected"""
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while self.clients:
+            next_tick += self.tick_interval
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            if self._pending or any(client.held for client in self.clients.values()):
+                try:
+                    self._flush()
+                except Exception as e:
+                    logger.error(f"Error flushing WebSocket tick: {e}")
+        self._pending.clear()
+
+    def _select(self, client: ClientConnection, pending: List[Tuple[Hashable, str, dict]],
+                now: float) -> List[dict]:
+        """Messages this client receives this tick, honouring its channel rates"""
+        due = client.due_channels(now, self.tick_interval)
+        selected: List[dict] = []
+        delivered: Set[str] = set()
+        for key, (channel, message) in list(client.held.items()):
+            if channel in due and key not in self._pending:
+                selected.append(message)
+                delivered.add(channel)
+                del client.held[key]
+        for key, channel, message in pending:
+            if channel not in client.subscriptions:
+                continue
+            if channel in due:
+                client.held.pop(key, None)
+                selected.append(message)
+                delivered.add(channel)
+            elif isinstance(key, tuple) and key[:1] == ("event",):
+                client.messages_dropped += 1
+            else:
+                client.held[key] = (channel, message)
+        for channel in delivered:
+            client.last_sent[channel] = now
+        return selected
+
+    def _flush(self) -> None:
+        pending = [(key, channel, message) for key, (channel, message) in self._pending.items()]
+        self.tick_seq += 1
+        now = time.monotonic()
+
+        # Serialize each representation at most once per tick: one text per
+        # message for legacy clients, one frame per (selection, encoding) for
+        # batched clients - clients with the same subscriptions share it
+        texts: Dict[int, str] = {}
+        batches: Dict[Tuple[str, Tuple[int, ...]], Payload] = {}
+        for client in list(self.clients.values()):
+            messages = self._select(client, pending, now)
+            if not messages:
+                continue
+            if client.batch:
+                cache_key = (client.encoding, tuple(id(message) for message in messages))
+                payload = batches.get(cache_key)
+                if payload is None:
+                    frame = {"type": "batch", "seq": self.tick_seq, "messages": messages}
+                    if client.encoding == "msgpack":
+                        payload = msgpack.packb(frame, default=str)
+                    else:
+                        payload = json.dumps(frame)
+                    batches[cache_key] = payload
+                ok = client.enqueue(payload, now)
+            else:
+                ok = True
+                for message in messages:
+                    text = texts.get(id(message))
+                    if text is None:
+                        text = texts[id(message)] = json.dumps(message)
+                    ok = ok and client.enqueue(text, now)
+            if not ok:
+                self._evict(client, "outbound queue full")
+        self._pending.clear()
+
+    async def broadcast(self, message: dict, channel: str = "events"):
+        """
+        Send a message to every client subscribed to ``channel``
+
+        Same as an unkeyed publish(): delivered on the next tick, honouring
+        each client's channel subscriptions, rate limits and encoding.
+        """
+        self.publish(message, channel=channel)
+
+    def get_stats(self) -> dict:
+        return {
+            "clients": [client.get_stats() for client in self.clients.values()],
+            "evictions": self.evictions,
+            "tick_hz": round(1.0 / self.tick_interval, 1),
+            "ticks": self.tick_seq,
+            "messages_coalesced": self.messages_coalesced,
+            "channels": {channel: sum(channel in client.subscriptions for client in self.clients.values())
+                         for channel in CHANNELS},
+            "msgpack_available": MSGPACK_AVAILABLE,
+            "queue_size": self.queue_size,
+            "max_lag_seconds": self.max_lag,
+        }
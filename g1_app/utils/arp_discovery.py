@@ -1,18 +1,18 @@
 #!/usr/bin/env python3
 """
-Robot Discovery - Scapy-based ARP Scanning (Production)
+Robot Discovery - ARP Subnet Sweep (Production)
 
 CANONICAL IMPLEMENTATION for all G1 robot discovery across the project.
 
 Technology Stack:
-- Python scapy library for ARP scanning
+- Concurrent asyncio subnet sweep (subnet_sweep) for ARP scanning
 - No external tools (no nmap, no arp-scan)
 - No sudo/root permissions required
 - Cross-platform (Linux, Windows, macOS)
 
 Performance:
 - <5 seconds on typical networks
-- Optimized for eth1 interface only
+- All directly connected interfaces swept concurrently
 - Smart subnet selection (/24 for large networks)
 
 Key Features:
@@ -32,13 +32,16 @@ Phone log insights:
 - Network modes: AP (192.168.12.1), STA-L (local network), STA-T (remote/cloud)
 - WiFi interface MAC: fc:23:cd:92:60:02 (WiFi), fe:23:cd:92:60:02 (BLE)
 """
+import asyncio
 import subprocess
 import logging
 import socket
 import ipaddress
 import platform
-from typing import Optional, Tuple
-from scapy.all import ARP, Ether, srp
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Optional, Tuple, TypeVar
+
+from .subnet_sweep import SWEEP_TIMEOUT, sweep_for_mac
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +55,27 @@ MULTICAST_GROUP = "231.1.1.2"  # Robot multicast group (discovered in logs)
 MULTICAST_PORT = 7400  # DDS discovery port
 BROADCAST_PORT = 7400  # UDP broadcast port
 
+T = TypeVar('T')
+
+
+def run_blocking(coro: Awaitable[T]) -> T:
+    """
+    Run a discovery coroutine to completion from synchronous code.
+
+    asyncio.run() cannot be used while this thread already runs an event
+    loop, so in that case the coroutine gets its own loop in a worker thread.
+    That still blocks the caller's loop until discovery finishes; async code
+    should await the coroutine instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    name = getattr(coro, "__qualname__", "the async variant")
+    logger.warning(f"Synchronous discovery called from a running event loop; await {name}() instead")
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
 def try_multicast_discovery(timeout: float = 2.0) -> Optional[str]:
     """
     Attempt robot discovery via multicast (as Android app does).
@@ -206,9 +230,8 @@ def discover_robot_ip(target_mac: str = G1_MAC, timeout: int = 10, fast: bool =
     Discovery order (if fast=True):
     1. Multicast discovery (231.1.1.2) - Android app uses this
     2. AP mode check (192.168.12.1) - Default when robot is hotspot
-    3. ARP table scan - Fast if cache populated
-    4. Network broadcast + ARP rescan
-    5. Full nmap scan (slowest, most thorough)
+    3. ARP table lookup - Fast if cache populated
+    4. Concurrent subnet sweep of the local /24s
     
     Args:
         target_mac: MAC address to search for (default: G1_6937)
@@ -227,57 +250,16 @@ def discover_robot_ip(target_mac: str = G1_MAC, timeout: int = 10, fast: bool =
         logger.info(f"✅ Found in AP mode: {G1_AP_IP}")
         return G1_AP_IP
     
-    # FAST METHOD 2: Scapy ARP scan (pure Python, no sudo needed)
-    # Skip multicast for MAC-based discovery - it doesn't return MAC info and adds 2+ seconds
-    logger.info("Trying scapy ARP scan for MAC discovery...")
-    interfaces = get_network_interfaces()
-    
-    # Filter to only scan eth1 (primary network where robot lives)
-    # Skip loopback, docker, and other virtual interfaces for speed
-    eth1_interfaces = [(iface, ip, cidr) for iface, ip, cidr in interfaces if iface == 'eth1']
-    
-    if not eth1_interfaces:
-        # Fallback: scan first real network interface if eth1 not found
-        eth1_interfaces = [(iface, ip, cidr) for iface, ip, cidr in interfaces 
-                          if not iface.startswith(('lo', 'docker', 'veth', 'br-'))][:1]
-    
-    for iface_name, local_ip, network_cidr in eth1_interfaces:
-        try:
-            # For large networks (/22, /21, etc), scan only the /24 containing local IP
-            # This reduces scan from 1024 IPs to 256 IPs for much faster discovery
-            ip_obj = ipaddress.ip_interface(network_cidr)
-            if ip_obj.network.prefixlen < 24:
-                # Large network - use /24 subnet containing local IP
-                network_addr = str(ipaddress.ip_network(f"{local_ip}/24", strict=False))
-                logger.debug(f"Large network detected ({network_cidr}), scanning /24 subset: {network_addr}")
-            else:
-                # Small network - scan entire subnet
-                network_addr = str(ipaddress.ip_network(network_cidr, strict=False))
-            
-            logger.debug(f"Scanning {network_addr} on {iface_name}...")
-            
-            # Create ARP request packet for subnet
-            arp = ARP(pdst=network_addr)
-            ether = Ether(dst="ff:ff:ff:ff:ff:ff")
-            packet = ether/arp
-            
-            # Send packet and get responses (2.5 second timeout optimized for /24 networks)
-            answered, _ = srp(packet, timeout=2.5, verbose=False, iface=iface_name)
-            
-            # Check each response for target MAC
-            for sent, received in answered:
-                mac = received.hwsrc.lower()
-                ip = received.psrc
-                
-                if mac == target_mac:
-                    mode = detect_network_mode(ip)
-                    logger.info(f"✅ Found robot at {ip} via scapy ARP scan (MAC: {target_mac}, mode: {mode})")
-                    return ip
-                    
-        except Exception as e:
-            logger.debug(f"Scapy scan on {iface_name} failed: {e}")
-            continue
-    
+    # FAST METHOD 2: Concurrent subnet sweep (raw ARP when permitted, else
+    # UDP-triggered kernel ARP resolution); returns on the first MAC match
+    logger.info("Sweeping local subnets for MAC discovery...")
+    sweep = run_blocking(sweep_for_mac(target_mac, timeout=SWEEP_TIMEOUT if fast else timeout))
+    if sweep.ip:
+        mode = detect_network_mode(sweep.ip)
+        logger.info(f"✅ Found robot at {sweep.ip} via {sweep.method} "
+                    f"(MAC: {target_mac}, mode: {mode}, {sweep.elapsed_ms:.0f} ms)")
+        return sweep.ip
+
     # Provide helpful error message based on network modes from phone logs
     raise RuntimeError(
         f"Robot with MAC {target_mac} not found.\n"
@@ -0,0 +1,195 @@
+"""
+Multicast Listener - Always-on receiver for robot announcements
+
+Joins the robot multicast group (231.1.1.2:7400) once and keeps the socket
+open, so every announcement is seen as it arrives instead of only those that
+land inside a short polling window. Datagrams are handled by an asyncio
+DatagramProtocol on the event loop; no thread and no per-scan socket setup.
+
+Announcements are counted per source address. RTPS datagrams (DDS participant
+announcements on port 7400) also carry the sender's GUID prefix, which is kept
+as a stable participant id. Every DDS participant on the LAN sends to this
+group, so at most MAX_SOURCES senders are tracked and ones silent for
+SOURCE_TTL are forgotten.
+"""
+
+import asyncio
+import socket
+import struct
+import time
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Optional
+import logging
+
+from .arp_discovery import MULTICAST_GROUP, MULTICAST_PORT
+
+logger = logging.getLogger(__name__)
+
+RTPS_MAGIC = b"RTPS"
+DISCOVERY_PROBE = b"G1_DISCOVERY"  # Sent by try_multicast_discovery; not an announcement
+MAX_SOURCES = 64  # Senders tracked at once; the least recently heard is dropped first
+SOURCE_TTL = 600.0  # Seconds of silence before a sender is forgotten
+
+
+@dataclass
+class Announcement:
+    """One datagram received on the multicast group"""
+    ip: str
+    port: int
+    kind: str  # "rtps" or "raw"
+    guid_prefix: Optional[str]  # RTPS participant GUID prefix (hex)
+    size: int
+    received: float  # time.monotonic()
+
+
+@dataclass
+class SourceStats:
+    """Announcement counters for one sender"""
+    count: int = 0
+    first_seen: float = 0.0  # time.time()
+    last_seen: float = 0.0
+    guid_prefix: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def parse_announcement(data: bytes, addr) -> Optional[Announcement]:
+    """
+    Classify a datagram from the group
+
+    Returns:
+        Announcement, or None for our own discovery probes and empty packets
+    """
+    if not data or data == DISCOVERY_PROBE:
+        return None
+    guid_prefix = None
+    kind = "raw"
+    # RTPS header: "RTPS", version (2), vendor id (2), GUID prefix (12)
+    if len(data) >= 20 and data[:4] == RTPS_MAGIC:
+        kind = "rtps"
+        guid_prefix = data[8:20].hex()
+    return Announcement(ip=addr[0], port=addr[1], kind=kind, guid_prefix=guid_prefix,
+                        size=len(data), received=time.monotonic())
+
+
+class _AnnouncementProtocol(asyncio.DatagramProtocol):
+    def __init__(self, listener: "MulticastListener"):
+        self.listener = listener
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self.listener._on_datagram(data, addr)
+
+    def error_received(self, exc: Exception) -> None:
+        self.listener.errors += 1
+        logger.debug(f"Multicast listener error: {exc}")
+
+
+class MulticastListener:
+    """Long-lived multicast membership delivering Announcements to a callback"""
+
+    def __init__(self, callback: Optional[Callable[[Announcement], None]] = None,
+                 group: str = MULTICAST_GROUP, port: int = MULTICAST_PORT,
+                 interface: str = "0.0.0.0"):
+        self.callback = callback
+        self.group = group
+        self.port = port
+        self.interface = interface
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self.sources: Dict[str, SourceStats] = {}  # Least recently heard first
+        self.sources_dropped = 0
+        self.received = 0
+        self.ignored = 0
+        self.errors = 0
+
+    @property
+    def active(self) -> bool:
+        return self._transport is not None
+
+    def _open_socket(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if hasattr(socket, "SO_REUSEPORT"):
+                # Lets try_multicast_discovery and other tools bind the port too
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            sock.bind(("", self.port))
+            mreq = struct.pack("4s4s", socket.inet_aton(self.group), socket.inet_aton(self.interface))
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+            sock.setblocking(False)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    async def start(self) -> bool:
+        """
+        Join the group and start receiving
+
+        Returns:
+            True if listening, False if the socket could not be set up
+        """
+        if self._transport is not None:
+            return True
+        try:
+            sock = self._open_socket()
+        except OSError as e:
+            logger.warning(f"Multicast listener unavailable on {self.group}:{self.port}: {e}")
+            return False
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _AnnouncementProtocol(self), sock=sock)
+        logger.info(f"📡 Listening for robot announcements on {self.group}:{self.port}")
+        return True
+
+    def stop(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    def _on_datagram(self, data: bytes, addr) -> None:
+        announcement = parse_announcement(data, addr)
+        if announcement is None:
+            self.ignored += 1
+            return
+        self.received += 1
+        now = time.time()
+        stats = self.sources.pop(announcement.ip, None)  # Re-inserted as most recent
+        if stats is None:
+            self._drop_stale_sources(now)
+            stats = SourceStats(first_seen=now)
+            logger.info(f"📣 First announcement from {announcement.ip} ({announcement.kind})")
+        self.sources[announcement.ip] = stats
+        stats.count += 1
+        stats.last_seen = now
+        if announcement.guid_prefix:
+            stats.guid_prefix = announcement.guid_prefix
+        if self.callback:
+            try:
+                self.callback(announcement)
+            except Exception as e:
+                logger.error(f"Announcement handler failed: {e}")
+
+    def _drop_stale_sources(self, now: float) -> None:
+        """Make room for a new sender: expire silent ones, then the least recently heard"""
+        while self.sources:
+            ip, oldest = next(iter(self.sources.items()))
+            if len(self.sources) < MAX_SOURCES and now - oldest.last_seen < SOURCE_TTL:
+                return
+            del self.sources[ip]
+            self.sources_dropped += 1
+
+    def count(self, ip: str) -> int:
+        stats = self.sources.get(ip)
+        return stats.count if stats else 0
+
+    def get_stats(self) -> dict:
+        return {
+            "active": self.active,
+            "group": f"{self.group}:{self.port}",
+            "received": self.received,
+            "ignored": self.ignored,
+            "errors": self.errors,
+            "sources_dropped": self.sources_dropped,
+            "sources": {ip: stats.to_dict() for ip, stats in self.sources.items()},
+        }
@@ -0,0 +1,292 @@
+"""
+Neighbor Table - Subprocess-free ARP/route lookups and async liveness probes
+
+Reads the kernel neighbor and route tables straight from /proc/net/arp and
+/proc/net/route instead of spawning ``arp``/``ip``/``ping``. Liveness is
+checked with asyncio probes that run concurrently and never block the event
+loop:
+
+- ICMP echo over an unprivileged datagram socket (Linux, needs the process
+  group inside ``net.ipv4.ping_group_range``; skipped if not permitted)
+- TCP connect to the robot's WebRTC signalling ports; a refused connection
+  still proves the host is up
+
+On systems without /proc the ARP table falls back to ``arp`` in a worker
+thread; every such spawn is counted in DiscoveryMetrics.subprocess_spawns.
+"""
+
+import asyncio
+import errno
+import ipaddress
+import os
+import socket
+import struct
+import subprocess
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Sequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROC_ARP = "/proc/net/arp"
+PROC_ROUTE = "/proc/net/route"
+PROBE_PORTS = (8081, 9991)  # Robot WebRTC signalling ports
+PROBE_TIMEOUT = 0.8  # Seconds per liveness probe
+
+ATF_COM = 0x02  # /proc/net/arp flag: entry complete (has a MAC)
+RTF_UP = 0x0001  # /proc/net/route flag: route usable
+
+
+@dataclass
+class NeighborEntry:
+    """One complete entry of the kernel ARP table"""
+    ip: str
+    mac: str
+    device: str
+
+
+@dataclass
+class RouteEntry:
+    """One usable IPv4 route"""
+    network: ipaddress.IPv4Network
+    device: str
+    gateway: Optional[str]  # None for directly connected networks
+
+
+@dataclass
+class DiscoveryMetrics:
+    """Per-scan timing and probe counters"""
+    scans: int = 0
+    last_scan_ms: float = 0.0
+    max_scan_ms: float = 0.0
+    total_scan_ms: float = 0.0
+    probes: int = 0
+    probes_alive: int = 0
+    icmp_available: Optional[bool] = None  # None until the first ICMP attempt
+    subprocess_spawns: int = 0  # Stays 0 on Linux
+
+    def record_scan(self, duration_ms: float) -> None:
+        self.scans += 1
+        self.last_scan_ms = duration_ms
+        self.max_scan_ms = max(self.max_scan_ms, duration_ms)
+        self.total_scan_ms += duration_ms
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["avg_scan_ms"] = round(self.total_scan_ms / self.scans, 2) if self.scans else 0.0
+        for key in ("last_scan_ms", "max_scan_ms", "total_scan_ms"):
+            data[key] = round(data[key], 2)
+        return data
+
+
+_metrics = DiscoveryMetrics()
+
+def get_discovery_metrics() -> DiscoveryMetrics:
+    """Get the shared discovery metrics"""
+    return _metrics
+
+
+def _hex_to_ipv4(value: str) -> str:
+    """/proc/net/route stores addresses as little-endian hex"""
+    return socket.inet_ntoa(struct.pack("<I", int(value, 16)))
+
+
+def read_arp_table(path: str = PROC_ARP) -> Optional[List[NeighborEntry]]:
+    """
+    Complete entries of the kernel ARP table
+
+    Returns:
+        Entries, or None if ``path`` does not exist (non-Linux)
+    """
+    try:
+        with open(path) as f:
+            lines = f.read().splitlines()[1:]
+    except FileNotFoundError:
+        return None
+
+    entries = []
+    for line in lines:
+        # IP address  HW type  Flags  HW address  Mask  Device
+        parts = line.split()
+        if len(parts) < 6:
+            continue
+        if not int(parts[2], 16) & ATF_COM or parts[3] == "00:00:00:00:00:00":
+            continue
+        entries.append(NeighborEntry(ip=parts[0], mac=parts[3].lower(), device=parts[5]))
+    return entries
+
+
+def _arp_command_table() -> List[NeighborEntry]:
+    """``arp`` fallback for systems without /proc/net/arp"""
+    _metrics.subprocess_spawns += 1
+    windows = os.name == "nt"
+    result = subprocess.run(['arp', '-a'] if windows else ['arp', '-an'],
+                            capture_output=True, text=True, timeout=2)
+    entries = []
+    for line in result.stdout.splitlines():
+        parts = line.replace('(', ' ').replace(')', ' ').split()
+        ip = next((p for p in parts if p.count('.') == 3), None)
+        mac = next((p.replace('-', ':').lower() for p in parts
+                    if p.count(':') == 5 or p.count('-') == 5), None)
+        if ip and mac:
+            entries.append(NeighborEntry(ip=ip, mac=mac, device=""))
+    return entries
+
+
+async def get_neighbors() -> List[NeighborEntry]:
+    """ARP table without blocking the event loop"""
+    entries = read_arp_table()
+    if entries is not None:
+        return entries
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, _arp_command_table)
+    except Exception as e:
+        logger.debug(f"arp fallback failed: {e}")
+        return []
+
+
+def find_mac(mac: str, entries: Sequence[NeighborEntry]) -> Optional[NeighborEntry]:
+    mac = mac.lower()
+    return next((entry for entry in entries if entry.mac == mac), None)
+
+
+def find_ip(ip: str, entries: Sequence[NeighborEntry]) -> Optional[NeighborEntry]:
+    return next((entry for entry in entries if entry.ip == ip), None)
+
+
+def read_routes(path: str = PROC_ROUTE) -> List[RouteEntry]:
+    """Usable IPv4 routes from /proc/net/route (empty list if unavailable)"""
+    try:
+        with open(path) as f:
+            lines = f.read().splitlines()[1:]
+    except OSError:
+        return []
+
+    routes = []
+    for line in lines:
+        # Iface  Destination  Gateway  Flags  RefCnt  Use  Metric  Mask ...
+        parts = line.split()
+        if len(parts) < 8 or not int(parts[3], 16) & RTF_UP:
+            continue
+        try:
+            network = ipaddress.IPv4Network(f"{_hex_to_ipv4(parts[1])}/{_hex_to_ipv4(parts[7])}")
+        except ValueError:
+            continue
+        gateway = _hex_to_ipv4(parts[2])
+        routes.append(RouteEntry(network=network, device=parts[0],
+                                 gateway=None if gateway == "0.0.0.0" else gateway))
+    return routes
+
+
+def is_local_network(ip: str, routes: Optional[List[RouteEntry]] = None) -> bool:
+    """True if ``ip`` is on a directly connected network"""
+    routes = read_routes() if routes is None else routes
+    address = ipaddress.IPv4Address(ip)
+    return any(route.gateway is None and route.network.prefixlen > 0 and address in route.network
+               for route in routes)
+
+
+def network_mode(ip: str, routes: Optional[List[RouteEntry]] = None) -> str:
+    """
+    "AP" (robot hotspot), "STA-L" (same network) or "STA-T" (different network)
+
+    Same classification as arp_discovery.detect_network_mode, from the route
+    table instead of ``ip addr``.
+    """
+    if ip.startswith("192.168.12."):
+        return "AP"
+    try:
+        return "STA-L" if is_local_network(ip, routes) else "STA-T"
+    except ValueError:
+        return "STA-T"
+
+
+def _icmp_checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+async def icmp_probe(ip: str, timeout: float = PROBE_TIMEOUT) -> Optional[bool]:
+    """
+    ICMP echo over an unprivileged datagram socket
+
+    Returns:
+        True on reply, False on timeout, None if ICMP sockets are not permitted
+    """
+    if _metrics.icmp_available is False:
+        return None
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+    except OSError as e:
+        if e.errno in (errno.EACCES, errno.EPERM, errno.EPROTONOSUPPORT, errno.EAFNOSUPPORT):
+            logger.info("Unprivileged ICMP not permitted - liveness uses TCP probes only")
+            _metrics.icmp_available = False
+            return None
+        # e.g. EMFILE/ENFILE during a wide sweep: skip ICMP for this probe only
+        logger.debug(f"ICMP socket for {ip} unavailable: {e}")
+        return None
+    _metrics.icmp_available = True
+
+    loop = asyncio.get_running_loop()
+    sock.setblocking(False)
+    try:
+        # The kernel rewrites the identifier for datagram ICMP sockets
+        header = struct.pack("!BBHHH", 8, 0, 0, 0, 1)
+        payload = struct.pack("!d", time.monotonic())
+        packet = struct.pack("!BBHHH", 8, 0, _icmp_checksum(header + payload), 0, 1) + payload
+        await loop.sock_sendto(sock, packet, (ip, 0))
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            reply = await asyncio.wait_for(loop.sock_recv(sock, 1024), remaining)
+            if reply and reply[0] == 0:  # Echo reply
+                return True
+    except (asyncio.TimeoutError, OSError):
+        return False
+    finally:
+        sock.close()
+
+
+async def tcp_probe(ip: str, port: int, timeout: float = PROBE_TIMEOUT) -> bool:
+    """True if ``ip`` answers on ``port`` - with a handshake or a refusal"""
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+        writer.close()
+        return True
+    except ConnectionRefusedError:
+        return True  # RST: the host is up, the port is just closed
+    except (asyncio.TimeoutError, OSError):
+        return False
+
+
+async def probe_host(ip: str, ports: Sequence[int] = PROBE_PORTS,
+                     timeout: float = PROBE_TIMEOUT) -> bool:
+    """
+    Concurrent ICMP + TCP liveness check; returns as soon as one probe succeeds
+    """
+    _metrics.probes += 1
+    probes = [asyncio.ensure_future(icmp_probe(ip, timeout))]
+    probes += [asyncio.ensure_future(tcp_probe(ip, port, timeout)) for port in ports]
+    try:
+        for finished in asyncio.as_completed(probes):
+            if await finished:
+                _metrics.probes_alive += 1
+                return True
+        return False
+    finally:
+        for probe in probes:
+            probe.cancel()
+
+
+async def probe_hosts(ips: Sequence[str], ports: Sequence[int] = PROBE_PORTS,
+                      timeout: float = PROBE_TIMEOUT) -> Dict[str, bool]:
+    """Probe several hosts concurrently -> {ip: alive}"""
+    results = await asyncio.gather(*(probe_host(ip, ports, timeout) for ip in ips))
+    return dict(zip(ips, results))
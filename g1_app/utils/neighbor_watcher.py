@@ -0,0 +1,182 @@
+"""
+Neighbor Watcher - Push notifications of kernel neighbor (ARP) changes
+
+Subscribes to the rtnetlink RTMGRP_NEIGH multicast group and parses
+RTM_NEWNEIGH / RTM_DELNEIGH messages as the kernel emits them, so a robot's
+MAC-to-IP binding is known the moment the kernel learns it instead of at the
+next poll. The socket is non-blocking and serviced with loop.add_reader; no
+thread and no subprocess are involved.
+
+Linux only: NETLINK_AVAILABLE is False elsewhere and start() returns False, in
+which case callers keep polling /proc/net/arp (see neighbor_table).
+"""
+
+import asyncio
+import socket
+import struct
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+NETLINK_AVAILABLE = hasattr(socket, "AF_NETLINK")
+
+NETLINK_ROUTE = 0
+RTMGRP_NEIGH = 0x4
+RTM_NEWNEIGH = 28
+RTM_DELNEIGH = 29
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+
+NDA_DST = 1
+NDA_LLADDR = 2
+
+# Neighbor (NUD) states
+NUD_INCOMPLETE = 0x01
+NUD_REACHABLE = 0x02
+NUD_STALE = 0x04
+NUD_DELAY = 0x08
+NUD_PROBE = 0x10
+NUD_FAILED = 0x20
+NUD_NOARP = 0x40
+NUD_PERMANENT = 0x80
+
+NUD_VALID = NUD_REACHABLE | NUD_STALE | NUD_DELAY | NUD_PROBE | NUD_PERMANENT | NUD_NOARP
+
+_NLMSGHDR = struct.Struct("=IHHII")  # len, type, flags, seq, pid
+_NDMSG = struct.Struct("=BxxxiHBB")  # family, ifindex, state, flags, type
+_RTATTR = struct.Struct("=HH")  # len, type
+
+
+@dataclass
+class NeighborEvent:
+    """One kernel neighbor table change"""
+    ip: str
+    mac: Optional[str]
+    state: int
+    ifindex: int
+    deleted: bool
+    received: float  # time.monotonic()
+
+    @property
+    def reachable(self) -> bool:
+        """Kernel has recently confirmed two-way reachability"""
+        return not self.deleted and bool(self.state & (NUD_REACHABLE | NUD_PERMANENT))
+
+    @property
+    def failed(self) -> bool:
+        return self.deleted or bool(self.state & NUD_FAILED)
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def parse_neighbor_messages(data: bytes, received: Optional[float] = None):
+    """Yield NeighborEvents for the IPv4 RTM_NEWNEIGH/RTM_DELNEIGH messages in ``data``"""
+    received = time.monotonic() if received is None else received
+    offset = 0
+    while offset + _NLMSGHDR.size <= len(data):
+        msg_len, msg_type, _, _, _ = _NLMSGHDR.unpack_from(data, offset)
+        if msg_len < _NLMSGHDR.size or offset + msg_len > len(data):
+            break  # Malformed or truncated
+        body = offset + _NLMSGHDR.size
+        end = offset + msg_len
+        offset += _align(msg_len)
+        if msg_type not in (RTM_NEWNEIGH, RTM_DELNEIGH) or body + _NDMSG.size > end:
+            continue
+
+        family, ifindex, state, _, _ = _NDMSG.unpack_from(data, body)
+        if family != socket.AF_INET:
+            continue
+        ip = mac = None
+        attr = body + _NDMSG.size
+        while attr + _RTATTR.size <= end:
+            attr_len, attr_type = _RTATTR.unpack_from(data, attr)
+            if attr_len < _RTATTR.size:
+                break
+            value = data[attr + _RTATTR.size:attr + attr_len]
+            if attr_type == NDA_DST and len(value) == 4:
+                ip = socket.inet_ntoa(value)
+            elif attr_type == NDA_LLADDR and len(value) == 6:
+                mac = ":".join(f"{b:02x}" for b in value)
+            attr += _align(attr_len)
+        if ip:
+            yield NeighborEvent(ip=ip, mac=mac, state=state, ifindex=ifindex,
+                                deleted=msg_type == RTM_DELNEIGH, received=received)
+
+
+class NeighborWatcher:
+    """Delivers NeighborEvents to a callback from the asyncio loop"""
+
+    def __init__(self, callback: Callable[[NeighborEvent], None]):
+        self.callback = callback
+        self._sock: Optional[socket.socket] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.events = 0
+        self.errors = 0
+
+    @property
+    def active(self) -> bool:
+        return self._sock is not None
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> bool:
+        """
+        Join RTMGRP_NEIGH and start reading
+
+        Returns:
+            True if watching, False if netlink is unavailable
+        """
+        if self._sock is not None:
+            return True
+        if not NETLINK_AVAILABLE:
+            return False
+        sock = None
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+            sock.setblocking(False)
+            sock.bind((0, RTMGRP_NEIGH))
+        except OSError as e:
+            if sock is not None:
+                sock.close()
+            logger.info(f"Neighbor netlink unavailable ({e}) - falling back to polling")
+            return False
+
+        self._loop = loop or asyncio.get_running_loop()
+        self._sock = sock
+        self._loop.add_reader(sock.fileno(), self._on_readable)
+        logger.info("📡 Watching kernel neighbor table (rtnetlink)")
+        return True
+
+    def stop(self) -> None:
+        if self._sock is None:
+            return
+        try:
+            self._loop.remove_reader(self._sock.fileno())
+        finally:
+            self._sock.close()
+            self._sock = None
+
+    def _on_readable(self) -> None:
+        received = time.monotonic()
+        while self._sock is not None:
+            try:
+                data = self._sock.recv(65536)
+            except BlockingIOError:
+                return
+            except OSError as e:
+                # ENOBUFS: the kernel dropped events; the periodic confirm catches up
+                self.errors += 1
+                logger.debug(f"Neighbor netlink read failed: {e}")
+                return
+            for event in parse_neighbor_messages(data, received):
+                self.events += 1
+                try:
+                    self.callback(event)
+                except Exception as e:
+                    logger.error(f"Neighbor event handler failed: {e}")
+
+    def get_stats(self) -> dict:
+        return {"active": self.active, "events": self.events, "errors": self.errors}
@@ -6,8 +6,8 @@ All local scripts and utilities should use this module.
 
 Architecture:
 - Multicast discovery (231.1.1.2:7400) - fastest when robot broadcasts
-- ARP scan with ping verification - reliable fallback
-- Network mode detection (AP/STA-L/STA-T)
+- Concurrent subnet sweep (subnet_sweep) raced against it
+- Liveness probes and network mode detection (AP/STA-L/STA-T) via neighbor_table
 
 Usage:
     from g1_app.utils.robot_discovery import discover_robot
@@ -16,43 +16,90 @@ Usage:
     if robot:
         print(f"Robot: {robot['ip']} - {robot['mode']} - {'ONLINE' if robot['online'] else 'OFFLINE'}")
 """
-import subprocess
+import asyncio
 import logging
 from typing import Optional, Dict
 from .arp_discovery import (
     try_multicast_discovery,
-    detect_network_mode,
-    discover_robot_ip as arp_discover_robot_ip,
-    G1_MAC,
-    G1_AP_IP
+    run_blocking,
+    G1_MAC
 )
+from .neighbor_table import find_ip, network_mode, probe_host, read_arp_table
+from .subnet_sweep import SWEEP_TIMEOUT, sweep_for_mac
 
 logger = logging.getLogger(__name__)
 
+MULTICAST_TIMEOUT = 0.5  # Seconds to listen for the robot's multicast
 
-def _mac_for_ip(ip: str) -> Optional[str]:
-    """Resolve MAC for a specific IP via ip neigh/arp."""
-    try:
-        result = subprocess.run(['ip', 'neigh', 'show', ip], capture_output=True, text=True, timeout=1)
-        for line in result.stdout.split('\n'):
-            if ip in line and 'lladdr' in line:
-                parts = line.split()
-                if 'lladdr' in parts:
-                    return parts[parts.index('lladdr') + 1].lower()
-    except Exception:
-        pass
 
-    try:
-        result = subprocess.run(['arp', '-n', ip], capture_output=True, text=True, timeout=1)
-        for line in result.stdout.split('\n'):
-            if ip in line:
-                parts = line.split()
-                if len(parts) >= 3:
-                    return parts[2].lower()
-    except Exception:
-        pass
+async def _multicast_candidate(target_mac: str) -> Optional[str]:
+    """Multicast sender IP, if the neighbor table maps it to ``target_mac``"""
+    loop = asyncio.get_running_loop()
+    ip = await loop.run_in_executor(None, try_multicast_discovery, MULTICAST_TIMEOUT)
+    if not ip:
+        return None
+    entry = find_ip(ip, read_arp_table() or [])
+    if entry is None or entry.mac != target_mac:
+        logger.debug(f"Multicast IP {ip} not confirmed as {target_mac}; continuing sweep")
+        return None
+    return ip
 
-    return None
+
+async def discover_robot_async(target_mac: str = G1_MAC, verify_with_ping: bool = True,
+                               timeout: float = SWEEP_TIMEOUT) -> Optional[Dict[str, any]]:
+    """
+    Discover robot without blocking the event loop.
+
+    Multicast listening and a concurrent subnet sweep run side by side; the
+    first to identify ``target_mac`` wins and the other is cancelled.
+
+    Args:
+        target_mac: MAC address to find (default: G1_6937)
+        verify_with_ping: If True, verify the robot answers a liveness probe
+        timeout: Maximum seconds for the sweep
+
+    Returns:
+        Dict with keys: ip, mac, mode, online, method, elapsed_ms
+        None if robot not found
+    """
+    target_mac = target_mac.lower().replace("-", ":").replace(".", ":")
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    multicast = asyncio.ensure_future(_multicast_candidate(target_mac))
+    sweep = asyncio.ensure_future(sweep_for_mac(target_mac, timeout=timeout))
+    ip = method = None
+    try:
+        pending = {multicast, sweep}
+        while pending and not ip:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    logger.debug(f"Discovery method failed: {task.exception()}")
+                elif task is multicast and task.result():
+                    ip, method = task.result(), "multicast"
+                elif task is sweep and task.result().ip:
+                    ip, method = task.result().ip, task.result().method
+    finally:
+        for task in (multicast, sweep):
+            task.cancel()
+
+    if not ip:
+        logger.warning(f"Robot not found (MAC: {target_mac})")
+        return None
+
+    online = await probe_host(ip) if verify_with_ping else True
+    mode = network_mode(ip)
+    elapsed_ms = (loop.time() - started) * 1000
+    logger.info(f"✓ Robot found via {method}: {ip} ({mode}) in {elapsed_ms:.0f} ms")
+    return {
+        'ip': ip,
+        'mac': target_mac,
+        'mode': mode,
+        'online': online,
+        'method': method,
+        'elapsed_ms': round(elapsed_ms, 1),
+    }
 
 
 def discover_robot(target_mac: str = G1_MAC, verify_with_ping: bool = True) -> Optional[Dict[str, any]]:
@@ -60,11 +107,13 @@ def discover_robot(target_mac: str = G1_MAC, verify_with_ping: bool = True) -> O
     Discover robot using the same method as the web server.
     
     This is the RECOMMENDED way to discover robots in all scripts.
-    Uses the proven multicast + ARP + ping verification approach.
+    Synchronous wrapper around discover_robot_async(); code already running
+    in an event loop should await that instead (called from a running loop,
+    discovery runs in a worker thread and blocks the loop until it finishes).
     
     Args:
         target_mac: MAC address to find (default: G1_6937)
-        verify_with_ping: If True, verify robot responds to ping (recommended)
+        verify_with_ping: If True, verify robot responds to a liveness probe (recommended)
     
     Returns:
         Dict with keys: ip, mac, mode, online
@@ -77,96 +126,7 @@ def discover_robot(target_mac: str = G1_MAC, verify_with_ping: bool = True) -> O
         else:
             print("Robot offline or not found")
     """
-    target_mac = target_mac.lower().replace("-", ":").replace(".", ":")
-    
-    # STEP 1: Try multicast discovery (fastest)
-    logger.debug("Trying multicast discovery...")
-    multicast_ip = try_multicast_discovery(timeout=0.5)
-    
-    if multicast_ip:
-        resolved_mac = _mac_for_ip(multicast_ip)
-        if resolved_mac and resolved_mac != target_mac:
-            logger.debug(f"Multicast IP {multicast_ip} maps to {resolved_mac}, not target {target_mac}; continuing scan")
-            multicast_ip = None
-
-    if multicast_ip:
-        # Verify MAC via ARP
-        try:
-            result = subprocess.run(['arp', '-n', multicast_ip],
-                                   capture_output=True, text=True, timeout=1)
-            for line in result.stdout.split('\n'):
-                if multicast_ip in line:
-                    parts = line.split()
-                    if len(parts) >= 3 and parts[2].lower() == target_mac:
-                        mode = detect_network_mode(multicast_ip)
-                        logger.info(f"✓ Robot found via multicast: {multicast_ip} ({mode})")
-                        return {
-                            'ip': multicast_ip,
-                            'mac': target_mac,
-                            'mode': mode,
-                            'online': True
-                        }
-        except Exception as e:
-            logger.debug(f"Multicast MAC verification failed: {e}")
-    
-    # STEP 2: Full ARP/broadcast fallback (fast path)
-    logger.debug("Trying ARP/broadcast scan...")
-    try:
-        ip = arp_discover_robot_ip(target_mac=target_mac, timeout=3, fast=True)
-        if ip:
-            online = True
-            if verify_with_ping:
-                try:
-                    ping_result = subprocess.run(
-                        ['ping', '-c', '1', '-W', '1', ip],
-                        capture_output=True,
-                        timeout=2
-                    )
-                    online = ping_result.returncode == 0
-                except Exception:
-                    online = False
-
-            mode = detect_network_mode(ip)
-            logger.info(f"✓ Robot found via scan: {ip} ({mode})")
-            return {
-                'ip': ip,
-                'mac': target_mac,
-                'mode': mode,
-                'online': online
-            }
-    except Exception as e:
-        logger.error(f"ARP/broadcast scan failed: {e}")
-
-    # STEP 3: Full network scan fallback (slower)
-    logger.debug("Trying full network scan...")
-    try:
-        ip = arp_discover_robot_ip(target_mac=target_mac, timeout=8, fast=False)
-        if ip:
-            online = True
-            if verify_with_ping:
-                try:
-                    ping_result = subprocess.run(
-                        ['ping', '-c', '1', '-W', '1', ip],
-                        capture_output=True,
-                        timeout=2
-                    )
-                    online = ping_result.returncode == 0
-                except Exception:
-                    online = False
-
-            mode = detect_network_mode(ip)
-            logger.info(f"✓ Robot found via full scan: {ip} ({mode})")
-            return {
-                'ip': ip,
-                'mac': target_mac,
-                'mode': mode,
-                'online': online
-            }
-    except Exception as e:
-        logger.error(f"Full scan failed: {e}")
-    
-    logger.warning(f"Robot not found (MAC: {target_mac})")
-    return None
+    return run_blocking(discover_robot_async(target_mac, verify_with_ping))
 
 
 def wait_for_robot(target_mac: str = G1_MAC, timeout: int = 30, check_interval: int = 2) -> Optional[Dict[str, any]]:
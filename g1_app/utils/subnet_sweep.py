@@ -0,0 +1,259 @@
+"""
+Subnet Sweep - Concurrent asyncio search of local /24s for a robot MAC
+
+Replaces the serial scapy ``srp`` / nmap scans. Every host of each directly
+connected network (narrowed to the /24 around our address on larger
+networks) is probed concurrently, at most ``window`` hosts in flight:
+
+- Raw ARP who-has over an AF_PACKET socket when the process may open one
+  (CAP_NET_RAW); replies are read with loop.add_reader.
+- Otherwise (and in addition) a UDP datagram to the robot's WebRTC ports,
+  which makes the kernel ARP-resolve the host; the neighbor table is
+  watched for the answer.
+
+The sweep returns as soon as the target MAC shows up and cancels every probe
+still outstanding.
+"""
+
+import asyncio
+import ipaddress
+import socket
+import struct
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+from .neighbor_table import PROBE_PORTS, find_mac, read_arp_table, read_routes
+
+logger = logging.getLogger(__name__)
+
+SWEEP_WINDOW = 64  # Hosts with an outstanding probe at any time
+SWEEP_TIMEOUT = 3.0  # Seconds for a whole sweep
+HOST_WAIT = 0.5  # Seconds a host holds its window slot waiting for ARP resolution
+ARP_POLL_INTERVAL = 0.05  # Seconds between neighbor table reads
+
+ETH_P_ARP = 0x0806
+SKIP_INTERFACES = ('lo', 'docker', 'veth', 'br-')
+
+_ARP_REQUEST = struct.Struct("!6s6sH HHBBH6s4s6s4s")  # Ethernet header + ARP payload
+
+
+@dataclass
+class SweepResult:
+    """Where the target MAC answered, and what the sweep cost"""
+    ip: Optional[str]
+    mac: str
+    method: Optional[str]  # "arp-cache", "raw-arp", "udp" or None if not found
+    elapsed_ms: float
+    hosts: int
+    probes_sent: int
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["elapsed_ms"] = round(self.elapsed_ms, 1)
+        return data
+
+
+def _local_address(network: ipaddress.IPv4Network) -> Optional[str]:
+    """Our address on ``network`` (UDP connect sends nothing)"""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect((str(network.network_address + 1), 9))
+            return s.getsockname()[0]
+    except OSError:
+        return None
+
+
+def target_networks() -> List[Tuple[str, ipaddress.IPv4Network, Optional[str]]]:
+    """
+    Networks to sweep as (interface, network, local_ip)
+
+    Directly connected routes on real interfaces; networks larger than /24 are
+    narrowed to the /24 containing our address.
+    """
+    targets = []
+    for route in read_routes():
+        if route.gateway is not None or route.network.prefixlen == 0:
+            continue
+        if route.device.startswith(SKIP_INTERFACES):
+            continue
+        local_ip = _local_address(route.network)
+        network = route.network
+        if network.prefixlen < 24 and local_ip:
+            network = ipaddress.IPv4Network(f"{local_ip}/24", strict=False)
+        targets.append((route.device, network, local_ip))
+    return targets
+
+
+def _interface_mac(iface: str) -> Optional[bytes]:
+    try:
+        text = Path(f"/sys/class/net/{iface}/address").read_text().strip()
+        return bytes.fromhex(text.replace(":", ""))
+    except (OSError, ValueError):
+        return None
+
+
+class _RawArp:
+    """Broadcast ARP requests on one interface and report replies"""
+
+    def __init__(self, iface: str, local_ip: str, on_reply):
+        self.iface = iface
+        self.local_ip = socket.inet_aton(local_ip)
+        self.mac = _interface_mac(iface)
+        self.on_reply = on_reply
+        self.sock: Optional[socket.socket] = None
+
+    def open(self, loop: asyncio.AbstractEventLoop) -> bool:
+        if self.mac is None or not hasattr(socket, "AF_PACKET"):
+            return False
+        try:
+            sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ARP))
+            sock.bind((self.iface, 0))
+            sock.setblocking(False)
+        except OSError:
+            return False  # Not permitted (no CAP_NET_RAW)
+        self.sock = sock
+        loop.add_reader(sock.fileno(), self._on_readable)
+        return True
+
+    def request(self, ip: str) -> bool:
+        frame = _ARP_REQUEST.pack(
+            b"\xff" * 6, self.mac, ETH_P_ARP,
+            1, 0x0800, 6, 4, 1,  # Ethernet/IPv4, who-has
+            self.mac, self.local_ip, b"\0" * 6, socket.inet_aton(ip),
+        )
+        try:
+            self.sock.send(frame)
+            return True
+        except OSError:
+            return False
+
+    def _on_readable(self) -> None:
+        while self.sock is not None:
+            try:
+                frame = self.sock.recv(128)
+            except (BlockingIOError, OSError):
+                return
+            if len(frame) < _ARP_REQUEST.size:
+                continue
+            fields = _ARP_REQUEST.unpack_from(frame)
+            if fields[2] == ETH_P_ARP and fields[7] == 2:  # ARP reply
+                mac = ":".join(f"{b:02x}" for b in fields[8])
+                self.on_reply(socket.inet_ntoa(fields[9]), mac)
+
+    def close(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self.sock is not None:
+            loop.remove_reader(self.sock.fileno())
+            self.sock.close()
+            self.sock = None
+
+
+async def sweep_for_mac(target_mac: str,
+                        networks: Optional[Sequence[Tuple[str, ipaddress.IPv4Network, Optional[str]]]] = None,
+                        window: int = SWEEP_WINDOW, timeout: float = SWEEP_TIMEOUT,
+                        ports: Sequence[int] = PROBE_PORTS) -> SweepResult:
+    """
+    Find the IP that answers for ``target_mac`` on the local networks
+
+    Args:
+        target_mac: MAC address to look for
+        networks: (interface, network, local_ip) to sweep (default: target_networks())
+        window: Maximum hosts probed at once
+        timeout: Give up after this many seconds
+        ports: UDP ports poked to trigger ARP resolution
+
+    Returns:
+        SweepResult (ip None if the MAC did not answer)
+    """
+    target_mac = target_mac.lower().replace("-", ":")
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    probes_sent = 0
+
+    def result(ip: Optional[str], method: Optional[str], hosts: int) -> SweepResult:
+        return SweepResult(ip=ip, mac=target_mac, method=method,
+                           elapsed_ms=(time.perf_counter() - started) * 1000,
+                           hosts=hosts, probes_sent=probes_sent)
+
+    # Already resolved? Nothing to sweep.
+    cached = find_mac(target_mac, read_arp_table() or [])
+    if cached:
+        return result(cached.ip, "arp-cache", 0)
+
+    networks = target_networks() if networks is None else list(networks)
+    hosts: List[str] = []
+    for _, network, local_ip in networks:
+        hosts.extend(str(host) for host in network.hosts() if str(host) != local_ip)
+    if not hosts:
+        return result(None, None, 0)
+
+    found: "asyncio.Future[Tuple[str, str]]" = loop.create_future()
+    resolved: Dict[str, asyncio.Event] = {ip: asyncio.Event() for ip in hosts}
+
+    def on_answer(ip: str, mac: str, method: str) -> None:
+        event = resolved.get(ip)
+        if event:
+            event.set()
+        if mac == target_mac and not found.done():
+            found.set_result((ip, method))
+
+    raw = [_RawArp(iface, local_ip, lambda ip, mac: on_answer(ip, mac, "raw-arp"))
+           for iface, _, local_ip in networks if local_ip]
+    raw = [arp for arp in raw if arp.open(loop)]
+    raw_by_network = {}
+    for arp in raw:
+        for iface, network, _ in networks:
+            if iface == arp.iface:
+                raw_by_network[network] = arp
+
+    udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp.setblocking(False)
+    window_slots = asyncio.Semaphore(window)
+
+    async def poll_neighbors() -> None:
+        while True:
+            for entry in read_arp_table() or []:
+                on_answer(entry.ip, entry.mac, "udp")
+            await asyncio.sleep(ARP_POLL_INTERVAL)
+
+    async def probe(ip: str) -> None:
+        nonlocal probes_sent
+        async with window_slots:
+            arp = next((a for n, a in raw_by_network.items() if ipaddress.IPv4Address(ip) in n), None)
+            if arp:
+                arp.request(ip)
+            for port in ports:
+                try:
+                    udp.sendto(b"\0", (ip, port))
+                except OSError:
+                    pass
+            probes_sent += 1
+            try:
+                await asyncio.wait_for(resolved[ip].wait(), HOST_WAIT)
+            except asyncio.TimeoutError:
+                pass
+
+    poller = asyncio.ensure_future(poll_neighbors())
+    probes = asyncio.gather(*(probe(ip) for ip in hosts))
+    try:
+        await asyncio.wait({found, probes}, timeout=timeout,
+                           return_when=asyncio.FIRST_COMPLETED)
+        if not found.done():
+            # Probes finished: give late ARP replies one more poll
+            await asyncio.sleep(ARP_POLL_INTERVAL * 2)
+        if found.done():
+            ip, method = found.result()
+            logger.info(f"✅ Sweep found {target_mac} at {ip} via {method} "
+                        f"({probes_sent}/{len(hosts)} hosts probed)")
+            return result(ip, method, len(hosts))
+        return result(None, None, len(hosts))
+    finally:
+        poller.cancel()
+        probes.cancel()
+        await asyncio.gather(poller, probes, return_exceptions=True)
+        for arp in raw:
+            arp.close(loop)
+        udp.close()
+
@@ -3,7 +3,7 @@
 
 import asyncio
 import logging
-from g1_app.utils.arp_discovery import discover_robot_ip
+from g1_app.utils.robot_discovery import discover_robot_async
 from g1_app.core.robot_controller import RobotController
 from g1_app.arm_controller import ArmController
 
@@ -18,10 +18,11 @@ async def manual_control():
     
     # Connect to robot
     logger.info("🔍 Discovering robot...")
-    robot_ip = discover_robot_ip(G1_MAC)
-    if not robot_ip:
+    found = await discover_robot_async(G1_MAC)
+    if not found:
         logger.error("❌ Failed to discover robot")
         return
+    robot_ip = found['ip']
     
     logger.info(f"✅ Found robot at {robot_ip}")
     robot = RobotController(robot_ip, G1_SN)
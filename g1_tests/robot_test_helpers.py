@@ -6,6 +6,7 @@ Use these to ensure consistency and avoid repeating mistakes.
 Uses centralized robot discovery - SINGLE SOURCE OF TRUTH
 """
 
+import os
 import sys
 import asyncio
 import json
@@ -17,7 +18,7 @@ from typing import Optional, Dict, Any
 repo_root = Path(__file__).resolve().parents[1]
 if str(repo_root) not in sys.path:
     sys.path.insert(0, str(repo_root))
-from g1_app.utils.robot_discovery import discover_robot, wait_for_robot
+from g1_app.utils.robot_discovery import discover_robot_async, wait_for_robot
 
 from g1_app.utils.pathing import get_webrtc_paths
 
@@ -25,6 +26,7 @@ for path in get_webrtc_paths():
     if path and path not in sys.path:
         sys.path.insert(0, path)
 from unitree_webrtc_connect.webrtc_driver import UnitreeWebRTCConnection, WebRTCConnectionMethod
+from g1_app.core.broker_client import BrokerConnection
 
 logger = logging.getLogger(__name__)
 
@@ -44,10 +46,20 @@ class RobotTestConnection:
     
     async def __aenter__(self):
         """Context manager entry - connect to robot"""
+        # Share the UI's connection when a robot broker is running
+        broker_socket = os.getenv('G1_BROKER_SOCKET')
+        if broker_socket:
+            logger.info(f"🔀 Connecting through robot broker {broker_socket}...")
+            self.conn = BrokerConnection(broker_socket, name=Path(sys.argv[0]).name)
+            await self.conn.connect()
+            self.robot_ip = self.conn.robot_ip
+            logger.info(f"✅ Connected! (robot {self.robot_ip})")
+            return self
+
         # Discover robot if IP not provided
         if not self.robot_ip:
             logger.info("🔍 Discovering robot...")
-            robot = discover_robot()
+            robot = await discover_robot_async()
             if not robot or not robot['online']:
                 raise RuntimeError("❌ Robot not found or offline")
             
@@ -239,7 +251,7 @@ async def quick_connect(robot_ip: Optional[str] = None) -> UnitreeWebRTCConnecti
     """
     if not robot_ip:
         logger.info("🔍 Discovering robot...")
-        robot = discover_robot()
+        robot = await discover_robot_async()
         if not robot or not robot['online']:
             raise RuntimeError("❌ Robot not found or offline")
         robot_ip = robot['ip']
@@ -16,15 +16,16 @@ if str(repo_root) not in sys.path:
     sys.path.insert(0, str(repo_root))
 
 # Import the ARP discovery function
-from g1_app.utils.arp_discovery import discover_robot_ip
+from g1_app.utils.robot_discovery import discover_robot_async
 
 async def main():
     print("\n🔍 Discovering G1 robot via ARP scan...")
     print("   Looking for MAC: fc:23:cd:92:60:02\n")
     
-    robot_ip = discover_robot_ip()
+    robot = await discover_robot_async()
     
-    if robot_ip:
+    if robot:
+        robot_ip = robot['ip']
         print(f"✅ Found robot at: {robot_ip}\n")
         print("Next steps:")
         print(f"  1. Verify connection: ping {robot_ip}")
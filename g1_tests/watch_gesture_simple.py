@@ -4,7 +4,7 @@
 import asyncio
 import logging
 import time
-from g1_app.utils.arp_discovery import discover_robot_ip
+from g1_app.utils.robot_discovery import discover_robot_async
 from g1_app.core.robot_controller import RobotController
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
@@ -15,7 +15,10 @@ G1_SN = "G1_6937"
 
 async def watch_gesture():
     # Connect
-    robot_ip = discover_robot_ip(G1_MAC)
+    found = await discover_robot_async(G1_MAC)
+    if not found:
+        raise RuntimeError(f"Robot not found (MAC: {G1_MAC})")
+    robot_ip = found['ip']
     robot = RobotController(robot_ip, G1_SN)
     await robot.connect()
     await asyncio.sleep(3)